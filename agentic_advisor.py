@@ -11,6 +11,7 @@ from typing import Dict, List, Any, Optional, Tuple
 
 import solpool_api_client as solpool_api
 import filotsense_api_client as sentiment_api
+from impermanent_loss import impermanent_loss_risk
 
 # Configure logging
 logging.basicConfig(
@@ -26,6 +27,7 @@ RISK_PROFILES = {
         "max_apr": 30,       # Cap APR to avoid highly speculative pools
         "min_sentiment": -0.1, # Avoid very negative sentiment
         "min_prediction": 60, # Reasonable prediction confidence
+        "il_weight": 0.3,     # High penalty for impermanent loss risk
         "description": "Prioritizes stable pools with moderate returns and lower risk"
     },
     "moderate": {
@@ -33,6 +35,7 @@ RISK_PROFILES = {
         "max_apr": 50,       # Higher APR tolerance
         "min_sentiment": -0.3, # Can accept some negative sentiment
         "min_prediction": 50, # Average prediction confidence
+        "il_weight": 0.2,     # Medium penalty for impermanent loss risk
         "description": "Balanced approach between growth and stability"
     },
     "aggressive": {
@@ -40,6 +43,7 @@ RISK_PROFILES = {
         "max_apr": 100,      # High APR tolerance for speculative pools
         "min_sentiment": -0.5, # Can accept more negative sentiment for high returns
         "min_prediction": 40, # Lower prediction confidence threshold
+        "il_weight": 0.1,     # Low penalty for impermanent loss risk
         "description": "Prioritizes high returns with higher risk tolerance"
     }
 }
@@ -174,6 +178,9 @@ def get_investment_recommendation(
             
             return result
         
+        # Expected impermanent loss for all candidate pools in one vectorized pass
+        il_risks = impermanent_loss_risk(candidate_pools)
+        
         # Score and rank candidate pools
         scored_pools = []
         
@@ -259,7 +266,18 @@ def get_investment_recommendation(
                 elif avg_sentiment < -0.3:
                     score_reasons.append("Caution: Negative sentiment")
                     
-            # 5. Token preference bonus (if applicable)
+            # 5. Impermanent loss penalty (5% expected loss = 10 points)
+            il_risk = il_risks.get(pool.get("id", ""))
+            if il_risk is not None:
+                il_score = min(10, il_risk * 200)
+                pool_score -= il_score * profile_config["il_weight"]
+                
+                if il_risk < 0.001:
+                    score_reasons.append("Low impermanent loss risk")
+                elif il_risk > 0.02:
+                    score_reasons.append("Caution: High impermanent loss risk")
+                    
+            # 6. Token preference bonus (if applicable)
             if token_preference and (token_preference.upper() == token_a or token_preference.upper() == token_b):
                 pool_score += 2  # Bonus points for matching token preference
                 score_reasons.append(f"Includes preferred {token_preference} token")
@@ -273,6 +291,7 @@ def get_investment_recommendation(
                 "score": pool_score,
                 "prediction_score": prediction_score,
                 "sentiment_score": avg_sentiment,
+                "impermanent_loss_risk": il_risk,
                 "reasons": score_reasons,
                 "raw_data": pool  # Include raw data for further processing
             }
@@ -295,6 +314,7 @@ def get_investment_recommendation(
                 "score": pool["score"],
                 "prediction_score": pool.get("prediction_score", 0),
                 "sentiment_score": pool.get("sentiment_score", 0),
+                "impermanent_loss_risk": pool.get("impermanent_loss_risk"),
                 "reasons": pool.get("reasons", [])
             })
         
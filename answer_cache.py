@@ -0,0 +1,351 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+AI answer cache for FiLot Telegram bot
+Serves repeated free-text questions from memory (and optionally the database)
+instead of asking the AI again for the same question, profile and market data
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import datetime
+import threading
+from collections import OrderedDict, namedtuple
+from typing import Dict, Any, List, Optional, Tuple
+
+from market_snapshot import get_current_snapshot
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Cache configuration
+ANSWER_CACHE_TTL = int(os.environ.get("ANSWER_CACHE_TTL", "3600"))  # 1 hour
+ANSWER_CACHE_MAX_ENTRIES = int(os.environ.get("ANSWER_CACHE_MAX_ENTRIES", "2000"))
+ANSWER_CACHE_PERSIST = os.environ.get("ANSWER_CACHE_PERSIST", "false").lower() in ("1", "true", "yes")
+
+# Log the hit ratio every this many lookups
+STATS_LOG_INTERVAL = 100
+
+# Words that do not change what is being asked
+FILLER_WORDS = {"please", "pls", "plz", "hey", "hi", "hello", "the", "a", "an", "kindly", "thanks"}
+
+# Everything except word characters and the symbols used in pairs and amounts
+_SEPARATOR_PATTERN = re.compile(r"[^\w/$%.,]+")
+
+# Cache key: normalized question, user profile and the market data the answer was based on
+AnswerKey = namedtuple("AnswerKey", "question risk_profile investment_horizon snapshot_version snapshot_fingerprint")
+
+
+def normalize_question(text: str) -> str:
+    """
+    Normalize a question so trivially different phrasings share a cache entry.
+
+    Lowercases, drops punctuation and filler words, and collapses whitespace,
+    e.g. "Hey, what is Impermanent Loss??" -> "what is impermanent loss".
+
+    Args:
+        text: Question text
+
+    Returns:
+        Normalized question
+    """
+    words = _SEPARATOR_PATTERN.sub(" ", text.lower().replace("’", "'").replace("'", "")).split()
+    words = [word.strip(".,") for word in words]
+    return " ".join(word for word in words if word and word not in FILLER_WORDS)
+
+
+class AnswerCache:
+    """
+    LRU cache of AI answers with a TTL, optionally backed by the database.
+
+    Answers that depend on pool data are keyed by the market snapshot version
+    in memory and by the snapshot's data fingerprint in the database, so a
+    restart does not serve answers based on different pool data.
+    """
+
+    def __init__(self, max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+                 ttl: float = ANSWER_CACHE_TTL, persist: bool = ANSWER_CACHE_PERSIST):
+        """
+        Initialize the answer cache.
+
+        Args:
+            max_entries: Maximum number of answers kept in memory
+            ttl: Seconds an answer stays valid
+            persist: Whether to also store answers in the database
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.persist = persist
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self.stats = {
+            "hits": 0,
+            "persisted_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+    def make_key(self, question: str, risk_profile: Optional[str] = None,
+                 investment_horizon: Optional[str] = None, market_dependent: bool = True) -> AnswerKey:
+        """
+        Build the cache key for a question.
+
+        Args:
+            question: Question text as sent by the user
+            risk_profile: User's risk profile
+            investment_horizon: User's investment horizon
+            market_dependent: Whether the answer uses pool data; concept explanations do not
+
+        Returns:
+            AnswerKey for get() and put()
+        """
+        snapshot = get_current_snapshot() if market_dependent else None
+        return AnswerKey(
+            normalize_question(question),
+            risk_profile if market_dependent else None,
+            investment_horizon if market_dependent else None,
+            snapshot.version if snapshot else 0,
+            snapshot.fingerprint if snapshot else "",
+        )
+
+    @staticmethod
+    def _persisted_id(key: AnswerKey) -> str:
+        """Database ID of an answer, independent of the process-local snapshot version."""
+        parts = [key.question, key.risk_profile, key.investment_horizon, key.snapshot_fingerprint]
+        return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+    def get(self, *keys: AnswerKey) -> Optional[str]:
+        """
+        Look up a cached answer, trying several keys in order as one lookup.
+
+        Args:
+            *keys: Keys from make_key(), e.g. the market-dependent and the concept key of a question
+
+        Returns:
+            The answer of the first key that has one, or None on a miss
+        """
+        keys = [key for key in keys if key.question]
+        if not keys:
+            return None
+        answer = self._get_memory(keys)
+        if answer is not None:
+            return answer
+        return self._finish_lookup(self._load(keys) if self.persist else None)
+
+    async def get_async(self, *keys: AnswerKey) -> Optional[str]:
+        """
+        Look up a cached answer from a coroutine.
+
+        Like get(), but the database lookup goes through async_db, so it
+        does not block the event loop.
+
+        Args:
+            *keys: Keys from make_key(), tried in order
+
+        Returns:
+            The answer of the first key that has one, or None on a miss
+        """
+        keys = [key for key in keys if key.question]
+        if not keys:
+            return None
+        answer = self._get_memory(keys)
+        if answer is not None:
+            return answer
+
+        loaded = None
+        if self.persist:
+            try:
+                # Import at function level to avoid circular imports
+                from async_db import get_async_db
+                loaded = await get_async_db().run(self._load_row, keys)
+            except Exception as e:
+                logger.error(f"Error loading cached answer: {e}")
+        return self._finish_lookup(loaded)
+
+    def put(self, key: AnswerKey, answer: str) -> None:
+        """
+        Cache an answer.
+
+        Args:
+            key: Key from make_key()
+            answer: AI answer text
+        """
+        expires_at = self._put_memory(key, answer)
+        if expires_at is not None and self.persist:
+            self._store(key, answer, expires_at)
+
+    async def put_async(self, key: AnswerKey, answer: str) -> None:
+        """
+        Cache an answer from a coroutine, storing it in the database through async_db.
+
+        Args:
+            key: Key from make_key()
+            answer: AI answer text
+        """
+        expires_at = self._put_memory(key, answer)
+        if expires_at is not None and self.persist:
+            try:
+                # Import at function level to avoid circular imports
+                from async_db import get_async_db
+                await get_async_db().run(self._store_row, key, answer, expires_at)
+            except Exception as e:
+                logger.error(f"Error storing cached answer: {e}")
+
+    def _get_memory(self, keys: List[AnswerKey]) -> Optional[str]:
+        """Look up the first unexpired answer of several keys in memory, counting a hit."""
+        answer = None
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                memory_key = key[:4]
+                answer, expires_at = self._entries.get(memory_key, (None, 0.0))
+                if answer is None:
+                    continue
+                if expires_at > now:
+                    self._entries.move_to_end(memory_key)
+                    break
+                del self._entries[memory_key]
+                self.stats["expirations"] += 1
+                answer = None
+
+        if answer is not None:
+            self._count("hits")
+        return answer
+
+    def _finish_lookup(self, loaded: Optional[Tuple[AnswerKey, str]]) -> Optional[str]:
+        """Keep an answer loaded from the database in memory and count the lookup."""
+        if loaded is not None:
+            key, answer = loaded
+            self._remember(key[:4], answer, time.time() + self.ttl)
+            self._count("persisted_hits")
+            return answer
+        self._count("misses")
+        return None
+
+    def _put_memory(self, key: AnswerKey, answer: str) -> Optional[float]:
+        """Store an answer in memory; returns its expiry time, or None if it is not cached."""
+        if not key.question or not answer:
+            return None
+
+        expires_at = time.time() + self.ttl
+        self._remember(key[:4], answer, expires_at)
+        with self._lock:
+            self.stats["stores"] += 1
+        return expires_at
+
+    def _remember(self, memory_key: tuple, answer: str, expires_at: float) -> None:
+        """Store an answer in memory, evicting the least recently used entries."""
+        with self._lock:
+            self._entries[memory_key] = (answer, expires_at)
+            self._entries.move_to_end(memory_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def _count(self, outcome: str) -> None:
+        """Count a lookup outcome and periodically log the hit ratio."""
+        with self._lock:
+            self.stats[outcome] += 1
+            lookups = self.stats["hits"] + self.stats["persisted_hits"] + self.stats["misses"]
+        if lookups % STATS_LOG_INTERVAL == 0:
+            logger.info(f"Answer cache hit ratio {self.hit_ratio():.1%} over {lookups} lookups")
+
+    def _load_row(self, session: Any, keys: List[AnswerKey]) -> Optional[Tuple[AnswerKey, str]]:
+        """Read the first unexpired answer of several keys with a database session, in one query."""
+        # Import at function level to avoid circular imports
+        from sqlalchemy import select
+        from models import CachedAnswer
+
+        ids = {self._persisted_id(key): key for key in keys}
+        rows = session.execute(
+            select(CachedAnswer.id, CachedAnswer.answer)
+            .where(CachedAnswer.id.in_(list(ids)), CachedAnswer.expires_at > datetime.datetime.utcnow())
+        ).all()
+        answers = dict(rows)
+        for persisted_id, key in ids.items():
+            if persisted_id in answers:
+                return key, answers[persisted_id]
+        return None
+
+    def _store_row(self, session: Any, key: AnswerKey, answer: str, expires_at: float) -> None:
+        """Insert or replace an answer with a database session (the caller commits)."""
+        # Import at function level to avoid circular imports
+        from models import CachedAnswer
+
+        session.merge(CachedAnswer(
+            id=self._persisted_id(key),
+            question=key.question,
+            risk_profile=key.risk_profile,
+            investment_horizon=key.investment_horizon,
+            answer=answer,
+            expires_at=datetime.datetime.utcfromtimestamp(expires_at)
+        ))
+
+    def _load(self, keys: List[AnswerKey]) -> Optional[Tuple[AnswerKey, str]]:
+        """Load the first unexpired answer of several keys from the database."""
+        try:
+            # Import at function level to avoid circular imports
+            from app import app
+            from models import db
+
+            with app.app_context():
+                return self._load_row(db.session, keys)
+        except Exception as e:
+            logger.error(f"Error loading cached answer: {e}")
+            return None
+
+    def _store(self, key: AnswerKey, answer: str, expires_at: float) -> None:
+        """Insert or replace an answer in the database."""
+        try:
+            # Import at function level to avoid circular imports
+            from app import app
+            from models import db
+
+            with app.app_context():
+                self._store_row(db.session, key, answer, expires_at)
+                db.session.commit()
+        except Exception as e:
+            logger.error(f"Error storing cached answer: {e}")
+
+    def hit_ratio(self) -> float:
+        """Fraction of lookups served from the cache."""
+        hits = self.stats["hits"] + self.stats["persisted_hits"]
+        lookups = hits + self.stats["misses"]
+        return hits / lookups if lookups else 0.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with lookup counters, the hit ratio and the number of entries
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+        stats["hit_ratio"] = self.hit_ratio()
+        return stats
+
+    def clear(self) -> None:
+        """Remove all answers from memory."""
+        with self._lock:
+            self._entries.clear()
+
+
+# Singleton answer cache
+_answer_cache: Optional[AnswerCache] = None
+
+
+def get_answer_cache() -> AnswerCache:
+    """Get the singleton AnswerCache instance."""
+    global _answer_cache
+    if _answer_cache is None:
+        _answer_cache = AnswerCache()
+    return _answer_cache
@@ -6,36 +6,237 @@ Anthropic Claude AI integration for specialized financial advice
 """
 
 import os
+import time
+import asyncio
+import contextlib
 import logging
 import aiohttp
 import json
-from typing import Optional, Dict, List, Any, Tuple
-import anthropic
-from anthropic import Anthropic
+from typing import Optional, Dict, List, Any, Tuple, AsyncIterator, Awaitable, Callable
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Maximum number of Anthropic requests in flight per process
+MAX_CONCURRENT_REQUESTS = int(os.environ.get("ANTHROPIC_MAX_CONCURRENCY", "8"))
+
+# Deadlines in seconds, covering both the wait for a free slot and the request itself
+DEFAULT_DEADLINE = 30.0
+CLASSIFICATION_DEADLINE = 8.0  # Classification only needs a few tokens
+STRATEGY_DEADLINE = 45.0  # Strategies are the longest responses
+
+# Streaming callback, called with the response text generated so far
+TextCallback = Callable[[str], Awaitable[None]]
+
+# Canned replies returned instead of model output when the AI is unavailable, fails or returns no text
+FALLBACK_RESPONSES = {
+    "Financial advice features are currently unavailable.",
+    "Sorry, an error occurred while generating financial advice. Please try again later.",
+    "I couldn't generate financial advice at this time.",
+    "I couldn't generate an investment strategy at this time.",
+    "I couldn't generate an explanation at this time.",
+    "I'm sorry, I couldn't process your request at this time.",
+    "Investment strategy generation is currently unavailable.",
+    "Sorry, an error occurred while generating your investment strategy. Please try again later.",
+    "Financial concept explanations are currently unavailable.",
+    "Sorry, an error occurred while generating the explanation. Please try again later.",
+    "Risk assessment is currently unavailable.",
+    "Could not generate detailed risk assessment.",
+    "An error occurred during risk assessment.",
+}
+
+
+def is_fallback_response(response: Any) -> bool:
+    """
+    Check whether a response is a canned fallback rather than model output.
+
+    Args:
+        response: Text response, or a risk assessment dictionary
+
+    Returns:
+        True if the response should not be reused, e.g. from a cache
+    """
+    if isinstance(response, dict):
+        response = response.get("explanation")
+    return response is None or response in FALLBACK_RESPONSES
+
+
 class AnthropicAI:
     """Client for interacting with Anthropic Claude API for financial advice."""
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, base_url: Optional[str] = None,
+                 max_concurrency: int = MAX_CONCURRENT_REQUESTS):
         """
         Initialize the Anthropic Claude AI client.
         
         Args:
             api_key: API key for Anthropic API
+            base_url: Optional API endpoint (e.g. a local stand-in), defaults to ANTHROPIC_BASE_URL or the public API
+            max_concurrency: Maximum number of requests in flight at once
         """
         self.api_key = api_key
         # Note that the newest Anthropic model is "claude-3-5-sonnet-20241022" which was released October 22, 2024
         self.model = "claude-3-5-sonnet-20241022"  
-        self.client = None if not api_key else Anthropic(api_key=api_key)
+        self.base_url = base_url
+        self._client = None
+        self.max_concurrency = max_concurrency
+        
+        # Semaphores are bound to an event loop, so one is created per running loop
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+        
+        self._metrics = {
+            "calls": 0,
+            "started": 0,
+            "completed": 0,
+            "timeouts": 0,
+            "cancelled": 0,
+            "errors": 0,
+            "waiting": 0,
+            "in_flight": 0,
+            "queue_time_total": 0.0,
+            "queue_time_max": 0.0,
+            "request_time_total": 0.0,
+            "streamed": 0,
+            "first_chunk_time_total": 0.0,
+        }
+    
+    @property
+    def client(self):
+        """Anthropic SDK client, created on first use so importing the SDK does not slow start-up."""
+        if self._client is None and self.api_key:
+            # Import at function level to keep the SDK out of start-up
+            from anthropic import AsyncAnthropic
+            # Deadlines are enforced per call, so a single retry is enough
+            self._client = AsyncAnthropic(api_key=self.api_key, base_url=self.base_url, max_retries=1)
+        return self._client
+        
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Get the concurrency semaphore for the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+        
+    @contextlib.asynccontextmanager
+    async def _request_slot(self, deadline: float = DEFAULT_DEADLINE) -> AsyncIterator[None]:
+        """
+        Hold one of max_concurrency request slots for the duration of a request.
+        
+        The deadline covers both the queue wait and the request. Cancelling the
+        calling task cancels the HTTP request and frees the slot.
+        
+        Args:
+            deadline: Seconds until the call is abandoned with TimeoutError
+        """
+        semaphore = self._get_semaphore()
+        metrics = self._metrics
+        metrics["calls"] += 1
+        metrics["waiting"] += 1
+        queued_at = time.monotonic()
+        acquired = False
+        
+        try:
+            async with asyncio.timeout(deadline):
+                await semaphore.acquire()
+                acquired = True
+                
+                queue_time = time.monotonic() - queued_at
+                metrics["waiting"] -= 1
+                metrics["started"] += 1
+                metrics["in_flight"] += 1
+                metrics["queue_time_total"] += queue_time
+                metrics["queue_time_max"] = max(metrics["queue_time_max"], queue_time)
+                if queue_time > 1.0:
+                    logger.warning(f"Anthropic request waited {queue_time:.2f}s for a free slot")
+                
+                started_at = time.monotonic()
+                yield
+                metrics["request_time_total"] += time.monotonic() - started_at
+                metrics["completed"] += 1
+        except TimeoutError:
+            metrics["timeouts"] += 1
+            logger.error(f"Anthropic request exceeded its {deadline:.0f}s deadline")
+            raise
+        except asyncio.CancelledError:
+            metrics["cancelled"] += 1
+            raise
+        except Exception:
+            metrics["errors"] += 1
+            raise
+        finally:
+            if acquired:
+                metrics["in_flight"] -= 1
+                semaphore.release()
+            else:
+                metrics["waiting"] -= 1
+                
+    async def _create_message(self, deadline: float = DEFAULT_DEADLINE, **kwargs) -> Any:
+        """
+        Send a Messages API request without blocking the event loop.
+        
+        Args:
+            deadline: Seconds until the call is abandoned with TimeoutError
+            **kwargs: Arguments for messages.create
+            
+        Returns:
+            The API response message
+        """
+        async with self._request_slot(deadline):
+            return await self.client.messages.create(**kwargs)
+            
+    async def _generate_text(self, on_text: Optional[TextCallback] = None,
+                             deadline: float = DEFAULT_DEADLINE, **kwargs) -> str:
+        """
+        Generate a text response, optionally streaming it as it is produced.
+        
+        Args:
+            on_text: Optional coroutine called with the text generated so far
+                whenever a new chunk arrives; the response is streamed if given
+            deadline: Seconds until the call is abandoned with TimeoutError
+            **kwargs: Arguments for messages.create
+            
+        Returns:
+            The complete response text ("" if the model returned no text)
+        """
+        if on_text is None:
+            response = await self._create_message(deadline=deadline, **kwargs)
+            return response.content[0].text if response.content else ""
+            
+        text = ""
+        async with self._request_slot(deadline):
+            started_at = time.monotonic()
+            async with self.client.messages.stream(**kwargs) as stream:
+                async for chunk in stream.text_stream:
+                    if not text:
+                        self._metrics["streamed"] += 1
+                        self._metrics["first_chunk_time_total"] += time.monotonic() - started_at
+                    text += chunk
+                    await on_text(text)
+        return text
+        
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get request and queue-time metrics for this client.
+        
+        Returns:
+            Dictionary with counters, current queue depth, average/max queue and request times
+            and the average time to the first chunk of streamed responses
+        """
+        metrics = dict(self._metrics)
+        started = metrics["started"]
+        metrics["avg_queue_time"] = metrics["queue_time_total"] / started if started else 0.0
+        metrics["avg_request_time"] = metrics["request_time_total"] / metrics["completed"] if metrics["completed"] else 0.0
+        metrics["avg_first_chunk_time"] = metrics["first_chunk_time_total"] / metrics["streamed"] if metrics["streamed"] else 0.0
+        return metrics
         
     async def get_financial_advice(self, 
                                   user_query: str, 
                                   pool_data: Optional[List[Dict[str, Any]]] = None,
                                   risk_profile: str = "moderate",
-                                  investment_horizon: str = "medium") -> str:
+                                  investment_horizon: str = "medium",
+                                  on_text: Optional[TextCallback] = None) -> str:
         """
         Generate specialized financial advice using Anthropic Claude.
         
@@ -44,6 +245,7 @@ class AnthropicAI:
             pool_data: Optional cryptocurrency pool data for context
             risk_profile: User's risk tolerance (conservative, moderate, aggressive)
             investment_horizon: User's investment timeframe (short, medium, long)
+            on_text: Optional coroutine to stream the advice to, called with the text so far
             
         Returns:
             AI-generated financial advice as a string
@@ -87,7 +289,8 @@ class AnthropicAI:
             """
             
             # Generate the response
-            response = self.client.messages.create(
+            financial_advice = await self._generate_text(
+                on_text,
                 model=self.model,
                 system=system_prompt,
                 max_tokens=1024,
@@ -97,9 +300,8 @@ class AnthropicAI:
                 ]
             )
             
-            # Extract and return the advice
-            financial_advice = response.content[0].text if response.content else "I couldn't generate financial advice at this time."
-            return financial_advice
+            # Return the advice
+            return financial_advice or "I couldn't generate financial advice at this time."
                 
         except Exception as e:
             logger.error(f"Error generating financial advice: {e}")
@@ -151,7 +353,7 @@ class AnthropicAI:
             """
             
             # Generate the assessment
-            response = self.client.messages.create(
+            response = await self._create_message(
                 model=self.model,
                 max_tokens=1024,
                 temperature=0.3,  # Lower temperature for more consistent analysis
@@ -299,7 +501,8 @@ class AnthropicAI:
             """
             
             # Generate the strategy
-            response = self.client.messages.create(
+            response = await self._create_message(
+                deadline=STRATEGY_DEADLINE,
                 model=self.model,
                 max_tokens=1536,  # Longer response for detailed strategy
                 temperature=0.7,
@@ -316,12 +519,14 @@ class AnthropicAI:
             logger.error(f"Error generating investment strategy: {e}")
             return "Sorry, an error occurred while generating your investment strategy. Please try again later."
             
-    async def explain_financial_concept(self, concept: str) -> str:
+    async def explain_financial_concept(self, concept: str,
+                                        on_text: Optional[TextCallback] = None) -> str:
         """
         Provide detailed explanation of a DeFi or crypto financial concept.
         
         Args:
             concept: The financial concept to explain
+            on_text: Optional coroutine to stream the explanation to, called with the text so far
             
         Returns:
             Detailed explanation as a string
@@ -348,7 +553,8 @@ class AnthropicAI:
             """
             
             # Generate the explanation
-            response = self.client.messages.create(
+            explanation = await self._generate_text(
+                on_text,
                 model=self.model,
                 max_tokens=1024,
                 temperature=0.5,
@@ -357,9 +563,8 @@ class AnthropicAI:
                 ]
             )
             
-            # Extract and return the explanation
-            explanation = response.content[0].text if response.content else "I couldn't generate an explanation at this time."
-            return explanation
+            # Return the explanation
+            return explanation or "I couldn't generate an explanation at this time."
                 
         except Exception as e:
             logger.error(f"Error explaining financial concept: {e}")
@@ -399,7 +604,8 @@ class AnthropicAI:
             """
             
             # Generate the classification
-            response = self.client.messages.create(
+            response = await self._create_message(
+                deadline=CLASSIFICATION_DEADLINE,
                 model=self.model,
                 max_tokens=10,  # Very short response needed
                 temperature=0.2,  # Low temperature for consistent results
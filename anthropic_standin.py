@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Local stand-in for the Anthropic Messages API for FiLot Telegram bot
+Answers /v1/messages after a configurable delay so the AI service can be
+exercised and benchmarked without network access or API credits
+
+Usage:
+    python anthropic_standin.py                  # benchmark the AI service against the stand-in
+    python anthropic_standin.py --serve          # only run the stand-in on STANDIN_PORT
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8787 python main.py
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import logging
+
+from aiohttp import web
+
+# Configure logging
+logging.basicConfig(
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+# Stand-in configuration
+STANDIN_PORT = int(os.environ.get("STANDIN_PORT", "8787"))
+STANDIN_LATENCY = float(os.environ.get("STANDIN_LATENCY", "1.5"))  # Seconds per response
+STREAM_FIRST_CHUNK_SHARE = 0.2  # Share of the latency before the first streamed chunk
+LATENCY_KEY = web.AppKey("latency", float)  # App key holding the configured latency
+
+# Benchmark configuration
+BENCHMARK_REQUESTS = 24
+
+
+async def handle_messages(request: web.Request) -> web.StreamResponse:
+    """Answer a Messages API request with canned text after the configured latency."""
+    body = await request.json()
+
+    # Classification prompts ask for a single category name
+    text = "general" if body.get("max_tokens", 0) <= 10 else (
+        "This is a stand-in response. Liquidity pools earn trading fees but carry "
+        "impermanent loss risk. Cryptocurrency investments are risky."
+    )
+    message = {
+        "id": f"msg_{uuid.uuid4().hex}",
+        "type": "message",
+        "role": "assistant",
+        "model": body.get("model", "standin"),
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": 0, "output_tokens": len(text.split())}
+    }
+
+    if body.get("stream"):
+        return await _stream_message(request, message)
+
+    await asyncio.sleep(request.app[LATENCY_KEY])
+    return web.json_response(message)
+
+
+async def _stream_message(request: web.Request, message: dict) -> web.StreamResponse:
+    """Stream a message as server-sent events, word by word, spread over the configured latency."""
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+    await response.prepare(request)
+
+    async def send(event: str, data: dict) -> None:
+        await response.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+
+    text = message["content"][0]["text"]
+    words = text.split(" ")
+    latency = request.app[LATENCY_KEY]
+
+    # The first chunk arrives after a fifth of the latency, the rest are spread over the remainder
+    await asyncio.sleep(latency * STREAM_FIRST_CHUNK_SHARE)
+    await send("message_start", {"type": "message_start", "message": dict(message, content=[], stop_reason=None)})
+    await send("content_block_start", {"type": "content_block_start", "index": 0,
+                                       "content_block": {"type": "text", "text": ""}})
+    for i, word in enumerate(words):
+        if i:
+            await asyncio.sleep(latency * (1 - STREAM_FIRST_CHUNK_SHARE) / len(words))
+        chunk = word if i == 0 else f" {word}"
+        await send("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                           "delta": {"type": "text_delta", "text": chunk}})
+    await send("content_block_stop", {"type": "content_block_stop", "index": 0})
+    await send("message_delta", {"type": "message_delta",
+                                 "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                 "usage": {"output_tokens": len(words)}})
+    await send("message_stop", {"type": "message_stop"})
+    await response.write_eof()
+    return response
+
+
+def create_app(latency: float = STANDIN_LATENCY) -> web.Application:
+    """
+    Create the stand-in web application.
+
+    Args:
+        latency: Seconds to wait before answering each request
+
+    Returns:
+        aiohttp Application serving POST /v1/messages
+    """
+    app = web.Application()
+    app[LATENCY_KEY] = latency
+    app.router.add_post("/v1/messages", handle_messages)
+    return app
+
+
+async def start_standin(port: int = STANDIN_PORT, latency: float = STANDIN_LATENCY) -> web.AppRunner:
+    """Start the stand-in on localhost and return its runner (call runner.cleanup() to stop)."""
+    runner = web.AppRunner(create_app(latency))
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    logger.info(f"Anthropic stand-in listening on http://127.0.0.1:{port} with {latency}s latency")
+    return runner
+
+
+async def run_benchmark() -> None:
+    """Fire concurrent AI service calls at the stand-in and report wall time and queue metrics."""
+    # Import at function level so the stand-in can run without the bot's dependencies
+    from anthropic_service import AnthropicAI
+
+    runner = await start_standin()
+    try:
+        advisor = AnthropicAI(api_key="standin", base_url=f"http://127.0.0.1:{STANDIN_PORT}")
+
+        # Another user's quick call must not wait for the slow ones ahead of it
+        start = time.monotonic()
+        answers = await asyncio.gather(*[
+            advisor.get_financial_advice(f"Question {i}") for i in range(BENCHMARK_REQUESTS)
+        ])
+        elapsed = time.monotonic() - start
+
+        sequential = BENCHMARK_REQUESTS * STANDIN_LATENCY
+        metrics = advisor.get_metrics()
+        print(f"\n{len(answers)} requests at {STANDIN_LATENCY}s each, {advisor.max_concurrency} concurrent")
+        print(f"Wall time: {elapsed:.2f}s (blocking client: ~{sequential:.1f}s)")
+        print(f"Queue time: avg {metrics['avg_queue_time']:.2f}s, max {metrics['queue_time_max']:.2f}s")
+        print(f"Request time: avg {metrics['avg_request_time']:.2f}s")
+
+        # A call whose deadline expires while queued or in flight is abandoned
+        slow = asyncio.create_task(advisor.get_financial_advice("Will be cancelled"))
+        await asyncio.sleep(0.1)
+        slow.cancel()
+        await asyncio.gather(slow, return_exceptions=True)
+        print(f"Cancelled calls: {advisor.get_metrics()['cancelled']}, in flight: {advisor.get_metrics()['in_flight']}")
+
+        # Streamed answers show their first words long before the full answer is ready
+        chunks = []
+
+        async def on_text(text: str) -> None:
+            chunks.append((time.monotonic() - start, text))
+
+        start = time.monotonic()
+        await advisor.explain_financial_concept("impermanent loss", on_text=on_text)
+        print(f"Streamed {len(chunks)} chunks: first after {chunks[0][0]:.2f}s, complete after {chunks[-1][0]:.2f}s")
+    finally:
+        await runner.cleanup()
+
+
+async def serve_forever() -> None:
+    """Run only the stand-in until interrupted."""
+    runner = await start_standin()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(serve_forever() if "--serve" in sys.argv else run_benchmark())
@@ -8,25 +8,13 @@ Prevents message loops and detects repeated actions to improve user experience
 
 import time
 import logging
-from typing import Dict, Set, List, Tuple, Optional
-from datetime import datetime, timedelta
-from collections import defaultdict
+from collections import deque
+
+from user_state import UserStateStore
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Store user message history for loop detection
-# Key: user_id, Value: List of (message_text, timestamp) tuples
-user_message_history: Dict[int, List[Tuple[str, float]]] = {}
-
-# Store button presses to detect repetitive button clicks
-# Key: user_id, Value: Dict of button_text -> List of timestamps
-user_button_presses: Dict[int, Dict[str, List[float]]] = defaultdict(lambda: defaultdict(list))
-
-# Store last sent messages to each user to prevent duplicate notifications
-# Key: user_id, Value: (message_text, timestamp)
-last_sent_messages: Dict[int, Tuple[str, float]] = {}
-
 # Maximum number of messages to keep in history per user
 MAX_HISTORY_SIZE = 20
 
@@ -42,6 +30,30 @@ BUTTON_RATE_LIMIT_WINDOW = 2.0
 # Minimum time between duplicate messages (in seconds)
 MIN_DUPLICATE_INTERVAL = 2.0
 
+# Button presses kept per button; more than two within the window is never needed
+MAX_BUTTON_HISTORY = 4
+
+# Seconds of inactivity after which a user's anti-loop records are dropped
+ANTI_LOOP_STATE_TTL = DUPLICATE_WINDOW * 2
+
+# Store user message history for loop detection
+# Key: user_id, Value: deque of (hash of message_text, timestamp) tuples
+user_message_history: UserStateStore = UserStateStore(
+    "message_history", ANTI_LOOP_STATE_TTL
+)
+
+# Store button presses to detect repetitive button clicks
+# Key: user_id, Value: Dict of button_text -> deque of timestamps
+user_button_presses: UserStateStore = UserStateStore(
+    "button_presses", ANTI_LOOP_STATE_TTL
+)
+
+# Store last sent messages to each user to prevent duplicate notifications
+# Key: user_id, Value: (hash of message_text, timestamp)
+last_sent_messages: UserStateStore = UserStateStore(
+    "last_sent_messages", ANTI_LOOP_STATE_TTL
+)
+
 
 def record_user_message(user_id: int, message_text: str) -> None:
     """
@@ -54,15 +66,12 @@ def record_user_message(user_id: int, message_text: str) -> None:
     timestamp = time.time()
     
     # Initialize history for new users
-    if user_id not in user_message_history:
-        user_message_history[user_id] = []
+    history = user_message_history.get(user_id)
+    if history is None:
+        history = user_message_history[user_id] = deque(maxlen=MAX_HISTORY_SIZE)
     
-    # Add the current message
-    user_message_history[user_id].append((message_text, timestamp))
-    
-    # Keep history size limited
-    if len(user_message_history[user_id]) > MAX_HISTORY_SIZE:
-        user_message_history[user_id].pop(0)
+    # Add the current message; only its hash is needed for comparisons
+    history.append((hash(message_text), timestamp))
     
     # Log for debugging
     logger.debug(f"Recorded message from user {user_id}: {message_text[:20]}...")
@@ -79,18 +88,18 @@ def is_potential_loop(user_id: int, message_text: str) -> bool:
     Returns:
         True if this appears to be a loop, False otherwise
     """
-    if user_id not in user_message_history:
-        return False
-    
     # Get recent history
-    history = user_message_history[user_id]
+    history = user_message_history.get(user_id)
+    if not history:
+        return False
     
     # Count occurrences of this message in the recent past
     now = time.time()
     recent_count = 0
+    message_hash = hash(message_text)
     
-    for hist_text, hist_time in history:
-        if hist_text == message_text and now - hist_time < DUPLICATE_WINDOW:
+    for hist_hash, hist_time in history:
+        if hist_hash == message_hash and now - hist_time < DUPLICATE_WINDOW:
             recent_count += 1
     
     # If we've seen this message too many times recently, it's a potential loop
@@ -110,13 +119,12 @@ def record_button_press(user_id: int, button_text: str) -> None:
         button_text: Text of the pressed button
     """
     timestamp = time.time()
-    user_button_presses[user_id][button_text].append(timestamp)
-    
-    # Clean up old button presses to prevent memory growth
-    cutoff_time = timestamp - DUPLICATE_WINDOW
-    user_button_presses[user_id][button_text] = [
-        t for t in user_button_presses[user_id][button_text] if t >= cutoff_time
-    ]
+    presses = user_button_presses.get(user_id)
+    if presses is None:
+        presses = user_button_presses[user_id] = {}
+    if button_text not in presses:
+        presses[button_text] = deque(maxlen=MAX_BUTTON_HISTORY)
+    presses[button_text].append(timestamp)
 
 
 def is_button_rate_limited(user_id: int, button_text: str) -> bool:
@@ -131,13 +139,14 @@ def is_button_rate_limited(user_id: int, button_text: str) -> bool:
         True if the button press should be rate limited, False otherwise
     """
     # If no history, allow the button press
-    if user_id not in user_button_presses or button_text not in user_button_presses[user_id]:
+    presses = user_button_presses.get(user_id)
+    if not presses or button_text not in presses:
         return False
     
     # Check if there's already a recent press of this button
     now = time.time()
     recent_presses = [
-        t for t in user_button_presses[user_id][button_text] 
+        t for t in presses[button_text]
         if now - t < BUTTON_RATE_LIMIT_WINDOW
     ]
     
@@ -157,7 +166,7 @@ def record_sent_message(user_id: int, message_text: str) -> None:
         user_id: Telegram user ID
         message_text: Message text content
     """
-    last_sent_messages[user_id] = (message_text, time.time())
+    last_sent_messages[user_id] = (hash(message_text), time.time())
 
 
 def is_duplicate_outgoing(user_id: int, message_text: str) -> bool:
@@ -171,14 +180,15 @@ def is_duplicate_outgoing(user_id: int, message_text: str) -> bool:
     Returns:
         True if this appears to be a duplicate, False otherwise
     """
-    if user_id not in last_sent_messages:
+    last_sent = last_sent_messages.get(user_id)
+    if last_sent is None:
         return False
     
-    last_text, last_time = last_sent_messages[user_id]
+    last_hash, last_time = last_sent
     now = time.time()
     
     # If it's the same message and sent too soon after the last one
-    if last_text == message_text and now - last_time < MIN_DUPLICATE_INTERVAL:
+    if last_hash == hash(message_text) and now - last_time < MIN_DUPLICATE_INTERVAL:
         logger.info(f"Prevented duplicate message to user {user_id}")
         return True
     
@@ -188,38 +198,7 @@ def is_duplicate_outgoing(user_id: int, message_text: str) -> bool:
 def clean_expired_records() -> None:
     """
     Clean up expired records to prevent memory leaks.
-    Should be called periodically.
+    The user state sweeper does this in the background; calling it directly is still safe.
     """
-    cutoff_time = time.time() - DUPLICATE_WINDOW * 2
-    
-    # Clean up message history
-    for user_id in list(user_message_history.keys()):
-        user_message_history[user_id] = [
-            (text, timestamp) for text, timestamp in user_message_history[user_id]
-            if timestamp >= cutoff_time
-        ]
-        
-        # Remove empty histories
-        if not user_message_history[user_id]:
-            del user_message_history[user_id]
-    
-    # Clean up button press history
-    for user_id in list(user_button_presses.keys()):
-        for button_text in list(user_button_presses[user_id].keys()):
-            user_button_presses[user_id][button_text] = [
-                t for t in user_button_presses[user_id][button_text]
-                if t >= cutoff_time
-            ]
-            
-            # Remove empty button histories
-            if not user_button_presses[user_id][button_text]:
-                del user_button_presses[user_id][button_text]
-        
-        # Remove empty user entries
-        if not user_button_presses[user_id]:
-            del user_button_presses[user_id]
-    
-    # Clean up sent messages
-    for user_id in list(last_sent_messages.keys()):
-        if last_sent_messages[user_id][1] < cutoff_time:
-            del last_sent_messages[user_id]
\ No newline at end of file
+    for store in (user_message_history, user_button_presses, last_sent_messages):
+        store.sweep()
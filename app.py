@@ -15,6 +15,8 @@ from dotenv import load_dotenv
 from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy import text
 from models import db, User, Pool, BotStatistics, UserQuery, UserActivityLog, ErrorLog
+from startup import once
+from heartbeat import start_heartbeat, get_heartbeat
 
 # Load environment variables
 load_dotenv()
@@ -40,83 +42,23 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Add anti-idle mechanism
-def start_anti_idle_thread():
+@once
+def init_app():
     """
-    Start a thread that keeps the application active by periodically
-    accessing the database. This prevents the application from being
-    terminated due to inactivity by the hosting platform.
-    """
-    import threading
-    import time
-    
-    def keep_alive():
-        """Keep the application alive by performing regular database activity."""
-        logger.info("Starting anti-idle thread to prevent timeout")
-        
-        while True:
-            try:
-                # Execute a simple query to keep the database connection active
-                with app.app_context():
-                    from sqlalchemy import text
-                    result = db.session.execute(text("SELECT 1")).fetchone()
-                    logger.info(f"Anti-idle thread: Database ping successful, result={result}")
-                    
-                    # Update the uptime_percentage which we can modify directly
-                    from models import BotStatistics
-                    stats = BotStatistics.query.order_by(BotStatistics.id.desc()).first()
-                    if stats:
-                        # Create a log record to show activity
-                        from models import ErrorLog
-                        log = ErrorLog(
-                            error_type="keep_alive",
-                            error_message="Anti-idle activity to prevent timeout",
-                            module="app.py",
-                            resolved=True
-                        )
-                        db.session.add(log)
-                        # Increment uptime percentage slightly (which can be modified directly)
-                        stats.uptime_percentage += 0.01  # Small increment
-                        db.session.commit()
-                        logger.info("Anti-idle thread: Recorded keep-alive activity to prevent timeout")
-                    else:
-                        # Create initial statistics
-                        new_stats = BotStatistics(
-                            command_count=0,
-                            active_user_count=0,
-                            subscribed_user_count=0,
-                            blocked_user_count=0,
-                            spam_detected_count=0,
-                            average_response_time=0.0,
-                            uptime_percentage=0.0,
-                            error_count=0
-                        )
-                        db.session.add(new_stats)
-                        db.session.commit()
-                        logger.info("Anti-idle thread: Created initial statistics")
-            except Exception as e:
-                logger.error(f"Anti-idle thread: Error during keep-alive operation: {e}")
-            
-            # Sleep for 60 seconds (well below the 2m21s timeout)
-            time.sleep(60)
-    
-    # Start the keep-alive thread as a daemon
-    anti_idle_thread = threading.Thread(target=keep_alive, daemon=True)
-    anti_idle_thread.start()
-    logger.info("Anti-idle thread started")
-    
-    return anti_idle_thread
+    Create missing database tables and start the heartbeat.
 
-# Start the anti-idle thread
-anti_idle_thread = start_anti_idle_thread()
+    Called by the entry points before serving, instead of at import, so
+    importing this module opens no database connection. Runs once per process.
+    """
+    with app.app_context():
+        try:
+            db.create_all()
+            logger.info("Database tables created successfully")
+        except Exception as e:
+            logger.error(f"Error creating database tables: {e}")
 
-# Create database tables
-with app.app_context():
-    try:
-        db.create_all()
-        logger.info("Database tables created successfully")
-    except Exception as e:
-        logger.error(f"Error creating database tables: {e}")
+    # Record liveness periodically; also keeps the hosting platform from idling the app
+    start_heartbeat()
 
 # Add health check endpoint
 @app.route("/health")
@@ -129,13 +71,40 @@ def health():
     bot_threads = [t for t in threading.enumerate() if 'telegram' in t.name.lower() or 'bot' in t.name.lower()]
     bot_thread_names = [t.name for t in bot_threads]
     
+    # Import at function level to avoid circular imports
+    from answer_cache import get_answer_cache
+    from stats_aggregator import get_stats_aggregator
+    from log_writer import get_log_writer
+    from user_state import get_state_metrics
+    from callback_router import get_callback_router
+    from render_cache import get_render_cache
+    from notification_matcher import get_notification_matcher
+    from webhook_server import get_webhook_metrics
+    from update_scheduler import get_scheduler_metrics
+    from startup import get_startup_metrics
+    from db_pool import get_pool_metrics
+    from async_db import get_async_db
+    
     return jsonify({
         "status": "ok",
         "timestamp": datetime.datetime.now().isoformat(),
         "app": "telegram-crypto-pool-bot",
         "telegram_token": token_status,
         "threads": len(threading.enumerate()),
-        "bot_threads": bot_thread_names
+        "bot_threads": bot_thread_names,
+        "answer_cache": get_answer_cache().get_stats(),
+        "statistics": get_stats_aggregator().get_summary(),
+        "log_writer": get_log_writer().get_metrics(),
+        "user_state": get_state_metrics(),
+        "callbacks": get_callback_router().get_metrics(),
+        "render_cache": get_render_cache().get_stats(),
+        "notifications": get_notification_matcher().get_metrics(),
+        "webhook": get_webhook_metrics(),
+        "updates": get_scheduler_metrics(),
+        "startup": get_startup_metrics(),
+        "heartbeat": get_heartbeat().get_status(),
+        "db_pool": get_pool_metrics(),
+        "async_db": get_async_db().get_metrics()
     })
 
 # Routes
@@ -0,0 +1,329 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Async database access for FiLot Telegram bot
+Lets bot handlers read and write the models without blocking the event loop
+or entering a Flask app context. With PostgreSQL and the asyncpg driver the
+queries run on an async SQLAlchemy engine; otherwise (SQLite, or asyncpg not
+installed) they run in sessions on a small thread pool
+"""
+
+import os
+import time
+import weakref
+import asyncio
+import logging
+import datetime
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, List, Optional, Tuple, TypeVar
+
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Threads running database work in executor mode
+DB_EXECUTOR_WORKERS = int(os.environ.get("DB_EXECUTOR_WORKERS", "8"))
+
+# Connections of the async engine (mirrors the app engine's pool settings)
+ASYNC_POOL_SIZE = 5
+ASYNC_POOL_RECYCLE = 300
+
+T = TypeVar("T")
+
+
+def async_driver_available() -> bool:
+    """Whether async SQLAlchemy can be used with PostgreSQL (asyncpg and greenlet installed)."""
+    return all(importlib.util.find_spec(name) is not None for name in ("asyncpg", "greenlet"))
+
+
+def to_async_url(database_url: str) -> Optional[Tuple[Any, Dict[str, Any]]]:
+    """
+    Convert a PostgreSQL URL to its asyncpg form.
+
+    Args:
+        database_url: URL as used by the app, e.g. postgresql://user:pw@host/db?sslmode=require
+
+    Returns:
+        Tuple of (SQLAlchemy URL, connect arguments), or None for other databases
+    """
+    url = make_url(database_url)
+    if url.get_backend_name() not in ("postgresql", "postgres"):
+        return None
+    connect_args = {}
+    # asyncpg takes the SSL mode as a connect argument instead of sslmode
+    if "sslmode" in url.query:
+        connect_args["ssl"] = url.query["sslmode"]
+        url = url.difference_update_query(["sslmode"])
+    return url.set(drivername="postgresql+asyncpg"), connect_args
+
+
+class AsyncDatabase:
+    """
+    Database access for coroutines.
+
+    run() calls a function with a session and commits, so the same function
+    works in both modes; get(), scalar() and scalars() cover the common
+    single-statement reads. Objects are not expired on commit and can be
+    read after the call returns.
+    """
+
+    def __init__(self, database_url: Optional[str] = None, workers: int = DB_EXECUTOR_WORKERS,
+                 use_async_driver: Optional[bool] = None):
+        """
+        Initialize the database access.
+
+        Args:
+            database_url: Database URL (DATABASE_URL by default)
+            workers: Threads used in executor mode
+            use_async_driver: Force (or disable) the async engine; detected if None
+        """
+        self.database_url = database_url or os.environ.get("DATABASE_URL", "")
+        self.workers = workers
+        async_url = to_async_url(self.database_url) if self.database_url else None
+        if use_async_driver is None:
+            use_async_driver = async_url is not None and async_driver_available()
+        self.mode = "async" if use_async_driver and async_url else "executor"
+        self._async_url = async_url
+        # Pooled asyncpg connections belong to the loop that opened them, so each
+        # event loop (e.g. after the bot restarts under a new asyncio.run) gets its own engine
+        self._async_sessionmakers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._engine = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.metrics = {
+            "calls": 0,
+            "failures": 0,
+            "total_ms": 0.0,
+            "max_ms": 0.0,
+        }
+
+    def _sync_engine(self) -> Any:
+        """Engine of the Flask app, shared with its connection pool (executor mode)."""
+        if self._engine is None:
+            # Import at function level to avoid circular imports
+            from app import app
+            from models import db
+
+            # The engine stays usable after the context that created it is left
+            with app.app_context():
+                self._engine = db.engine
+        return self._engine
+
+    def _sessionmaker(self) -> Any:
+        """Async session factory of the running loop, created on first use on that loop (async mode)."""
+        loop = asyncio.get_running_loop()
+        sessionmaker = self._async_sessionmakers.get(loop)
+        if sessionmaker is None:
+            sessionmaker = self._async_sessionmakers[loop] = self._create_sessionmaker()
+        return sessionmaker
+
+    def _create_sessionmaker(self) -> Any:
+        """Create an async engine and its session factory."""
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+        url, connect_args = self._async_url
+        engine = create_async_engine(url, pool_size=ASYNC_POOL_SIZE, pool_recycle=ASYNC_POOL_RECYCLE,
+                                     pool_pre_ping=True, connect_args=connect_args)
+        logger.info("Async database engine created (asyncpg)")
+        return async_sessionmaker(engine, expire_on_commit=False)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Threads for blocking database work, created on first use."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="db")
+        return self._executor
+
+    def _call_in_session(self, func: Callable[..., T], *args: Any) -> T:
+        """Run func(session, *args) in a new session and commit (executor mode)."""
+        with Session(self._sync_engine(), expire_on_commit=False) as session:
+            result = func(session, *args)
+            session.commit()
+            return result
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """
+        Run a function with a session without blocking the event loop, then commit.
+
+        Args:
+            func: Function taking a sqlalchemy.orm.Session and args
+            *args: Further arguments for func
+
+        Returns:
+            The function's result
+
+        Raises:
+            Any error of the function or the commit (after rolling back)
+        """
+        started = time.perf_counter()
+        self.metrics["calls"] += 1
+        try:
+            if self.mode == "async":
+                async with self._sessionmaker()() as session:
+                    result = await session.run_sync(func, *args)
+                    await session.commit()
+            else:
+                result = await asyncio.get_running_loop().run_in_executor(
+                    self._get_executor(), self._call_in_session, func, *args
+                )
+            return result
+        except Exception:
+            self.metrics["failures"] += 1
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.metrics["total_ms"] += elapsed_ms
+            self.metrics["max_ms"] = max(self.metrics["max_ms"], elapsed_ms)
+
+    async def run_blocking(self, func: Callable[..., T], *args: Any) -> T:
+        """
+        Run a blocking call without a session on the database threads, in either mode.
+
+        For database work outside SQLAlchemy, e.g. checking out a raw psycopg2
+        connection from db_pool, which can wait for a free connection.
+
+        Args:
+            func: Function to call
+            *args: Arguments for func
+
+        Returns:
+            The function's result
+        """
+        return await asyncio.get_running_loop().run_in_executor(self._get_executor(), func, *args)
+
+    async def run_in_app_context(self, func: Callable[..., T], *args: Any) -> T:
+        """
+        Run a function using the Flask-SQLAlchemy session on the database threads.
+
+        For the db_utils functions, which use Model.query and db.session and
+        need an app context; one is pushed on the worker thread for the call.
+
+        Args:
+            func: Function to call
+            *args: Arguments for func
+
+        Returns:
+            The function's result
+        """
+        return await self.run_blocking(_call_in_app_context, func, *args)
+
+    async def get(self, model: Any, key: Any) -> Optional[Any]:
+        """Get a row by primary key, or None."""
+        return await self.run(lambda session: session.get(model, key))
+
+    async def scalar(self, statement: Any) -> Optional[Any]:
+        """Execute a statement and return the first column of the first row, or None."""
+        return await self.run(lambda session: session.execute(statement).scalar())
+
+    async def scalars(self, statement: Any) -> List[Any]:
+        """Execute a statement and return the first column of every row."""
+        return await self.run(lambda session: session.execute(statement).scalars().all())
+
+    async def add_all(self, instances: List[Any]) -> None:
+        """Insert or update model instances."""
+        await self.run(lambda session: session.add_all(instances))
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get database access metrics.
+
+        Returns:
+            Dictionary with the mode, call and failure counts and call times (ms)
+        """
+        metrics = dict(self.metrics)
+        metrics.update({
+            "mode": self.mode,
+            "avg_ms": metrics["total_ms"] / metrics["calls"] if metrics["calls"] else 0.0,
+        })
+        return metrics
+
+
+def _call_in_app_context(func: Callable[..., T], *args: Any) -> T:
+    """Call func(*args) in a Flask app context (for run_in_app_context)."""
+    # Import at function level to avoid circular imports
+    from app import app
+
+    with app.app_context():
+        return func(*args)
+
+
+def _get_or_create_user(session: Session, user_id: int, fields: Dict[str, Any]) -> Any:
+    """Session function for get_or_create_user."""
+    # Import at function level to avoid circular imports
+    from models import User, UserActivityLog
+
+    now = datetime.datetime.utcnow()
+    user = session.get(User, user_id)
+    if user is None:
+        try:
+            with session.begin_nested():
+                user = User(id=user_id, created_at=now, last_active=now,
+                            **{k: v for k, v in fields.items() if v is not None})
+                session.add(user)
+            session.add(UserActivityLog(user_id=user_id, activity_type="account_created",
+                                        details="New user created", timestamp=now))
+            logger.info(f"Created new user with id={user_id}")
+        except IntegrityError:
+            # Created concurrently by another handler or process
+            user = session.get(User, user_id)
+        return user
+
+    for name, value in fields.items():
+        if value is not None and getattr(user, name) != value:
+            setattr(user, name, value)
+    user.last_active = now
+    return user
+
+
+async def get_or_create_user(user_id: int, **fields: Any) -> Any:
+    """
+    Get a user, creating them if needed, and update their last activity.
+
+    Equivalent of db_utils.get_or_create_user for coroutines.
+
+    Args:
+        user_id: Telegram user ID
+        **fields: User columns to set if given, e.g. username, first_name, last_name
+
+    Returns:
+        User object (detached, attributes loaded)
+    """
+    return await get_async_db().run(_get_or_create_user, user_id, fields)
+
+
+async def get_top_pools(limit: int = 5, offset: int = 0) -> List[Any]:
+    """
+    Get pools ordered by 24h APR.
+
+    Args:
+        limit: Maximum number of pools
+        offset: Number of pools to skip
+
+    Returns:
+        List of Pool objects
+    """
+    # Import at function level to avoid circular imports
+    from models import Pool
+
+    return await get_async_db().scalars(
+        select(Pool).order_by(Pool.apr_24h.desc()).offset(offset).limit(limit)
+    )
+
+
+# Singleton database access
+_async_db: Optional[AsyncDatabase] = None
+
+
+def get_async_db() -> AsyncDatabase:
+    """Get the singleton AsyncDatabase for DATABASE_URL."""
+    global _async_db
+    if _async_db is None:
+        _async_db = AsyncDatabase()
+        logger.info(f"Async database access in {_async_db.mode} mode")
+    return _async_db
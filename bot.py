@@ -8,33 +8,27 @@ import re
 import datetime
 import asyncio
 import io
-import qrcode
 from typing import Dict, List, Any, Optional, Union, Tuple
 import traceback
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, KeyboardButton
-from telegram.ext import ContextTypes, Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters
+from telegram.ext import ContextTypes, Application, CommandHandler, MessageHandler, filters
 from dotenv import load_dotenv
 
 # Import local modules
 import db_utils
 from models import User, Pool, UserQuery, db
 from question_detector import get_predefined_response, is_question
+from intent_classifier import get_classifier, retrain_in_background
+from answer_cache import get_answer_cache
+from streaming_reply import StreamingReply
 from raydium_client import get_client
 from utils import format_pool_info, format_simulation_results, format_daily_update
 from menus import MenuType, get_menu_config
-from keyboard_utils import get_reply_keyboard, set_menu_state
+from keyboard_utils import get_reply_keyboard, set_menu_state, get_current_menu
 from callback_handler import handle_callback_query
 from anti_loop import record_user_message, is_potential_loop, record_button_press, is_button_rate_limited
-from wallet_utils import connect_wallet, check_wallet_balance, calculate_deposit_strategy, get_wallet_balances
-from walletconnect_utils import (
-    create_walletconnect_session, 
-    check_walletconnect_session, 
-    kill_walletconnect_session,
-    get_user_walletconnect_sessions,
-    get_db_connection
-)
-from anthropic_service import AnthropicAI
+from anthropic_service import AnthropicAI, is_fallback_response
 
 # Initialize AI service
 anthropic_api_key = os.environ.get("ANTHROPIC_API_KEY")
@@ -65,17 +59,19 @@ async def update_query_response(query_id: int, response_text: str, processing_ti
     """
     try:
         # Import here to avoid circular imports
-        from sqlalchemy.orm import Session
-        from models import db, UserQuery
+        from async_db import get_async_db
+        from models import UserQuery
         
-        # Create new session for thread safety
-        with Session(db.engine) as session:
-            query = session.query(UserQuery).filter(UserQuery.id == query_id).first()
+        def update(session):
+            query = session.get(UserQuery, query_id)
             if query:
                 query.response_text = response_text
                 query.processing_time = processing_time
-                session.commit()
-                logger.debug(f"Updated query {query_id} with response")
+            return query is not None
+        
+        # Runs in its own session without blocking the event loop
+        if await get_async_db().run(update):
+            logger.debug(f"Updated query {query_id} with response")
     except Exception as e:
         logger.error(f"Error updating query response: {e}")
 
@@ -83,72 +79,27 @@ async def update_query_response(query_id: int, response_text: str, processing_ti
 async def get_pool_data() -> List[Any]:
     """Get pool data for display in commands."""
     try:
-        # Import app and db here to avoid circular imports
-        from app import app, db
+        # Import at function level to avoid circular imports
+        from async_db import get_async_db, get_top_pools
         from models import Pool
         
-        with app.app_context():
-            try:
-                # Try to get pools from database first
-                pools = Pool.query.order_by(Pool.apr_24h.desc()).limit(5).all()
-                
-                # If no pools in database, use the predefined data
-                if not pools or len(pools) == 0:
-                    try:
-                        # Import here to avoid circular imports
-                        from response_data import get_pool_data as get_predefined_pool_data
-                        
-                        # Get predefined pool data
-                        predefined_data = get_predefined_pool_data()
-                        
-                        # Process top APR pools from the predefined data
-                        api_pools = predefined_data.get('topAPR', [])
-                        
-                        # Convert pools to Pool objects for formatting
-                        pools = []
-                        for pool_data in api_pools:
-                            pool = Pool()
-                            pool.id = pool_data.get("id", "unknown")
-                            
-                            # Extract token symbols from pair name
-                            pair_name = pool_data.get("pairName", "UNKNOWN/UNKNOWN")
-                            token_symbols = pair_name.split("/")
-                            
-                            pool.token_a_symbol = token_symbols[0] if len(token_symbols) > 0 else "Unknown"
-                            pool.token_b_symbol = token_symbols[1] if len(token_symbols) > 1 else "Unknown"
-                            
-                            # Get token prices if available
-                            token_prices = pool_data.get("tokenPrices", {})
-                            pool.token_a_price = token_prices.get(pool.token_a_symbol, 0)
-                            pool.token_b_price = token_prices.get(pool.token_b_symbol, 0)
-                            
-                            # Extract other pool data
-                            pool.apr_24h = pool_data.get("apr", 0)
-                            pool.apr_7d = pool_data.get("aprWeekly", 0)
-                            pool.apr_30d = pool_data.get("aprMonthly", 0)
-                            pool.tvl = pool_data.get("liquidity", 0)
-                            pool.fee = pool_data.get("fee", 0) * 100  # Convert from decimal to percentage
-                            pool.volume_24h = pool_data.get("volume24h", 0)
-                            pool.tx_count_24h = pool_data.get("txCount", 0)
-                            pools.append(pool)
-                        
-                        # Save pools to database for future use
-                        db.session.add_all(pools)
-                        db.session.commit()
-                        logger.info(f"Saved {len(pools)} pools to database from predefined data")
-                    except Exception as e:
-                        logger.error(f"Error using predefined pool data: {e}")
-                        pools = []
-            except Exception as e:
-                logger.error(f"Database error: {e}")
-                # Fallback to using predefined data directly if database access fails
+        try:
+            # Try to get pools from database first
+            pools = await get_top_pools(limit=5)
+            
+            # If no pools in database, use the predefined data
+            if not pools or len(pools) == 0:
                 try:
+                    # Import here to avoid circular imports
                     from response_data import get_pool_data as get_predefined_pool_data
-                    from models import Pool
                     
-                    predefined_data = get_predefined_pool_data()
+                    # Get predefined pool data
+                    predefined_data = await asyncio.to_thread(get_predefined_pool_data)
+                    
+                    # Process top APR pools from the predefined data
                     api_pools = predefined_data.get('topAPR', [])
                     
+                    # Convert pools to Pool objects for formatting
                     pools = []
                     for pool_data in api_pools:
                         pool = Pool()
@@ -176,11 +127,54 @@ async def get_pool_data() -> List[Any]:
                         pool.tx_count_24h = pool_data.get("txCount", 0)
                         pools.append(pool)
                     
-                    logger.info(f"Using {len(pools)} pools from predefined data without database")
+                    # Save pools to database for future use
+                    await get_async_db().add_all(pools)
+                    logger.info(f"Saved {len(pools)} pools to database from predefined data")
                 except Exception as e:
-                    logger.error(f"Error creating fallback pool objects: {e}")
+                    logger.error(f"Error using predefined pool data: {e}")
                     pools = []
+        except Exception as e:
+            logger.error(f"Database error: {e}")
+            # Fallback to using predefined data directly if database access fails
+            try:
+                from response_data import get_pool_data as get_predefined_pool_data
+                from models import Pool
+                
+                predefined_data = await asyncio.to_thread(get_predefined_pool_data)
+                api_pools = predefined_data.get('topAPR', [])
+                
+                pools = []
+                for pool_data in api_pools:
+                    pool = Pool()
+                    pool.id = pool_data.get("id", "unknown")
+                    
+                    # Extract token symbols from pair name
+                    pair_name = pool_data.get("pairName", "UNKNOWN/UNKNOWN")
+                    token_symbols = pair_name.split("/")
+                    
+                    pool.token_a_symbol = token_symbols[0] if len(token_symbols) > 0 else "Unknown"
+                    pool.token_b_symbol = token_symbols[1] if len(token_symbols) > 1 else "Unknown"
+                    
+                    # Get token prices if available
+                    token_prices = pool_data.get("tokenPrices", {})
+                    pool.token_a_price = token_prices.get(pool.token_a_symbol, 0)
+                    pool.token_b_price = token_prices.get(pool.token_b_symbol, 0)
                     
+                    # Extract other pool data
+                    pool.apr_24h = pool_data.get("apr", 0)
+                    pool.apr_7d = pool_data.get("aprWeekly", 0)
+                    pool.apr_30d = pool_data.get("aprMonthly", 0)
+                    pool.tvl = pool_data.get("liquidity", 0)
+                    pool.fee = pool_data.get("fee", 0) * 100  # Convert from decimal to percentage
+                    pool.volume_24h = pool_data.get("volume24h", 0)
+                    pool.tx_count_24h = pool_data.get("txCount", 0)
+                    pools.append(pool)
+                
+                logger.info(f"Using {len(pools)} pools from predefined data without database")
+            except Exception as e:
+                logger.error(f"Error creating fallback pool objects: {e}")
+                pools = []
+                
         return pools
     except Exception as e:
         logger.error(f"Error getting pool data: {e}")
@@ -195,20 +189,20 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         user = update.effective_user
         logger.info(f"User info retrieved: {user.id} - {user.username}")
         
-        # Use app context for database operations
-        from app import app
-        with app.app_context():
-            # Log user activity
-            db_utils.get_or_create_user(
-                user_id=user.id,
-                username=user.username,
-                first_name=user.first_name,
-                last_name=user.last_name
-            )
-            logger.info(f"User {user.id} created or retrieved from database")
-            
-            db_utils.log_user_activity(user.id, "start_command")
-            logger.info(f"Activity logged for user {user.id}")
+        # Import at function level to avoid circular imports
+        from async_db import get_or_create_user
+        
+        # Database work runs off the event loop
+        await get_or_create_user(
+            user.id,
+            username=user.username,
+            first_name=user.first_name,
+            last_name=user.last_name
+        )
+        logger.info(f"User {user.id} created or retrieved from database")
+        
+        await db_utils.log_user_activity_async(user.id, "start_command")
+        logger.info(f"Activity logged for user {user.id}")
         
         # Import the main keyboard from invest_flow
         from invest_flow import MAIN_KEYBOARD
@@ -240,10 +234,8 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Send a help message when the command /help is issued and show the help menu."""
     try:
-        from app import app
-        with app.app_context():
-            user = update.effective_user
-            db_utils.log_user_activity(user.id, "help_command")
+        user = update.effective_user
+        await db_utils.log_user_activity_async(user.id, "help_command")
         
         await update.message.reply_markdown(
             "🤖 *FiLot Bot - Help Guide*\n\n"
@@ -278,16 +270,10 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 async def info_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Show information about cryptocurrency pools when the command /info is issued."""
     try:
-        # Import app at function level to avoid circular imports
-        from app import app
-        
-        # Get user info before entering app context
         user = update.effective_user
         
-        # Use app context for database operations
-        with app.app_context():
-            # Log the activity inside app context
-            db_utils.log_user_activity(user.id, "info_command")
+        # Log the activity without blocking the event loop
+        await db_utils.log_user_activity_async(user.id, "info_command")
         
         # Determine whether this is a direct command or a callback query
         is_callback = update.callback_query is not None
@@ -306,7 +292,7 @@ async def info_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         from response_data import get_pool_data as get_predefined_pool_data
         
         # Get predefined pool data directly as dictionaries
-        predefined_data = get_predefined_pool_data()
+        predefined_data = await asyncio.to_thread(get_predefined_pool_data)
         
         # Check if a specific pool type was requested via button press or command args
         pool_type = None
@@ -377,16 +363,10 @@ async def info_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 async def simulate_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Simulate investment returns when the command /simulate is issued."""
     try:
-        # Import app at function level to avoid circular imports
-        from app import app
-        
-        # Get user info before entering app context
         user = update.effective_user
         
-        # Use app context for database operations
-        with app.app_context():
-            # Log the activity inside app context
-            db_utils.log_user_activity(user.id, "simulate_command")
+        # Log the activity without blocking the event loop
+        await db_utils.log_user_activity_async(user.id, "simulate_command")
         
         # Set default amount to 1000 if not provided
         amount = 1000.0
@@ -423,9 +403,15 @@ async def simulate_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         
         # Import at function level to avoid circular imports
         from response_data import get_pool_data as get_predefined_pool_data
+        from market_snapshot import get_current_snapshot
         
-        # Get predefined pool data directly as dictionaries
-        predefined_data = get_predefined_pool_data()
+        # Use the current market snapshot when it is fresh to avoid any network call
+        snapshot = get_current_snapshot()
+        if snapshot and snapshot.is_fresh() and snapshot.pool_data.get('bestPerformance'):
+            predefined_data = snapshot.pool_data
+        else:
+            # Get predefined pool data directly as dictionaries
+            predefined_data = await asyncio.to_thread(get_predefined_pool_data)
         
         # Process top APR pools from the predefined data (bestPerformance = topAPR)
         # These should be the 2 highest-performing pools
@@ -462,22 +448,16 @@ async def simulate_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -
 async def subscribe_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Subscribe to daily updates when the command /subscribe is issued."""
     try:
-        # Import app at function level to avoid circular imports
-        from app import app
+        # Import at function level to avoid circular imports
+        from async_db import get_async_db
         
-        # Get user info before entering app context
         user = update.effective_user
         
-        # Use app context for all database operations
-        success = False
-        with app.app_context():
-            # Subscribe user in database
-            success = db_utils.subscribe_user(user.id)
-            
-            if success:
-                db_utils.log_user_activity(user.id, "subscribe")
+        # Subscribe user in database, off the event loop
+        success = await get_async_db().run_in_app_context(db_utils.subscribe_user, user.id)
+        if success:
+            await db_utils.log_user_activity_async(user.id, "subscribe")
         
-        # Send response outside app context (no db operations)
         if success:
             await update.message.reply_markdown(
                 "✅ You've successfully subscribed to daily updates!\n\n"
@@ -499,22 +479,16 @@ async def subscribe_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
 async def unsubscribe_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Unsubscribe from daily updates when the command /unsubscribe is issued."""
     try:
-        # Import app at function level to avoid circular imports
-        from app import app
+        # Import at function level to avoid circular imports
+        from async_db import get_async_db
         
-        # Get user info before entering app context
         user = update.effective_user
         
-        # Use app context for all database operations
-        success = False
-        with app.app_context():
-            # Unsubscribe user in database
-            success = db_utils.unsubscribe_user(user.id)
-            
-            if success:
-                db_utils.log_user_activity(user.id, "unsubscribe")
+        # Unsubscribe user in database, off the event loop
+        success = await get_async_db().run_in_app_context(db_utils.unsubscribe_user, user.id)
+        if success:
+            await db_utils.log_user_activity_async(user.id, "unsubscribe")
         
-        # Send response outside app context (no db operations)
         if success:
             await update.message.reply_markdown(
                 "✅ You've successfully unsubscribed from daily updates.\n\n"
@@ -535,33 +509,27 @@ async def unsubscribe_command(update: Update, context: ContextTypes.DEFAULT_TYPE
 async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Check bot status when the command /status is issued."""
     try:
-        # Import the app at function level to avoid circular imports
-        from app import app
+        # Import at function level to avoid circular imports
+        from async_db import get_or_create_user
         
-        # Get user info before entering app context
         user = update.effective_user
         
-        # Use app context for all database operations
-        with app.app_context():
-            # Log the activity inside app context
-            db_utils.log_user_activity(user.id, "status_command")
-            
-            # Get user status inside app context
-            db_user = db_utils.get_or_create_user(user.id)
-            
-            # Format the status text with user data
-            status_text = (
-                "🤖 *FiLot Bot Status*\n\n"
-                "✅ Bot is operational and ready to assist you!\n\n"
-                "*Your Account Status:*\n"
-                f"• User ID: {db_user.telegram_id}\n"
-                f"• Subscription: {'Active ✅' if db_user.is_subscribed else 'Inactive ❌'}\n"
-                f"• Verification: {'Verified ✅' if db_user.is_verified else 'Unverified ❌'}\n"
-                f"• Account Created: {db_user.created_at.strftime('%Y-%m-%d')}\n\n"
-                "Use /help to see available commands."
-            )
+        # Log the activity and get the user status without blocking the event loop
+        await db_utils.log_user_activity_async(user.id, "status_command")
+        db_user = await get_or_create_user(user.id)
+        
+        # Format the status text with user data
+        status_text = (
+            "🤖 *FiLot Bot Status*\n\n"
+            "✅ Bot is operational and ready to assist you!\n\n"
+            "*Your Account Status:*\n"
+            f"• User ID: {db_user.telegram_id}\n"
+            f"• Subscription: {'Active ✅' if db_user.is_subscribed else 'Inactive ❌'}\n"
+            f"• Verification: {'Verified ✅' if db_user.is_verified else 'Unverified ❌'}\n"
+            f"• Account Created: {db_user.created_at.strftime('%Y-%m-%d')}\n\n"
+            "Use /help to see available commands."
+        )
         
-        # Reply outside of app context (no db operations)
         await update.message.reply_markdown(status_text)
     except Exception as e:
         logger.error(f"Error in status command: {e}", exc_info=True)
@@ -572,18 +540,15 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 async def verify_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Verify the user when the command /verify is issued."""
     try:
-        # Import app at function level to avoid circular imports
-        from app import app
+        # Import at function level to avoid circular imports
+        from async_db import get_async_db
         
-        # Get user info before entering app context
         user = update.effective_user
         
         # Check if code is provided
         if not context.args or not context.args[0]:
-            # Use app context for database operations
-            with app.app_context():
-                # Generate verification code inside app context
-                code = db_utils.generate_verification_code(user.id)
+            # Generate verification code off the event loop
+            code = await get_async_db().run_in_app_context(db_utils.generate_verification_code, user.id)
             
             if code:
                 await update.message.reply_markdown(
@@ -600,20 +565,12 @@ async def verify_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                 )
             return
             
-        # Verify with provided code (inside app context)
+        # Verify with provided code
         code = context.args[0]
+        success = await get_async_db().run_in_app_context(db_utils.verify_user, user.id, code)
+        if success:
+            await db_utils.log_user_activity_async(user.id, "verified")
         
-        # Use app context for all database operations
-        success = False
-        with app.app_context():
-            # Verify user with code
-            success = db_utils.verify_user(user.id, code)
-            
-            if success:
-                # Log the activity inside app context
-                db_utils.log_user_activity(user.id, "verified")
-        
-        # Send response outside app context (no db operations)
         if success:
             await update.message.reply_markdown(
                 "✅ *Verification Successful!*\n\n"
@@ -635,16 +592,13 @@ async def verify_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 async def wallet_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Manage wallet when the command /wallet is issued."""
     try:
-        # Import app at function level to avoid circular imports
-        from app import app
-        
-        # Get user info before entering app context
         user = update.effective_user
         
-        # Use app context for database operations
-        with app.app_context():
-            # Log the activity inside app context
-            db_utils.log_user_activity(user.id, "wallet_command")
+        # Log the activity without blocking the event loop
+        await db_utils.log_user_activity_async(user.id, "wallet_command")
+        
+        # Import at function level so start-up does not load the wallet modules
+        from wallet_utils import connect_wallet, check_wallet_balance
         
         # Check if a wallet address is provided
         if context.args and context.args[0]:
@@ -725,36 +679,30 @@ async def wallet_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Set user investment profile when the command /profile is issued."""
     try:
-        # Import app at function level to avoid circular imports
-        from app import app
+        # Import at function level to avoid circular imports
+        from async_db import get_async_db, get_or_create_user
         
-        # Get user info before entering app context
         user = update.effective_user
         profile_text = None
-        db_user = None
         
-        # Use app context for all database operations
-        with app.app_context():
-            # Log the activity inside app context
-            db_utils.log_user_activity(user.id, "profile_command")
-            
-            # Get current user profile data inside app context
-            db_user = db_utils.get_or_create_user(user.id)
-            
-            # If no parameters provided, prepare to show current profile
-            if not context.args:
-                # Format current profile info
-                profile_text = (
-                    "🔍 *Your Investment Profile*\n\n"
-                    f"• Risk Tolerance: *{db_user.risk_profile.capitalize()}*\n"
-                    f"• Investment Horizon: *{db_user.investment_horizon.capitalize()}*\n"
-                    f"• Investment Goals: {db_user.investment_goals or 'Not specified'}\n\n"
-                    "To update your profile, use one of these commands:\n"
-                    "• `/profile risk [conservative/moderate/aggressive]`\n"
-                    "• `/profile horizon [short/medium/long]`\n"
-                    "• `/profile goals [your investment goals]`\n\n"
-                    "Example: `/profile risk aggressive`"
-                )
+        # Log the activity and get the current profile without blocking the event loop
+        await db_utils.log_user_activity_async(user.id, "profile_command")
+        db_user = await get_or_create_user(user.id)
+        
+        # If no parameters provided, prepare to show current profile
+        if not context.args:
+            # Format current profile info
+            profile_text = (
+                "🔍 *Your Investment Profile*\n\n"
+                f"• Risk Tolerance: *{db_user.risk_profile.capitalize()}*\n"
+                f"• Investment Horizon: *{db_user.investment_horizon.capitalize()}*\n"
+                f"• Investment Goals: {db_user.investment_goals or 'Not specified'}\n\n"
+                "To update your profile, use one of these commands:\n"
+                "• `/profile risk [conservative/moderate/aggressive]`\n"
+                "• `/profile horizon [short/medium/long]`\n"
+                "• `/profile goals [your investment goals]`\n\n"
+                "Example: `/profile risk aggressive`"
+            )
         
         # If we have profile text ready, send it and return
         if profile_text:
@@ -768,56 +716,61 @@ async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             setting_type = context.args[0].lower()
             setting_value = " ".join(context.args[1:])
             
-            # Process different setting types within app context
-            with app.app_context():
-                if setting_type == "risk":
-                    if setting_value.lower() in ["conservative", "moderate", "aggressive"]:
-                        # Update risk profile using db_utils
-                        db_user.risk_profile = setting_value.lower()
-                        db_utils.update_user_profile(db_user.id, "risk_profile", setting_value.lower())
-                        
-                        # Send confirmation
-                        await update.message.reply_markdown(
-                            f"✅ Risk profile updated to *{setting_value.capitalize()}*.\n\n"
-                            f"Your AI financial advice will now be tailored to a {setting_value.lower()} risk tolerance."
-                        )
-                    else:
-                        await update.message.reply_text(
-                            "Invalid risk profile. Please choose from: conservative, moderate, or aggressive."
-                        )
-                        
-                elif setting_type == "horizon":
-                    if setting_value.lower() in ["short", "medium", "long"]:
-                        # Update investment horizon using db_utils
-                        db_user.investment_horizon = setting_value.lower()
-                        db_utils.update_user_profile(db_user.id, "investment_horizon", setting_value.lower())
-                        
-                        # Send confirmation
-                        await update.message.reply_markdown(
-                            f"✅ Investment horizon updated to *{setting_value.capitalize()}*.\n\n"
-                            f"Your AI financial advice will now be tailored to a {setting_value.lower()}-term investment horizon."
-                        )
-                    else:
-                        await update.message.reply_text(
-                            "Invalid investment horizon. Please choose from: short, medium, or long."
-                        )
-                        
-                elif setting_type == "goals":
-                    # Update investment goals using db_utils
-                    goals_value = setting_value[:255]  # Limit to 255 chars
-                    db_user.investment_goals = goals_value
-                    db_utils.update_user_profile(db_user.id, "investment_goals", goals_value)
+            # Update the setting off the event loop
+            if setting_type == "risk":
+                if setting_value.lower() in ["conservative", "moderate", "aggressive"]:
+                    # Update risk profile using db_utils
+                    db_user.risk_profile = setting_value.lower()
+                    await get_async_db().run_in_app_context(
+                        db_utils.update_user_profile, db_user.id, "risk_profile", setting_value.lower()
+                    )
                     
                     # Send confirmation
                     await update.message.reply_markdown(
-                        "✅ Investment goals updated successfully.\n\n"
-                        "Your AI financial advice will take your goals into consideration."
+                        f"✅ Risk profile updated to *{setting_value.capitalize()}*.\n\n"
+                        f"Your AI financial advice will now be tailored to a {setting_value.lower()} risk tolerance."
+                    )
+                else:
+                    await update.message.reply_text(
+                        "Invalid risk profile. Please choose from: conservative, moderate, or aggressive."
                     )
                     
+            elif setting_type == "horizon":
+                if setting_value.lower() in ["short", "medium", "long"]:
+                    # Update investment horizon using db_utils
+                    db_user.investment_horizon = setting_value.lower()
+                    await get_async_db().run_in_app_context(
+                        db_utils.update_user_profile, db_user.id, "investment_horizon", setting_value.lower()
+                    )
+                    
+                    # Send confirmation
+                    await update.message.reply_markdown(
+                        f"✅ Investment horizon updated to *{setting_value.capitalize()}*.\n\n"
+                        f"Your AI financial advice will now be tailored to a {setting_value.lower()}-term investment horizon."
+                    )
                 else:
                     await update.message.reply_text(
-                        "Invalid setting. Please use 'risk', 'horizon', or 'goals'."
+                        "Invalid investment horizon. Please choose from: short, medium, or long."
                     )
+                    
+            elif setting_type == "goals":
+                # Update investment goals using db_utils
+                goals_value = setting_value[:255]  # Limit to 255 chars
+                db_user.investment_goals = goals_value
+                await get_async_db().run_in_app_context(
+                    db_utils.update_user_profile, db_user.id, "investment_goals", goals_value
+                )
+                
+                # Send confirmation
+                await update.message.reply_markdown(
+                    "✅ Investment goals updated successfully.\n\n"
+                    "Your AI financial advice will take your goals into consideration."
+                )
+                
+            else:
+                await update.message.reply_text(
+                    "Invalid setting. Please use 'risk', 'horizon', or 'goals'."
+                )
         else:
             await update.message.reply_text(
                 "Please provide both setting type and value. For example:\n"
@@ -832,10 +785,8 @@ async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 async def faq_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Display FAQ information when the command /faq is issued."""
     try:
-        from app import app
-        with app.app_context():
-            user = update.effective_user
-            db_utils.log_user_activity(user.id, "faq_command")
+        user = update.effective_user
+        await db_utils.log_user_activity_async(user.id, "faq_command")
         
         # Format the FAQ content with emojis and clear sections
         faq_text = """
@@ -860,7 +811,7 @@ Annual Percentage Rate - estimated yearly return. Pool APRs can be high (10-200%
 Use /subscribe for automatic news. Use /unsubscribe to stop.
 
 *How does /simulate work?*
-It estimates earnings based on recent APRs: Earnings = Investment * (APR/100) * Time.
+It estimates daily-compounded earnings from recent APRs over several horizons, plus downside cases for a cooling APR and impermanent loss.
 
 *When is FiLot launching?*
 Coming soon! Use /subscribe for announcements.
@@ -888,16 +839,10 @@ Use /help to see all available commands!
 async def social_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Display social media links when the command /social is issued."""
     try:
-        # Import app at function level to avoid circular imports
-        from app import app
-        
-        # Get user info before entering app context
         user = update.effective_user
         
-        # Use app context for database operations
-        with app.app_context():
-            # Log the activity inside app context
-            db_utils.log_user_activity(user.id, "social_command")
+        # Log the activity without blocking the event loop
+        await db_utils.log_user_activity_async(user.id, "social_command")
         
         # Format the social media content with emojis and links
         social_text = """
@@ -944,16 +889,13 @@ Follow us for the latest news and launch announcements!
 async def walletconnect_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Create a WalletConnect session when the command /walletconnect is issued."""
     try:
-        # Import app at function level to avoid circular imports
-        from app import app
-        
-        # Get user info before entering app context
         user = update.effective_user
         
-        # Use app context for database operations
-        with app.app_context():
-            # Log the activity inside app context
-            db_utils.log_user_activity(user.id, "walletconnect_command")
+        # Log the activity without blocking the event loop
+        await db_utils.log_user_activity_async(user.id, "walletconnect_command")
+        
+        # Import at function level so start-up does not load the wallet modules
+        from walletconnect_utils import create_walletconnect_session
         
         # Determine if this is a callback or direct command
         is_callback = update.callback_query is not None
@@ -1135,95 +1077,124 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         # Record message for anti-loop protection
         record_user_message(user.id, message_text)
         
-        # Check if this is a menu navigation button press
-        menu_handled = await handle_menu_navigation(update, context)
-        if menu_handled:
+        # Check if this is a menu button
+        current_menu = await get_current_menu(user.id)
+        if current_menu and message_text.strip() in ["Back", "Menu", "Main Menu"]:
             # Record button press for rate limiting
             record_button_press(user.id, message_text)
-            logger.info(f"User {user.id} navigated using menu button: {message_text}")
-            # Message was handled by menu navigation, no need to process further
-            return
-            
-        # Check if this is a potential menu button but not properly handled
-        current_menu = get_current_menu(user.id)
-        if current_menu and message_text.strip() in ["Back", "Menu", "Main Menu"]:
             # Go back to main menu
             await set_menu_state(update, context, MenuType.MAIN)
             logger.info(f"User {user.id} returned to main menu with text: {message_text}")
             return
         
-        # We'll wrap all database operations in an app context
-        from app import app
-        with app.app_context():
-            # Log the query in the database
-            query = db_utils.log_user_query(
+        # The query is logged once its response is known, timed from when it arrived
+        received_at = datetime.datetime.utcnow()
+        
+        # First, check if this is a question
+        question_detected = is_question(message_text)
+        logger.info(f"Is question detection: {question_detected}")
+        
+        # Check for predefined responses
+        predefined_response = get_predefined_response(message_text)
+        
+        if predefined_response:
+            logger.info(f"Found predefined response for: {message_text[:30]}...")
+            
+            # Send predefined response
+            await update.message.reply_markdown(predefined_response)
+            
+            # Log the query with its response (written in the background)
+            await db_utils.log_user_query_async(
                 user_id=user.id,
                 command="message",  # Changed from None to avoid type error
-                query_text=message_text
+                query_text=message_text,
+                response_text=predefined_response,
+                processing_time=(datetime.datetime.utcnow() - received_at).total_seconds() * 1000,
+                timestamp=received_at
             )
             
-            # First, check if this is a question
-            question_detected = is_question(message_text)
-            logger.info(f"Is question detection: {question_detected}")
-            
-            # Check for predefined responses
-            predefined_response = get_predefined_response(message_text)
-            
-            if predefined_response:
-                logger.info(f"Found predefined response for: {message_text[:30]}...")
-                
-                # Send predefined response
-                await update.message.reply_markdown(predefined_response)
-                
-                # Update the query with the response
-                if query:
-                    query.response_text = predefined_response
-                    query.processing_time = (datetime.datetime.now() - query.timestamp).total_seconds() * 1000
-                    # Save to db in a non-blocking way
-                    asyncio.create_task(update_query_response(query.id, predefined_response, query.processing_time))
-                
-                # Log that we've responded with a predefined answer
-                db_utils.log_user_activity(user.id, "predefined_response", details=f"Question: {message_text[:50]}")
-                return
-        
-        # No predefined response available, use Anthropic AI for specialized financial advice
-        logger.info(f"No predefined response for: {message_text}, using AI advisor")
-        
-        # Send typing indicator while processing
-        await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
-        
-        # Try to identify if this is a financial question
-        classification = await ai_advisor.classify_financial_question(message_text)
-        logger.info(f"AI classification: {classification}")
+            # Log that we've responded with a predefined answer
+            await db_utils.log_user_activity_async(user.id, "predefined_response", details=f"Question: {message_text[:50]}")
+            return
         
-        # We need another app context for database operations
-        from app import app
+        # Import at function level to avoid circular imports
+        from async_db import get_or_create_user
         
         # Get user profile details
         user_db = None
         risk_profile = "moderate"
         investment_horizon = "medium"
         
-        with app.app_context():
+        try:
             # Get user profile if available
-            user_db = db_utils.get_or_create_user(user.id)
+            user_db = await get_or_create_user(user.id)
             risk_profile = getattr(user_db, 'risk_profile', 'moderate')
             investment_horizon = getattr(user_db, 'investment_horizon', 'medium')
+        except Exception as e:
+            logger.error(f"Error getting user profile: {e}")
+        
+        # Repeated questions with the same profile and market data are answered from the cache
+        # before classifying or loading pools. The question is not classified yet, so both keys
+        # are tried: concept explanations do not use pool data and are shared across users
+        answer_cache = get_answer_cache()
+        market_key = answer_cache.make_key(message_text, risk_profile, investment_horizon)
+        concept_key = answer_cache.make_key(message_text, market_dependent=False)
+        cached_response = await answer_cache.get_async(market_key, concept_key)
+        
+        if cached_response is not None:
+            logger.info(f"Answering from cache: {market_key.question}")
+            await update.message.reply_markdown(cached_response)
+            
+            await db_utils.log_user_query_async(
+                user_id=user.id,
+                command="message",  # Changed from None to avoid type error
+                query_text=message_text,
+                response_text=cached_response,
+                processing_time=(datetime.datetime.utcnow() - received_at).total_seconds() * 1000,
+                timestamp=received_at
+            )
+            # Not classified, and tagged with its source so the classifier does not learn from it
+            await db_utils.log_user_activity_async(user.id, "ai_response", details="Classification: unclassified (cache)")
+            return
+        
+        # No predefined or cached response available, use Anthropic AI for specialized financial advice
+        logger.info(f"No predefined response for: {message_text}, using AI advisor")
+        
+        # Send typing indicator while processing
+        await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
+        
+        # Try to identify if this is a financial question, locally first and
+        # with the AI classifier only when the local model is unsure
+        classification = get_classifier().classify(message_text)
+        classification_source = "local"
+        if classification is None:
+            classification = await ai_advisor.classify_financial_question(message_text)
+            classification_source = "llm"
+        logger.info(f"Classification ({classification_source}): {classification}")
         
         # Get pool data for context
         pools = await get_pool_data()
         
+        cache_key = concept_key if classification == "defi_explanation" else market_key
+        cacheable = True
+        
         ai_response = "I'm sorry, I couldn't process your request at this time."
         
+        # Advice and explanations are streamed into a placeholder message as they are generated
+        streaming_reply = None
+        
         # Process based on classification
         if classification == "pool_advice":
             # Question about specific liquidity pools
             logger.info("Generating pool advice")
+            streaming_reply = StreamingReply(update.message)
+            await streaming_reply.start()
             ai_response = await ai_advisor.get_financial_advice(
                 message_text, 
                 pool_data=pools,
                 risk_profile=risk_profile,
-                investment_horizon=investment_horizon
+                investment_horizon=investment_horizon,
+                on_text=streaming_reply.update
             )
             
         elif classification == "strategy_help":
@@ -1263,6 +1234,7 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                 }
             
             risk_result = await ai_advisor.assess_investment_risk(highest_apr_pool)
+            cacheable = not is_fallback_response(risk_result)
             
             # Format risk assessment response
             risk_level = risk_result.get('risk_level', 'medium')
@@ -1291,32 +1263,44 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             concept_match = re.search(r'(what is|explain|how does|tell me about) ([\w\s]+)', message_text.lower())
             concept = concept_match.group(2).strip() if concept_match else message_text
             
-            ai_response = await ai_advisor.explain_financial_concept(concept)
+            streaming_reply = StreamingReply(update.message)
+            await streaming_reply.start()
+            ai_response = await ai_advisor.explain_financial_concept(concept, on_text=streaming_reply.update)
             
         else:
             # General financial advice
             logger.info("Generating general financial advice")
+            streaming_reply = StreamingReply(update.message)
+            await streaming_reply.start()
             ai_response = await ai_advisor.get_financial_advice(
                 message_text, 
                 pool_data=pools,
                 risk_profile=risk_profile,
-                investment_horizon=investment_horizon
+                investment_horizon=investment_horizon,
+                on_text=streaming_reply.update
             )
         
-        # Send the AI response
-        await update.message.reply_markdown(ai_response)
-        
-        # Update the database with our query and response
-        with app.app_context():
-            # Update the query with the response
-            if query:
-                query.response_text = ai_response if isinstance(ai_response, str) else str(ai_response)
-                query.processing_time = (datetime.datetime.now() - query.timestamp).total_seconds() * 1000
-                # Save to db in a non-blocking way
-                asyncio.create_task(update_query_response(query.id, query.response_text, query.processing_time))
-                
-            # Log that we've responded with an AI-generated answer
-            db_utils.log_user_activity(user.id, "ai_response", details=f"Classification: {classification}")
+        # Send the AI response, or render the final version of a streamed one
+        if streaming_reply:
+            await streaming_reply.finish(ai_response)
+        else:
+            await update.message.reply_markdown(ai_response)
+        
+        if cacheable and not is_fallback_response(ai_response):
+            await answer_cache.put_async(cache_key, ai_response)
+        
+        # Log our query and response (written in the background, no app context needed)
+        await db_utils.log_user_query_async(
+            user_id=user.id,
+            command="message",  # Changed from None to avoid type error
+            query_text=message_text,
+            response_text=ai_response if isinstance(ai_response, str) else str(ai_response),
+            processing_time=(datetime.datetime.utcnow() - received_at).total_seconds() * 1000,
+            timestamp=received_at
+        )
+            
+        # Log that we've responded with an AI-generated answer
+        await db_utils.log_user_activity_async(user.id, "ai_response", details=f"Classification: {classification} ({classification_source})")
             
     except Exception as e:
         logger.error(f"Error handling message: {e}")
@@ -1376,46 +1360,71 @@ async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> N
         logger.error(f"Error in error handler: {e}")
         logger.error(traceback.format_exc())
 
-async def send_daily_updates() -> None:
-    """Send daily updates to subscribed users."""
+async def send_daily_updates(bot=None) -> Optional[Dict[str, Any]]:
+    """
+    Send daily updates to subscribed users.
+    
+    Delivery goes through the broadcast engine, which streams subscribers
+    from the database and resumes today's broadcast if it was interrupted.
+    
+    Args:
+        bot: Optional initialized Bot to send with (a dedicated one is created if omitted)
+        
+    Returns:
+        Broadcast metrics, or None if nothing was sent
+    """
     try:
-        # Get subscribed users
-        subscribed_users = db_utils.get_subscribed_users()
+        # Import at function level to avoid circular imports
+        from response_data import get_pool_data as get_predefined_pool_data
+        from broadcast import broadcast_message
         
-        if not subscribed_users:
-            logger.info("No subscribed users found for daily updates")
-            return
-            
-        # Get pool data
-        pools = await get_pool_data()
+        # Get pool data as dictionaries, as format_daily_update expects
+        predefined_data = await asyncio.to_thread(get_predefined_pool_data)
+        pools = predefined_data.get('topAPR', []) if predefined_data else []
         
         if not pools:
             logger.error("Failed to get pool data for daily updates")
-            return
+            return None
             
         # Format daily update message
         update_message = format_daily_update(pools)
         
-        # TODO: Send message to all subscribed users
-        # This would be implemented when you have the application running 24/7
-        logger.info(f"Would send daily updates to {len(subscribed_users)} users")
+        # One broadcast per day; rerunning it the same day resumes instead of resending
+        key = f"daily_update:{datetime.date.today().isoformat()}"
+        metrics = await broadcast_message(key, update_message, bot=bot)
+        logger.info(f"Sent daily updates to {metrics['sent']} users ({metrics['sends_per_second']:.1f}/s)")
+        return metrics
     except Exception as e:
         logger.error(f"Error sending daily updates: {e}")
+        return None
+
+def _set_wallet_session_status(session_id: str, status: str) -> None:
+    """Store the status of a WalletConnect session."""
+    # Import at function level so start-up does not load the wallet modules
+    from walletconnect_utils import db_connection
+    
+    with db_connection() as conn:
+        if conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "UPDATE wallet_sessions SET status = %s WHERE session_id = %s",
+                (status, session_id)
+            )
+            cursor.close()
 
 # Callback Query Handler (for inline buttons)
 async def handle_callback_query(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle callback queries from inline keyboards."""
     try:
-        # Import app at function level to avoid circular imports
-        from app import app
+        # Import at function level to avoid circular imports
+        from async_db import get_async_db
         
         query = update.callback_query
         user = query.from_user
         callback_data = query.data
         
-        # Log user activity within app context
-        with app.app_context():
-            db_utils.log_user_activity(user.id, f"callback_{callback_data}")
+        # Log user activity without blocking the event loop
+        await db_utils.log_user_activity_async(user.id, f"callback_{callback_data}")
         
         # Acknowledge the callback query
         await query.answer()
@@ -1426,6 +1435,11 @@ async def handle_callback_query(update: Update, context: ContextTypes.DEFAULT_TY
             await walletconnect_command(update, context)
             
         elif callback_data.startswith("check_wc_"):
+            # Import at function level so start-up does not load the wallet modules
+            import qrcode
+            from wallet_utils import get_wallet_balances
+            from walletconnect_utils import check_walletconnect_session
+            
             try:
                 # Check WalletConnect session status
                 session_id = callback_data.replace("check_wc_", "")
@@ -1451,16 +1465,7 @@ async def handle_callback_query(update: Update, context: ContextTypes.DEFAULT_TY
                 
                 # Update the session status in the database
                 if status != session_info["status"]:
-                    # Use app context for database operations
-                    with app.app_context():
-                        conn = get_db_connection()
-                        cursor = conn.cursor()
-                        cursor.execute(
-                            "UPDATE wallet_sessions SET status = %s WHERE session_id = %s",
-                            (status, session_id)
-                        )
-                        cursor.close()
-                        conn.close()
+                    await get_async_db().run_in_app_context(_set_wallet_session_status, session_id, status)
                 
                 if status == "connected":
                     try:
@@ -1553,6 +1558,9 @@ async def handle_callback_query(update: Update, context: ContextTypes.DEFAULT_TY
                 )
                 
         elif callback_data.startswith("cancel_wc_"):
+            # Import at function level so start-up does not load the wallet modules
+            from walletconnect_utils import kill_walletconnect_session
+            
             # Cancel WalletConnect session
             session_id = callback_data.replace("cancel_wc_", "")
             result = await kill_walletconnect_session(session_id)
@@ -1589,7 +1597,7 @@ async def handle_callback_query(update: Update, context: ContextTypes.DEFAULT_TY
                 from response_data import get_pool_data as get_predefined_pool_data
                 
                 # Get predefined pool data directly as dictionaries
-                predefined_data = get_predefined_pool_data()
+                predefined_data = await asyncio.to_thread(get_predefined_pool_data)
                 
                 # Process top APR pools from the predefined data
                 pool_list = predefined_data.get('topAPR', [])
@@ -1639,8 +1647,23 @@ def create_application():
         logger.error("Telegram bot token not found. Please set the TELEGRAM_TOKEN secret.")
         raise ValueError("Telegram bot token not found")
     
-    # Create the Application
-    application = Application.builder().token(token).build()
+    # Import at function level to avoid circular imports
+    from app import init_app
+    from notification_matcher import start_notifications
+    from update_scheduler import create_update_scheduler
+    
+    # Create database tables and start the keep-alive before handling updates
+    init_app()
+    
+    # Create the Application; market alerts start once the bot's loop is running,
+    # and updates of different users are processed concurrently but in order per user
+    application = (
+        Application.builder()
+        .token(token)
+        .concurrent_updates(create_update_scheduler())
+        .post_init(start_notifications)
+        .build()
+    )
     
     # Register command handlers
     application.add_handler(CommandHandler("start", start_command))
@@ -1669,23 +1692,28 @@ def create_application():
         handle_my_investments
     )
     
-    # Register specific callback query handlers with patterns
-    application.add_handler(CallbackQueryHandler(handle_account, pattern="^account$"))
-    application.add_handler(CallbackQueryHandler(handle_invest, pattern="^invest$"))
-    application.add_handler(CallbackQueryHandler(handle_explore_pools, pattern="^explore_pools$"))
-    application.add_handler(CallbackQueryHandler(handle_help, pattern="^help$"))
-    application.add_handler(CallbackQueryHandler(handle_back_to_main, pattern="^back_to_main$"))
-    application.add_handler(CallbackQueryHandler(handle_wallet_settings, pattern="^wallet_settings$"))
-    application.add_handler(CallbackQueryHandler(handle_update_profile, pattern="^update_profile$"))
-    application.add_handler(CallbackQueryHandler(handle_subscription_settings, pattern="^subscription_settings$"))
-    application.add_handler(CallbackQueryHandler(handle_token_search, pattern="^token_search$"))
-    application.add_handler(CallbackQueryHandler(handle_predictions, pattern="^predictions$"))
-    application.add_handler(CallbackQueryHandler(handle_my_investments, pattern="^my_investments$"))
+    # Register button callbacks with a single router that looks up the callback data
+    from callback_router import get_callback_router
+    router = get_callback_router()
+    router.add_route("account", handle_account)
+    router.add_route("invest", handle_invest)
+    router.add_route("explore_pools", handle_explore_pools)
+    router.add_route("help", handle_help)
+    router.add_route("back_to_main", handle_back_to_main)
+    router.add_route("wallet_settings", handle_wallet_settings)
+    router.add_route("update_profile", handle_update_profile)
+    router.add_route("subscription_settings", handle_subscription_settings)
+    router.add_route("token_search", handle_token_search)
+    router.add_route("predictions", handle_predictions)
+    router.add_route("my_investments", handle_my_investments)
     
-    # Register fallback callback query handler for any other patterns
-    application.add_handler(CallbackQueryHandler(handle_callback_query))
+    # Callbacks without a route fall back to the generic callback query handler
+    router.set_fallback(handle_callback_query)
+    application.add_handler(router.handler())
     
     # Register message handler for non-command messages
+    # Blocking, so the update scheduler keeps each user's messages in order; other users'
+    # updates still run concurrently while an AI answer is pending
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
     
     # Register error handler
@@ -1693,4 +1721,7 @@ def create_application():
     
     logger.info("Application created with all handlers registered")
     
+    # Learn from previously logged AI classifications
+    retrain_in_background()
+    
     return application
\ No newline at end of file
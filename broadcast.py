@@ -0,0 +1,434 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Broadcast engine for FiLot Telegram bot
+Delivers one message to every subscriber through a pool of async senders,
+streaming subscriber IDs from the database in pages, staying within
+Telegram's rate limits and checkpointing progress so a restarted broadcast
+resumes where it stopped
+"""
+
+import os
+import time
+import bisect
+import asyncio
+import logging
+import datetime
+import weakref
+from collections import deque
+from typing import Dict, Any, Deque, Iterable, List, Optional
+
+from telegram import Bot
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
+from telegram.request import HTTPXRequest
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Messages per second across all chats and broadcasts of the bot (split between
+# sharded workers); Telegram allows about 30 for ordinary broadcasts
+BROADCAST_RATE = float(os.environ.get("BROADCAST_RATE", "29"))
+
+# Messages that may be sent back to back before the rate applies
+BROADCAST_BURST = 10
+
+# Concurrent senders (and HTTP connections)
+BROADCAST_WORKERS = int(os.environ.get("BROADCAST_WORKERS", "50"))
+
+# Subscriber IDs read from the database per query
+BROADCAST_PAGE_SIZE = 1000
+
+# Minimum seconds between two messages to the same chat
+PER_CHAT_INTERVAL = 1.0
+
+# Attempts per chat before the delivery is counted as failed
+MAX_SEND_ATTEMPTS = 3
+
+# Seconds between checkpoint writes and progress log lines
+CHECKPOINT_INTERVAL = 5.0
+
+# Attempts to read the checkpoint before the broadcast gives up
+CHECKPOINT_LOAD_ATTEMPTS = 3
+
+# Send with paid broadcast limits (up to 1000 messages per second, billed in Stars)
+BROADCAST_PAID = os.environ.get("BROADCAST_PAID", "false").lower() == "true"
+
+
+class SendRateLimiter:
+    """
+    Token bucket shared by all senders of a broadcast.
+
+    A flood-control error from Telegram pauses the whole bucket, since
+    RetryAfter during a broadcast means the bot as a whole is sending too fast.
+    """
+
+    def __init__(self, rate: float = BROADCAST_RATE, burst: int = BROADCAST_BURST):
+        """
+        Initialize a full bucket.
+
+        Args:
+            rate: Tokens added per second
+            burst: Bucket capacity
+        """
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait for a token."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for the given number of seconds."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+
+# Limiter shared by the broadcasts running on each event loop
+_send_limiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, SendRateLimiter]" = weakref.WeakKeyDictionary()
+
+
+def get_send_limiter() -> SendRateLimiter:
+    """
+    Get the rate limiter shared by all broadcasts of this process.
+
+    Alerts, daily updates and any other broadcasts running at the same time
+    draw from one bucket, and sharded workers each get an equal share of
+    BROADCAST_RATE, so the bot as a whole stays within Telegram's limit.
+    Must be called on the event loop the broadcasts run on.
+    """
+    # Import at function level so the broadcast engine does not need aiohttp
+    from sharding import SHARD_COUNT
+
+    loop = asyncio.get_running_loop()
+    limiter = _send_limiters.get(loop)
+    if limiter is None:
+        limiter = _send_limiters[loop] = SendRateLimiter(BROADCAST_RATE / max(SHARD_COUNT, 1))
+    return limiter
+
+
+class _Page:
+    """Subscriber IDs read in one query and how many of them are still being delivered."""
+
+    __slots__ = ("last_id", "remaining")
+
+    def __init__(self, last_id: int, remaining: int):
+        self.last_id = last_id
+        self.remaining = remaining
+
+
+class Broadcast:
+    """
+    One message delivered to every subscribed, unblocked user, or to a given set of users.
+
+    Subscribers are read in ID order with keyset pagination and fed to the
+    senders through a bounded queue, so memory does not grow with the number
+    of subscribers. The checkpoint is the highest ID below which every
+    delivery has finished; after a restart the broadcast continues from there,
+    resending at most the deliveries that were in flight.
+    """
+
+    def __init__(self, bot: Bot, key: str, text: str, parse_mode: Optional[str] = None,
+                 workers: int = BROADCAST_WORKERS, rate: Optional[float] = None,
+                 page_size: int = BROADCAST_PAGE_SIZE, recipients: Optional[Iterable[int]] = None):
+        """
+        Initialize a broadcast.
+
+        Args:
+            bot: Initialized Bot used for sending
+            key: Unique broadcast key used for the checkpoint, e.g. "daily_update:2024-01-31"
+            text: Message text
+            parse_mode: Optional parse mode of the text
+            workers: Number of concurrent senders
+            rate: Messages per second for this broadcast alone (None to share the
+                process-wide limit of get_send_limiter)
+            page_size: Subscriber IDs per database query
+            recipients: Optional user IDs to send to instead of all subscribers
+        """
+        self.bot = bot
+        self.key = key
+        self.text = text
+        self.parse_mode = parse_mode
+        self.workers = workers
+        self.page_size = page_size
+        self.recipients = sorted(set(recipients)) if recipients is not None else None
+        self.limiter = SendRateLimiter(rate) if rate is not None else None
+        self._pages: Deque[_Page] = deque()
+        self._watermark = 0
+        self._saved_watermark = 0
+        self._started = 0.0
+        self.metrics = {
+            "sent": 0,
+            "failed": 0,
+            "blocked": 0,
+            "retried": 0,
+            "rate_limited": 0,
+            "resumed_from": 0,
+        }
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        Deliver the message to all subscribers not yet covered by the checkpoint.
+
+        Returns:
+            Delivery metrics including sends per second
+
+        Raises:
+            Exception: If the checkpoint cannot be read, so nothing is resent
+        """
+        if self.limiter is None:
+            self.limiter = get_send_limiter()
+        checkpoint = await asyncio.to_thread(self._load_checkpoint)
+        if checkpoint.get("completed"):
+            logger.info(f"Broadcast {self.key} already completed")
+            return dict(self.metrics, completed=True, sends_per_second=0.0)
+
+        self._watermark = self._saved_watermark = checkpoint.get("last_user_id", 0)
+        self.metrics["resumed_from"] = self._watermark
+        self.metrics["sent"] = checkpoint.get("sent_count", 0)
+        self.metrics["failed"] = checkpoint.get("failed_count", 0)
+        sent_before = self.metrics["sent"]
+
+        self._started = time.monotonic()
+        queue: "asyncio.Queue[Optional[tuple]]" = asyncio.Queue(maxsize=self.workers * 4)
+        senders = [asyncio.create_task(self._sender(queue)) for _ in range(self.workers)]
+        checkpointer = asyncio.create_task(self._checkpoint_loop())
+
+        try:
+            await self._produce(queue)
+            await asyncio.gather(*senders)
+        except BaseException:
+            # Keep the progress made so far for the next attempt
+            await asyncio.shield(asyncio.to_thread(self._save_checkpoint, False))
+            raise
+        finally:
+            for sender in senders:
+                sender.cancel()
+            checkpointer.cancel()
+
+        await asyncio.to_thread(self._save_checkpoint, True)
+
+        elapsed = time.monotonic() - self._started
+        metrics = dict(self.metrics)
+        metrics["elapsed"] = elapsed
+        metrics["sends_per_second"] = (metrics["sent"] - sent_before) / elapsed if elapsed > 0 else 0.0
+        metrics["completed"] = True
+        logger.info(
+            f"Broadcast {self.key} finished: {metrics['sent']} sent, {metrics['failed']} failed, "
+            f"{metrics['blocked']} blocked, {metrics['sends_per_second']:.1f} sends/s"
+        )
+        return metrics
+
+    async def _produce(self, queue: "asyncio.Queue[Optional[tuple]]") -> None:
+        """Read subscriber IDs page by page and queue them for the senders."""
+        after_id = self._watermark
+        while True:
+            if self.recipients is not None:
+                start = bisect.bisect_right(self.recipients, after_id)
+                user_ids = self.recipients[start:start + self.page_size]
+            else:
+                user_ids = await asyncio.to_thread(self._fetch_page, after_id)
+            if not user_ids:
+                break
+            page = _Page(user_ids[-1], len(user_ids))
+            self._pages.append(page)
+            for user_id in user_ids:
+                await queue.put((user_id, page))
+            after_id = user_ids[-1]
+            if len(user_ids) < self.page_size:
+                break
+        for _ in range(self.workers):
+            await queue.put(None)
+
+    async def _sender(self, queue: "asyncio.Queue[Optional[tuple]]") -> None:
+        """Deliver queued messages until the producer is done."""
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            user_id, page = item
+            try:
+                await self._deliver(user_id)
+            except Exception as e:
+                self.metrics["failed"] += 1
+                logger.error(f"Unexpected error broadcasting to {user_id}: {e}")
+            self._complete(page)
+
+    async def _deliver(self, user_id: int) -> None:
+        """Send the message to one chat, retrying rate limits and network errors."""
+        api_kwargs = {"allow_paid_broadcast": True} if BROADCAST_PAID else None
+        last_attempt = 0.0
+        for attempt in range(MAX_SEND_ATTEMPTS):
+            # Retries to the same chat respect the per-chat limit
+            wait = last_attempt + PER_CHAT_INTERVAL - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            await self.limiter.acquire()
+            last_attempt = time.monotonic()
+            try:
+                await self.bot.send_message(
+                    chat_id=user_id, text=self.text, parse_mode=self.parse_mode, api_kwargs=api_kwargs
+                )
+                self.metrics["sent"] += 1
+                return
+            except RetryAfter as e:
+                self.metrics["rate_limited"] += 1
+                self.limiter.pause(float(e.retry_after))
+            except Forbidden:
+                # The user blocked the bot or deleted their account
+                self.metrics["blocked"] += 1
+                return
+            except BadRequest as e:
+                self.metrics["failed"] += 1
+                logger.debug(f"Broadcast to {user_id} rejected: {e}")
+                return
+            except NetworkError as e:
+                logger.debug(f"Network error broadcasting to {user_id}: {e}")
+                await asyncio.sleep(2 ** attempt)
+            self.metrics["retried"] += 1
+        self.metrics["failed"] += 1
+
+    def _complete(self, page: _Page) -> None:
+        """Count a finished delivery and advance the watermark over fully delivered pages."""
+        page.remaining -= 1
+        while self._pages and self._pages[0].remaining == 0:
+            self._watermark = self._pages.popleft().last_id
+
+    async def _checkpoint_loop(self) -> None:
+        """Write the checkpoint and log progress periodically."""
+        while True:
+            await asyncio.sleep(CHECKPOINT_INTERVAL)
+            if self._watermark != self._saved_watermark:
+                await asyncio.to_thread(self._save_checkpoint, False)
+            elapsed = time.monotonic() - self._started
+            logger.info(
+                f"Broadcast {self.key}: {self.metrics['sent']} sent, {self.metrics['failed']} failed, "
+                f"{self.metrics['sent'] / elapsed if elapsed else 0:.1f} sends/s"
+            )
+
+    def _fetch_page(self, after_id: int) -> List[int]:
+        """Read the next page of subscriber IDs after after_id."""
+        # Import at function level to avoid circular imports
+        from sqlalchemy import select
+        from app import app
+        from models import db, User
+
+        with app.app_context():
+            return list(db.session.execute(
+                select(User.id)
+                .where(User.is_subscribed == True, User.is_blocked == False, User.id > after_id)
+                .order_by(User.id)
+                .limit(self.page_size)
+            ).scalars())
+
+    def _load_checkpoint(self) -> Dict[str, Any]:
+        """
+        Read this broadcast's checkpoint, if any.
+
+        A checkpoint that cannot be read is not treated as missing, since that
+        would restart the broadcast from the first subscriber and resend it.
+
+        Returns:
+            Checkpoint fields, or an empty dictionary if there is none
+
+        Raises:
+            Exception: The last database error if every attempt failed
+        """
+        # Import at function level to avoid circular imports
+        from app import app
+        from models import db, BroadcastCheckpoint
+
+        for attempt in range(CHECKPOINT_LOAD_ATTEMPTS):
+            try:
+                with app.app_context():
+                    checkpoint = db.session.get(BroadcastCheckpoint, self.key)
+                    if checkpoint is None:
+                        return {}
+                    return {
+                        "last_user_id": checkpoint.last_user_id or 0,
+                        "sent_count": checkpoint.sent_count or 0,
+                        "failed_count": checkpoint.failed_count or 0,
+                        "completed": checkpoint.completed_at is not None,
+                    }
+            except Exception as e:
+                logger.error(f"Error loading broadcast checkpoint {self.key} (attempt {attempt + 1}): {e}")
+                if attempt + 1 == CHECKPOINT_LOAD_ATTEMPTS:
+                    raise
+                time.sleep(2 ** attempt)
+
+    def _save_checkpoint(self, completed: bool) -> None:
+        """Write the current watermark and counters."""
+        # Import at function level to avoid circular imports
+        from app import app
+        from models import db, BroadcastCheckpoint
+
+        watermark = self._watermark
+        try:
+            with app.app_context():
+                checkpoint = db.session.get(BroadcastCheckpoint, self.key)
+                if checkpoint is None:
+                    checkpoint = BroadcastCheckpoint(id=self.key)
+                    db.session.add(checkpoint)
+                checkpoint.last_user_id = watermark
+                checkpoint.sent_count = self.metrics["sent"]
+                checkpoint.failed_count = self.metrics["failed"]
+                if completed:
+                    checkpoint.completed_at = datetime.datetime.utcnow()
+                db.session.commit()
+            self._saved_watermark = watermark
+        except Exception as e:
+            logger.error(f"Error saving broadcast checkpoint {self.key}: {e}")
+
+
+def create_broadcast_bot(token: Optional[str] = None, workers: int = BROADCAST_WORKERS) -> Bot:
+    """
+    Create a Bot with enough HTTP connections for concurrent sending.
+
+    The default request object holds a single connection, which would
+    serialize every send. Use as "async with create_broadcast_bot() as bot".
+
+    Args:
+        token: Bot token (defaults to TELEGRAM_TOKEN / TELEGRAM_BOT_TOKEN)
+        workers: Number of concurrent senders
+
+    Returns:
+        Uninitialized Bot
+    """
+    token = token or os.environ.get("TELEGRAM_TOKEN") or os.environ.get("TELEGRAM_BOT_TOKEN")
+    if not token:
+        raise ValueError("TELEGRAM_BOT_TOKEN environment variable not set")
+    return Bot(token, request=HTTPXRequest(connection_pool_size=workers))
+
+
+async def broadcast_message(key: str, text: str, bot: Optional[Bot] = None, **kwargs) -> Dict[str, Any]:
+    """
+    Deliver a message to all subscribers (or the given recipients), resuming an interrupted broadcast with the same key.
+
+    Args:
+        key: Unique broadcast key, e.g. "daily_update:2024-01-31"
+        text: Message text
+        bot: Initialized Bot to send with (a dedicated one is created if omitted)
+        **kwargs: Further Broadcast options (parse_mode, workers, rate, page_size, recipients)
+
+    Returns:
+        Delivery metrics including sends per second
+    """
+    if bot is not None:
+        return await Broadcast(bot, key, text, **kwargs).run()
+    async with create_broadcast_bot(workers=kwargs.get("workers", BROADCAST_WORKERS)) as own_bot:
+        return await Broadcast(own_bot, key, text, **kwargs).run()
@@ -13,14 +13,13 @@ import datetime
 import asyncio
 from typing import Dict, Any, Optional, List, Union, Tuple
 
-from wallet_actions import initiate_wallet_connection, check_connection_status, disconnect_wallet, WalletConnectionStatus
-
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import ContextTypes
 
 import db_utils
 from models import User, Pool, db
 from utils import format_pool_info
+from render_cache import get_render_cache, pools_key
 from menus import MenuType, get_menu_config
 from keyboard_utils import get_reply_keyboard, set_menu_state
 from solpool_api_client import (
@@ -38,7 +37,6 @@ from filotsense_api_client import (
     get_token_price,
     get_market_sentiment
 )
-from rl_investment_advisor import get_rl_recommendations
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -248,6 +246,9 @@ async def handle_wallet_settings(update: Update, context: ContextTypes.DEFAULT_T
         user_id = update.effective_user.id if update.effective_user else 0
         logger.info(f"User {user_id} pressed wallet settings button")
         
+        # Import at function level so start-up does not load the wallet modules
+        from wallet_actions import WalletConnectionStatus
+        
         # Get user's wallet status
         user = User.query.get(user_id)
         connection_status = "disconnected"
@@ -330,6 +331,9 @@ async def handle_walletconnect(update: Update, context: ContextTypes.DEFAULT_TYP
         user_id = update.effective_user.id if update.effective_user else 0
         logger.info(f"User {user_id} initiated wallet connection")
         
+        # Import at function level so start-up does not load the wallet modules
+        from wallet_actions import initiate_wallet_connection
+        
         try:
             # Start wallet connection process
             connection_result = await initiate_wallet_connection(user_id)
@@ -427,6 +431,9 @@ async def handle_check_wallet_status(update: Update, context: ContextTypes.DEFAU
         user_id = update.effective_user.id if update.effective_user else 0
         logger.info(f"User {user_id} checking wallet connection status")
         
+        # Import at function level so start-up does not load the wallet modules
+        from wallet_actions import check_connection_status, WalletConnectionStatus
+        
         try:
             # Get session ID from context
             session_id = context.user_data.get("wallet_session_id") if context.user_data else None
@@ -558,6 +565,9 @@ async def handle_cancel_wallet_connection(update: Update, context: ContextTypes.
         user_id = update.effective_user.id if update.effective_user else 0
         logger.info(f"User {user_id} canceling wallet connection")
         
+        # Import at function level so start-up does not load the wallet modules
+        from wallet_actions import disconnect_wallet
+        
         try:
             # Disconnect wallet
             result = disconnect_wallet(user_id)
@@ -609,6 +619,9 @@ async def handle_disconnect_wallet(update: Update, context: ContextTypes.DEFAULT
         user_id = update.effective_user.id if update.effective_user else 0
         logger.info(f"User {user_id} disconnecting wallet")
         
+        # Import at function level so start-up does not load the wallet modules
+        from wallet_actions import disconnect_wallet
+        
         try:
             # Disconnect wallet
             result = disconnect_wallet(user_id)
@@ -816,6 +829,9 @@ async def handle_smart_invest(update: Update, context: ContextTypes.DEFAULT_TYPE
         user_id = update.effective_user.id if update.effective_user else 0
         logger.info(f"User {user_id} pressed smart invest button")
         
+        # Import at function level so start-up does not load the advisors
+        from rl_investment_advisor import get_rl_recommendations
+        
         try:
             # Get user profile to determine risk preference
             user_profile = get_user_profile(user_id)
@@ -888,6 +904,71 @@ async def handle_smart_invest(update: Update, context: ContextTypes.DEFAULT_TYPE
                 parse_mode="MarkdownV2"
             )
 
+def _render_high_apr_page(pools: List[Dict[str, Any]], page: int) -> Tuple[str, InlineKeyboardMarkup]:
+    """
+    Render one page of the high APR pools list.
+    
+    Args:
+        pools: Pools to list
+        page: Requested page number (clamped to the available pages)
+        
+    Returns:
+        Tuple of (message text, keyboard)
+    """
+    # Calculate pagination
+    total_pools = len(pools)
+    pools_per_page = 3
+    total_pages = (total_pools + pools_per_page - 1) // pools_per_page
+    
+    # Adjust page if out of bounds
+    if page < 1:
+        page = 1
+    if page > total_pages:
+        page = total_pages
+    
+    # Get pools for current page
+    start_idx = (page - 1) * pools_per_page
+    end_idx = min(start_idx + pools_per_page, total_pools)
+    current_page_pools = pools[start_idx:end_idx]
+    
+    # Format pool information
+    pools_text = ""
+    for i, pool in enumerate(current_page_pools, start=1):
+        pool_name = f"{pool.get('token_a_symbol', 'Unknown')}/{pool.get('token_b_symbol', 'Unknown')}"
+        apr = pool.get('apr_24h', 0)
+        tvl = pool.get('tvl', 0)
+        
+        pools_text += f"*{i}. {pool_name}*\n"
+        pools_text += f"   APR: *{apr:.2f}%*\n"
+        pools_text += f"   TVL: *${tvl:,.2f}*\n"
+        pools_text += f"   Pool ID: `{pool.get('id', 'Unknown')}`\n\n"
+    
+    # Create buttons for each pool
+    keyboard = []
+    for pool in current_page_pools:
+        pool_id = pool.get('id', '')
+        if pool_id:
+            pool_name = f"{pool.get('token_a_symbol', 'Unknown')}/{pool.get('token_b_symbol', 'Unknown')}"
+            keyboard.append([InlineKeyboardButton(f"Details: {pool_name}", callback_data=f"pool:{pool_id}")])
+    
+    # Add pagination buttons
+    pagination = []
+    if page > 1:
+        pagination.append(InlineKeyboardButton("◀️ Previous", callback_data=f"high_apr:{page-1}"))
+    if page < total_pages:
+        pagination.append(InlineKeyboardButton("Next ▶️", callback_data=f"high_apr:{page+1}"))
+    if pagination:
+        keyboard.append(pagination)
+    
+    keyboard.append([InlineKeyboardButton("⬅️ Back to Explore", callback_data="explore_pools")])
+    
+    text = (
+        f"*📈 High APR Pools (Page {page}/{total_pages})*\n\n"
+        f"These pools currently offer the highest yields on Raydium:\n\n"
+        f"{pools_text}"
+    )
+    return text, InlineKeyboardMarkup(keyboard)
+
 async def handle_high_apr_pools(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     Handle the 'high_apr' button click to show pools with highest yields
@@ -913,58 +994,15 @@ async def handle_high_apr_pools(update: Update, context: ContextTypes.DEFAULT_TY
             pools = get_high_apr_pools(min_apr=10.0, limit=5)
             
             if pools:
-                # Calculate pagination
-                total_pools = len(pools)
-                pools_per_page = 3
-                total_pages = (total_pools + pools_per_page - 1) // pools_per_page
-                
-                # Adjust page if out of bounds
-                if page < 1:
-                    page = 1
-                if page > total_pages:
-                    page = total_pages
-                
-                # Get pools for current page
-                start_idx = (page - 1) * pools_per_page
-                end_idx = min(start_idx + pools_per_page, total_pools)
-                current_page_pools = pools[start_idx:end_idx]
-                
-                # Format pool information
-                pools_text = ""
-                for i, pool in enumerate(current_page_pools, start=1):
-                    pool_name = f"{pool.get('token_a_symbol', 'Unknown')}/{pool.get('token_b_symbol', 'Unknown')}"
-                    apr = pool.get('apr_24h', 0)
-                    tvl = pool.get('tvl', 0)
-                    
-                    pools_text += f"*{i}. {pool_name}*\n"
-                    pools_text += f"   APR: *{apr:.2f}%*\n"
-                    pools_text += f"   TVL: *${tvl:,.2f}*\n"
-                    pools_text += f"   Pool ID: `{pool.get('id', 'Unknown')}`\n\n"
-                
-                # Create buttons for each pool
-                keyboard = []
-                for pool in current_page_pools:
-                    pool_id = pool.get('id', '')
-                    if pool_id:
-                        pool_name = f"{pool.get('token_a_symbol', 'Unknown')}/{pool.get('token_b_symbol', 'Unknown')}"
-                        keyboard.append([InlineKeyboardButton(f"Details: {pool_name}", callback_data=f"pool:{pool_id}")])
-                
-                # Add pagination buttons
-                pagination = []
-                if page > 1:
-                    pagination.append(InlineKeyboardButton("◀️ Previous", callback_data=f"high_apr:{page-1}"))
-                if page < total_pages:
-                    pagination.append(InlineKeyboardButton("Next ▶️", callback_data=f"high_apr:{page+1}"))
-                if pagination:
-                    keyboard.append(pagination)
-                
-                keyboard.append([InlineKeyboardButton("⬅️ Back to Explore", callback_data="explore_pools")])
+                # The page only depends on the pool data, so it is rendered once per snapshot version
+                text, reply_markup = get_render_cache().get_or_render(
+                    "high_apr_page", (pools_key(pools), page),
+                    lambda: _render_high_apr_page(pools, page)
+                )
                 
                 await query.edit_message_text(
-                    f"*📈 High APR Pools (Page {page}/{total_pages})*\n\n"
-                    f"These pools currently offer the highest yields on Raydium:\n\n"
-                    f"{pools_text}",
-                    reply_markup=InlineKeyboardMarkup(keyboard),
+                    text,
+                    reply_markup=reply_markup,
                     parse_mode="MarkdownV2"
                 )
             else:
@@ -1468,6 +1506,74 @@ async def handle_declining_pools(update: Update, context: ContextTypes.DEFAULT_T
                 parse_mode="MarkdownV2"
             )
 
+def _render_stable_pools_page(stable_pools: List[Dict[str, Any]], page: int) -> Tuple[str, InlineKeyboardMarkup]:
+    """
+    Render one page of the most stable pools list.
+    
+    Args:
+        stable_pools: Pools to list
+        page: Requested page number (clamped to the available pages)
+        
+    Returns:
+        Tuple of (message text, keyboard)
+    """
+    # Calculate pagination
+    total_pools = len(stable_pools)
+    pools_per_page = 3
+    total_pages = (total_pools + pools_per_page - 1) // pools_per_page
+    
+    # Adjust page if out of bounds
+    if page < 1:
+        page = 1
+    if page > total_pages:
+        page = total_pages
+    
+    # Get pools for current page
+    start_idx = (page - 1) * pools_per_page
+    end_idx = min(start_idx + pools_per_page, total_pools)
+    current_page_pools = stable_pools[start_idx:end_idx]
+    
+    # Format pool information
+    pools_text = ""
+    for i, pool in enumerate(current_page_pools, start=1):
+        pool_name = f"{pool.get('token_a_symbol', 'Unknown')}/{pool.get('token_b_symbol', 'Unknown')}"
+        apr = pool.get('apr_24h', 0)
+        apr_7d = pool.get('apr_7d', 0)
+        volatility = pool.get('apr_volatility', 0)
+        tvl = pool.get('tvl', 0)
+        
+        pools_text += f"*{i}. {pool_name}*\n"
+        pools_text += f"   APR: *{apr:.2f}%*\n"
+        pools_text += f"   7d APR: *{apr_7d:.2f}%*\n"
+        pools_text += f"   Volatility: *{volatility:.2f}%*\n"
+        pools_text += f"   TVL: *${tvl:,.2f}*\n\n"
+    
+    # Create buttons for each pool
+    keyboard = []
+    for pool in current_page_pools:
+        pool_id = pool.get('id', '')
+        if pool_id:
+            pool_name = f"{pool.get('token_a_symbol', 'Unknown')}/{pool.get('token_b_symbol', 'Unknown')}"
+            keyboard.append([InlineKeyboardButton(f"Details: {pool_name}", callback_data=f"pool:{pool_id}")])
+    
+    # Add pagination buttons
+    pagination = []
+    if page > 1:
+        pagination.append(InlineKeyboardButton("◀️ Previous", callback_data=f"stable_pools:{page-1}"))
+    if page < total_pages:
+        pagination.append(InlineKeyboardButton("Next ▶️", callback_data=f"stable_pools:{page+1}"))
+    if pagination:
+        keyboard.append(pagination)
+    
+    keyboard.append([InlineKeyboardButton("⬅️ Back to Predictions", callback_data="predictions")])
+    
+    text = (
+        f"*🎯 Most Stable Pools (Page {page}/{total_pages})*\n\n"
+        f"These pools show the most consistent performance with low volatility:\n\n"
+        f"{pools_text}"
+    )
+    return text, InlineKeyboardMarkup(keyboard)
+
 async def handle_stable_pools(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     Handle the 'stable_pools' button click to show pools with stable performance
@@ -1512,61 +1618,15 @@ async def handle_stable_pools(update: Update, context: ContextTypes.DEFAULT_TYPE
             stable_pools = sorted(stable_pools, key=lambda p: p.get('apr_volatility', 100))
             
             if stable_pools:
-                # Calculate pagination
-                total_pools = len(stable_pools)
-                pools_per_page = 3
-                total_pages = (total_pools + pools_per_page - 1) // pools_per_page
-                
-                # Adjust page if out of bounds
-                if page < 1:
-                    page = 1
-                if page > total_pages:
-                    page = total_pages
-                
-                # Get pools for current page
-                start_idx = (page - 1) * pools_per_page
-                end_idx = min(start_idx + pools_per_page, total_pools)
-                current_page_pools = stable_pools[start_idx:end_idx]
-                
-                # Format pool information
-                pools_text = ""
-                for i, pool in enumerate(current_page_pools, start=1):
-                    pool_name = f"{pool.get('token_a_symbol', 'Unknown')}/{pool.get('token_b_symbol', 'Unknown')}"
-                    apr = pool.get('apr_24h', 0)
-                    apr_7d = pool.get('apr_7d', 0)
-                    volatility = pool.get('apr_volatility', 0)
-                    tvl = pool.get('tvl', 0)
-                    
-                    pools_text += f"*{i}. {pool_name}*\n"
-                    pools_text += f"   APR: *{apr:.2f}%*\n"
-                    pools_text += f"   7d APR: *{apr_7d:.2f}%*\n"
-                    pools_text += f"   Volatility: *{volatility:.2f}%*\n"
-                    pools_text += f"   TVL: *${tvl:,.2f}*\n\n"
-                
-                # Create buttons for each pool
-                keyboard = []
-                for pool in current_page_pools:
-                    pool_id = pool.get('id', '')
-                    if pool_id:
-                        pool_name = f"{pool.get('token_a_symbol', 'Unknown')}/{pool.get('token_b_symbol', 'Unknown')}"
-                        keyboard.append([InlineKeyboardButton(f"Details: {pool_name}", callback_data=f"pool:{pool_id}")])
-                
-                # Add pagination buttons
-                pagination = []
-                if page > 1:
-                    pagination.append(InlineKeyboardButton("◀️ Previous", callback_data=f"stable_pools:{page-1}"))
-                if page < total_pages:
-                    pagination.append(InlineKeyboardButton("Next ▶️", callback_data=f"stable_pools:{page+1}"))
-                if pagination:
-                    keyboard.append(pagination)
-                
-                keyboard.append([InlineKeyboardButton("⬅️ Back to Predictions", callback_data="predictions")])
+                # The page only depends on the pool data, so it is rendered once per snapshot version
+                text, reply_markup = get_render_cache().get_or_render(
+                    "stable_pools_page", (pools_key(stable_pools, extra_fields=("apr_volatility",)), page),
+                    lambda: _render_stable_pools_page(stable_pools, page)
+                )
                 
                 await query.edit_message_text(
-                    f"*🎯 Most Stable Pools (Page {page}/{total_pages})*\n\n"
-                    f"These pools show the most consistent performance with low volatility:\n\n"
-                    f"{pools_text}",
-                    reply_markup=InlineKeyboardMarkup(keyboard),
+                    text,
+                    reply_markup=reply_markup,
                     parse_mode="MarkdownV2"
                 )
             else:
@@ -2308,6 +2368,10 @@ def toggle_notification_preference(user_id: int, preference_name: str) -> bool:
             
         # Save the changes
         db.session.commit()
+        
+        # Import at function level to avoid circular imports
+        from notification_matcher import get_notification_matcher
+        get_notification_matcher().update_user(user)
         return True
         
     except Exception as e:
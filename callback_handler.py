@@ -17,6 +17,7 @@ import db_utils
 import db_fallback
 from menus import MenuType, get_menu_config
 from keyboard_utils import set_menu_state, get_current_menu
+from callback_router import PrefixTrie
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -27,6 +28,9 @@ CallbackHandler = Callable[[Update, ContextTypes.DEFAULT_TYPE, Union[str, Dict[s
 # Registry of callback handlers
 callback_handlers: Dict[str, CallbackHandler] = {}
 
+# The same handlers indexed by prefix, so lookup does not scan the registry
+_callback_prefixes: PrefixTrie[CallbackHandler] = PrefixTrie()
+
 
 def register_callback(prefix: str):
     """
@@ -37,6 +41,7 @@ def register_callback(prefix: str):
     """
     def decorator(func: CallbackHandler):
         callback_handlers[prefix] = func
+        _callback_prefixes.insert(prefix, func)
         return func
     return decorator
 
@@ -65,17 +70,11 @@ async def handle_callback_query(update: Update, context: ContextTypes.DEFAULT_TY
         # Log the callback for debugging
         logger.info(f"Received callback: {callback_data} from user {update.effective_user.id}")
         
-        # Find appropriate handler based on prefix
-        handler = None
-        handler_prefix = ""
-        
-        for prefix, callback_handler in callback_handlers.items():
-            if callback_data.startswith(prefix):
-                handler = callback_handler
-                handler_prefix = prefix
-                break
+        # Find appropriate handler based on the longest matching prefix
+        match = _callback_prefixes.longest_prefix(callback_data)
         
-        if handler:
+        if match:
+            handler_prefix, handler = match
             # Extract the parameters from callback_data
             params_str = callback_data[len(handler_prefix):]
             
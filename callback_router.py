@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Callback query router for FiLot Telegram bot
+Dispatches inline button presses to their handlers with one lookup on the
+callback data instead of trying a regex handler per button in turn
+"""
+
+import time
+import logging
+from typing import Dict, Any, Callable, Awaitable, Generic, Optional, Tuple, TypeVar
+
+from telegram import Update
+from telegram.ext import CallbackQueryHandler, ContextTypes
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Type definition for button handlers
+ButtonHandler = Callable[[Update, ContextTypes.DEFAULT_TYPE], Awaitable[None]]
+
+# Route name used in metrics for callbacks handled by the fallback
+FALLBACK_ROUTE = "*"
+
+T = TypeVar("T")
+
+
+class PrefixTrie(Generic[T]):
+    """
+    Character trie returning the value of the longest registered prefix.
+
+    Lookup cost depends on the length of the key (callback data is at most
+    64 bytes), not on how many prefixes are registered.
+    """
+
+    # Key under which a node stores its value; never a single character
+    _VALUE = ""
+
+    def __init__(self):
+        self._root: Dict[str, Any] = {}
+
+    def insert(self, prefix: str, value: T) -> bool:
+        """
+        Register a prefix.
+
+        Args:
+            prefix: Key prefix
+            value: Value returned for keys starting with the prefix
+
+        Returns:
+            False if the prefix was already registered (the first value is kept)
+        """
+        node = self._root
+        for char in prefix:
+            node = node.setdefault(char, {})
+        if self._VALUE in node:
+            return False
+        node[self._VALUE] = (prefix, value)
+        return True
+
+    def longest_prefix(self, key: str) -> Optional[Tuple[str, T]]:
+        """
+        Find the longest registered prefix of a key.
+
+        Args:
+            key: Key to look up
+
+        Returns:
+            Tuple of (prefix, value), or None if no prefix matches
+        """
+        node = self._root
+        match = node.get(self._VALUE)
+        for char in key:
+            node = node.get(char)
+            if node is None:
+                break
+            match = node.get(self._VALUE, match)
+        return match
+
+
+class CallbackRouter:
+    """
+    Single callback query handler dispatching on callback data.
+
+    Exact routes are a dict lookup and prefix routes (e.g. "pool:") a trie
+    walk over the callback data. Callbacks matching neither go to the
+    fallback handler, if one is set. Latency is counted per route.
+    """
+
+    def __init__(self):
+        self._exact: Dict[str, ButtonHandler] = {}
+        self._prefixes: PrefixTrie[ButtonHandler] = PrefixTrie()
+        self.fallback: Optional[ButtonHandler] = None
+        self.unmatched = 0
+        # route -> [count, total_ms, max_ms, errors]
+        self._latency: Dict[str, list] = {}
+
+    def add_route(self, callback_data: str, handler: ButtonHandler) -> None:
+        """
+        Route callbacks whose data equals callback_data.
+
+        Args:
+            callback_data: Exact callback data
+            handler: Handler taking (update, context)
+        """
+        if callback_data in self._exact:
+            if self._exact[callback_data] is not handler:
+                logger.warning(f"Callback route '{callback_data}' already registered, keeping the first handler")
+            return
+        self._exact[callback_data] = handler
+
+    def add_prefix_route(self, prefix: str, handler: ButtonHandler) -> None:
+        """
+        Route callbacks whose data starts with prefix. The longest matching prefix wins.
+
+        Args:
+            prefix: Callback data prefix, e.g. "pool:"
+            handler: Handler taking (update, context)
+        """
+        if not self._prefixes.insert(prefix, handler):
+            logger.debug(f"Callback prefix '{prefix}' already registered, keeping the first handler")
+
+    def set_fallback(self, handler: ButtonHandler) -> None:
+        """
+        Handle callbacks that match no route.
+
+        Args:
+            handler: Handler taking (update, context)
+        """
+        self.fallback = handler
+
+    def resolve(self, callback_data: str) -> Tuple[Optional[str], Optional[ButtonHandler]]:
+        """
+        Find the handler for callback data.
+
+        Args:
+            callback_data: Callback data of the pressed button
+
+        Returns:
+            Tuple of (route name, handler), or (None, None) if nothing matches
+        """
+        handler = self._exact.get(callback_data)
+        if handler is not None:
+            return callback_data, handler
+
+        match = self._prefixes.longest_prefix(callback_data)
+        if match is not None:
+            prefix, handler = match
+            return f"{prefix}*", handler
+
+        if self.fallback is not None:
+            return FALLBACK_ROUTE, self.fallback
+        return None, None
+
+    async def dispatch(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """
+        Handle a callback query by dispatching it to its route.
+
+        Args:
+            update: Telegram update object
+            context: Context object for the update
+        """
+        query = update.callback_query
+        route, handler = self.resolve(query.data or "")
+        if handler is None:
+            self.unmatched += 1
+            logger.warning(f"No handler found for callback: {query.data}")
+            await query.answer(text="This button is not yet implemented.")
+            return
+
+        started = time.perf_counter()
+        failed = False
+        try:
+            await handler(update, context)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._record(route, (time.perf_counter() - started) * 1000, failed)
+
+    def _record(self, route: str, elapsed_ms: float, failed: bool) -> None:
+        """Count one call of a route."""
+        stats = self._latency.get(route)
+        if stats is None:
+            stats = self._latency[route] = [0, 0.0, 0.0, 0]
+        stats[0] += 1
+        stats[1] += elapsed_ms
+        stats[2] = max(stats[2], elapsed_ms)
+        if failed:
+            stats[3] += 1
+
+    def handler(self) -> CallbackQueryHandler:
+        """
+        Create the single CallbackQueryHandler to register with the application.
+
+        Returns:
+            CallbackQueryHandler calling dispatch for every callback query
+        """
+        return CallbackQueryHandler(self.dispatch)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get per-route call counts and latencies.
+
+        Returns:
+            Dictionary with route counts and calls, average and maximum latency (ms) per route
+        """
+        return {
+            "exact_routes": len(self._exact),
+            "unmatched": self.unmatched,
+            "routes": {
+                route: {
+                    "calls": count,
+                    "avg_ms": total / count,
+                    "max_ms": longest,
+                    "errors": errors,
+                }
+                for route, (count, total, longest, errors) in self._latency.items()
+            },
+        }
+
+
+# Singleton router
+_callback_router: Optional[CallbackRouter] = None
+
+
+def get_callback_router() -> CallbackRouter:
+    """Get the singleton CallbackRouter instance."""
+    global _callback_router
+    if _callback_router is None:
+        _callback_router = CallbackRouter()
+    return _callback_router
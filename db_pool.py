@@ -0,0 +1,352 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Database connection pool for FiLot Telegram bot
+Shares psycopg2 connections between the modules that run raw SQL
+(db_utils, transactions, walletconnect_utils), so an operation borrows an
+open connection instead of connecting and authenticating every time
+"""
+
+import os
+import time
+import logging
+import threading
+import weakref
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Deque, Iterator, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Connections opened when the pool is created, and the most open at once
+DB_POOL_MIN_SIZE = int(os.environ.get("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.environ.get("DB_POOL_MAX_SIZE", "10"))
+
+# Seconds a caller waits for a free connection before giving up
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+
+# Connections idle longer than this are checked with SELECT 1 before reuse (seconds)
+HEALTH_CHECK_IDLE = 30
+
+# Idle connections above the minimum size are closed after this many seconds
+MAX_IDLE_TIME = 300
+
+
+class PoolTimeout(Exception):
+    """No connection became free within the pool timeout."""
+
+
+class PooledConnection:
+    """
+    Connection borrowed from a ConnectionPool.
+
+    Behaves like the psycopg2 connection it wraps, except that close()
+    returns it to the pool (rolling back anything not committed). A wrapper
+    garbage-collected without close() also returns its connection.
+    """
+
+    def __init__(self, pool: "ConnectionPool", connection: Any):
+        self._pool = pool
+        self._connection = connection
+        self._finalizer = weakref.finalize(self, pool.reclaim, connection)
+        self._finalizer.atexit = False
+
+    def __getattr__(self, name: str) -> Any:
+        if self._connection is None:
+            raise AttributeError(f"Connection returned to the pool, cannot access {name}")
+        return getattr(self._connection, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name.startswith("_"):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._connection, name, value)
+
+    def __enter__(self) -> "PooledConnection":
+        self._connection.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._connection.__exit__(exc_type, exc, tb)
+
+    @property
+    def closed(self) -> bool:
+        """Whether the connection was returned to the pool (or is closed)."""
+        return self._connection is None or bool(self._connection.closed)
+
+    def close(self) -> None:
+        """Return the connection to the pool; later calls do nothing."""
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            self._finalizer.detach()
+            self._pool.release(connection)
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of database connections.
+
+    Callers wait (up to a timeout) when all connections are in use, and the
+    wait is measured. Connections that have been idle for a while are checked
+    before they are handed out, and broken ones are replaced.
+    """
+
+    def __init__(self, dsn: str, min_size: int = DB_POOL_MIN_SIZE, max_size: int = DB_POOL_MAX_SIZE,
+                 timeout: float = DB_POOL_TIMEOUT, connect: Optional[Callable[[str], Any]] = None):
+        """
+        Initialize the pool and open min_size connections.
+
+        Args:
+            dsn: Database URL
+            min_size: Connections kept open while idle
+            max_size: Maximum number of open connections
+            timeout: Seconds to wait for a free connection
+            connect: Function opening a connection (psycopg2.connect by default)
+        """
+        if connect is None:
+            import psycopg2
+            connect = psycopg2.connect
+        self.dsn = dsn
+        self.min_size = min(min_size, max_size)
+        self.max_size = max_size
+        self.timeout = timeout
+        self._connect = connect
+        self._lock = threading.Lock()
+        self._available = threading.BoundedSemaphore(max_size)
+        # (connection, time it was returned), most recently returned last
+        self._idle: Deque[Tuple[Any, float]] = deque()
+        self._open = 0
+        self.metrics = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_ms_total": 0.0,
+            "wait_ms_max": 0.0,
+            "timeouts": 0,
+            "opened": 0,
+            "closed": 0,
+            "health_check_failures": 0,
+            "leaked": 0,
+        }
+
+        for _ in range(self.min_size):
+            try:
+                self._idle.append((self._new_connection(), time.monotonic()))
+            except Exception as e:
+                logger.error(f"Error opening pooled database connection: {e}")
+                break
+
+    def _new_connection(self) -> Any:
+        """Open a connection and count it."""
+        connection = self._connect(self.dsn)
+        with self._lock:
+            self._open += 1
+            self.metrics["opened"] += 1
+        return connection
+
+    def _discard(self, connection: Any) -> None:
+        """Close a connection and forget it."""
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._open -= 1
+            self.metrics["closed"] += 1
+
+    def _is_healthy(self, connection: Any, idle_seconds: float) -> bool:
+        """Check a connection taken from the idle list."""
+        if connection.closed:
+            return False
+        if idle_seconds < HEALTH_CHECK_IDLE:
+            return True
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            connection.rollback()
+            return True
+        except Exception as e:
+            logger.warning(f"Pooled database connection failed health check: {e}")
+            self.metrics["health_check_failures"] += 1
+            return False
+
+    def _take_idle(self) -> Optional[Any]:
+        """Take a healthy idle connection, closing stale and broken ones; None if none is left."""
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                connection, returned_at = self._idle.pop()
+                # Close connections idle too long (oldest first), keeping the minimum size open
+                expired = []
+                while (self._idle and now - self._idle[0][1] > MAX_IDLE_TIME
+                       and self._open - len(expired) > self.min_size):
+                    expired.append(self._idle.popleft()[0])
+            for stale in expired:
+                self._discard(stale)
+            if self._is_healthy(connection, now - returned_at):
+                return connection
+            self._discard(connection)
+
+    def getconn(self, autocommit: bool = False, timeout: Optional[float] = None) -> PooledConnection:
+        """
+        Borrow a connection; call close() on it to give it back.
+
+        Args:
+            autocommit: Whether statements commit immediately
+            timeout: Seconds to wait for a free connection (pool default if None)
+
+        Returns:
+            PooledConnection
+
+        Raises:
+            PoolTimeout: If no connection became free in time
+        """
+        started = time.perf_counter()
+        if not self._available.acquire(blocking=False):
+            self.metrics["waits"] += 1
+            if not self._available.acquire(timeout=self.timeout if timeout is None else timeout):
+                self.metrics["timeouts"] += 1
+                raise PoolTimeout(f"No database connection free within {self.timeout}s")
+        wait_ms = (time.perf_counter() - started) * 1000
+        self.metrics["checkouts"] += 1
+        self.metrics["wait_ms_total"] += wait_ms
+        self.metrics["wait_ms_max"] = max(self.metrics["wait_ms_max"], wait_ms)
+
+        try:
+            connection = self._take_idle() or self._new_connection()
+            connection.autocommit = autocommit
+        except Exception:
+            self._available.release()
+            raise
+        return PooledConnection(self, connection)
+
+    def release(self, connection: Any) -> None:
+        """Return a raw connection to the pool (called by PooledConnection.close)."""
+        try:
+            if connection.closed:
+                raise ValueError("connection is closed")
+            if not connection.autocommit:
+                connection.rollback()
+            else:
+                connection.autocommit = False
+        except Exception as e:
+            logger.warning(f"Discarding database connection: {e}")
+            self._discard(connection)
+        else:
+            with self._lock:
+                self._idle.append((connection, time.monotonic()))
+        finally:
+            self._available.release()
+
+    def reclaim(self, connection: Any) -> None:
+        """Return the connection of a PooledConnection that was never closed."""
+        self.metrics["leaked"] += 1
+        logger.warning("Pooled database connection was not closed, returning it to the pool")
+        # Garbage collection can run this while the current thread holds the pool
+        # lock, so the connection is released from another thread
+        threading.Thread(target=self.release, args=(connection,), daemon=True).start()
+
+    @contextmanager
+    def connection(self, autocommit: bool = False) -> Iterator[PooledConnection]:
+        """
+        Borrow a connection for a block, committing if it succeeds and rolling back if it raises.
+
+        Args:
+            autocommit: Whether statements commit immediately
+
+        Yields:
+            PooledConnection, returned to the pool after the block
+        """
+        connection = self.getconn(autocommit)
+        try:
+            yield connection
+            if not autocommit:
+                connection.commit()
+        finally:
+            # Returning the connection rolls back an uncommitted transaction
+            connection.close()
+
+    def closeall(self) -> None:
+        """Close all idle connections."""
+        with self._lock:
+            idle = [connection for connection, _ in self._idle]
+            self._idle.clear()
+        for connection in idle:
+            self._discard(connection)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get pool metrics.
+
+        Returns:
+            Dictionary with pool sizes, connections in use and idle, checkout
+            and wait counts, wait times (ms), health check failures and
+            connections reclaimed from unclosed wrappers
+        """
+        with self._lock:
+            idle = len(self._idle)
+            open_connections = self._open
+        metrics = dict(self.metrics)
+        metrics.update({
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "open": open_connections,
+            "idle": idle,
+            "in_use": open_connections - idle,
+            "wait_ms_avg": metrics["wait_ms_total"] / metrics["checkouts"] if metrics["checkouts"] else 0.0,
+        })
+        return metrics
+
+
+# Singleton pool
+_connection_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_connection_pool() -> ConnectionPool:
+    """
+    Get the singleton pool for DATABASE_URL, creating it on first use.
+
+    Raises:
+        ValueError: If DATABASE_URL is not set
+    """
+    global _connection_pool
+    if _connection_pool is None:
+        with _pool_lock:
+            if _connection_pool is None:
+                database_url = os.environ.get("DATABASE_URL")
+                if not database_url:
+                    raise ValueError("DATABASE_URL environment variable not found")
+                _connection_pool = ConnectionPool(database_url)
+                logger.info(f"Database connection pool created (size {DB_POOL_MIN_SIZE}-{DB_POOL_MAX_SIZE})")
+    return _connection_pool
+
+
+def get_pooled_connection(autocommit: bool = False) -> PooledConnection:
+    """
+    Borrow a connection from the shared pool; close() returns it.
+
+    Args:
+        autocommit: Whether statements commit immediately
+
+    Returns:
+        PooledConnection
+    """
+    return get_connection_pool().getconn(autocommit)
+
+
+@contextmanager
+def pooled_connection(autocommit: bool = False) -> Iterator[PooledConnection]:
+    """Borrow a connection from the shared pool for a block (see ConnectionPool.connection)."""
+    with get_connection_pool().connection(autocommit) as connection:
+        yield connection
+
+
+def get_pool_metrics() -> Dict[str, Any]:
+    """Get metrics of the shared pool, empty before it is first used."""
+    return _connection_pool.get_metrics() if _connection_pool else {}
@@ -21,6 +21,9 @@ from models import (
     SystemBackup, ErrorLog, SuspiciousURL, MoodEntry
 )
 from app import db
+from stats_aggregator import get_stats_aggregator
+from log_writer import get_log_writer, USER_QUERIES, USER_ACTIVITY_LOGS, ERROR_LOGS
+from db_pool import get_pooled_connection, pooled_connection
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -33,10 +36,10 @@ def ping_database() -> Tuple[bool, Any]:
         Tuple of (success, result)
     """
     try:
-        conn, cursor = get_db_connection()
-        cursor.execute("SELECT 1")
-        result = cursor.fetchone()
-        conn.close()
+        with pooled_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            result = cursor.fetchone()
         return True, result
     except Exception as e:
         logger.error(f"Database ping failed: {e}")
@@ -44,28 +47,25 @@ def ping_database() -> Tuple[bool, Any]:
 
 def get_db_connection() -> Tuple[psycopg2.extensions.connection, psycopg2.extensions.cursor]:
     """
-    Get a connection to the PostgreSQL database.
+    Get a connection to the PostgreSQL database from the shared pool.
+    
+    Closing the connection returns it to the pool, rolling back anything
+    not committed.
     
     Returns:
         Tuple of connection and cursor objects
     """
+    conn = None
     try:
-        # Get database URL from environment variable
-        database_url = os.environ.get("DATABASE_URL")
-        
-        if not database_url:
-            logger.error("DATABASE_URL environment variable not found")
-            raise ValueError("DATABASE_URL environment variable not found")
-        
-        # Connect to database
-        conn = psycopg2.connect(database_url)
-        conn.autocommit = False
+        conn = get_pooled_connection()
         cursor = conn.cursor()
         
-        logger.debug("Connected to PostgreSQL database")
+        logger.debug("Borrowed pooled PostgreSQL connection")
         return conn, cursor
     except Exception as e:
         logger.error(f"Error connecting to database: {e}")
+        if conn is not None:
+            conn.close()
         raise
 
 def handle_db_error(func):
@@ -93,14 +93,7 @@ def handle_db_error(func):
             
             # Try to log the error to the database if possible
             try:
-                error_log = ErrorLog(
-                    error_type="Database Error",
-                    error_message=str(e),
-                    module=f"db_utils.{func.__name__}",
-                    user_id=user_id
-                )
-                db.session.add(error_log)
-                db.session.commit()
+                log_error("Database Error", str(e), module=f"db_utils.{func.__name__}", user_id=user_id)
             except Exception:
                 # If we can't log to DB, at least we logged to the file
                 pass
@@ -449,60 +442,101 @@ def generate_verification_code(user_id: int) -> Optional[str]:
 
 # Query and Log Functions
 
-@handle_db_error
+def _user_query_row(user_id: int, command: str, query_text: Optional[str], response_text: Optional[str],
+                    processing_time: Optional[float], timestamp: Optional[datetime.datetime]) -> Dict[str, Any]:
+    """Column values of a user query record."""
+    return {
+        "user_id": user_id,
+        "command": command,
+        "query_text": query_text,
+        "response_text": response_text,
+        "processing_time": processing_time,
+        "timestamp": timestamp or datetime.datetime.utcnow()
+    }
+
+def _count_query(processing_time: Optional[float]) -> None:
+    """Count a query; totals are flushed to BotStatistics periodically."""
+    stats = get_stats_aggregator()
+    stats.record_query()
+    stats.record_response_time(processing_time)
+
 def log_user_query(user_id: int, command: str, query_text: str = None, 
-                 response_text: str = None, processing_time: float = None) -> UserQuery:
+                 response_text: str = None, processing_time: float = None,
+                 timestamp: datetime.datetime = None) -> UserQuery:
     """
     Log a user query to the database.
 
+    The query is written in the background by the log writer, which also
+    increments the user's message count.
+
     Args:
         user_id: Telegram user ID
         command: Command used
         query_text: Full text of the query (optional)
         response_text: Bot's response (optional)
         processing_time: Time taken to process in ms (optional)
+        timestamp: When the query was received (defaults to now)
 
     Returns:
-        UserQuery object
+        UserQuery object (not attached to the session)
     """
-    query = UserQuery(
-        user_id=user_id,
-        command=command,
-        query_text=query_text,
-        response_text=response_text,
-        processing_time=processing_time
-    )
-    db.session.add(query)
-
-    # Increment message count for rate limiting
-    # Direct primary key lookup since id IS the Telegram ID
-    user = User.query.get(user_id)
-    if user:
-        user.message_count = user.message_count + 1 if hasattr(user, 'message_count') else 1
-        user.last_active = datetime.datetime.utcnow()
-        logger.debug(f"Updated message count for user {user_id} to {user.message_count}")
-    else:
-        logger.warning(f"Cannot update message count for user {user_id}: user not found")
+    row = _user_query_row(user_id, command, query_text, response_text, processing_time, timestamp)
+    get_log_writer().enqueue(USER_QUERIES, row)
+    logger.debug(f"Queued query from user {user_id}, command: {command}")
+    _count_query(processing_time)
+    return UserQuery(**row)
+
+async def log_user_query_async(user_id: int, command: str, query_text: str = None,
+                               response_text: str = None, processing_time: float = None,
+                               timestamp: datetime.datetime = None) -> UserQuery:
+    """
+    Async version of log_user_query.
 
-    try:
-        db.session.commit()
-        logger.debug(f"Logged query from user {user_id}, command: {command}")
-    except Exception as e:
-        db.session.rollback()
-        logger.error(f"Error logging user query: {e}")
-        raise
+    When the log queue is full, waits for room (up to LOG_ENQUEUE_TIMEOUT)
+    without blocking the event loop instead of dropping the query.
 
-    # Update bot statistics
-    update_bot_statistics()
+    Args:
+        user_id: Telegram user ID
+        command: Command used
+        query_text: Full text of the query (optional)
+        response_text: Bot's response (optional)
+        processing_time: Time taken to process in ms (optional)
+        timestamp: When the query was received (defaults to now)
 
-    return query
+    Returns:
+        UserQuery object (not attached to the session)
+    """
+    row = _user_query_row(user_id, command, query_text, response_text, processing_time, timestamp)
+    await get_log_writer().enqueue_async(USER_QUERIES, row)
+    logger.debug(f"Queued query from user {user_id}, command: {command}")
+    _count_query(processing_time)
+    return UserQuery(**row)
+
+def _user_activity_row(user_id: int, activity_type: str, details: Optional[str],
+                       ip_address: Optional[str], user_agent: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Column values of a user activity record, None if the user ID does not fit the column."""
+    # Check if user_id fits in the database column (BigInteger)
+    if user_id > 9223372036854775807:  # Max value for a signed 64-bit integer
+        logger.warning(f"User ID {user_id} is too large for the database, cannot log activity")
+        return None
+
+    # Based on our database schema query, these columns exist
+    return {
+        "user_id": user_id,
+        "activity_type": activity_type,
+        "details": details,
+        "ip_address": ip_address,
+        "user_agent": user_agent,
+        "timestamp": datetime.datetime.utcnow()
+    }
 
-@handle_db_error
 def log_user_activity(user_id: int, activity_type: str, details: str = None,
                     ip_address: str = None, user_agent: str = None) -> UserActivityLog:
     """
     Log user activity.
 
+    The activity is written in the background by the log writer.
+
     Args:
         user_id: Telegram user ID
         activity_type: Type of activity
@@ -511,38 +545,55 @@ def log_user_activity(user_id: int, activity_type: str, details: str = None,
         user_agent: User's client info (optional)
 
     Returns:
-        UserActivityLog object
+        UserActivityLog object (not attached to the session)
     """
     try:
-        # Check if user_id fits in the database column (BigInteger)
-        if user_id > 9223372036854775807:  # Max value for a signed 64-bit integer
-            logger.warning(f"User ID {user_id} is too large for the database, cannot log activity")
+        row = _user_activity_row(user_id, activity_type, details, ip_address, user_agent)
+        if row is None:
             return None
+        get_log_writer().enqueue(USER_ACTIVITY_LOGS, row)
 
-        # Based on our database schema query, these columns exist
-        activity = UserActivityLog(
-            user_id=user_id,
-            activity_type=activity_type,
-            details=details,
-            ip_address=ip_address,
-            user_agent=user_agent,
-            timestamp=datetime.datetime.utcnow()
-        )
-        db.session.add(activity)
-        db.session.commit()
+        return UserActivityLog(**row)
+    except Exception as e:
+        logger.error(f"Error logging user activity: {e}")
+        return None
+
+async def log_user_activity_async(user_id: int, activity_type: str, details: str = None,
+                                  ip_address: str = None, user_agent: str = None) -> UserActivityLog:
+    """
+    Async version of log_user_activity.
+
+    When the log queue is full, waits for room (up to LOG_ENQUEUE_TIMEOUT)
+    without blocking the event loop instead of dropping the activity.
+
+    Args:
+        user_id: Telegram user ID
+        activity_type: Type of activity
+        details: Additional details (optional)
+        ip_address: User's IP address (optional)
+        user_agent: User's client info (optional)
+
+    Returns:
+        UserActivityLog object (not attached to the session)
+    """
+    try:
+        row = _user_activity_row(user_id, activity_type, details, ip_address, user_agent)
+        if row is None:
+            return None
+        await get_log_writer().enqueue_async(USER_ACTIVITY_LOGS, row)
 
-        return activity
+        return UserActivityLog(**row)
     except Exception as e:
         logger.error(f"Error logging user activity: {e}")
-        db.session.rollback()
         return None
 
-@handle_db_error
 def log_error(error_type: str, error_message: str, traceback: str = None,
             module: str = None, user_id: int = None) -> ErrorLog:
     """
     Log an error to the database.
 
+    The error is written in the background by the log writer.
+
     Args:
         error_type: Type of error
         error_message: Error message
@@ -551,7 +602,7 @@ def log_error(error_type: str, error_message: str, traceback: str = None,
         user_id: User ID if error related to a user (optional)
 
     Returns:
-        ErrorLog object
+        ErrorLog object (not attached to the session)
     """
     try:
         # Check if user_id fits in the database column (BigInteger)
@@ -559,26 +610,23 @@ def log_error(error_type: str, error_message: str, traceback: str = None,
             logger.warning(f"User ID {user_id} is too large for the database, logging error without user_id")
             user_id = None
 
-        error = ErrorLog(
-            error_type=error_type,
-            error_message=error_message,
-            traceback=traceback,
-            module=module,
-            user_id=user_id
-        )
-        db.session.add(error)
-        db.session.commit()
+        row = {
+            "error_type": error_type,
+            "error_message": error_message,
+            "traceback": traceback,
+            "module": module,
+            "user_id": user_id,
+            "resolved": False,
+            "created_at": datetime.datetime.utcnow()
+        }
+        get_log_writer().enqueue(ERROR_LOGS, row)
 
-        # Update bot statistics
-        stats = BotStatistics.query.order_by(BotStatistics.id.desc()).first()
-        if stats:
-            stats.error_count += 1
-            db.session.commit()
+        # Count the error; totals are flushed to BotStatistics periodically
+        get_stats_aggregator().record_error()
 
-        return error
+        return ErrorLog(**row)
     except Exception as e:
         logger.error(f"Error logging error to database: {e}")
-        db.session.rollback()
         # At least log to file since we can't log to the database
         logger.error(f"Original error: {error_type} - {error_message}")
         return None
@@ -694,46 +742,13 @@ def update_bot_statistics() -> BotStatistics:
     """
     Update or create bot statistics.
 
+    Writes the incrementally maintained counters to the database instead of
+    recounting the query history.
+
     Returns:
         BotStatistics object
     """
-    from sqlalchemy import create_engine
-    from sqlalchemy.orm import scoped_session, sessionmaker
-
-    try:
-        if not hasattr(db, 'session') or db.session.is_active == False:
-            engine = create_engine(app.config['SQLALCHEMY_DATABASE_URI'])
-            db.session = scoped_session(sessionmaker(bind=engine))
-
-        stats = BotStatistics.query.order_by(BotStatistics.id.desc()).first()
-
-        if not stats:
-            # Create new stats object if none exists
-            stats = BotStatistics(start_time=datetime.datetime.utcnow())
-            db.session.add(stats)
-
-        # Update statistics
-        stats.command_count = UserQuery.query.count()
-        stats.active_user_count = User.query.filter(
-            User.last_active > (datetime.datetime.utcnow() - datetime.timedelta(days=1)),
-            User.is_blocked == False
-        ).count()
-        stats.subscribed_user_count = User.query.filter_by(is_subscribed=True).count()
-        stats.blocked_user_count = User.query.filter_by(is_blocked=True).count()
-
-        # Calculate average response time
-        response_times = db.session.query(UserQuery.processing_time).filter(UserQuery.processing_time != None).all()
-        if response_times:
-            avg_time = sum(rt[0] for rt in response_times) / len(response_times)
-            stats.average_response_time = avg_time
-
-        db.session.commit()
-        return stats
-    except Exception as e:
-        logger.error(f"Error updating bot statistics: {e}")
-        if hasattr(db, 'session'):
-            db.session.rollback()
-        return None
+    return get_stats_aggregator().flush()
 
 
 @handle_db_error
@@ -3,19 +3,24 @@
 
 """
 Mood tracking database utilities for the FiLot Telegram bot
+Coroutines for the mood tracking handlers; queries run through the async
+database access layer, so they neither block the event loop nor need an
+app context
 """
 
 import logging
 import datetime
 from typing import Dict, Any, List, Optional
+from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
 
-from models import db, MoodEntry, User
+from models import MoodEntry, User
+from async_db import get_async_db
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-def save_mood_entry(
+async def save_mood_entry(
     user_id: int,
     mood: str,
     mood_emoji: str,
@@ -35,10 +40,9 @@ def save_mood_entry(
     Returns:
         The created MoodEntry object, or None if there was an error
     """
-    try:
+    def save(session) -> Optional[MoodEntry]:
         # Ensure user exists
-        user = User.query.get(user_id)
-        if not user:
+        if session.get(User, user_id) is None:
             logger.warning(f"Attempt to save mood for non-existent user {user_id}")
             return None
             
@@ -50,20 +54,22 @@ def save_mood_entry(
         mood_entry.context = context
         mood_entry.notes = notes
         
-        db.session.add(mood_entry)
-        db.session.commit()
+        session.add(mood_entry)
+        return mood_entry
         
-        # Log the activity without using the log_user_activity function to avoid circular imports
-        logger.info(f"User {user_id} mood tracked: {mood} in context {context}")
+    try:
+        mood_entry = await get_async_db().run(save)
+        if mood_entry is not None:
+            # Log the activity without using the log_user_activity function to avoid circular imports
+            logger.info(f"User {user_id} mood tracked: {mood} in context {context}")
         
         return mood_entry
         
     except SQLAlchemyError as e:
-        db.session.rollback()
         logger.error(f"Error saving mood entry: {e}")
         return None
 
-def get_mood_history(
+async def get_mood_history(
     user_id: int,
     limit: int = 10,
     context_filter: Optional[str] = None
@@ -81,14 +87,14 @@ def get_mood_history(
     """
     try:
         # Query mood entries for the user
-        query = MoodEntry.query.filter_by(user_id=user_id)
+        query = select(MoodEntry).where(MoodEntry.user_id == user_id)
         
         # Apply context filter if specified
         if context_filter:
-            query = query.filter_by(context=context_filter)
+            query = query.where(MoodEntry.context == context_filter)
             
         # Order by most recent first and apply limit
-        entries = query.order_by(MoodEntry.timestamp.desc()).limit(limit).all()
+        entries = await get_async_db().scalars(query.order_by(MoodEntry.timestamp.desc()).limit(limit))
         
         # Format the results
         return [
@@ -107,7 +113,7 @@ def get_mood_history(
         logger.error(f"Error fetching mood history: {e}")
         return []
 
-def get_mood_stats(
+async def get_mood_stats(
     user_id: int,
     days: int = 30
 ) -> Dict[str, Any]:
@@ -126,9 +132,9 @@ def get_mood_stats(
         cutoff_date = datetime.datetime.utcnow() - datetime.timedelta(days=days)
         
         # Query mood entries for the user within the time frame
-        entries = MoodEntry.query.filter_by(user_id=user_id).filter(
-            MoodEntry.timestamp >= cutoff_date
-        ).all()
+        entries = await get_async_db().scalars(
+            select(MoodEntry).where(MoodEntry.user_id == user_id, MoodEntry.timestamp >= cutoff_date)
+        )
         
         if not entries:
             return {
@@ -135,7 +135,7 @@ async def handle_pool_action(update: Update, context: ContextTypes.DEFAULT_TYPE,
     try:
         if action == "list":
             # Fetch pools from database
-            pools = get_pools_from_db(limit=5)
+            pools = await get_pools_from_db(limit=5)
             
             if pools:
                 # Build message with pools
@@ -513,7 +513,7 @@ async def handle_pagination(update: Update, context: ContextTypes.DEFAULT_TYPE,
     if page_type == "pools":
         # Paginate pool list
         offset = (page - 1) * 5
-        pools = get_pools_from_db(limit=5, offset=offset)
+        pools = await get_pools_from_db(limit=5, offset=offset)
         
         if pools:
             message = f"*📊 Liquidity Pool Data (Page {page})*\n\n"
@@ -563,32 +563,31 @@ async def handle_menu_action(update: Update, context: ContextTypes.DEFAULT_TYPE,
     await handle_back_action(update, context, "main")
 
 # Database interaction functions
-def get_pools_from_db(limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
+async def get_pools_from_db(limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
     """
     Get pool data from the database
     """
     try:
-        from app import app
+        from async_db import get_top_pools
         
-        with app.app_context():
-            pools = Pool.query.order_by(Pool.apr_24h.desc()).offset(offset).limit(limit).all()
-            
-            result = []
-            for pool in pools:
-                result.append({
-                    'id': pool.id,
-                    'token_a': pool.token_a_symbol,
-                    'token_b': pool.token_b_symbol,
-                    'apr_24h': pool.apr_24h,
-                    'apr_7d': pool.apr_7d,
-                    'tvl': pool.tvl,
-                    'fee': pool.fee,
-                    'volume_24h': pool.volume_24h or 0,
-                    'tx_count_24h': pool.tx_count_24h,
-                    'last_updated': pool.last_updated.strftime('%Y-%m-%d %H:%M:%S') if pool.last_updated else 'N/A'
-                })
-            
-            return result
+        pools = await get_top_pools(limit=limit, offset=offset)
+        
+        result = []
+        for pool in pools:
+            result.append({
+                'id': pool.id,
+                'token_a': pool.token_a_symbol,
+                'token_b': pool.token_b_symbol,
+                'apr_24h': pool.apr_24h,
+                'apr_7d': pool.apr_7d,
+                'tvl': pool.tvl,
+                'fee': pool.fee,
+                'volume_24h': pool.volume_24h or 0,
+                'tx_count_24h': pool.tx_count_24h,
+                'last_updated': pool.last_updated.strftime('%Y-%m-%d %H:%M:%S') if pool.last_updated else 'N/A'
+            })
+        
+        return result
     except Exception as e:
         logger.error(f"Error getting pools from database: {e}")
         
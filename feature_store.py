@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Pool feature store for FiLot Telegram bot
+Computes each pool's RL feature vector once per market snapshot version and
+keeps all vectors in one contiguous float32 matrix
+"""
+
+import time
+import logging
+import threading
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+from market_snapshot import SNAPSHOT_MAX_AGE, get_snapshot_version
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Feature vector layout used by the RL advisor (all values scaled to 0-1)
+FEATURE_NAMES = (
+    "apr",               # APR (0-100% -> 0-1)
+    "tvl",               # TVL (log10 scaled, max ~$100M)
+    "volume",            # 24h volume (log10 scaled, max ~$10M)
+    "volatility",        # Volatility (higher is more volatile)
+    "sentiment",         # Average token sentiment
+    "prediction",        # Prediction score
+    "apr_change",        # 7-day APR change (0.5 = no change)
+    "price_change",      # 24h token price change (0.5 = no change)
+)
+
+# Features older than this are recomputed even if the snapshot version is unchanged,
+# so sentiment and price inputs do not go stale between snapshot updates
+FEATURE_MAX_AGE = SNAPSHOT_MAX_AGE
+
+# Initial number of rows allocated in the feature matrix
+INITIAL_CAPACITY = 64
+
+
+def _number(value: Any, default: float) -> float:
+    """Convert an API value to float, using default for missing or invalid values."""
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return default
+
+
+def _centered(values: np.ndarray) -> np.ndarray:
+    """Map percent changes in [-50, 50] to [0, 1], with 0.5 outside that range."""
+    in_range = (values >= -50) & (values <= 50)
+    return np.where(in_range, (values + 50) / 100, 0.5)
+
+
+def compute_features(
+    pools: List[Dict[str, Any]],
+    sentiments: Optional[Dict[str, Any]] = None,
+    prices: Optional[Dict[str, Any]] = None
+) -> np.ndarray:
+    """
+    Compute the RL feature vectors for several pools at once.
+
+    Args:
+        pools: Pool data dictionaries from the SolPool API
+        sentiments: Optional pre-loaded sentiment data
+        prices: Optional pre-loaded price data
+
+    Returns:
+        Float32 matrix of shape (len(pools), len(FEATURE_NAMES))
+    """
+    sent_data = (sentiments or {}).get("sentiment") or {}
+    price_data = (prices or {}).get("prices") or {}
+
+    count = len(pools)
+    apr = np.empty(count)
+    liquidity = np.empty(count)
+    volume = np.empty(count)
+    volatility = np.empty(count)
+    sentiment_a = np.empty(count)
+    sentiment_b = np.empty(count)
+    prediction = np.empty(count)
+    apr_change = np.empty(count)
+    price_change = np.empty(count)
+
+    for i, pool in enumerate(pools):
+        token1 = pool.get("token1_symbol", "") or ""
+        token2 = pool.get("token2_symbol", "") or ""
+
+        apr[i] = _number(pool.get("apr"), 0.0)
+        liquidity[i] = _number(pool.get("liquidity"), 0.0)
+        volume[i] = _number(pool.get("volume_24h"), 0.0)
+        # Volatility is a percentage; unknown volatility counts as medium
+        volatility[i] = _number(pool.get("volatility"), 50.0)
+        prediction[i] = _number(pool.get("prediction_score"), 50.0)
+        apr_change[i] = _number(pool.get("apr_change_7d"), 0.0)
+
+        # Sentiment scores are -1 to 1; missing tokens are neutral
+        sentiment_a[i] = _number(sent_data[token1].get("score"), 0.0) if token1 in sent_data else 0.0
+        sentiment_b[i] = _number(sent_data[token2].get("score"), 0.0) if token2 in sent_data else 0.0
+
+        # Price change of the first token; pools without price data get 0
+        if price_data and token1 in price_data:
+            price_change[i] = _number(price_data[token1].get("percent_change_24h"), 0.0)
+        else:
+            price_change[i] = np.nan
+
+    features = np.empty((count, len(FEATURE_NAMES)), dtype=np.float32)
+    features[:, 0] = np.minimum(apr / 100.0, 1.0)
+    features[:, 1] = np.minimum(np.log10(np.maximum(liquidity, 0.0) + 1) / 8.0, 1.0)
+    features[:, 2] = np.minimum(np.log10(np.maximum(volume, 0.0) + 1) / 7.0, 1.0)
+    features[:, 3] = np.minimum(volatility / 100.0, 1.0)
+    features[:, 4] = ((sentiment_a + 1) / 2 + (sentiment_b + 1) / 2) / 2
+    features[:, 5] = np.minimum(prediction / 100.0, 1.0)
+    features[:, 6] = _centered(apr_change)
+    features[:, 7] = np.where(np.isnan(price_change), 0.0, _centered(price_change))
+    return features
+
+
+class PoolFeatureStore:
+    """
+    Feature vectors for all known pools in one contiguous float32 matrix.
+
+    Each row records the snapshot version and time it was computed, so
+    consumers can tell whether a pool's features are stale.
+    """
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        """
+        Initialize an empty feature store.
+
+        Args:
+            capacity: Number of rows to allocate up front
+        """
+        self._lock = threading.Lock()
+        self._index: Dict[str, int] = {}
+        self.matrix = np.zeros((capacity, len(FEATURE_NAMES)), dtype=np.float32)
+        self.versions = np.full(capacity, -1, dtype=np.int64)
+        self.updated_at = np.zeros(capacity)
+
+    def __len__(self):
+        return len(self._index)
+
+    def _grow(self, rows: int) -> None:
+        """Make room for at least `rows` rows, doubling the allocation."""
+        capacity = self.matrix.shape[0]
+        if rows <= capacity:
+            return
+        while capacity < rows:
+            capacity *= 2
+        extra = capacity - self.matrix.shape[0]
+        self.matrix = np.concatenate([self.matrix, np.zeros((extra, len(FEATURE_NAMES)), dtype=np.float32)])
+        self.versions = np.concatenate([self.versions, np.full(extra, -1, dtype=np.int64)])
+        self.updated_at = np.concatenate([self.updated_at, np.zeros(extra)])
+
+    def row_index(self, pool_id: str) -> Optional[int]:
+        """Row of a pool in the feature matrix, or None if it has no features."""
+        return self._index.get(str(pool_id))
+
+    def get(self, pool_id: str) -> Optional[np.ndarray]:
+        """
+        Get a pool's feature vector.
+
+        Args:
+            pool_id: Pool ID
+
+        Returns:
+            Read-only view of the pool's row, or None if it has no features
+        """
+        row = self.row_index(pool_id)
+        if row is None:
+            return None
+        vector = self.matrix[row]
+        vector.flags.writeable = False
+        return vector
+
+    def is_stale(self, pool_id: str, version: Optional[int] = None,
+                 max_age: float = FEATURE_MAX_AGE) -> bool:
+        """
+        Check whether a pool's features need to be recomputed.
+
+        Args:
+            pool_id: Pool ID
+            version: Snapshot version the features must match (defaults to current)
+            max_age: Maximum age of the features in seconds
+
+        Returns:
+            True if the pool has no features, or they are from another version or too old
+        """
+        row = self.row_index(pool_id)
+        if row is None:
+            return True
+        version = get_snapshot_version() if version is None else version
+        return self.versions[row] != version or time.time() - self.updated_at[row] > max_age
+
+    def stale_ids(self, pool_ids: List[str], version: Optional[int] = None) -> List[str]:
+        """Get the subset of pool_ids whose features need to be recomputed."""
+        return [pool_id for pool_id in pool_ids if self.is_stale(pool_id, version)]
+
+    def update(
+        self,
+        pools: List[Dict[str, Any]],
+        sentiments: Optional[Dict[str, Any]] = None,
+        prices: Optional[Dict[str, Any]] = None,
+        version: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Compute and store the feature vectors for several pools.
+
+        Args:
+            pools: Pool data dictionaries with an "id" key
+            sentiments: Optional pre-loaded sentiment data
+            prices: Optional pre-loaded price data
+            version: Snapshot version the features belong to (defaults to current)
+
+        Returns:
+            Row indices of the pools in the feature matrix
+        """
+        pools = [pool for pool in pools if pool.get("id")]
+        if not pools:
+            return np.zeros(0, dtype=np.int64)
+
+        features = compute_features(pools, sentiments, prices)
+        version = get_snapshot_version() if version is None else version
+        now = time.time()
+
+        with self._lock:
+            for pool in pools:
+                pool_id = str(pool["id"])
+                if pool_id not in self._index:
+                    self._index[pool_id] = len(self._index)
+            self._grow(len(self._index))
+
+            rows = np.array([self._index[str(pool["id"])] for pool in pools], dtype=np.int64)
+            self.matrix[rows] = features
+            self.versions[rows] = version
+            self.updated_at[rows] = now
+
+        return rows
+
+
+# Singleton feature store
+_feature_store: Optional[PoolFeatureStore] = None
+
+
+def get_feature_store() -> PoolFeatureStore:
+    """Get the singleton PoolFeatureStore instance."""
+    global _feature_store
+    if _feature_store is None:
+        _feature_store = PoolFeatureStore()
+    return _feature_store
@@ -82,6 +82,19 @@ def add_missing_columns():
                 db.session.commit()
                 logger.info("Added investment_goals column to users table")
 
+            # Add response_count to bot_statistics, counting the queries the mean response time covers
+            if not check_column_exists('bot_statistics', 'response_count'):
+                logger.info("Adding response_count column to bot_statistics table")
+                db.session.execute(text(
+                    "ALTER TABLE bot_statistics ADD COLUMN response_count INTEGER DEFAULT 0;"
+                ))
+                db.session.execute(text(
+                    "UPDATE bot_statistics SET response_count = "
+                    "(SELECT COUNT(processing_time) FROM user_queries);"
+                ))
+                db.session.commit()
+                logger.info("Added response_count column to bot_statistics table")
+
             # Fix BigInteger columns that might be Integer in the database
             # This is a bit tricky as it requires data conversion
             # For now, logging the issue - a more comprehensive fix might require 
@@ -100,6 +113,22 @@ def add_missing_columns():
 
         return True
 
+def remove_keep_alive_logs():
+    """Delete the keep-alive rows the former anti-idle thread wrote to the error log."""
+    with app.app_context():
+        try:
+            deleted = db.session.execute(text(
+                "DELETE FROM error_logs WHERE error_type = 'keep_alive';"
+            )).rowcount
+            db.session.commit()
+            logger.info(f"Removed {deleted} keep-alive rows from error_logs")
+        except Exception as e:
+            logger.error(f"Error removing keep-alive rows: {e}")
+            db.session.rollback()
+            return False
+
+        return True
+
 def reset_session_if_needed():
     """Reset the SQLAlchemy session if needed."""
     with app.app_context():
@@ -118,7 +147,7 @@ if __name__ == "__main__":
     
     reset_session_if_needed()
     
-    if add_missing_columns():
+    if add_missing_columns() and remove_keep_alive_logs():
         logger.info("Database schema fixes applied successfully")
     else:
         logger.error("Failed to apply all database schema fixes")
@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Heartbeat for FiLot Telegram bot
+Records that this process is alive by updating one row per process at a
+fixed interval, and computes uptime from the recorded start and last-seen
+timestamps; the database connection pool's pre-ping and recycle settings
+keep connections usable, so no separate keep-alive queries are needed
+"""
+
+import os
+import sys
+import time
+import uuid
+import socket
+import logging
+import datetime
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Seconds between heartbeats; below the hosting platform's idle timeout
+HEARTBEAT_INTERVAL = 60
+
+# Days heartbeat rows of stopped processes are kept
+HEARTBEAT_RETENTION_DAYS = 30
+
+# Days covered by the uptime percentage
+UPTIME_WINDOW_DAYS = 30
+
+# Heartbeats between uptime recomputations (reads every row in the window)
+UPTIME_REFRESH_BEATS = 10
+
+# Name of this service in the heartbeat table, e.g. run_bot or wsgi
+HEARTBEAT_SERVICE = os.environ.get("HEARTBEAT_SERVICE") or (
+    os.path.splitext(os.path.basename(sys.argv[0]))[0] if sys.argv and sys.argv[0] else "app"
+)
+
+
+def covered_seconds(intervals: List[Tuple[float, float]], window_start: float, window_end: float) -> float:
+    """
+    Total time covered by a set of possibly overlapping intervals within a window.
+
+    Args:
+        intervals: List of (start, end) Unix timestamps
+        window_start: Start of the window
+        window_end: End of the window
+
+    Returns:
+        Covered seconds
+    """
+    covered = 0.0
+    current_start = current_end = None
+    for start, end in sorted((max(s, window_start), min(e, window_end)) for s, e in intervals):
+        if end <= start:
+            continue
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                covered += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        covered += current_end - current_start
+    return covered
+
+
+class Heartbeat:
+    """
+    Periodic liveness record of one process.
+
+    Each beat updates (or creates) this process's row in service_heartbeats.
+    A process counts as up from its start until one interval after its last
+    beat, so uptime is computed from the rows of all processes of the service.
+    """
+
+    def __init__(self, service: str = HEARTBEAT_SERVICE, interval: float = HEARTBEAT_INTERVAL):
+        """
+        Initialize the heartbeat.
+
+        Args:
+            service: Service name shared by all processes of the same kind
+            interval: Seconds between beats
+        """
+        self.service = service
+        self.interval = interval
+        # Hostname and PID repeat across container restarts, so the random part
+        # keeps a restarted process from continuing its predecessor's row
+        self.instance_id = f"{socket.gethostname()[:70]}:{os.getpid()}:{uuid.uuid4().hex[:12]}"
+        self.started_at = datetime.datetime.utcnow()
+        self.last_beat: Optional[datetime.datetime] = None
+        self.beats = 0
+        self.failures = 0
+        self.uptime_percentage: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def beat(self) -> bool:
+        """
+        Record that this process is alive.
+
+        Returns:
+            True if the heartbeat row was written
+        """
+        # Import at function level to avoid circular imports
+        from app import app
+        from models import db, ServiceHeartbeat
+
+        now = datetime.datetime.utcnow()
+        try:
+            with app.app_context():
+                row = db.session.get(ServiceHeartbeat, self.instance_id)
+                if row is None:
+                    row = ServiceHeartbeat(id=self.instance_id, service=self.service,
+                                           started_at=self.started_at, beats=0)
+                    db.session.add(row)
+                row.last_seen = now
+                row.beats = (row.beats or 0) + 1
+                db.session.commit()
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"Heartbeat failed: {e}")
+            return False
+
+        self.last_beat = now
+        self.beats += 1
+        return True
+
+    def compute_uptime(self, days: int = UPTIME_WINDOW_DAYS) -> Optional[float]:
+        """
+        Compute the service's uptime percentage from heartbeat timestamps.
+
+        The window starts at the later of `days` ago and the first recorded start.
+
+        Args:
+            days: Length of the window in days
+
+        Returns:
+            Uptime in percent, or None if it cannot be computed
+        """
+        # Import at function level to avoid circular imports
+        from app import app
+        from models import db, ServiceHeartbeat
+
+        now = datetime.datetime.utcnow()
+        window_start = now - datetime.timedelta(days=days)
+        try:
+            with app.app_context():
+                rows = db.session.execute(
+                    db.select(ServiceHeartbeat.started_at, ServiceHeartbeat.last_seen)
+                    .where(ServiceHeartbeat.service == self.service, ServiceHeartbeat.last_seen >= window_start)
+                ).all()
+        except Exception as e:
+            logger.warning(f"Error computing uptime: {e}")
+            return None
+        if not rows:
+            return None
+
+        grace = datetime.timedelta(seconds=self.interval)
+        intervals = [(started.timestamp(), min(last_seen + grace, now).timestamp()) for started, last_seen in rows]
+        start = max(window_start.timestamp(), min(s for s, _ in intervals))
+        if now.timestamp() <= start:
+            return 100.0
+        return min(100.0, covered_seconds(intervals, start, now.timestamp()) / (now.timestamp() - start) * 100)
+
+    def prune(self) -> None:
+        """Delete heartbeat rows of processes not seen within the retention period."""
+        # Import at function level to avoid circular imports
+        from app import app
+        from models import db, ServiceHeartbeat
+
+        cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=HEARTBEAT_RETENTION_DAYS)
+        try:
+            with app.app_context():
+                db.session.execute(db.delete(ServiceHeartbeat).where(ServiceHeartbeat.last_seen < cutoff))
+                db.session.commit()
+        except Exception as e:
+            logger.warning(f"Error pruning heartbeats: {e}")
+
+    def _run(self) -> None:
+        """Beat every interval until the process exits."""
+        self.prune()
+        while True:
+            if self.beat() and (self.beats == 1 or self.beats % UPTIME_REFRESH_BEATS == 0):
+                self.uptime_percentage = self.compute_uptime()
+            time.sleep(self.interval)
+
+    def start(self) -> None:
+        """Start beating in a daemon thread (once)."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="heartbeat", daemon=True)
+        self._thread.start()
+        logger.info(f"Heartbeat started for {self.service} ({self.instance_id}) every {self.interval}s")
+
+    def get_status(self) -> Dict[str, Any]:
+        """
+        Get this process's liveness, without touching the database.
+
+        Returns:
+            Dictionary with the service, process uptime, last beat age,
+            beat and failure counts and the last computed uptime percentage
+        """
+        now = datetime.datetime.utcnow()
+        return {
+            "service": self.service,
+            "instance": self.instance_id,
+            "started_at": self.started_at.isoformat(),
+            "uptime_seconds": int((now - self.started_at).total_seconds()),
+            "last_beat_age": (now - self.last_beat).total_seconds() if self.last_beat else None,
+            "beats": self.beats,
+            "failures": self.failures,
+            "uptime_percentage": self.uptime_percentage,
+        }
+
+
+# Singleton heartbeat
+_heartbeat: Optional[Heartbeat] = None
+
+
+def get_heartbeat() -> Heartbeat:
+    """Get the singleton Heartbeat instance for this process."""
+    global _heartbeat
+    if _heartbeat is None:
+        _heartbeat = Heartbeat()
+    return _heartbeat
+
+
+def start_heartbeat() -> Heartbeat:
+    """Start this process's heartbeat if it is not running yet."""
+    heartbeat = get_heartbeat()
+    heartbeat.start()
+    return heartbeat
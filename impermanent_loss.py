@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Impermanent loss engine for FiLot Telegram bot
+Evaluates impermanent loss and net liquidity position value over price-ratio
+grids and price paths for many pools at once
+"""
+
+import logging
+from typing import Dict, List, Any, Optional, Sequence
+
+import numpy as np
+
+from market_snapshot import normalize_pool, get_history_store
+from pool_statistics import estimate_daily_volatility
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Largest price move (either direction) covered by the default price-ratio grid
+GRID_MAX_MOVE = 4.0
+
+# Number of points in the default price-ratio grid (odd, so 1.0 is included)
+GRID_POINTS = 33
+
+# Gauss-Hermite nodes used to take expectations over lognormal price moves
+QUADRATURE_NODES = 32
+
+# Horizon (days) of the impermanent loss risk feature used by the advisors
+RISK_HORIZON_DAYS = 30
+
+_hermite_nodes, _hermite_weights = np.polynomial.hermite_e.hermegauss(QUADRATURE_NODES)
+_hermite_weights = _hermite_weights / _hermite_weights.sum()
+
+
+def impermanent_loss(price_ratio: np.ndarray) -> np.ndarray:
+    """
+    Impermanent loss of a 50/50 constant-product position.
+
+    Args:
+        price_ratio: Relative price change of token_a vs token_b (1.0 = unchanged)
+
+    Returns:
+        Loss as a fraction of the held value (0 or negative)
+    """
+    price_ratio = np.asarray(price_ratio, dtype=float)
+    return 2 * np.sqrt(price_ratio) / (1 + price_ratio) - 1
+
+
+def price_ratio_grid(max_move: float = GRID_MAX_MOVE, points: int = GRID_POINTS) -> np.ndarray:
+    """
+    Build a price-ratio grid that is symmetric in log space around 1.0.
+
+    Args:
+        max_move: Largest price move covered, e.g. 4.0 spans 0.25x to 4x
+        points: Number of grid points
+
+    Returns:
+        Array of price ratios
+    """
+    return np.exp(np.linspace(-np.log(max_move), np.log(max_move), points))
+
+
+def breakeven_ratios(fee_return: np.ndarray) -> np.ndarray:
+    """
+    Price ratios at which fee income exactly offsets impermanent loss.
+
+    Solves 2*sqrt(k)/(1+k) * (1+f) = 1 for k in closed form.
+
+    Args:
+        fee_return: Fee return over the holding period as a fraction, any shape
+
+    Returns:
+        Array of shape fee_return.shape + (2,) with the lower and upper ratio
+    """
+    growth = 1 + np.clip(np.asarray(fee_return, dtype=float), 0.0, None)
+    spread = np.sqrt(growth ** 2 - 1)
+    return np.stack([(growth - spread) ** 2, (growth + spread) ** 2], axis=-1)
+
+
+def scenario_grid(
+    fee_returns: Sequence[float],
+    grid: Optional[np.ndarray] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Evaluate net position value for every pool over a price-ratio grid.
+
+    Values are relative to an initial deposit of 1, priced in token_b.
+
+    Args:
+        fee_returns: Fee return over the holding period for each pool, as a fraction
+        grid: Price ratios to evaluate (defaults to price_ratio_grid())
+
+    Returns:
+        Dictionary with:
+        - price_ratio, impermanent_loss, hold_value: shape (grid,)
+        - lp_value, net_vs_hold: shape (pools, grid)
+        - breakeven: shape (pools, 2)
+    """
+    grid = price_ratio_grid() if grid is None else np.asarray(grid, dtype=float)
+    fee_growth = 1 + np.asarray(fee_returns, dtype=float)
+
+    hold_value = (1 + grid) / 2
+    lp_value = np.sqrt(grid)[None, :] * fee_growth[:, None]
+
+    return {
+        "price_ratio": grid,
+        "impermanent_loss": impermanent_loss(grid),
+        "hold_value": hold_value,
+        "lp_value": lp_value,
+        "net_vs_hold": lp_value / hold_value[None, :] - 1,
+        "breakeven": breakeven_ratios(fee_growth - 1),
+    }
+
+
+def simulate_price_paths(
+    daily_volatility: Sequence[float],
+    days: int,
+    paths: int = 256,
+    seed: Optional[int] = 0
+) -> np.ndarray:
+    """
+    Simulate price-ratio paths as driftless geometric Brownian motion.
+
+    Args:
+        daily_volatility: Daily log-volatility of each pool's price ratio
+        days: Number of daily steps
+        paths: Number of paths per pool
+        seed: Random seed (fixed by default so rankings are reproducible)
+
+    Returns:
+        Price ratios of shape (pools, paths, days), relative to today
+    """
+    sigma = np.asarray(daily_volatility, dtype=float)[:, None, None]
+    rng = np.random.default_rng(seed)
+    shocks = rng.standard_normal((sigma.shape[0], paths, days))
+    # The -sigma^2/2 drift keeps the expected price ratio at 1.0
+    return np.exp(np.cumsum(sigma * shocks - sigma ** 2 / 2, axis=2))
+
+
+def path_impermanent_loss(price_paths: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Summarize impermanent loss along price-ratio paths.
+
+    Args:
+        price_paths: Price ratios of shape (pools, paths, steps)
+
+    Returns:
+        Dictionary with arrays of shape (pools, steps):
+        - mean: average loss at each step
+        - p95: 95th percentile loss (5th percentile of the negative values)
+        and shape (pools,):
+        - worst: worst loss seen on any path at any step
+    """
+    losses = impermanent_loss(price_paths)
+    return {
+        "mean": losses.mean(axis=1),
+        "p95": np.percentile(losses, 5, axis=1),
+        "worst": losses.min(axis=(1, 2)),
+    }
+
+
+def historical_impermanent_loss(pool_ids: List[str], points: Optional[int] = None) -> np.ndarray:
+    """
+    Impermanent loss a position opened at the start of the stored history would show.
+
+    Args:
+        pool_ids: Pool IDs to evaluate
+        points: Number of most recent history points to use (all by default)
+
+    Returns:
+        Array of shape (pools, points), NaN where no price was recorded
+    """
+    ratios = get_history_store().price_ratio_series(pool_ids, points)
+    if ratios.size == 0:
+        return ratios
+
+    # Measure each pool's moves from its first recorded price ratio
+    has_value = np.isfinite(ratios)
+    first = np.argmax(has_value, axis=1)
+    entry = ratios[np.arange(len(pool_ids)), first]
+    return impermanent_loss(ratios / entry[:, None])
+
+
+def expected_impermanent_loss(daily_volatility: Sequence[float], days: Sequence[int]) -> np.ndarray:
+    """
+    Expected impermanent loss under a lognormal price-ratio move.
+
+    Uses Gauss-Hermite quadrature, so it is deterministic and cheap enough
+    for the recommendation path.
+
+    Args:
+        daily_volatility: Daily log-volatility of each pool's price ratio
+        days: Holding periods in days
+
+    Returns:
+        Array of shape (pools, horizons) with expected loss fractions (0 or negative)
+    """
+    sigma = np.asarray(daily_volatility, dtype=float)[:, None, None]
+    days = np.atleast_1d(np.asarray(days, dtype=float))[None, :, None]
+    total = sigma * np.sqrt(days)
+    log_ratio = total * _hermite_nodes[None, None, :] - total ** 2 / 2
+    return (impermanent_loss(np.exp(log_ratio)) * _hermite_weights).sum(axis=2)
+
+
+def impermanent_loss_risk(
+    pools: List[Dict[str, Any]],
+    days: int = RISK_HORIZON_DAYS
+) -> Dict[str, float]:
+    """
+    Expected impermanent loss over a holding period for every candidate pool.
+
+    Args:
+        pools: Pool dictionaries in any supported format
+        days: Holding period in days
+
+    Returns:
+        Dictionary mapping pool ID to expected loss as a positive fraction
+    """
+    records = [r for r in (normalize_pool(pool) for pool in pools) if r]
+    if not records:
+        return {}
+
+    try:
+        volatility = estimate_daily_volatility(records)
+        expected = -expected_impermanent_loss(volatility, [days])[:, 0]
+    except Exception as e:
+        logger.error(f"Error calculating impermanent loss risk: {e}")
+        return {}
+
+    return {record["id"]: float(loss) for record, loss in zip(records, expected)}
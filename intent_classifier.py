@@ -0,0 +1,309 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Local financial question classifier for FiLot Telegram bot
+Naive Bayes model over words and word pairs that classifies free-text
+questions into the same categories as the LLM classifier, in microseconds
+"""
+
+import re
+import logging
+import datetime
+import threading
+from collections import Counter
+from typing import Dict, List, Any, Optional, Tuple, Iterable
+
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Categories used by AnthropicAI.classify_financial_question
+CATEGORIES = (
+    "pool_advice", "token_question", "risk_assessment", "strategy_help",
+    "defi_explanation", "market_prediction", "tax_question", "platform_question", "general"
+)
+
+# Minimum posterior probability to trust the local label instead of asking the LLM
+CONFIDENCE_THRESHOLD = 0.6
+
+# Laplace smoothing for word counts
+SMOOTHING = 0.5
+
+# Logged examples carry this weight relative to the built-in seed examples
+LOGGED_EXAMPLE_WEIGHT = 2.0
+
+# Maximum number of logged questions used for retraining
+MAX_TRAINING_ROWS = 20000
+
+# Logged questions are matched to classifications logged at most this long after them
+CLASSIFICATION_LOOKBACK = datetime.timedelta(minutes=10)
+
+# Activity details written when a question is classified, e.g. "Classification: tax_question (local)"
+CLASSIFICATION_DETAILS_PATTERN = re.compile(r"^Classification: (\w+)(?: \((\w+)\))?$")
+
+# Built-in examples so the classifier works before any questions are logged
+SEED_EXAMPLES = {
+    "pool_advice": [
+        "which pool should i add liquidity to", "best liquidity pool for sol",
+        "is the sol usdc pool good", "which pool has the best apr",
+        "should i provide liquidity to ray sol", "where should i farm my usdc",
+        "recommend a pool for me", "highest yield pool right now",
+        "is this pool worth it", "best farm for stablecoins", "which lp should i join",
+    ],
+    "token_question": [
+        "what is bonk token", "tell me about jto", "is sol a good coin",
+        "what is the ray token used for", "who created this coin", "what is usdc backed by",
+        "token supply of jup", "what does the bonk token do", "is msol the same as sol",
+        "explain the utility of this token",
+    ],
+    "risk_assessment": [
+        "is it safe to invest in pools", "what are the risks of this pool",
+        "can i lose money", "how risky is yield farming", "is raydium secure",
+        "could the pool get hacked", "what happens if the token crashes",
+        "is my money safe", "risk of rug pull", "how dangerous is impermanent loss for me",
+    ],
+    "strategy_help": [
+        "how should i invest 1000 dollars", "what strategy should i use",
+        "how do i diversify my portfolio", "should i dca or lump sum",
+        "how to allocate my investment", "best strategy for a conservative investor",
+        "how should i split my money between pools", "plan for investing 500",
+        "long term investment approach", "when should i rebalance",
+    ],
+    "defi_explanation": [
+        "what is impermanent loss", "explain liquidity pools", "what is an amm",
+        "how does yield farming work", "what is apr vs apy", "explain staking",
+        "what is slippage", "how do liquidity providers earn fees", "what is defi",
+        "what is a liquidity provider token", "explain how swaps work",
+    ],
+    "market_prediction": [
+        "will sol go up", "price prediction for bonk", "is the market going to crash",
+        "when will bitcoin recover", "will apr go down next week", "is this a good time to buy",
+        "where is the market heading", "will eth reach 5000", "is crypto bullish",
+        "should i sell before the dip",
+    ],
+    "tax_question": [
+        "do i pay taxes on yield", "how are crypto rewards taxed", "capital gains on lp tokens",
+        "tax reporting for defi", "is impermanent loss tax deductible", "irs rules for staking",
+        "do i need to report my earnings", "tax on crypto swaps", "is defi regulated",
+        "legal status of yield farming",
+    ],
+    "platform_question": [
+        "what is raydium", "how does orca work", "is jupiter a dex",
+        "difference between raydium and orca", "how do i use phantom wallet",
+        "what platforms does filot support", "how to connect my wallet to raydium",
+        "what fees does raydium charge", "is meteora safe to use", "which dex is best on solana",
+    ],
+    "general": [
+        "hello", "thanks", "how are you", "what can you do", "good morning",
+        "who are you", "help", "ok", "cool thanks", "tell me something interesting",
+    ],
+}
+
+_WORD_PATTERN = re.compile(r"[a-z0-9$]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase words and adjacent word pairs.
+
+    Args:
+        text: Question text
+
+    Returns:
+        List of word and word-pair features
+    """
+    words = _WORD_PATTERN.findall(text.lower())
+    return words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+
+class IntentClassifier:
+    """Multinomial Naive Bayes classifier over word and word-pair features."""
+
+    def __init__(self):
+        """Initialize the classifier from the built-in seed examples."""
+        self._model: Tuple[Dict[str, int], np.ndarray, np.ndarray] = ({}, np.zeros((0, 0)), np.zeros(0))
+        self.training_size = 0
+        self.train([])
+
+    def train(self, examples: Iterable[Tuple[str, str]]) -> int:
+        """
+        Fit the model on the seed examples plus logged examples.
+
+        Args:
+            examples: (question text, category) pairs, e.g. from logged LLM classifications
+
+        Returns:
+            Number of logged examples used
+        """
+        category_index = {category: i for i, category in enumerate(CATEGORIES)}
+        counts: Dict[str, np.ndarray] = {}
+        documents = np.zeros(len(CATEGORIES))
+
+        def add(text: str, column: int, weight: float) -> None:
+            documents[column] += weight
+            for feature, count in Counter(tokenize(text)).items():
+                if feature not in counts:
+                    counts[feature] = np.zeros(len(CATEGORIES))
+                counts[feature][column] += count * weight
+
+        for category, texts in SEED_EXAMPLES.items():
+            for text in texts:
+                add(text, category_index[category], 1.0)
+
+        used = 0
+        for text, category in examples:
+            if text and category in category_index:
+                add(text, category_index[category], LOGGED_EXAMPLE_WEIGHT)
+                used += 1
+
+        vocabulary = {feature: row for row, feature in enumerate(counts)}
+        matrix = np.array(list(counts.values())) + SMOOTHING
+        log_likelihood = np.log(matrix / matrix.sum(axis=0))
+        log_prior = np.log(documents / documents.sum())
+
+        # Swap the fitted model in with one assignment so concurrent predictions stay consistent
+        self._model = (vocabulary, log_likelihood, log_prior)
+        self.training_size = used
+
+        logger.info(f"Trained intent classifier on {used} logged questions, {len(vocabulary)} features")
+        return used
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """
+        Classify a question.
+
+        Args:
+            text: Question text
+
+        Returns:
+            Tuple of (category, posterior probability)
+        """
+        vocabulary, log_likelihood, log_prior = self._model
+        rows = [vocabulary[feature] for feature in tokenize(text) if feature in vocabulary]
+        if not rows:
+            return "general", 0.0
+
+        scores = log_prior + log_likelihood[rows].sum(axis=0)
+        probabilities = np.exp(scores - scores.max())
+        probabilities /= probabilities.sum()
+        best = int(probabilities.argmax())
+        return CATEGORIES[best], float(probabilities[best])
+
+    def classify(self, text: str, threshold: float = CONFIDENCE_THRESHOLD) -> Optional[str]:
+        """
+        Classify a question if the model is confident enough.
+
+        Args:
+            text: Question text
+            threshold: Minimum posterior probability
+
+        Returns:
+            Category, or None if the caller should fall back to the LLM
+        """
+        category, confidence = self.predict(text)
+        return category if confidence >= threshold else None
+
+
+def labeled_questions_from_logs(limit: int = MAX_TRAINING_ROWS) -> List[Tuple[str, str]]:
+    """
+    Build training pairs from logged questions and their LLM classifications.
+
+    Each "ai_response" activity classified by the LLM is matched with the
+    same user's latest free-text UserQuery logged before it. Must be called
+    inside a Flask app context.
+
+    Args:
+        limit: Maximum number of classifications to read
+
+    Returns:
+        List of (question text, category) pairs
+    """
+    # Import at function level to avoid circular imports
+    from models import UserQuery, UserActivityLog
+
+    activities = (
+        UserActivityLog.query
+        .filter(UserActivityLog.activity_type == "ai_response")
+        .order_by(UserActivityLog.timestamp.desc())
+        .limit(limit)
+        .all()
+    )
+    if not activities:
+        return []
+
+    oldest = min(activity.timestamp for activity in activities)
+    queries = (
+        UserQuery.query
+        .filter(UserQuery.command == "message", UserQuery.timestamp >= oldest - CLASSIFICATION_LOOKBACK)
+        .order_by(UserQuery.timestamp)
+        .all()
+    )
+    queries_by_user: Dict[int, List[Any]] = {}
+    for query in queries:
+        queries_by_user.setdefault(query.user_id, []).append(query)
+
+    examples = []
+    for activity in activities:
+        match = CLASSIFICATION_DETAILS_PATTERN.match(activity.details or "")
+        # Only learn from LLM labels (older rows have no source and came from the LLM)
+        if not match or match.group(2) not in (None, "llm"):
+            continue
+
+        question = None
+        for query in queries_by_user.get(activity.user_id, []):
+            if query.timestamp > activity.timestamp:
+                break
+            question = query
+        if question and question.query_text and \
+                activity.timestamp - question.timestamp <= CLASSIFICATION_LOOKBACK:
+            examples.append((question.query_text, match.group(1)))
+
+    return examples
+
+
+def retrain_from_logs() -> int:
+    """
+    Retrain the shared classifier from logged questions.
+
+    Must be called inside a Flask app context.
+
+    Returns:
+        Number of logged examples used
+    """
+    try:
+        return get_classifier().train(labeled_questions_from_logs())
+    except Exception as e:
+        logger.error(f"Error retraining intent classifier: {e}")
+        return 0
+
+
+def retrain_in_background() -> threading.Thread:
+    """
+    Retrain the shared classifier from logged questions without blocking startup.
+
+    Returns:
+        The daemon thread doing the training
+    """
+    def _train():
+        # Import at function level to avoid circular imports
+        from app import app
+        with app.app_context():
+            retrain_from_logs()
+
+    thread = threading.Thread(target=_train, name="intent-classifier-training", daemon=True)
+    thread.start()
+    return thread
+
+
+# Singleton classifier
+_classifier: Optional[IntentClassifier] = None
+
+
+def get_classifier() -> IntentClassifier:
+    """Get the singleton IntentClassifier instance."""
+    global _classifier
+    if _classifier is None:
+        _classifier = IntentClassifier()
+    return _classifier
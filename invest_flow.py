@@ -13,9 +13,9 @@ from typing import Dict, List, Any, Optional, Tuple, Union
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup
 from telegram.ext import ContextTypes
 
-import agentic_advisor
 from models import db, User, Pool
 from app import app
+from user_state import UserStateStore
 
 # Configure logging
 logging.basicConfig(
@@ -54,8 +54,11 @@ TOKEN_PREFERENCE_KEYBOARD = InlineKeyboardMarkup([
     [InlineKeyboardButton("No Preference", callback_data="token_none")]
 ])
 
+# Seconds of inactivity after which a user's investment context is forgotten
+INVESTMENT_CONTEXT_TTL = 24 * 3600
+
 # User context storage (in-memory for now, could be moved to database)
-user_investment_context = {}
+user_investment_context = UserStateStore("investment_context", INVESTMENT_CONTEXT_TTL)
 
 async def start_invest_flow(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
@@ -229,6 +232,9 @@ async def process_token_preference(update: Update, context: ContextTypes.DEFAULT
         update: Telegram update object
         context: Context object for the update
     """
+    # Import at function level so start-up does not load the advisors
+    import agentic_advisor
+    
     query = update.callback_query
     user_id = update.effective_user.id if update.effective_user else 0
     
@@ -709,6 +715,9 @@ async def check_active_investments(user_id: int) -> List[Dict[str, Any]]:
     Returns:
         List of active investments with exit recommendations
     """
+    # Import at function level so start-up does not load the advisors
+    import agentic_advisor
+    
     # In a real implementation, this would query the database
     # For now, we'll return a placeholder
     
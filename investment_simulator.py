@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Local investment simulator for FiLot Telegram bot
+Computes compounded liquidity pool returns for many pools, amounts and horizons
+at once with NumPy broadcasting instead of calling the remote /simulate API
+"""
+
+import math
+import logging
+from typing import Dict, List, Any, Optional, Sequence
+
+import numpy as np
+
+from market_snapshot import normalize_pool, get_current_snapshot
+from impermanent_loss import impermanent_loss
+from pool_statistics import estimate_daily_volatility
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Horizons shown by /simulate (days)
+DEFAULT_HORIZONS = (1, 7, 30, 365)
+
+# APR decay scenarios as APR half-life in days (None = APR stays constant)
+APR_DECAY_SCENARIOS = {
+    "steady": None,
+    "cooling": 180,
+    "collapse": 30,
+}
+
+# Impermanent loss bands in standard deviations of the price ratio move
+IL_BAND_SIGMAS = (1.0, 2.0)
+
+
+def _fee_share(records: List[Dict[str, Any]], apr: np.ndarray) -> np.ndarray:
+    """Fraction of each pool's APR that comes from trading fees."""
+    volume = np.array([r["volume"] for r in records], dtype=float)
+    fee = np.array([r["fee"] for r in records], dtype=float)
+    tvl = np.array([r["tvl"] for r in records], dtype=float)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fee_apr = volume * fee / tvl * 365 * 100
+        share = np.clip(fee_apr / apr, 0.0, 1.0)
+
+    # Without volume data, Raydium APR is reported as fee APR
+    return np.where(np.isfinite(share), share, 1.0)
+
+
+def simulate_returns(
+    pools: List[Dict[str, Any]],
+    amounts: Sequence[float],
+    horizons: Sequence[int] = DEFAULT_HORIZONS,
+    scenarios: Optional[Sequence[str]] = None
+) -> Dict[str, Any]:
+    """
+    Simulate compounded returns for every pool, amount, horizon and APR scenario.
+
+    Args:
+        pools: Pool dictionaries in any supported format
+        amounts: Investment amounts in USD
+        horizons: Holding periods in days
+        scenarios: APR decay scenario names (defaults to all APR_DECAY_SCENARIOS)
+
+    Returns:
+        Dictionary with the axes and result arrays:
+        - final_value, earnings, fee_income: shape (pools, amounts, horizons, scenarios)
+        - il_bands: shape (pools, horizons, bands), loss fractions at IL_BAND_SIGMAS
+        - net_value: shape (pools, amounts, horizons, scenarios, bands), value after IL
+
+    Raises:
+        ValueError: If a horizon is shorter than one day
+    """
+    records = [r for r in (normalize_pool(pool) for pool in pools) if r]
+    scenarios = list(scenarios or APR_DECAY_SCENARIOS.keys())
+    amounts = np.asarray(amounts, dtype=float)
+    horizons = np.asarray(horizons, dtype=int)
+    if horizons.size and horizons.min() < 1:
+        raise ValueError(f"Horizons must be at least 1 day, got {horizons.min()}")
+
+    apr = np.array([r["apr"] for r in records], dtype=float)
+    max_days = int(horizons.max()) if horizons.size else 0
+
+    # Per-scenario APR decay factor for each simulated day: (scenarios, days)
+    days = np.arange(max_days)
+    decay = np.ones((len(scenarios), max_days))
+    for i, name in enumerate(scenarios):
+        half_life = APR_DECAY_SCENARIOS[name]
+        if half_life:
+            decay[i] = np.exp(-math.log(2) * days / half_life)
+
+    # Daily compounding: growth = prod(1 + r_t) = exp(cumsum(log1p(r_t)))
+    daily_rate = apr[None, :, None] / 100 / 365 * decay[:, None, :]  # (S, P, D)
+    log_growth = np.cumsum(np.log1p(daily_rate), axis=2)
+    growth = np.exp(log_growth[:, :, horizons - 1])  # (S, P, H)
+    growth = growth.transpose(1, 2, 0)  # (P, H, S)
+
+    final_value = amounts[None, :, None, None] * growth[:, None, :, :]  # (P, A, H, S)
+    earnings = final_value - amounts[None, :, None, None]
+    fee_income = earnings * _fee_share(records, apr)[:, None, None, None]
+
+    # Impermanent loss bands from the price ratio volatility over each horizon
+    volatility = estimate_daily_volatility(records)
+    sigmas = np.asarray(IL_BAND_SIGMAS, dtype=float)
+    move = volatility[:, None, None] * np.sqrt(horizons)[None, :, None] * sigmas[None, None, :]
+    il_bands = impermanent_loss(np.exp(move))  # (P, H, B)
+    net_value = final_value[..., None] * (1 + il_bands[:, None, :, None, :])
+
+    return {
+        "pool_ids": [r["id"] for r in records],
+        "pairs": [r["pair"] for r in records],
+        "records": records,
+        "amounts": amounts,
+        "horizons": horizons,
+        "scenarios": scenarios,
+        "il_sigmas": sigmas,
+        "daily_volatility": volatility,
+        "final_value": final_value,
+        "earnings": earnings,
+        "fee_income": fee_income,
+        "il_bands": il_bands,
+        "net_value": net_value,
+    }
+
+
+def simulate_pool(pool: Dict[str, Any], amount: float, days: int = 30) -> Dict[str, Any]:
+    """
+    Simulate a single investment, returning the same fields as the remote /simulate API.
+
+    Args:
+        pool: Pool dictionary in any supported format
+        amount: Amount to invest (in USD)
+        days: Number of days to simulate
+
+    Returns:
+        Dictionary with simulation results
+    """
+    if days < 1:
+        return {"success": False, "error": "Invalid duration", "message": "Days must be at least 1"}
+
+    result = simulate_returns([pool], [amount], [days], scenarios=["steady", "cooling"])
+    if not result["records"]:
+        return {"success": False, "error": "Invalid pool", "message": "Pool data is missing an ID"}
+
+    record = result["records"][0]
+    final_amount = float(result["final_value"][0, 0, 0, 0])
+    profit = final_amount - amount
+
+    # 50/50 split of the deposit into the two tokens at current prices
+    price_a = record["price_a"] if record["price_a"] > 0 else float("nan")
+    price_b = record["price_b"] if record["price_b"] > 0 else float("nan")
+    token_a_amount = amount / 2 / price_a
+    token_b_amount = amount / 2 / price_b
+
+    return {
+        "success": True,
+        "pool_id": record["id"],
+        "initial_amount": amount,
+        "final_amount": final_amount,
+        "profit": profit,
+        "roi_percent": (profit / amount) * 100 if amount > 0 else 0,
+        "fee_income": float(result["fee_income"][0, 0, 0, 0]),
+        "final_amount_apr_cooling": float(result["final_value"][0, 0, 0, 1]),
+        "impermanent_loss_1sigma": float(result["il_bands"][0, 0, 0]),
+        "impermanent_loss_2sigma": float(result["il_bands"][0, 0, 1]),
+        "apr_used": record["apr"],
+        "expected_apr": record["apr"],
+        "token_a_amount": 0.0 if math.isnan(token_a_amount) else token_a_amount,
+        "token_b_amount": 0.0 if math.isnan(token_b_amount) else token_b_amount,
+        "days": days,
+        "note": "Local simulation based on current APR"
+    }
+
+
+def simulate_snapshot_pool(pool_id: str, amount: float, days: int = 30) -> Optional[Dict[str, Any]]:
+    """
+    Simulate an investment in a pool from the current market snapshot.
+
+    Args:
+        pool_id: Pool ID to simulate
+        amount: Amount to invest (in USD)
+        days: Number of days to simulate
+
+    Returns:
+        Simulation results, or None if the pool is not in the snapshot
+    """
+    snapshot = get_current_snapshot()
+    if not snapshot:
+        return None
+
+    record = snapshot.get_pool(pool_id)
+    if not record:
+        return None
+
+    return simulate_pool(record, amount, days)
@@ -6,7 +6,7 @@ Keyboard utilities for FiLot Telegram bot
 Handles the creation and management of keyboard buttons
 """
 
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Any, Optional, Tuple
 import logging
 
 from telegram import ReplyKeyboardMarkup, KeyboardButton, ReplyKeyboardRemove, Update
@@ -15,12 +15,16 @@ from telegram.ext import ContextTypes
 
 from menus import MenuType, get_menu_config
 import db_fallback  # Import our fallback mechanism
+from user_state import UserStateStore
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Cache of user's current menu state
-user_menu_state: Dict[int, MenuType] = {}
+# Seconds of inactivity after which a user's cached menu state is dropped
+MENU_STATE_TTL = 24 * 3600
+
+# Cache of user's current menu state (user_id -> MenuType)
+user_menu_state = UserStateStore("menu_state", MENU_STATE_TTL)
 
 # Determine which menus should use one-time keyboard
 ONE_TIME_KEYBOARD_MENUS = {
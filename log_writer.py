@@ -0,0 +1,399 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Write-behind database logging for FiLot Telegram bot
+Queues user queries, activity logs and error logs and writes them in batched
+multi-row inserts from a background thread, so logging never waits on a
+database commit in a message handler
+"""
+
+import os
+import time
+import queue
+import atexit
+import asyncio
+import logging
+import datetime
+import threading
+from collections import defaultdict, deque
+from typing import Dict, List, Any, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Maximum number of records waiting to be written
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+
+# Maximum number of error logs kept beyond a full queue
+LOG_OVERFLOW_SIZE = int(os.environ.get("LOG_OVERFLOW_SIZE", "1000"))
+
+# Seconds enqueue_async waits for room in a full queue before dropping a record
+LOG_ENQUEUE_TIMEOUT = float(os.environ.get("LOG_ENQUEUE_TIMEOUT", "2.0"))
+
+# Seconds between checks for room while enqueue_async waits
+ENQUEUE_POLL_INTERVAL = 0.01
+
+# Write a batch when this many records are queued...
+LOG_BATCH_SIZE = 500
+
+# ...or when the oldest queued record is this many seconds old
+LOG_FLUSH_INTERVAL = 1.0
+
+# Log a warning for the first dropped record and then every this many
+DROP_WARNING_INTERVAL = 1000
+
+# Tables written by the pipeline
+USER_QUERIES = "user_queries"
+USER_ACTIVITY_LOGS = "user_activity_logs"
+ERROR_LOGS = "error_logs"
+
+# Updates of users.spam_score; only the latest score per user in a batch is written
+USER_SPAM_SCORES = "user_spam_scores"
+
+
+class LogWriter:
+    """
+    Bounded queue of log records drained by a background writer thread.
+
+    Records are grouped by table and written with one executemany insert
+    per table per batch. Missing users are created, and user message
+    counters from logged queries are applied in the same transaction, one
+    update per user.
+
+    A full queue pushes back on coroutines (enqueue_async waits for room)
+    and makes other records wait up to their timeout before being dropped.
+    Error logs are not refused: when the queue is full they are kept in a
+    bounded overflow list the writer drains first, which drops its oldest
+    error log once it is full.
+    """
+
+    def __init__(self, max_queue: int = LOG_QUEUE_SIZE, batch_size: int = LOG_BATCH_SIZE,
+                 flush_interval: float = LOG_FLUSH_INTERVAL, max_overflow: int = LOG_OVERFLOW_SIZE):
+        """
+        Initialize the writer. The background thread starts on the first record.
+
+        Args:
+            max_queue: Maximum number of queued records
+            batch_size: Number of records that triggers a write
+            flush_interval: Maximum seconds a record waits before being written
+            max_overflow: Maximum number of error logs kept beyond a full queue
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # Items are (table, row) records, a threading.Event set once everything
+        # before it is written (flush), or None to stop the thread (close)
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._overflow: "deque[Tuple[str, Dict[str, Any]]]" = deque(maxlen=max_overflow)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._atexit_registered = False
+        self.metrics = {
+            "enqueued": 0,
+            "written": 0,
+            "dropped": 0,
+            "overflowed": 0,
+            "batches": 0,
+            "failed_batches": 0,
+        }
+
+    def enqueue(self, table: str, row: Dict[str, Any], timeout: float = 0.0) -> bool:
+        """
+        Queue a record for writing.
+
+        When the queue is full the caller waits up to timeout seconds for room
+        (not at all by default, so a handler is never stalled), then the
+        record is dropped and counted. Error logs are kept in the overflow list.
+
+        Args:
+            table: Target table (USER_QUERIES, USER_ACTIVITY_LOGS or ERROR_LOGS) or USER_SPAM_SCORES
+            row: Column values
+            timeout: Maximum seconds to wait for room in a full queue
+
+        Returns:
+            True if the record was queued
+        """
+        self._ensure_started()
+        try:
+            if timeout > 0 and table != ERROR_LOGS:
+                self._queue.put((table, row), timeout=timeout)
+            else:
+                self._queue.put_nowait((table, row))
+        except queue.Full:
+            return self._queue_full(table, row)
+        self.metrics["enqueued"] += 1
+        return True
+
+    async def enqueue_async(self, table: str, row: Dict[str, Any], timeout: float = LOG_ENQUEUE_TIMEOUT) -> bool:
+        """
+        Queue a record from a coroutine, waiting for room without blocking the event loop.
+
+        Args:
+            table: Target table (USER_QUERIES, USER_ACTIVITY_LOGS or ERROR_LOGS) or USER_SPAM_SCORES
+            row: Column values
+            timeout: Maximum seconds to wait for room in a full queue
+
+        Returns:
+            True if the record was queued
+        """
+        self._ensure_started()
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                self._queue.put_nowait((table, row))
+                break
+            except queue.Full:
+                if table == ERROR_LOGS or time.monotonic() >= deadline:
+                    return self._queue_full(table, row)
+            await asyncio.sleep(ENQUEUE_POLL_INTERVAL)
+        self.metrics["enqueued"] += 1
+        return True
+
+    def _queue_full(self, table: str, row: Dict[str, Any]) -> bool:
+        """Keep an error log that found the queue full in the overflow list, or drop another record."""
+        if table == ERROR_LOGS:
+            # A full overflow list evicts its oldest error log to make room
+            if len(self._overflow) == self._overflow.maxlen:
+                self._count_dropped(table)
+            self._overflow.append((table, row))
+            self.metrics["enqueued"] += 1
+            self.metrics["overflowed"] += 1
+            return True
+        self._count_dropped(table)
+        return False
+
+    def _count_dropped(self, table: str) -> None:
+        """Count a dropped record, warning for the first and then every DROP_WARNING_INTERVAL."""
+        self.metrics["dropped"] += 1
+        if self.metrics["dropped"] % DROP_WARNING_INTERVAL == 1:
+            logger.warning(f"Log queue full, dropped {table} record ({self.metrics['dropped']} dropped so far)")
+
+    def _next_item(self, timeout: Optional[float] = None) -> Any:
+        """
+        Take the next record, overflowed error logs first.
+
+        Args:
+            timeout: Maximum seconds to wait (None to wait until there is one)
+
+        Raises:
+            queue.Empty: If nothing arrived in time
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self._overflow:
+                return self._overflow.popleft()
+            # Wake up periodically to see error logs added to the overflow list
+            wait = self.flush_interval if deadline is None else min(self.flush_interval, deadline - time.monotonic())
+            try:
+                return self._queue.get(timeout=max(wait, 0))
+            except queue.Empty:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise
+
+    def _ensure_started(self) -> None:
+        """Start the writer thread on first use, or again after close()."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.close)
+                self._atexit_registered = True
+
+    def _run(self) -> None:
+        """Collect records into batches and write them until closed."""
+        while True:
+            batch: List[Tuple[str, Dict[str, Any]]] = []
+            closing = False
+            drained: Optional[threading.Event] = None
+
+            # Wait for the first record, then collect until the batch is full or the interval passes
+            item = self._next_item()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is None:
+                    closing = True
+                    # Error logs that overflowed the queue are written before stopping
+                    while self._overflow:
+                        batch.append(self._overflow.popleft())
+                    break
+                if isinstance(item, threading.Event):
+                    drained = item
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._next_item(timeout)
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._write(batch)
+            if drained is not None:
+                drained.set()
+            if closing:
+                return
+
+    def _write(self, batch: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """Write one batch in a single transaction, falling back to row by row on failure."""
+        # Import at function level to avoid circular imports
+        from app import app
+
+        rows_by_table: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for table, row in batch:
+            rows_by_table[table].append(row)
+
+        try:
+            with app.app_context():
+                self._insert(rows_by_table)
+            self.metrics["batches"] += 1
+            self.metrics["written"] += len(batch)
+            return
+        except Exception as e:
+            self.metrics["failed_batches"] += 1
+            logger.error(f"Error writing log batch of {len(batch)} records, retrying one by one: {e}")
+
+        # One bad row (e.g. an unknown user) should not lose the rest of the batch
+        with app.app_context():
+            for table, row in batch:
+                try:
+                    self._insert({table: [row]})
+                    self.metrics["written"] += 1
+                except Exception as e:
+                    self.metrics["dropped"] += 1
+                    logger.error(f"Error writing {table} record: {e}")
+
+    @staticmethod
+    def _insert(rows_by_table: Dict[str, List[Dict[str, Any]]]) -> None:
+        """Insert rows and apply user counters and scores in one transaction. Needs an app context."""
+        # Import at function level to avoid circular imports
+        from sqlalchemy import insert, select, update, bindparam, func
+        from models import db, User, UserQuery, UserActivityLog, ErrorLog
+
+        models = {USER_QUERIES: UserQuery, USER_ACTIVITY_LOGS: UserActivityLog, ERROR_LOGS: ErrorLog}
+
+        # Count messages per user so each user is updated once per batch
+        message_counts: Dict[int, List[Any]] = {}
+        for row in rows_by_table.get(USER_QUERIES, []):
+            count = message_counts.setdefault(row["user_id"], [0, row["timestamp"]])
+            count[0] += 1
+            count[1] = max(count[1], row["timestamp"])
+
+        # Later scores for the same user replace earlier ones
+        spam_scores = {row["user_id"]: row["spam_score"] for row in rows_by_table.get(USER_SPAM_SCORES, [])}
+
+        # Users whose records are written before any handler created them, e.g. a first
+        # message scored as spam, are created as db_utils.get_or_create_user would
+        user_ids = {
+            row["user_id"]
+            for table in (USER_QUERIES, USER_ACTIVITY_LOGS, USER_SPAM_SCORES)
+            for row in rows_by_table.get(table, [])
+        }
+
+        users = User.__table__
+        with db.engine.begin() as connection:
+            if user_ids:
+                existing = set(connection.execute(select(users.c.id).where(users.c.id.in_(user_ids))).scalars())
+                now = datetime.datetime.utcnow()
+                missing = [
+                    {"id": user_id, "created_at": now, "last_active": now}
+                    for user_id in sorted(user_ids - existing)
+                ]
+                if missing:
+                    connection.execute(insert(users), missing)
+            for table, rows in rows_by_table.items():
+                if rows and table in models:
+                    connection.execute(insert(models[table].__table__), rows)
+            if message_counts:
+                connection.execute(
+                    update(users)
+                    .where(users.c.id == bindparam("user_id"))
+                    .values(
+                        message_count=func.coalesce(users.c.message_count, 0) + bindparam("messages"),
+                        last_active=bindparam("active")
+                    ),
+                    [
+                        {"user_id": user_id, "messages": count, "active": active}
+                        for user_id, (count, active) in message_counts.items()
+                    ]
+                )
+            if spam_scores:
+                connection.execute(
+                    update(users)
+                    .where(users.c.id == bindparam("user_id"))
+                    .values(spam_score=bindparam("score")),
+                    [{"user_id": user_id, "score": score} for user_id, score in spam_scores.items()]
+                )
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """
+        Wait until everything queued so far is written. The writer keeps running.
+
+        Args:
+            timeout: Maximum seconds to wait for the queue to drain
+
+        Returns:
+            True if the queue drained in time
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return self._queue.empty() and not self._overflow
+        drained = threading.Event()
+        try:
+            self._queue.put(drained, timeout=timeout)
+        except queue.Full:
+            drained = None
+        if drained is None or not drained.wait(timeout):
+            logger.warning(f"Log writer did not drain within {timeout}s, {self._queue.qsize()} records left")
+            return False
+        return True
+
+    def close(self, timeout: float = 10.0) -> None:
+        """
+        Write everything queued and stop the writer thread (on shutdown).
+
+        A record queued after close() starts the thread again.
+
+        Args:
+            timeout: Maximum seconds to wait for the queue to drain
+        """
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+            thread.join(timeout)
+        except queue.Full:
+            pass
+        if thread.is_alive():
+            logger.warning(f"Log writer did not drain within {timeout}s, {self._queue.qsize()} records left")
+        logger.info(f"Log writer closed: {self.metrics['written']} written, {self.metrics['dropped']} dropped")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get pipeline metrics.
+
+        Returns:
+            Dictionary with record and batch counters and the current queue depth
+        """
+        metrics = dict(self.metrics)
+        metrics["queued"] = self._queue.qsize() + len(self._overflow)
+        return metrics
+
+
+# Singleton log writer
+_log_writer: Optional[LogWriter] = None
+
+
+def get_log_writer() -> LogWriter:
+    """Get the singleton LogWriter instance."""
+    global _log_writer
+    if _log_writer is None:
+        _log_writer = LogWriter()
+    return _log_writer
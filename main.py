@@ -12,7 +12,6 @@ import time
 import threading
 import traceback
 import asyncio
-import requests
 from datetime import datetime
 from typing import Dict, List, Any, Optional, Union
 
@@ -35,7 +34,7 @@ RETRY_DELAY = 2  # Delay between retries in seconds
 from telegram import Bot, Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     Application, CommandHandler, MessageHandler, 
-    CallbackQueryHandler, ContextTypes, filters
+    ContextTypes, filters
 )
 
 # Import handlers
@@ -64,14 +63,15 @@ from button_responses import (
 # Import token search conversation flow
 from token_search import get_token_search_conversation_handler
 
-# Import wallet and investment execution
-from wallet_actions import (
-    get_wallet_status, connect_wallet, disconnect_wallet,
-    initiate_wallet_connection, check_connection_status,
-    execute_investment, check_transaction_status
-)
+# Import investment execution
 from smart_invest_execution import get_investment_conversation_handler
 
+# Import callback query router
+from callback_router import get_callback_router
+
+# Import local question classifier
+from intent_classifier import retrain_in_background
+
 # Import command handlers
 from bot import (
     start_command, help_command, info_command, simulate_command,
@@ -93,8 +93,23 @@ def run_telegram_bot():
             logger.error("TELEGRAM_BOT_TOKEN not set in environment variables")
             raise ValueError("TELEGRAM_BOT_TOKEN environment variable not set")
             
-        # Initialize the Bot and dispatcher
-        application = Application.builder().token(telegram_token).build()
+        # Import at function level to avoid circular imports
+        from app import init_app
+        from notification_matcher import start_notifications
+        from update_scheduler import create_update_scheduler
+        
+        # Create database tables and start the keep-alive before handling updates
+        init_app()
+        
+        # Initialize the Bot and dispatcher; market alerts start once the bot's loop is running,
+        # and updates of different users are processed concurrently but in order per user
+        application = (
+            Application.builder()
+            .token(telegram_token)
+            .concurrent_updates(create_update_scheduler())
+            .post_init(start_notifications)
+            .build()
+        )
         
         # Register command handlers
         application.add_handler(CommandHandler("start", start_command))
@@ -118,78 +133,88 @@ def run_telegram_bot():
         application.add_handler(get_token_search_conversation_handler())
         application.add_handler(get_investment_conversation_handler())
         
-        # Register callback query handlers with specific patterns
+        # Register button callbacks with a single router that looks up the callback data
+        router = get_callback_router()
         
         # Main navigation buttons
-        application.add_handler(CallbackQueryHandler(handle_account, pattern="^account$"))
-        application.add_handler(CallbackQueryHandler(handle_invest, pattern="^invest$"))
-        application.add_handler(CallbackQueryHandler(handle_explore_pools, pattern="^explore_pools$"))
-        application.add_handler(CallbackQueryHandler(handle_help, pattern="^help$"))
-        application.add_handler(CallbackQueryHandler(handle_back_to_main, pattern="^back_to_main$"))
+        router.add_route("account", handle_account)
+        router.add_route("invest", handle_invest)
+        router.add_route("explore_pools", handle_explore_pools)
+        router.add_route("help", handle_help)
+        router.add_route("back_to_main", handle_back_to_main)
         
         # Account/profile options
-        application.add_handler(CallbackQueryHandler(handle_wallet_settings, pattern="^wallet_settings$"))
-        application.add_handler(CallbackQueryHandler(handle_update_profile, pattern="^update_profile$"))
-        application.add_handler(CallbackQueryHandler(handle_subscription_settings, pattern="^subscription_settings$"))
+        router.add_route("wallet_settings", handle_wallet_settings)
+        router.add_route("update_profile", handle_update_profile)
+        router.add_route("subscription_settings", handle_subscription_settings)
         
         # Wallet connection handlers
-        application.add_handler(CallbackQueryHandler(handle_walletconnect, pattern="^walletconnect$"))
-        application.add_handler(CallbackQueryHandler(handle_check_wallet_status, pattern="^check_wallet_status$"))
-        application.add_handler(CallbackQueryHandler(handle_cancel_wallet_connection, pattern="^cancel_wallet_connection$"))
-        application.add_handler(CallbackQueryHandler(handle_disconnect_wallet, pattern="^disconnect_wallet$"))
+        router.add_route("walletconnect", handle_walletconnect)
+        router.add_route("check_wallet_status", handle_check_wallet_status)
+        router.add_route("cancel_wallet_connection", handle_cancel_wallet_connection)
+        router.add_route("disconnect_wallet", handle_disconnect_wallet)
         
         # Investment options
-        application.add_handler(CallbackQueryHandler(handle_smart_invest, pattern="^smart_invest$"))
-        application.add_handler(CallbackQueryHandler(handle_high_apr_pools, pattern="^high_apr$"))
-        application.add_handler(CallbackQueryHandler(handle_pool_info, pattern="^top_pools$"))
-        application.add_handler(CallbackQueryHandler(handle_my_investments, pattern="^my_investments$"))
+        router.add_route("smart_invest", handle_smart_invest)
+        router.add_route("high_apr", handle_high_apr_pools)
+        router.add_route("top_pools", handle_pool_info)
+        router.add_route("my_investments", handle_my_investments)
         
         # Pool exploration
-        application.add_handler(CallbackQueryHandler(handle_pool_info, pattern="^pools$"))
-        application.add_handler(CallbackQueryHandler(handle_token_search, pattern="^token_search$"))
-        application.add_handler(CallbackQueryHandler(handle_predictions, pattern="^predictions$"))
+        router.add_route("pools", handle_pool_info)
+        router.add_route("token_search", handle_token_search)
+        router.add_route("predictions", handle_predictions)
         
-        # Dynamic pattern handlers with regex
-        application.add_handler(CallbackQueryHandler(handle_pool_detail, pattern="^pool:"))
-        application.add_handler(CallbackQueryHandler(handle_token_search_result, pattern="^search_token_"))
-        application.add_handler(CallbackQueryHandler(handle_stable_pools, pattern="^stable_pools:"))
-        application.add_handler(CallbackQueryHandler(handle_high_apr_pools, pattern="^high_apr:"))
+        # Dynamic handlers matched by callback data prefix
+        router.add_prefix_route("pool:", handle_pool_detail)
+        router.add_prefix_route("search_token_", handle_token_search_result)
+        router.add_prefix_route("stable_pools:", handle_stable_pools)
+        router.add_prefix_route("high_apr:", handle_high_apr_pools)
         
         # Pool predictions
-        application.add_handler(CallbackQueryHandler(handle_rising_pools, pattern="^rising_pools$"))
-        application.add_handler(CallbackQueryHandler(handle_declining_pools, pattern="^declining_pools$"))
-        application.add_handler(CallbackQueryHandler(handle_stable_pools, pattern="^stable_pools$"))
+        router.add_route("rising_pools", handle_rising_pools)
+        router.add_route("declining_pools", handle_declining_pools)
+        router.add_route("stable_pools", handle_stable_pools)
         
         # Notifications & subscriptions
-        application.add_handler(CallbackQueryHandler(handle_enable_notifications, pattern="^enable_notifications$"))
-        application.add_handler(CallbackQueryHandler(handle_disable_notifications, pattern="^disable_notifications$"))
-        application.add_handler(CallbackQueryHandler(handle_notification_preferences, pattern="^notification_preferences$"))
+        router.add_route("enable_notifications", handle_enable_notifications)
+        router.add_route("disable_notifications", handle_disable_notifications)
+        router.add_route("notification_preferences", handle_notification_preferences)
         
         # Help & FAQ
-        application.add_handler(CallbackQueryHandler(handle_help_getting_started, pattern="^help_getting_started$"))
-        application.add_handler(CallbackQueryHandler(handle_help_commands, pattern="^help_commands$"))
-        application.add_handler(CallbackQueryHandler(handle_faq, pattern="^faq$"))
-        application.add_handler(CallbackQueryHandler(handle_faq_filot, pattern="^faq_filot$"))
-        application.add_handler(CallbackQueryHandler(handle_faq_pools, pattern="^faq_pools$"))
-        application.add_handler(CallbackQueryHandler(handle_faq_apr, pattern="^faq_apr$"))
-        application.add_handler(CallbackQueryHandler(handle_faq_impermanent_loss, pattern="^faq_impermanent_loss$"))
-        application.add_handler(CallbackQueryHandler(handle_faq_wallet_security, pattern="^faq_wallet_security$"))
+        router.add_route("help_getting_started", handle_help_getting_started)
+        router.add_route("help_commands", handle_help_commands)
+        router.add_route("faq", handle_faq)
+        router.add_route("faq_filot", handle_faq_filot)
+        router.add_route("faq_pools", handle_faq_pools)
+        router.add_route("faq_apr", handle_faq_apr)
+        router.add_route("faq_impermanent_loss", handle_faq_impermanent_loss)
+        router.add_route("faq_wallet_security", handle_faq_wallet_security)
         
         # Notification toggles
-        application.add_handler(CallbackQueryHandler(handle_toggle_notif_market, pattern="^toggle_notif_market$"))
-        application.add_handler(CallbackQueryHandler(handle_toggle_notif_apr, pattern="^toggle_notif_apr$"))
-        application.add_handler(CallbackQueryHandler(handle_toggle_notif_price, pattern="^toggle_notif_price$"))
-        application.add_handler(CallbackQueryHandler(handle_toggle_notif_prediction, pattern="^toggle_notif_prediction$"))
+        router.add_route("toggle_notif_market", handle_toggle_notif_market)
+        router.add_route("toggle_notif_apr", handle_toggle_notif_apr)
+        router.add_route("toggle_notif_price", handle_toggle_notif_price)
+        router.add_route("toggle_notif_prediction", handle_toggle_notif_prediction)
         
         # Custom token search
-        application.add_handler(CallbackQueryHandler(handle_custom_token_search, pattern="^custom_token_search$"))
+        router.add_route("custom_token_search", handle_custom_token_search)
+        
+        application.add_handler(router.handler())
         
         # Register message handler as fallback for everything else
+        # Blocking, so the update scheduler keeps each user's messages in order; other users'
+        # updates still run concurrently while an AI answer is pending
         application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
         
+        # Learn from previously logged AI classifications
+        retrain_in_background()
+        
         # Start the Bot
         logger.info("Starting Telegram bot")
-        application.run_polling(poll_interval=1.0, timeout=30)
+        # Import at function level to avoid circular imports
+        from webhook_server import run_application
+        run_application(application, timeout=30)
         
     except Exception as e:
         logger.error(f"Error in telegram bot: {e}")
@@ -200,20 +225,6 @@ def main():
     Main function to start both the Flask app and Telegram bot
     """
     try:
-        # First, kill any existing bot process that might be running
-        try:
-            # Try to terminate any other instance gracefully
-            import requests
-            import os
-            bot_token = os.environ.get("TELEGRAM_TOKEN") or os.environ.get("TELEGRAM_BOT_TOKEN")
-            if bot_token:
-                base_url = f"https://api.telegram.org/bot{bot_token}"
-                requests.get(f"{base_url}/getUpdates", params={"offset": -1, "timeout": 0})
-                requests.get(f"{base_url}/deleteWebhook", params={"drop_pending_updates": "true"})
-                logger.info("Terminated any existing bot polling")
-        except Exception as e:
-            logger.warning(f"Failed to terminate existing bot: {e}")
-        
         # Start in the appropriate mode
         if os.environ.get('PRODUCTION') == 'true':
             # In production, run only the bot
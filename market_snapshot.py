@@ -0,0 +1,537 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Market snapshot and local pool history for FiLot Telegram bot
+Keeps the latest pool data under a version number and records a rolling
+per-pool time series so analytics can run locally without API calls
+"""
+
+import os
+import json
+import time
+import atexit
+import hashlib
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Snapshot configuration
+SNAPSHOT_MAX_AGE = 300  # 5 minutes, same as the API client caches
+
+# History configuration
+HISTORY_FILE = "pool_history.npz"
+HISTORY_SAMPLE_INTERVAL = 3600  # At most one observation per hour
+MAX_HISTORY_POINTS = 24 * 45  # 45 days of hourly observations
+HISTORY_FIELDS = ("apr", "tvl", "volume", "price_a", "price_b")
+HISTORY_SAVE_INTERVAL = 300  # Seconds between background saves of new observations
+
+# Tokens treated as USD stablecoins
+STABLE_TOKENS = {"USDC", "USDT", "DAI", "USDH", "UXD", "PYUSD"}
+
+
+def _first_float(pool: Dict[str, Any], keys: Tuple[str, ...], default: float = float("nan")) -> float:
+    """Return the first key in pool that holds a number, as a float."""
+    for key in keys:
+        value = pool.get(key)
+        if value is None or value == "":
+            continue
+        try:
+            return float(value)
+        except (ValueError, TypeError):
+            continue
+    return default
+
+
+def _token_symbols(pool: Dict[str, Any]) -> Tuple[str, str]:
+    """Extract the (token_a, token_b) symbols from any of the pool formats we receive."""
+    for key in ("pairName", "tokenPair", "pair"):
+        pair = pool.get(key) or ""
+        if "/" in pair:
+            token_a, token_b = pair.split("/", 1)
+            break
+    else:
+        token_a = pool.get("token1_symbol") or pool.get("token_a_symbol") or ""
+        token_b = pool.get("token2_symbol") or pool.get("token_b_symbol") or ""
+
+    # WSOL is displayed as SOL everywhere in the bot
+    token_a = "SOL" if token_a == "WSOL" else token_a
+    token_b = "SOL" if token_b == "WSOL" else token_b
+    return token_a, token_b
+
+
+def normalize_pool(pool: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Normalize a pool dictionary from the Raydium, SolPool or response_data format.
+
+    Args:
+        pool: Pool dictionary in any of the formats used by the bot
+
+    Returns:
+        Normalized pool record, or None if the pool has no ID
+    """
+    if not isinstance(pool, dict):
+        return None
+
+    pool_id = pool.get("id") or pool.get("pool_id") or pool.get("address")
+    if not pool_id:
+        return None
+
+    token_a, token_b = _token_symbols(pool)
+    token_prices = pool.get("tokenPrices") or {}
+
+    # Fee is a decimal rate in response_data (0.0025) but a percentage elsewhere
+    fee = _first_float(pool, ("fee", "feeRate", "fee_rate"))
+    if fee >= 0.05:
+        fee = fee / 100
+
+    price_a = _first_float(token_prices, (token_a,))
+    if np.isnan(price_a):
+        price_a = _first_float(pool, ("price_a", "token1_price", "token_a_price", "price"))
+    price_b = _first_float(token_prices, (token_b,))
+    if np.isnan(price_b):
+        price_b = _first_float(pool, ("price_b", "token2_price", "token_b_price"))
+
+    return {
+        "id": str(pool_id),
+        "pair": f"{token_a}/{token_b}",
+        "token_a": token_a,
+        "token_b": token_b,
+        "apr": _first_float(pool, ("apr", "apr24h", "apr_24h"), 0.0),
+        "apr_7d": _first_float(pool, ("aprWeekly", "apr7d", "apr_7d")),
+        "apr_30d": _first_float(pool, ("aprMonthly", "apr30d", "apr_30d")),
+        "tvl": _first_float(pool, ("liquidity", "liquidityUsd", "tvl"), 0.0),
+        "volume": _first_float(pool, ("volume24h", "volume_24h", "volume")),
+        "fee": fee,
+        "price_a": price_a,
+        "price_b": price_b,
+        "is_stable_pair": token_a in STABLE_TOKENS and token_b in STABLE_TOKENS,
+    }
+
+
+class MarketSnapshot:
+    """Immutable view of the pool data published at one point in time."""
+
+    def __init__(self, version: int, pool_data: Dict[str, List[Dict[str, Any]]],
+                 records: Dict[str, Dict[str, Any]], created_at: float,
+                 statistics: Optional[Dict[str, Dict[str, Any]]] = None,
+                 fingerprint: str = ""):
+        """
+        Initialize a market snapshot.
+
+        Args:
+            version: Monotonic snapshot version, bumped whenever the data changes
+            pool_data: Raw pool lists by category (bestPerformance, topStable, ...)
+            records: Normalized pool records by pool ID
+            created_at: Unix timestamp of publication
+            statistics: Volatility and APR trend statistics by pool ID
+            fingerprint: Hash of the pool data, stable across restarts unlike the version
+        """
+        self.version = version
+        self.pool_data = pool_data
+        self.records = records
+        self.created_at = created_at
+        self.statistics = statistics or {}
+        self.fingerprint = fingerprint
+
+    def age(self) -> float:
+        """Seconds since this snapshot was published."""
+        return time.time() - self.created_at
+
+    def is_fresh(self, max_age: float = SNAPSHOT_MAX_AGE) -> bool:
+        """Whether the snapshot is recent enough to answer requests from."""
+        return self.age() < max_age
+
+    def get_pool(self, pool_id: str) -> Optional[Dict[str, Any]]:
+        """Get the normalized record for a pool, if present."""
+        return self.records.get(str(pool_id))
+
+    def get_statistics(self, pool_id: str) -> Optional[Dict[str, Any]]:
+        """Get the locally estimated statistics for a pool, if present."""
+        return self.statistics.get(str(pool_id))
+
+    def __repr__(self):
+        return f"<MarketSnapshot version={self.version}, pools={len(self.records)}>"
+
+
+class PoolHistoryStore:
+    """
+    Rolling per-pool time series stored as one (pools, points, fields) array.
+
+    Every observation shifts the whole window left by one column, so column j
+    holds the same sample time for every pool and series can be sliced for all
+    pools at once. Observations are recorded in memory; a background thread
+    saves new ones every HISTORY_SAVE_INTERVAL seconds and once at exit.
+    """
+
+    def __init__(self, path: str = HISTORY_FILE, max_points: int = MAX_HISTORY_POINTS):
+        """
+        Initialize the history store and load any persisted history.
+
+        Args:
+            path: File used to persist the history between restarts
+            max_points: Number of observations kept per pool
+        """
+        self.path = path
+        self.max_points = max_points
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._unsaved = 0
+        self._writer: Optional[threading.Thread] = None
+        self._index: Dict[str, int] = {}
+        self._values = np.full((0, max_points, len(HISTORY_FIELDS)), np.nan)
+        self._timestamps = np.full(max_points, np.nan)
+        self._load()
+
+    def _load(self) -> None:
+        """Load the history from disk if it exists."""
+        try:
+            if not os.path.exists(self.path):
+                return
+            with np.load(self.path, allow_pickle=False) as data:
+                ids = [str(pool_id) for pool_id in data["ids"]]
+                values = data["values"]
+                timestamps = data["timestamps"]
+
+            # Keep the most recent observations if the window size changed
+            points = min(values.shape[1], self.max_points)
+            self._values = np.full((len(ids), self.max_points, len(HISTORY_FIELDS)), np.nan)
+            self._values[:, -points:] = values[:, -points:]
+            self._timestamps[-points:] = timestamps[-points:]
+            self._index = {pool_id: row for row, pool_id in enumerate(ids)}
+            logger.info(f"Loaded pool history for {len(ids)} pools")
+        except Exception as e:
+            logger.error(f"Error loading pool history: {e}")
+
+    def flush(self) -> bool:
+        """
+        Persist the observations recorded since the last save, if any.
+
+        Returns:
+            True if the history on disk is up to date
+        """
+        with self._save_lock:
+            with self._lock:
+                unsaved = self._unsaved
+                if not unsaved:
+                    return True
+                ids = sorted(self._index, key=self._index.get)
+                values = self._values.copy()
+                timestamps = self._timestamps.copy()
+                self._unsaved = 0
+
+            if self._save(ids, values, timestamps):
+                return True
+            with self._lock:
+                self._unsaved += unsaved
+            return False
+
+    def _save(self, ids: List[str], values: np.ndarray, timestamps: np.ndarray) -> bool:
+        """Persist a copy of the history atomically."""
+        tmp_path = None
+        try:
+            # A unique file per write, so processes saving at the same time do not share one
+            with tempfile.NamedTemporaryFile(dir=os.path.dirname(os.path.abspath(self.path)),
+                                             prefix=f"{os.path.basename(self.path)}.",
+                                             suffix=".tmp", delete=False) as tmp_file:
+                tmp_path = tmp_file.name
+                np.savez_compressed(
+                    tmp_file,
+                    ids=np.array(ids, dtype=str),
+                    values=values,
+                    timestamps=timestamps
+                )
+            os.replace(tmp_path, self.path)
+            return True
+        except Exception as e:
+            logger.error(f"Error saving pool history: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+    def _ensure_writer(self) -> None:
+        """Start the background save thread on first use."""
+        if self._writer is not None:
+            return
+        with self._lock:
+            if self._writer is not None:
+                return
+            self._writer = threading.Thread(target=self._save_loop, name="pool-history-writer", daemon=True)
+            self._writer.start()
+        atexit.register(self.flush)
+
+    def _save_loop(self) -> None:
+        """Save new observations every HISTORY_SAVE_INTERVAL seconds."""
+        while True:
+            time.sleep(HISTORY_SAVE_INTERVAL)
+            self.flush()
+
+    def last_timestamp(self) -> float:
+        """Timestamp of the most recent observation, or 0 if empty."""
+        last = self._timestamps[-1]
+        return 0.0 if np.isnan(last) else float(last)
+
+    def record(self, records: List[Dict[str, Any]], timestamp: Optional[float] = None,
+               force: bool = False) -> bool:
+        """
+        Record one observation for each pool.
+
+        Args:
+            records: Normalized pool records
+            timestamp: Observation time (defaults to now)
+            force: Record even if the sample interval has not elapsed
+
+        Returns:
+            True if an observation was recorded
+        """
+        if not records:
+            return False
+
+        timestamp = time.time() if timestamp is None else timestamp
+
+        with self._lock:
+            if not force and timestamp - self.last_timestamp() < HISTORY_SAMPLE_INTERVAL:
+                return False
+
+            # Add rows for pools we have not seen before
+            new_ids = [r["id"] for r in records if r["id"] not in self._index]
+            if new_ids:
+                for pool_id in new_ids:
+                    self._index[pool_id] = len(self._index)
+                padding = np.full((len(new_ids), self.max_points, len(HISTORY_FIELDS)), np.nan)
+                self._values = np.concatenate([self._values, padding])
+
+            # Shift the window for all pools so columns stay time-aligned
+            self._values[:, :-1] = self._values[:, 1:]
+            self._values[:, -1] = np.nan
+            self._timestamps[:-1] = self._timestamps[1:]
+            self._timestamps[-1] = timestamp
+
+            for record in records:
+                row = self._index[record["id"]]
+                self._values[row, -1] = [record.get(field, np.nan) for field in HISTORY_FIELDS]
+            self._unsaved += 1
+
+        self._ensure_writer()
+
+        logger.debug(f"Recorded pool history observation for {len(records)} pools")
+        return True
+
+    def series(self, field: str, pool_ids: List[str], points: Optional[int] = None) -> np.ndarray:
+        """
+        Get a time series for several pools.
+
+        Args:
+            field: One of HISTORY_FIELDS
+            pool_ids: Pools to return, one row each
+            points: Number of most recent observations (defaults to all)
+
+        Returns:
+            Array of shape (len(pool_ids), points), oldest first, NaN where missing
+        """
+        points = self.max_points if points is None else min(points, self.max_points)
+        column = HISTORY_FIELDS.index(field)
+        result = np.full((len(pool_ids), points), np.nan)
+
+        with self._lock:
+            rows = [self._index.get(str(pool_id), -1) for pool_id in pool_ids]
+            known = np.array([row >= 0 for row in rows], dtype=bool)
+            if known.any():
+                known_rows = np.array([row for row in rows if row >= 0])
+                result[known] = self._values[known_rows, -points:, column]
+
+        return result
+
+    def timestamps(self, points: Optional[int] = None) -> np.ndarray:
+        """Get the observation timestamps aligned with series(), oldest first."""
+        points = self.max_points if points is None else min(points, self.max_points)
+        return self._timestamps[-points:].copy()
+
+    def price_ratio_series(self, pool_ids: List[str], points: Optional[int] = None) -> np.ndarray:
+        """Get the token_a/token_b price ratio series for several pools."""
+        price_a = self.series("price_a", pool_ids, points)
+        price_b = self.series("price_b", pool_ids, points)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = price_a / price_b
+        ratio[~np.isfinite(ratio) | (ratio <= 0)] = np.nan
+        return ratio
+
+
+# Current snapshot and history singletons
+_snapshot: Optional[MarketSnapshot] = None
+_snapshot_fingerprint: Optional[str] = None
+_snapshot_lock = threading.Lock()
+_history: Optional[PoolHistoryStore] = None
+
+# Called with (previous, current) whenever a new snapshot version is published
+SnapshotListener = Callable[[Optional[MarketSnapshot], MarketSnapshot], None]
+_listeners: List[SnapshotListener] = []
+
+# One thread runs the listeners, in publication order, off the publishing thread
+_listener_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_history_store() -> PoolHistoryStore:
+    """Get the singleton PoolHistoryStore instance, loading it on first use."""
+    global _history
+    if _history is None:
+        with _snapshot_lock:
+            if _history is None:
+                _history = PoolHistoryStore()
+    return _history
+
+
+def _fingerprint(records: Dict[str, Dict[str, Any]]) -> str:
+    """Hash the fields that matter for display so unchanged data keeps its version."""
+    rows = [
+        (pool_id, round(r["apr"], 4), round(r["tvl"], 2), r["price_a"], r["price_b"])
+        for pool_id, r in sorted(records.items())
+    ]
+    return hashlib.md5(json.dumps(rows, default=str).encode("utf-8")).hexdigest()
+
+
+def publish_snapshot(pool_data: Dict[str, List[Dict[str, Any]]]) -> MarketSnapshot:
+    """
+    Publish freshly fetched pool data as the current market snapshot.
+
+    Categories in pool_data replace the same categories of the previous
+    snapshot; other categories are kept. The version only changes when the
+    pool data itself changes.
+
+    Args:
+        pool_data: Pool lists by category, e.g. the result of response_data.get_pool_data()
+
+    Returns:
+        The current MarketSnapshot
+    """
+    global _snapshot, _snapshot_fingerprint
+
+    # Import at function level to avoid circular imports
+    from pool_statistics import estimate_statistics, statistics_by_pool
+
+    history = get_history_store()
+
+    with _snapshot_lock:
+        categories = dict(_snapshot.pool_data) if _snapshot else {}
+        categories.update(pool_data)
+
+        records = {}
+        for pools in categories.values():
+            for pool in pools or []:
+                record = normalize_pool(pool)
+                if record:
+                    records[record["id"]] = record
+
+        # Every sample covers all pools of the snapshot, so publishing one category
+        # does not leave gaps in the series of the pools of other categories
+        history.record(list(records.values()))
+
+        # Statistics for every pool in the snapshot, in one pass over the history
+        try:
+            record_list = list(records.values())
+            statistics = statistics_by_pool(estimate_statistics(record_list), record_list)
+        except Exception as e:
+            logger.error(f"Error estimating pool statistics: {e}")
+            statistics = {}
+
+        fingerprint = _fingerprint(records)
+        if _snapshot and fingerprint == _snapshot_fingerprint:
+            version = _snapshot.version
+        else:
+            version = (_snapshot.version if _snapshot else 0) + 1
+
+        previous = _snapshot
+        _snapshot = MarketSnapshot(version, categories, records, time.time(), statistics, fingerprint)
+        _snapshot_fingerprint = fingerprint
+        snapshot = _snapshot
+
+    logger.info(f"Published market snapshot version {snapshot.version} with {len(snapshot.records)} pools")
+
+    if _listeners and (previous is None or previous.version != snapshot.version):
+        _get_listener_executor().submit(_notify_listeners, previous, snapshot)
+    return snapshot
+
+
+def _get_listener_executor() -> ThreadPoolExecutor:
+    """Get the single-thread executor running snapshot listeners."""
+    global _listener_executor
+    if _listener_executor is None:
+        with _snapshot_lock:
+            if _listener_executor is None:
+                _listener_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshot-listeners")
+    return _listener_executor
+
+
+def _notify_listeners(previous: Optional[MarketSnapshot], snapshot: MarketSnapshot) -> None:
+    """Call every listener with a newly published snapshot."""
+    for listener in list(_listeners):
+        try:
+            listener(previous, snapshot)
+        except Exception as e:
+            logger.error(f"Error in snapshot listener {getattr(listener, '__name__', listener)}: {e}")
+
+
+def record_pools(pools: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Record pools fetched outside the snapshot in the history and estimate their statistics.
+
+    Unlike publish_snapshot() this leaves the current snapshot and its version
+    alone, so the pools are not displayed and the caches keyed on the version
+    stay valid.
+
+    Args:
+        pools: Pool dictionaries as returned by the API
+
+    Returns:
+        Dictionary mapping pool ID to its statistics
+    """
+    # Import at function level to avoid circular imports
+    from pool_statistics import estimate_statistics, statistics_by_pool
+
+    history = get_history_store()
+
+    records = {}
+    for pool in pools or []:
+        record = normalize_pool(pool)
+        if record:
+            records[record["id"]] = record
+
+    with _snapshot_lock:
+        # A sample covers the snapshot pools too, so it leaves no gaps in their series
+        sample = dict(_snapshot.records) if _snapshot else {}
+    sample.update(records)
+    history.record(list(sample.values()))
+
+    record_list = list(records.values())
+    return statistics_by_pool(estimate_statistics(record_list), record_list)
+
+
+def add_snapshot_listener(listener: SnapshotListener) -> None:
+    """
+    Register a function called with (previous, current) when a new snapshot version is published.
+
+    Listeners run one at a time on a background thread, in publication order,
+    so publishing never waits for them.
+
+    Args:
+        listener: Function taking the previous snapshot (or None) and the new one
+    """
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def get_current_snapshot() -> Optional[MarketSnapshot]:
+    """Get the most recently published market snapshot, if any."""
+    return _snapshot
+
+
+def get_snapshot_version() -> int:
+    """Get the current snapshot version (0 before the first publication)."""
+    return _snapshot.version if _snapshot else 0
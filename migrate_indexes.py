@@ -0,0 +1,300 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Database migration script to add indexes for the hot queries
+Creates the composite and partial indexes declared on the models and those
+of the raw-SQL tables (transactions, wallet_sessions) on an existing
+database, and checks with EXPLAIN that none of the hot queries scans a whole
+table once the tables hold data
+
+Usage:
+    python migrate_indexes.py            # create missing indexes
+    python migrate_indexes.py --check    # seed data in a rolled-back transaction and check the query plans
+"""
+
+import sys
+import logging
+import argparse
+import datetime
+from typing import Dict, Any, List, Tuple
+
+from sqlalchemy import func, inspect, select, text
+from sqlalchemy.schema import CreateIndex
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Indexes of the tables created with raw SQL, which have no models
+RAW_TABLE_INDEXES = {
+    "transactions": [
+        "CREATE INDEX IF NOT EXISTS ix_transactions_user_id_created_at ON transactions (user_id, created_at)",
+    ],
+    "wallet_sessions": [
+        "CREATE INDEX IF NOT EXISTS ix_wallet_sessions_telegram_user_id_created_at "
+        "ON wallet_sessions (telegram_user_id, created_at)",
+    ],
+}
+
+# Rows inserted into each hot table before the plans are checked
+SEED_ROWS = 5000
+
+# User IDs used for seeded rows, far above real Telegram IDs
+SEED_USER_BASE = 10 ** 15
+
+
+def index_statements(engine: Any) -> List[Tuple[str, str, str]]:
+    """
+    Get the statements creating every index of the models and raw-SQL tables.
+
+    Args:
+        engine: SQLAlchemy engine of the database
+
+    Returns:
+        List of (table, index name, CREATE INDEX IF NOT EXISTS statement)
+    """
+    # Import at function level to avoid circular imports
+    from models import db
+
+    statements = []
+    for table in db.metadata.sorted_tables:
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=engine.dialect))
+            statements.append((table.name, index.name, ddl))
+    for table, ddls in RAW_TABLE_INDEXES.items():
+        for ddl in ddls:
+            statements.append((table, ddl.split(" ON ")[0].split()[-1], ddl))
+    return statements
+
+
+def create_indexes(engine: Any) -> List[str]:
+    """
+    Create the missing indexes of existing tables.
+
+    On PostgreSQL the indexes are built concurrently, so the tables stay
+    writable while the migration runs.
+
+    Args:
+        engine: SQLAlchemy engine of the database
+
+    Returns:
+        Names of the indexes created
+    """
+    concurrently = engine.dialect.name == "postgresql"
+    created = []
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        inspector = inspect(connection)
+        tables = set(inspector.get_table_names())
+        for table, name, ddl in index_statements(engine):
+            if table not in tables:
+                logger.info(f"Skipping index {name}: table {table} does not exist")
+                continue
+            if name in {index["name"] for index in inspector.get_indexes(table)}:
+                continue
+            if concurrently:
+                ddl = ddl.replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY", 1)
+            try:
+                connection.execute(text(ddl))
+                created.append(name)
+                logger.info(f"Created index {name} on {table}")
+            except Exception as e:
+                logger.error(f"Error creating index {name}: {e}")
+    return created
+
+
+def hot_queries(now: datetime.datetime) -> List[Tuple[str, str, Any]]:
+    """
+    Get the hot queries whose plans are checked.
+
+    The statements mirror those issued by the bot and the admin pages.
+
+    Args:
+        now: Current time for the time-window queries
+
+    Returns:
+        List of (name, table, statement)
+    """
+    # Import at function level to avoid circular imports
+    from models import User, UserQuery, UserActivityLog, InvestmentLog
+
+    user_id = SEED_USER_BASE + 7
+    return [
+        ("user_queries_by_user", "user_queries",
+         select(UserQuery).where(UserQuery.user_id == user_id)
+         .order_by(UserQuery.timestamp.desc()).limit(10)),
+        ("message_queries_since", "user_queries",
+         select(UserQuery).where(UserQuery.command == "message",
+                                 UserQuery.timestamp >= now - datetime.timedelta(hours=1))
+         .order_by(UserQuery.timestamp)),
+        ("recent_activity", "user_activity_logs",
+         select(UserActivityLog).order_by(UserActivityLog.timestamp.desc()).limit(10)),
+        ("activity_count_by_user", "user_activity_logs",
+         select(func.count()).select_from(UserActivityLog).where(UserActivityLog.user_id == user_id)),
+        ("active_user_count", "users",
+         select(func.count()).select_from(User).where(
+             User.last_active > now - datetime.timedelta(days=1), User.is_blocked == False)),
+        ("subscribed_user_count", "users",
+         select(func.count()).select_from(User).where(User.is_subscribed == True)),
+        ("blocked_user_count", "users",
+         select(func.count()).select_from(User).where(User.is_blocked == True)),
+        ("subscriber_page", "users",
+         select(User.id).where(User.is_subscribed == True, User.is_blocked == False, User.id > 0)
+         .order_by(User.id).limit(500)),
+        ("investments_by_user", "investment_logs",
+         select(InvestmentLog).where(InvestmentLog.user_id == user_id)
+         .order_by(InvestmentLog.created_at.desc())),
+        ("transactions_by_user", "transactions",
+         text(f"SELECT id, transaction_id, status, created_at FROM transactions "
+              f"WHERE user_id = {user_id} ORDER BY created_at DESC LIMIT 10")),
+        ("wallet_sessions_by_user", "wallet_sessions",
+         text(f"SELECT session_id, status, created_at FROM wallet_sessions "
+              f"WHERE telegram_user_id = {user_id} ORDER BY created_at DESC")),
+    ]
+
+
+def seed_hot_tables(connection: Any, rows: int, now: datetime.datetime) -> None:
+    """
+    Insert synthetic rows into the hot tables (callers roll them back).
+
+    Args:
+        connection: Connection inside a transaction
+        rows: Number of rows per table
+        now: Current time; rows are spread over the previous 60 days
+    """
+    # Import at function level to avoid circular imports
+    from models import User, UserQuery, UserActivityLog, InvestmentLog, Pool
+
+    users = max(rows // 25, 1)
+    tables = set(inspect(connection).get_table_names())
+
+    def moment(i: int) -> datetime.datetime:
+        return now - datetime.timedelta(minutes=(i * 17) % (60 * 24 * 60))
+
+    connection.execute(User.__table__.insert(), [
+        {"id": SEED_USER_BASE + i, "username": f"seed{i}", "is_subscribed": i % 20 == 0,
+         "is_blocked": i % 100 == 1, "is_verified": False, "last_active": moment(i * 31),
+         "created_at": moment(i * 31)}
+        for i in range(rows)
+    ])
+    connection.execute(Pool.__table__.insert(), [{
+        "id": "seed_pool", "token_a_symbol": "SOL", "token_b_symbol": "USDC", "token_a_price": 1.0,
+        "token_b_price": 1.0, "apr_24h": 0.0, "apr_7d": 0.0, "apr_30d": 0.0, "tvl": 0.0, "fee": 0.0,
+    }])
+    connection.execute(UserQuery.__table__.insert(), [
+        {"user_id": SEED_USER_BASE + i % users, "command": "message" if i % 10 == 0 else "info",
+         "query_text": "seed", "timestamp": moment(i)}
+        for i in range(rows)
+    ])
+    connection.execute(UserActivityLog.__table__.insert(), [
+        {"user_id": SEED_USER_BASE + i % users, "activity_type": "seed", "timestamp": moment(i)}
+        for i in range(rows)
+    ])
+    connection.execute(InvestmentLog.__table__.insert(), [
+        {"user_id": SEED_USER_BASE + i % users, "pool_id": "seed_pool", "amount": 1.0,
+         "tx_hash": f"seed{i}", "status": "confirmed", "created_at": moment(i)}
+        for i in range(rows)
+    ])
+    if "transactions" in tables:
+        connection.execute(text(
+            "INSERT INTO transactions (transaction_id, user_id, wallet_address, transaction_type, status, "
+            "amount, token_symbol, created_at) VALUES (:transaction_id, :user_id, 'seed', 'swap', 'pending', "
+            "1, 'SOL', :created_at)"
+        ), [{"transaction_id": f"seed{i}", "user_id": SEED_USER_BASE + i % users, "created_at": moment(i)}
+            for i in range(rows)])
+    if "wallet_sessions" in tables:
+        connection.execute(text(
+            "INSERT INTO wallet_sessions (session_id, telegram_user_id, status, created_at) "
+            "VALUES (:session_id, :user_id, 'pending', :created_at)"
+        ), [{"session_id": f"seed{i}", "user_id": SEED_USER_BASE + i % users, "created_at": moment(i)}
+            for i in range(rows)])
+    connection.execute(text("ANALYZE"))
+
+
+def full_scans(connection: Any, sql: str, table: str) -> List[str]:
+    """
+    Get the plan lines in which a query reads a whole table.
+
+    Args:
+        connection: Database connection
+        sql: Query with literal values
+        table: Table the query must read through an index
+
+    Returns:
+        Matching plan lines (empty if the table is read through an index)
+    """
+    if connection.dialect.name == "sqlite":
+        plan = [row[-1] for row in connection.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+        # "SCAN t USING [COVERING] INDEX ..." reads an index; a bare "SCAN t" reads the table
+        return [line for line in plan if line.split()[:2] == ["SCAN", table] and "USING" not in line]
+    plan = [row[0] for row in connection.execute(text(f"EXPLAIN {sql}"))]
+    return [line.strip() for line in plan if f"Seq Scan on {table}" in line]
+
+
+def check_query_plans(engine: Any, rows: int = SEED_ROWS) -> Dict[str, Dict[str, Any]]:
+    """
+    Seed the hot tables, EXPLAIN the hot queries, and roll the data back.
+
+    Args:
+        engine: SQLAlchemy engine of the database
+        rows: Rows seeded per table
+
+    Returns:
+        Dictionary of query name -> {"status": "index", "full_scan" or "skipped", "plan": lines}
+    """
+    now = datetime.datetime.utcnow()
+    results = {}
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            seed_hot_tables(connection, rows, now)
+            tables = set(inspect(connection).get_table_names())
+            for name, table, statement in hot_queries(now):
+                if table not in tables:
+                    results[name] = {"status": "skipped", "plan": []}
+                    continue
+                sql = str(statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+                scans = full_scans(connection, sql, table)
+                results[name] = {"status": "full_scan" if scans else "index", "plan": scans}
+        finally:
+            transaction.rollback()
+    return results
+
+
+def get_engine() -> Any:
+    """Get the engine of the Flask app (DATABASE_URL)."""
+    # Import at function level to avoid circular imports
+    from app import app
+    from models import db
+
+    with app.app_context():
+        return db.engine
+
+
+def main() -> int:
+    """Create the missing indexes, or check the query plans with --check."""
+    logging.basicConfig(
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        level=logging.INFO
+    )
+    parser = argparse.ArgumentParser(description="Add indexes for the hot queries and check their plans")
+    parser.add_argument("--check", action="store_true", help="check the hot query plans instead of migrating")
+    parser.add_argument("--rows", type=int, default=SEED_ROWS, help="rows seeded per table for --check")
+    args = parser.parse_args()
+
+    engine = get_engine()
+    if not args.check:
+        created = create_indexes(engine)
+        print(f"Created {len(created)} indexes" + (f": {', '.join(created)}" if created else ""))
+        return 0
+
+    results = check_query_plans(engine, args.rows)
+    failed = [name for name, result in results.items() if result["status"] == "full_scan"]
+    for name, result in results.items():
+        print(f"{'❌' if name in failed else '✅' if result['status'] == 'index' else '➖'} {name}: {result['status']}")
+        for line in result["plan"]:
+            print(f"      {line}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
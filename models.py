@@ -6,7 +6,7 @@ Database models for the Telegram cryptocurrency pool bot
 """
 
 import datetime
-from sqlalchemy import Column, Integer, BigInteger, String, Float, Boolean, DateTime, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, BigInteger, String, Float, Boolean, DateTime, Text, ForeignKey, JSON, Index, text
 from sqlalchemy.orm import relationship
 from flask_sqlalchemy import SQLAlchemy
 from flask import Flask
@@ -18,6 +18,15 @@ db = SQLAlchemy()
 class User(db.Model):
     """User model representing a Telegram user."""
     __tablename__ = "users"
+    __table_args__ = (
+        # Partial indexes for the subscriber, blocked and active user queries and counts
+        Index("ix_users_subscribed", "id",
+              postgresql_where=text("is_subscribed"), sqlite_where=text("is_subscribed = 1")),
+        Index("ix_users_blocked", "id",
+              postgresql_where=text("is_blocked"), sqlite_where=text("is_blocked = 1")),
+        Index("ix_users_last_active_unblocked", "last_active",
+              postgresql_where=text("NOT is_blocked"), sqlite_where=text("is_blocked = 0")),
+    )
     
     # In the database, the 'id' column stores the Telegram user ID directly
     # We use BigInteger to support large Telegram IDs
@@ -83,6 +92,10 @@ class User(db.Model):
 class UserQuery(db.Model):
     """UserQuery model representing a query made by a user."""
     __tablename__ = "user_queries"
+    __table_args__ = (
+        Index("ix_user_queries_user_id_timestamp", "user_id", "timestamp"),
+        Index("ix_user_queries_command_timestamp", "command", "timestamp"),
+    )
     
     id = Column(Integer, primary_key=True)
     user_id = Column(BigInteger, ForeignKey("users.id"), nullable=False)
@@ -131,6 +144,10 @@ class Pool(db.Model):
 class UserActivityLog(db.Model):
     """UserActivityLog model representing user activity."""
     __tablename__ = "user_activity_logs"
+    __table_args__ = (
+        Index("ix_user_activity_logs_timestamp", "timestamp"),
+        Index("ix_user_activity_logs_user_id_timestamp", "user_id", "timestamp"),
+    )
     
     id = Column(Integer, primary_key=True)
     user_id = Column(BigInteger, ForeignKey("users.id"), nullable=False)
@@ -179,6 +196,7 @@ class BotStatistics(db.Model):
     blocked_user_count = Column(Integer, default=0)
     spam_detected_count = Column(Integer, default=0)
     average_response_time = Column(Float, default=0.0)  # In milliseconds
+    response_count = Column(Integer, default=0)  # Queries averaged into average_response_time
     uptime_percentage = Column(Float, default=0.0)  # Percentage
     error_count = Column(Integer, default=0)
     
@@ -273,6 +291,9 @@ class MoodEntry(db.Model):
 class InvestmentLog(db.Model):
     """InvestmentLog model for tracking user investments in liquidity pools."""
     __tablename__ = "investment_logs"
+    __table_args__ = (
+        Index("ix_investment_logs_user_id_created_at", "user_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True)
     user_id = Column(BigInteger, ForeignKey("users.id"), nullable=False)
@@ -307,4 +328,47 @@ class InvestmentLog(db.Model):
     pool = relationship("Pool", backref="investments")
     
     def __repr__(self):
-        return f"<InvestmentLog id={self.id}, user_id={self.user_id}, pool_id={self.pool_id}, amount=${self.amount}, status={self.status}>"
\ No newline at end of file
+        return f"<InvestmentLog id={self.id}, user_id={self.user_id}, pool_id={self.pool_id}, amount=${self.amount}, status={self.status}>"
+
+class CachedAnswer(db.Model):
+    """CachedAnswer model for AI answers reused across identical questions."""
+    __tablename__ = "cached_answers"
+    
+    id = Column(String(64), primary_key=True)  # Hash of question, profile and market data fingerprint
+    question = Column(Text, nullable=False)  # Normalized question text
+    risk_profile = Column(String(20), nullable=True)
+    investment_horizon = Column(String(20), nullable=True)
+    answer = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f"<CachedAnswer id={self.id[:8]}, question={self.question[:30]}, expires_at={self.expires_at}>"
+
+class BroadcastCheckpoint(db.Model):
+    """BroadcastCheckpoint model tracking delivery progress of a broadcast so a restart can resume it."""
+    __tablename__ = "broadcast_checkpoints"
+    
+    id = Column(String(100), primary_key=True)  # Broadcast key, e.g. daily_update:2024-01-31
+    last_user_id = Column(BigInteger, default=0)  # Every subscriber up to this ID has been handled
+    sent_count = Column(Integer, default=0)
+    failed_count = Column(Integer, default=0)
+    started_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+    completed_at = Column(DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f"<BroadcastCheckpoint id={self.id}, last_user_id={self.last_user_id}, sent={self.sent_count}>"
+
+class ServiceHeartbeat(db.Model):
+    """ServiceHeartbeat model recording when a running process was last seen alive."""
+    __tablename__ = "service_heartbeats"
+    
+    id = Column(String(100), primary_key=True)  # host:pid:random, unique per process start
+    service = Column(String(50), nullable=False, index=True)  # e.g. run_bot, wsgi
+    started_at = Column(DateTime, default=datetime.datetime.utcnow)
+    last_seen = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+    beats = Column(Integer, default=0)
+    
+    def __repr__(self):
+        return f"<ServiceHeartbeat id={self.id}, service={self.service}, last_seen={self.last_seen}>"
@@ -20,7 +20,6 @@ from telegram.ext import (
 )
 
 import db_utils
-from db_utils_mood import save_mood_entry, get_mood_history, get_mood_stats
 from models import User, db
 from keyboard_utils import get_reply_keyboard, set_menu_state
 
@@ -210,7 +209,7 @@ async def save_mood_entry(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         try:
             from db_utils_mood import save_mood_entry as db_save_mood
             
-            db_save_mood(
+            await db_save_mood(
                 user_id=user_id,
                 mood=mood_value,
                 mood_emoji=selected_mood,
@@ -285,7 +284,7 @@ async def view_mood_history(update: Update, context: ContextTypes.DEFAULT_TYPE)
                 
                 # Get mood history from database
                 from db_utils_mood import get_mood_history as db_get_mood_history
-                history = db_get_mood_history(user_id, limit=10)
+                history = await db_get_mood_history(user_id, limit=10)
                 
                 if not history or len(history) == 0:
                     await query.message.reply_text(
@@ -312,7 +311,7 @@ async def view_mood_history(update: Update, context: ContextTypes.DEFAULT_TYPE)
                         
                         # Get detailed mood stats
                         from db_utils_mood import get_mood_stats as db_get_mood_stats
-                        mood_stats = db_get_mood_stats(user_id, days=30)
+                        mood_stats = await db_get_mood_stats(user_id, days=30)
                         
                         # Check for repeated contexts
                         contexts = [entry.get('context') for entry in history]
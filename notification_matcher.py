@@ -0,0 +1,467 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Notification matcher for FiLot Telegram bot
+Turns changes between consecutive market snapshots into APR, price,
+prediction and market alerts and sends each one only to the users who
+subscribed to it, using an inverted index from alert type and watched
+pool or token to users
+"""
+
+import math
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import defaultdict, namedtuple
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# User column enabling each alert type
+NOTIFICATION_COLUMNS = {
+    "market": "notif_market",
+    "apr": "notif_apr",
+    "price": "notif_price",
+    "prediction": "notif_prediction",
+}
+
+# Relative APR change (percent) that triggers an APR alert
+APR_ALERT_CHANGE = 20.0
+
+# Token price change (percent) that triggers a price alert
+PRICE_ALERT_CHANGE = 5.0
+
+# APR trend (percent, fast vs slow EWMA) a pool must cross to trigger a prediction alert
+PREDICTION_TREND_THRESHOLD = 5.0
+
+# Total liquidity change (percent) that triggers a market alert
+MARKET_ALERT_CHANGE = 10.0
+
+# Seconds before the same alert (type and pool or token) can fire again
+ALERT_COOLDOWN = 6 * 3600
+
+# Seconds after which the subscriber index is reloaded from the database
+INDEX_REFRESH_INTERVAL = 3600
+
+# One change between two snapshots; targets are the pool ID, token symbols and pair it concerns
+MarketEvent = namedtuple("MarketEvent", ["kind", "key", "targets", "text"])
+
+# Alert types whose events concern the whole market rather than a pool or token
+UNTARGETED_KINDS = {"market"}
+
+# Stablecoins are not worth price alerts
+STABLE_TOKENS = {"USDC", "USDT", "DAI", "USDH", "UXD", "PYUSD"}
+
+
+def _percent_change(old: float, new: float) -> float:
+    """Relative change in percent, NaN if it cannot be computed."""
+    if not old or math.isnan(old) or math.isnan(new):
+        return float("nan")
+    return (new - old) / abs(old) * 100
+
+
+def _token_prices(snapshot) -> Dict[str, float]:
+    """First known USD price of each token in a snapshot."""
+    prices = {}
+    for record in snapshot.records.values():
+        for token, price in ((record["token_a"], record["price_a"]), (record["token_b"], record["price_b"])):
+            if token not in prices and price == price and price > 0:
+                prices[token] = price
+    return prices
+
+
+def diff_snapshots(previous, current) -> List[MarketEvent]:
+    """
+    Compute the alert-worthy changes between two market snapshots.
+
+    Args:
+        previous: Earlier MarketSnapshot
+        current: Newer MarketSnapshot
+
+    Returns:
+        List of MarketEvent
+    """
+    events = []
+
+    for pool_id, record in current.records.items():
+        old = previous.records.get(pool_id)
+        if old is None:
+            continue
+        targets = (pool_id, record["token_a"], record["token_b"], record["pair"])
+
+        change = _percent_change(old["apr"], record["apr"])
+        if abs(change) >= APR_ALERT_CHANGE:
+            events.append(MarketEvent("apr", pool_id, targets, (
+                f"📈 {record['pair']} APR {'rose' if change > 0 else 'fell'} "
+                f"from {old['apr']:.2f}% to {record['apr']:.2f}%"
+            )))
+
+        old_trend = (previous.get_statistics(pool_id) or {}).get("apr_trend")
+        trend = (current.get_statistics(pool_id) or {}).get("apr_trend")
+        if old_trend is not None and trend is not None:
+            if old_trend < PREDICTION_TREND_THRESHOLD <= trend:
+                direction = "rising"
+            elif old_trend > -PREDICTION_TREND_THRESHOLD >= trend:
+                direction = "declining"
+            else:
+                direction = None
+            if direction:
+                events.append(MarketEvent("prediction", pool_id, targets, (
+                    f"🔮 {record['pair']} APR trend turned {direction} ({trend:+.1f}%)"
+                )))
+
+    # Price alerts also reach users watching a pool that contains the token
+    token_pools: Dict[str, List[str]] = defaultdict(list)
+    for pool_id, record in current.records.items():
+        token_pools[record["token_a"]] += (pool_id, record["pair"])
+        token_pools[record["token_b"]] += (pool_id, record["pair"])
+
+    old_prices = _token_prices(previous)
+    for token, price in _token_prices(current).items():
+        if token in STABLE_TOKENS or token not in old_prices:
+            continue
+        change = _percent_change(old_prices[token], price)
+        if abs(change) >= PRICE_ALERT_CHANGE:
+            events.append(MarketEvent("price", token, (token, *token_pools[token]), (
+                f"💲 {token} {'up' if change > 0 else 'down'} {abs(change):.1f}% to ${price:,.4f}"
+            )))
+
+    # Only pools in both snapshots count, so pools appearing or disappearing are not a liquidity change
+    common = current.records.keys() & previous.records.keys()
+    old_tvl = sum(previous.records[pool_id]["tvl"] for pool_id in common)
+    tvl = sum(current.records[pool_id]["tvl"] for pool_id in common)
+    change = _percent_change(old_tvl, tvl)
+    if abs(change) >= MARKET_ALERT_CHANGE:
+        events.append(MarketEvent("market", "tvl", (), (
+            f"📊 Total pool liquidity {'up' if change > 0 else 'down'} {abs(change):.1f}% to ${tvl:,.0f}"
+        )))
+
+    return events
+
+
+def parse_watch_targets(preferred_pools: Any) -> Tuple[str, ...]:
+    """
+    Read the pools and tokens a user watches from User.preferred_pools.
+
+    Args:
+        preferred_pools: JSON value of the column (list of pool IDs, token symbols or pairs)
+
+    Returns:
+        Tuple of targets; empty if the user watches everything
+    """
+    if isinstance(preferred_pools, str):
+        preferred_pools = [preferred_pools]
+    if not isinstance(preferred_pools, (list, tuple)):
+        return ()
+    targets = []
+    for entry in preferred_pools:
+        if isinstance(entry, str) and entry.strip():
+            entry = entry.strip()
+            # Token symbols and pairs are matched case-insensitively, pool IDs exactly
+            targets.append(entry.upper() if len(entry) <= 20 else entry)
+    return tuple(targets)
+
+
+class NotificationIndex:
+    """
+    Inverted index from (alert type, watched target) to user IDs.
+
+    Users who enabled an alert type without watching specific pools or
+    tokens are indexed under (type, None) and match every event of that type.
+    Types in UNTARGETED_KINDS are always indexed under (type, None), as their
+    events have no targets to match a watched pool or token against.
+    """
+
+    def __init__(self):
+        self._users: Dict[Tuple[str, Optional[str]], Set[int]] = defaultdict(set)
+        self._subscriptions: Dict[int, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
+
+    def update(self, user_id: int, kinds: Iterable[str], targets: Tuple[str, ...] = ()) -> None:
+        """
+        Set a user's alert types and watched targets, replacing earlier ones.
+
+        Args:
+            user_id: Telegram user ID
+            kinds: Enabled alert types
+            targets: Watched pool IDs, tokens or pairs (empty for all)
+        """
+        self.remove(user_id)
+        kinds = tuple(kinds)
+        if not kinds:
+            return
+        self._subscriptions[user_id] = (kinds, targets)
+        for kind in kinds:
+            for target in self._index_targets(kind, targets):
+                self._users[(kind, target)].add(user_id)
+
+    def remove(self, user_id: int) -> None:
+        """Remove a user from the index."""
+        subscription = self._subscriptions.pop(user_id, None)
+        if subscription is None:
+            return
+        kinds, targets = subscription
+        for kind in kinds:
+            for target in self._index_targets(kind, targets):
+                users = self._users.get((kind, target))
+                if users is not None:
+                    users.discard(user_id)
+                    if not users:
+                        del self._users[(kind, target)]
+
+    @staticmethod
+    def _index_targets(kind: str, targets: Tuple[str, ...]) -> Tuple[Optional[str], ...]:
+        """Targets a subscription to one alert type is indexed under."""
+        if kind in UNTARGETED_KINDS or not targets:
+            return (None,)
+        return targets
+
+    def match(self, event: MarketEvent) -> Set[int]:
+        """
+        Find the users an event should be sent to.
+
+        Args:
+            event: Market event
+
+        Returns:
+            Set of user IDs
+        """
+        matched = set(self._users.get((event.kind, None), ()))
+        for target in event.targets:
+            for key in {target, target.upper()}:
+                matched |= self._users.get((event.kind, key), set())
+        return matched
+
+
+class NotificationMatcher:
+    """
+    Listens for new market snapshots and sends the alerts that fire.
+
+    Alerts for one snapshot are combined per user, users receiving the same
+    alerts share one broadcast, and broadcasts are scheduled on the bot's
+    event loop, where they draw from the process's shared send rate limit.
+    """
+
+    def __init__(self):
+        self.index = NotificationIndex()
+        self._lock = threading.Lock()
+        self._loaded_at: Optional[float] = None
+        self._reloading = False
+        self._last_fired: Dict[Tuple[str, str], float] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._bot = None
+        self.metrics = {
+            "snapshots": 0,
+            "events": 0,
+            "suppressed": 0,
+            "alerts": 0,
+            "broadcasts": 0,
+            "dropped": 0,
+        }
+
+    def attach(self, loop: asyncio.AbstractEventLoop, bot) -> None:
+        """
+        Send alerts with the given bot on the given event loop.
+
+        Args:
+            loop: The bot's running event loop
+            bot: Initialized Bot
+        """
+        self._loop = loop
+        self._bot = bot
+
+    def update_user(self, user) -> None:
+        """
+        Refresh one user's entry after their notification preferences change.
+
+        Args:
+            user: User model object
+        """
+        # Import at function level to avoid circular imports
+        from sharding import owns_user
+
+        kinds = [kind for kind, column in NOTIFICATION_COLUMNS.items() if getattr(user, column, False)]
+        with self._lock:
+            if user.is_blocked or not owns_user(user.id):
+                self.index.remove(user.id)
+            else:
+                self.index.update(user.id, kinds, parse_watch_targets(user.preferred_pools))
+
+    def _ensure_index(self) -> None:
+        """Start reloading the index in the background if it was never loaded or is stale."""
+        if self._loaded_at is not None and time.time() - self._loaded_at < INDEX_REFRESH_INTERVAL:
+            return
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+        threading.Thread(target=self._reload_index, name="notification-index", daemon=True).start()
+
+    def _reload_index(self) -> None:
+        """Load the index, keeping the previous one if loading fails."""
+        try:
+            self.load_index()
+        except Exception as e:
+            logger.error(f"Error loading notification index: {e}")
+        finally:
+            self._reloading = False
+
+    def load_index(self) -> None:
+        """Load the index of users with alerts enabled from the database."""
+        # Import at function level to avoid circular imports
+        from sqlalchemy import select, or_
+        from app import app
+        from models import db, User
+        from sharding import owns_user
+
+        columns = [getattr(User, column) for column in NOTIFICATION_COLUMNS.values()]
+        index = NotificationIndex()
+        with app.app_context():
+            rows = db.session.execute(
+                select(User.id, User.preferred_pools, *columns)
+                .where(User.is_blocked == False, or_(*[column == True for column in columns]))
+            )
+            for row in rows:
+                # A sharded worker alerts only the users it owns
+                if not owns_user(row[0]):
+                    continue
+                kinds = [kind for kind, enabled in zip(NOTIFICATION_COLUMNS, row[2:]) if enabled]
+                index.update(row[0], kinds, parse_watch_targets(row[1]))
+
+        with self._lock:
+            self.index = index
+            self._loaded_at = time.time()
+        logger.info(f"Loaded notification index with {len(index)} users")
+
+    def on_snapshot(self, previous, current) -> Dict[str, List[int]]:
+        """
+        Match the changes between two snapshots to users and send the alerts.
+
+        Args:
+            previous: Previous MarketSnapshot, or None for the first one
+            current: Newly published MarketSnapshot
+
+        Returns:
+            Dictionary mapping alert message text to recipient user IDs
+        """
+        self.metrics["snapshots"] += 1
+        if previous is None:
+            return {}
+
+        now = time.time()
+        self._last_fired = {key: fired for key, fired in self._last_fired.items() if now - fired < ALERT_COOLDOWN}
+        events = []
+        for event in diff_snapshots(previous, current):
+            if (event.kind, event.key) in self._last_fired:
+                self.metrics["suppressed"] += 1
+                continue
+            events.append(event)
+        self.metrics["events"] += len(events)
+        if not events:
+            return {}
+
+        # Snapshots are published from request paths, so a stale index is reloaded
+        # in the background and events are matched against the last loaded one
+        self._ensure_index()
+        if self._loaded_at is None:
+            return {}
+
+        # Combine the alerts each user receives, then group users with identical alerts
+        events_by_user: Dict[int, List[MarketEvent]] = defaultdict(list)
+        with self._lock:
+            for event in events:
+                for user_id in self.index.match(event):
+                    events_by_user[user_id].append(event)
+
+        recipients_by_events: Dict[Tuple[MarketEvent, ...], List[int]] = defaultdict(list)
+        for user_id, user_events in events_by_user.items():
+            recipients_by_events[tuple(user_events)].append(user_id)
+
+        self.metrics["alerts"] += len(events_by_user)
+        alerts = {}
+        for user_events, user_ids in recipients_by_events.items():
+            text = (
+                "🔔 FiLot Alerts\n\n" + "\n".join(event.text for event in user_events)
+                + "\n\nManage alerts in Notification Preferences."
+            )
+            alerts[text] = user_ids
+            # Only alerts that went out start their cooldown, so dropped ones can fire again
+            if self._dispatch(current, text, user_ids):
+                for event in user_events:
+                    self._last_fired[(event.kind, event.key)] = now
+        return alerts
+
+    def _dispatch(self, snapshot, text: str, user_ids: List[int]) -> bool:
+        """
+        Schedule a broadcast of one alert message on the bot's event loop (see get_send_limiter).
+
+        Returns:
+            True if the broadcast was scheduled, False if it was dropped
+        """
+        if self._loop is None or self._bot is None or self._loop.is_closed():
+            self.metrics["dropped"] += len(user_ids)
+            logger.warning(f"No bot attached, dropped alert for {len(user_ids)} users")
+            return False
+
+        # Import at function level to avoid circular imports
+        from broadcast import broadcast_message
+        from sharding import SHARD_INDEX
+
+        # Keyed by market data and text, so an alert resent after a restart is recognized as delivered;
+        # sharded workers see the same snapshots, so each keeps its own checkpoint for its own users
+        digest = hashlib.md5(text.encode("utf-8")).hexdigest()[:16]
+        key = f"alert:{SHARD_INDEX}:{snapshot.fingerprint[:16]}:{digest}"
+        asyncio.run_coroutine_threadsafe(
+            broadcast_message(key, text, bot=self._bot, recipients=user_ids), self._loop
+        )
+        self.metrics["broadcasts"] += 1
+        return True
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get matcher metrics.
+
+        Returns:
+            Dictionary with event, alert and broadcast counters and the index size
+        """
+        metrics = dict(self.metrics)
+        metrics["indexed_users"] = len(self.index)
+        return metrics
+
+
+# Singleton matcher
+_notification_matcher: Optional[NotificationMatcher] = None
+
+
+def get_notification_matcher() -> NotificationMatcher:
+    """Get the singleton NotificationMatcher instance."""
+    global _notification_matcher
+    if _notification_matcher is None:
+        _notification_matcher = NotificationMatcher()
+    return _notification_matcher
+
+
+async def start_notifications(application) -> None:
+    """
+    Start sending market alerts with the application's bot.
+
+    Used as the Application's post_init hook, so alerts are scheduled on the
+    loop the bot runs on.
+
+    Args:
+        application: The running telegram.ext.Application
+    """
+    # Import at function level to avoid circular imports
+    from market_snapshot import add_snapshot_listener
+
+    matcher = get_notification_matcher()
+    matcher.attach(asyncio.get_running_loop(), application.bot)
+    matcher._ensure_index()
+    add_snapshot_listener(matcher.on_snapshot)
+    logger.info("Market alert notifications started")
@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Local pool statistics estimator for FiLot Telegram bot
+Computes rolling volatility, EWMA APR trends and 7/30-day changes for all
+pools in one vectorized pass over the locally stored pool history
+"""
+
+import time
+import logging
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+from market_snapshot import PoolHistoryStore, get_history_store
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Daily volatility of the price ratio when there is not enough local history
+DEFAULT_DAILY_VOLATILITY = 0.05
+STABLE_DAILY_VOLATILITY = 0.002
+
+# Minimum number of observations needed to estimate volatility from history
+MIN_HISTORY_POINTS = 24
+
+# Rolling window for volatility estimates (days)
+VOLATILITY_WINDOW_DAYS = 14
+
+# Horizon the published volatility is scaled to (days), matching the IL risk horizon
+VOLATILITY_HORIZON_DAYS = 30
+
+# EWMA half-lives for the APR trend (hours)
+APR_FAST_HALF_LIFE = 24
+APR_SLOW_HALF_LIFE = 24 * 7
+
+SECONDS_PER_DAY = 86400
+
+
+def _masked_std(values: np.ndarray, finite: np.ndarray) -> np.ndarray:
+    """Sample standard deviation along axis 1, ignoring entries where finite is False."""
+    counts = finite.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.where(finite, values, 0.0).sum(axis=1) / counts
+        deviations = np.where(finite, values - mean[:, None], 0.0)
+        return np.sqrt((deviations ** 2).sum(axis=1) / (counts - 1))
+
+
+def _ewma(values: np.ndarray, timestamps: np.ndarray, half_life_hours: float) -> np.ndarray:
+    """Time-weighted exponential moving average along axis 1, ignoring NaNs."""
+    age_hours = (timestamps[-1] - timestamps) / 3600
+    finite = np.isfinite(values) & np.isfinite(age_hours)[None, :]
+    weights = np.where(finite, 0.5 ** (np.nan_to_num(age_hours) / half_life_hours)[None, :], 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (np.where(finite, values, 0.0) * weights).sum(axis=1) / weights.sum(axis=1)
+
+
+def _value_at(values: np.ndarray, timestamps: np.ndarray, target: float) -> np.ndarray:
+    """Last recorded value of every pool at or before target time (NaN if none)."""
+    # Unfilled slots at the start of the window have NaN timestamps
+    column = np.searchsorted(np.nan_to_num(timestamps, nan=-np.inf), target, side="right") - 1
+    if column < 0 or not np.isfinite(timestamps[column]):
+        return np.full(values.shape[0], np.nan)
+    return values[:, column]
+
+
+def _percent_change(current: np.ndarray, previous: np.ndarray) -> np.ndarray:
+    """Percent change from previous to current, NaN where undefined."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = (current - previous) / np.abs(previous) * 100
+    return np.where(np.isfinite(change), change, np.nan)
+
+
+def estimate_daily_volatility(
+    records: List[Dict[str, Any]],
+    store: Optional[PoolHistoryStore] = None
+) -> np.ndarray:
+    """
+    Estimate the daily log-volatility of each pool's price ratio.
+
+    Args:
+        records: Normalized pool records
+        store: History store to read from (defaults to the shared store)
+
+    Returns:
+        Array of daily volatilities, one per pool
+    """
+    return estimate_statistics(records, store)["daily_volatility"]
+
+
+def estimate_statistics(
+    records: List[Dict[str, Any]],
+    store: Optional[PoolHistoryStore] = None,
+    now: Optional[float] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Estimate volatility and APR trend statistics for many pools at once.
+
+    Pools without enough stored history fall back to defaults: the volatility
+    of their pair type, and for APR changes the difference between the current
+    APR and the 7/30-day average APR reported by the API.
+
+    Args:
+        records: Normalized pool records
+        store: History store to read from (defaults to the shared store)
+        now: Reference time for the 7/30-day lookbacks (defaults to now)
+
+    Returns:
+        Dictionary of arrays with one entry per record:
+        - daily_volatility: daily log-volatility of the price ratio (fraction)
+        - volatility: volatility over VOLATILITY_HORIZON_DAYS (percent)
+        - apr_ewma: APR smoothed with the fast EWMA
+        - apr_trend: fast vs slow APR EWMA (percent, positive = rising)
+        - apr_change_7d, apr_change_30d: APR change over 7/30 days (percent)
+        - price_change_7d: price ratio change over 7 days (percent, NaN if unknown)
+        - history_points: number of recorded price ratio observations
+    """
+    pool_ids = [r["id"] for r in records]
+    current_apr = np.array([r["apr"] for r in records], dtype=float)
+    default_volatility = np.array([
+        STABLE_DAILY_VOLATILITY if r["is_stable_pair"] else DEFAULT_DAILY_VOLATILITY
+        for r in records
+    ])
+
+    # Fallbacks from the averages the APIs report alongside the current APR
+    apr_7d_avg = np.array([r["apr_7d"] for r in records], dtype=float)
+    apr_30d_avg = np.array([r["apr_30d"] for r in records], dtype=float)
+    apr_change_7d = _percent_change(current_apr, apr_7d_avg)
+    apr_change_30d = _percent_change(current_apr, apr_30d_avg)
+
+    result = {
+        "daily_volatility": default_volatility,
+        "apr_ewma": current_apr,
+        "apr_trend": np.zeros(len(records)),
+        "apr_change_7d": apr_change_7d,
+        "apr_change_30d": apr_change_30d,
+        "price_change_7d": np.full(len(records), np.nan),
+        "history_points": np.zeros(len(records), dtype=int),
+    }
+
+    try:
+        store = store or get_history_store()
+        timestamps = store.timestamps()
+        ratios = store.price_ratio_series(pool_ids)
+        apr = store.series("apr", pool_ids)
+    except Exception as e:
+        logger.warning(f"Pool history unavailable, using default statistics: {e}")
+        ratios = None
+
+    if ratios is not None and np.isfinite(timestamps).any():
+        now = time.time() if now is None else now
+        has_ratio = np.isfinite(ratios)
+        result["history_points"] = has_ratio.sum(axis=1)
+
+        # Rolling volatility: log returns in the window, scaled to one day by their spacing
+        in_window = timestamps[1:] >= timestamps[-1] - VOLATILITY_WINDOW_DAYS * SECONDS_PER_DAY
+        spacing_days = np.diff(timestamps) / SECONDS_PER_DAY
+        with np.errstate(divide="ignore", invalid="ignore"):
+            log_returns = np.diff(np.log(ratios), axis=1) / np.sqrt(spacing_days)
+        finite = np.isfinite(log_returns) & in_window[None, :]
+        estimated = _masked_std(log_returns, finite)
+        usable = (finite.sum(axis=1) >= MIN_HISTORY_POINTS) & np.isfinite(estimated)
+        result["daily_volatility"] = np.where(usable, estimated, default_volatility)
+
+        # APR trend: time-weighted EWMAs are robust to gaps in the hourly samples
+        has_apr = np.isfinite(apr).any(axis=1)
+        fast = _ewma(apr, timestamps, APR_FAST_HALF_LIFE)
+        slow = _ewma(apr, timestamps, APR_SLOW_HALF_LIFE)
+        result["apr_ewma"] = np.where(has_apr, fast, current_apr)
+        result["apr_trend"] = np.where(has_apr, np.nan_to_num(_percent_change(fast, slow)), 0.0)
+
+        # Point-in-time changes where history reaches back far enough
+        for days, key in ((7, "apr_change_7d"), (30, "apr_change_30d")):
+            change = _percent_change(current_apr, _value_at(apr, timestamps, now - days * SECONDS_PER_DAY))
+            result[key] = np.where(np.isfinite(change), change, result[key])
+
+        latest_ratio = ratios[:, -1]
+        result["price_change_7d"] = _percent_change(
+            latest_ratio, _value_at(ratios, timestamps, now - 7 * SECONDS_PER_DAY)
+        )
+
+    result["volatility"] = result["daily_volatility"] * np.sqrt(VOLATILITY_HORIZON_DAYS) * 100
+    return result
+
+
+def statistics_by_pool(stats: Dict[str, np.ndarray], records: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Convert the arrays from estimate_statistics() into per-pool dictionaries.
+
+    NaN values become None so the result can be merged into pool data.
+
+    Args:
+        stats: Result of estimate_statistics()
+        records: The records the statistics were estimated for
+
+    Returns:
+        Dictionary mapping pool ID to its statistics
+    """
+    by_pool = {}
+    for i, record in enumerate(records):
+        pool_stats = {}
+        for key, values in stats.items():
+            value = values[i].item()
+            pool_stats[key] = None if isinstance(value, float) and np.isnan(value) else value
+        by_pool[record["id"]] = pool_stats
+    return by_pool
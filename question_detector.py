@@ -4,6 +4,7 @@ Question detection and predefined answer system for the Telegram bot
 
 import re
 import logging
+from collections import deque
 from typing import Optional, Dict, List, Tuple, Any
 
 logger = logging.getLogger(__name__)
@@ -640,6 +641,216 @@ def get_variations() -> Dict[str, List[str]]:
     }
 
 
+# Words that make any message worth matching even if it is not a question
+GREETING_KEYWORDS = ("hi", "hello", "hey", "start")
+
+# Single-word queries mapped to canonical responses
+KEY_TERMS = {
+    'la': 'what is la token',
+    'filot': 'what is filot',
+    'token': 'what is la token',
+    'roadmap': 'what is the roadmap',
+}
+
+# Keyword combinations (all must appear), checked in order
+KEYWORD_COMBINATIONS = [
+    (('how', 'start'), 'how to use filot'),
+    (('what', 'pool'), 'what is liquidity pool'),
+    (('what', 'apr'), 'what is apr'),
+    (('impermanent', 'loss'), 'impermanent loss'),
+    (('who', 'you'), 'what is filot'),
+    (('what', 'ask'), 'what can i ask'),
+    (('apy', 'mean'), 'what is apy'),
+    (('bank', 'interest'), 'compare bank interest'),
+    (('difference', 'apr', 'apy'), 'what is apy'),
+    (('how', 'filot', 'work'), 'how does filot work'),
+    (('how', 'work'), 'how does filot work'),
+    (('security', 'measures'), 'security measures'),
+    (('how', 'secure'), 'security measures'),
+    (('investment', 'strategy'), 'investment strategies'),
+    (('defi', 'cefi'), 'difference between defi and cefi'),
+    (('defi', 'vs'), 'difference between defi and cefi'),
+    (('yield', 'farm'), 'yield farming'),
+    (('when', 'invest'), 'best time to invest'),
+    (('best', 'time'), 'best time to invest'),
+    (('tax', 'crypto'), 'tax implications'),
+    (('small', 'investment'), 'how to start with $100'),
+    (('$100', 'invest'), 'how to start with $100'),
+]
+
+# Topics and their related keywords for semantic matching, checked in order
+TOPIC_KEYWORDS = {
+    "what is filot": ["platform", "service", "purpose", "about", "project", "tool", "app", "application"],
+    "what is la token": ["cryptocurrency", "coin", "utility", "token", "tokenomics"],
+    "what is the roadmap": ["plan", "timeline", "future", "development", "coming", "next"],
+    "how to use filot": ["instructions", "guide", "manual", "tutorial", "user", "help", "use"],
+    "what is liquidity pool": ["provide liquidity", "lp", "pooling", "amm", "pool"],
+    "impermanent loss": ["risk", "loss", "divergence", "price change"],
+    "what is apr": ["interest", "return", "yield", "earn", "profit", "reward"],
+    "compare bank interest": ["savings", "traditional", "bank", "investment", "return"],
+    "how does filot work": ["mechanism", "process", "operation", "function", "algorithm", "system"],
+    "security measures": ["safety", "protection", "secure", "safeguard", "encryption", "protection"],
+    "investment strategies": ["approach", "method", "technique", "tactic", "plan", "portfolio"],
+    "difference between defi and cefi": ["centralized", "decentralized", "comparison", "versus", "traditional"],
+    "yield farming": ["staking", "liquidity mining", "rewards", "incentives", "defi yields"],
+    "best time to invest": ["timing", "entry", "market timing", "when to buy", "opportunity"],
+    "tax implications": ["taxation", "reporting", "irs", "tax treatment", "capital gains"],
+    "how to start with $100": ["beginner", "small amount", "low budget", "minimal", "starting capital"]
+}
+
+# Common crypto and bot-related terms that make one or two word messages questions
+CRYPTO_TERMS = [
+    'filot', 'la', 'token', 'pool', 'apr', 'yield', 'liquidity', 'impermanent',
+    'risk', 'wallet', 'roadmap', 'security', 'defi', 'governance', 'investment'
+]
+
+# Question words and phrases at the beginning of a message
+QUESTION_STARTERS = [
+    'what', 'how', 'why', 'when', 'where', 'which', 'who', 'is', 'are', 'can',
+    'could', 'will', 'would', 'should', 'do', 'does', 'did', 'tell me about',
+    'explain', 'describe', 'show me', 'give me', 'i need', 'i want', 'help me with'
+]
+
+# Question words anywhere in short messages
+ANYWHERE_QUESTION_WORDS = ['what', 'how', 'why', 'when', 'where', 'which', 'who']
+
+# Inverted question structures
+INVERTED_PATTERNS = [
+    re.compile(r'(is|are|was|were|do|does|did|have|has|had|can|could|should|would|will) ([\w\s]+)\?*$'),
+    re.compile(r'(is|are|was|were|do|does|did|have|has|had|can|could|should|would|will) (it|there|they|he|she|we|you|i) ([\w\s]+)\?*$'),
+    re.compile(r'(tell|show|explain|describe) (me|us) ([\w\s]+)\?*$'),
+    re.compile(r'(need|want) (to know|info|information|details) ([\w\s]+)\?*$')
+]
+
+# Question expressions anywhere in the message
+QUESTION_EXPRESSIONS = [
+    "explain", "tell me about", "what about", "i want to know", "can you", "i need info",
+    "information on", "details about", "describe", "elaborate on", "need help with",
+    "tell me", "show me", "how do i", "how to", "what is", "what are", "what does",
+    "help me", "question about", "looking for", "searching for", "trying to find",
+    "want to learn", "need to understand", "wondering about", "curious about"
+]
+
+# Topic-specific triggers that indicate questions about crypto topics
+CRYPTO_QUESTION_INDICATORS = {
+    'filot': ["filot", "bot", "assistant"],
+    'la token': ["la", "la token", "token", "la!"],
+    'liquidity': ["pool", "liquidity", "lp", "yield farm"],
+    'wallet': ["wallet", "connect", "address", "balance"],
+    'investment': ["invest", "strategy", "return", "apr", "apy", "yield"],
+    'risk': ["risk", "impermanent loss", "il", "safe"]
+}
+
+
+class PatternAutomaton:
+    """
+    Aho-Corasick automaton that finds every occurrence of many literal
+    patterns in a single pass over the text.
+    """
+
+    def __init__(self, patterns: List[str]):
+        """
+        Build the automaton.
+
+        Args:
+            patterns: Literal patterns to search for
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[str]] = [[]]
+
+        for pattern in dict.fromkeys(patterns):
+            state = 0
+            for char in pattern:
+                if char not in self._goto[state]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._goto[state][char] = len(self._goto) - 1
+                state = self._goto[state][char]
+            self._output[state].append(pattern)
+
+        # Breadth-first pass to set failure links and merge outputs along them
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] += self._output[self._fail[next_state]]
+
+        # Resolved transitions, filled in lazily as pattern characters are seen; any
+        # other character leads back to the root and is not cached, so arbitrary
+        # user text cannot grow the table
+        self._delta: List[Dict[str, int]] = [dict(transitions) for transitions in self._goto]
+        self._alphabet = frozenset(char for transitions in self._goto for char in transitions)
+
+    def _next_state(self, state: int, char: str) -> int:
+        """Follow failure links to the next state and cache the transition."""
+        current = state
+        while current and char not in self._goto[current]:
+            current = self._fail[current]
+        next_state = self._goto[current].get(char, 0)
+        self._delta[state][char] = next_state
+        return next_state
+
+    def search(self, text: str) -> Dict[str, int]:
+        """
+        Find all patterns that occur in text.
+
+        Args:
+            text: Text to scan
+
+        Returns:
+            Dictionary mapping each pattern found to the start of its first occurrence
+        """
+        delta, output, alphabet = self._delta, self._output, self._alphabet
+        hits: Dict[str, int] = {}
+        state = 0
+        for position, char in enumerate(text):
+            if char not in alphabet:
+                state = 0
+            else:
+                next_state = delta[state].get(char)
+                state = self._next_state(state, char) if next_state is None else next_state
+            if output[state]:
+                for pattern in output[state]:
+                    if pattern not in hits:
+                        hits[pattern] = position - len(pattern) + 1
+        return hits
+
+
+def _first_hit(hits: Dict[str, int], patterns: List[str], at_start: bool = False) -> Optional[str]:
+    """Return the first of patterns (in priority order) that was found, optionally only at position 0."""
+    for pattern in patterns:
+        if pattern in hits and (not at_start or hits[pattern] == 0):
+            return pattern
+    return None
+
+
+# Tables compiled once at import instead of being rebuilt for every message
+_RESPONSES = get_predefined_responses()
+_VARIATIONS = get_variations()
+_CANONICALS = list(_VARIATIONS)
+_VARIANT_CANONICAL = {}
+for _index, _variants in enumerate(_VARIATIONS.values()):
+    for _variant in _variants:
+        _VARIANT_CANONICAL.setdefault(_variant, _index)
+_TOPIC_INDEX = [(topic, keywords, frozenset(topic.split())) for topic, keywords in TOPIC_KEYWORDS.items()]
+
+_AUTOMATON = PatternAutomaton(
+    list(_VARIANT_CANONICAL)
+    + [keyword for keywords, _ in KEYWORD_COMBINATIONS for keyword in keywords]
+    + [keyword for keywords in TOPIC_KEYWORDS.values() for keyword in keywords]
+    + [indicator for indicators in CRYPTO_QUESTION_INDICATORS.values() for indicator in indicators]
+    + list(GREETING_KEYWORDS) + ["launch", "la", "token", "when"]
+    + CRYPTO_TERMS + QUESTION_STARTERS + QUESTION_EXPRESSIONS
+)
+
+
 def is_question(text: str) -> bool:
     """
     Determine if text is likely a question based on various patterns.
@@ -650,9 +861,6 @@ def is_question(text: str) -> bool:
     Returns:
         True if the text is likely a question, False otherwise
     """
-    import logging
-    logger = logging.getLogger(__name__)
-
     # Clean the text
     text = text.strip().lower()
 
@@ -660,86 +868,51 @@ def is_question(text: str) -> bool:
     if not text:
         return False
 
+    hits = _AUTOMATON.search(text)
+    words = text.split()
+
     # Single word inputs are often questions about specific topics in a chat context
-    if len(text.split()) == 1 or len(text.split()) == 2:
-        # Check against common crypto and bot-related terms
-        crypto_terms = [
-            'filot', 'la', 'token', 'pool', 'apr', 'yield', 'liquidity', 'impermanent', 
-            'risk', 'wallet', 'roadmap', 'security', 'defi', 'governance', 'investment'
-        ]
-        for term in crypto_terms:
-            if term in text:
-                logger.info(f"Treating single/short term '{text}' as question about '{term}'")
-                return True
+    if len(words) == 1 or len(words) == 2:
+        term = _first_hit(hits, CRYPTO_TERMS)
+        if term:
+            logger.info(f"Treating single/short term '{text}' as question about '{term}'")
+            return True
 
     # Check if ends with a question mark
     if text.endswith('?'):
         logger.info(f"Detected question mark in: '{text}'")
         return True
 
-    # Check for question words at the beginning - expanded list
-    question_starters = [
-        'what', 'how', 'why', 'when', 'where', 'which', 'who', 'is', 'are', 'can', 
-        'could', 'will', 'would', 'should', 'do', 'does', 'did', 'tell me about',
-        'explain', 'describe', 'show me', 'give me', 'i need', 'i want', 'help me with'
-    ]
-
-    for starter in question_starters:
-        if text.startswith(starter):  # Removed ' ' requirement to match more flexible starts
-            logger.info(f"Detected question starter '{starter}' in: '{text}'")
-            return True
+    # Check for question words at the beginning
+    starter = _first_hit(hits, QUESTION_STARTERS, at_start=True)
+    if starter:
+        logger.info(f"Detected question starter '{starter}' in: '{text}'")
+        return True
 
     # Check for question words anywhere in the text - for short messages
-    if len(text.split()) <= 5:  # Only for short messages to avoid false positives
-        anywhere_question_words = [
-            'what', 'how', 'why', 'when', 'where', 'which', 'who'
-        ]
-        for word in anywhere_question_words:
-            if word in text.split():
+    if len(words) <= 5:  # Only for short messages to avoid false positives
+        word_set = set(words)
+        for word in ANYWHERE_QUESTION_WORDS:
+            if word in word_set:
                 logger.info(f"Detected question word '{word}' in short text: '{text}'")
                 return True
 
-    # Check for inverted question structure - expanded patterns
-    inverted_patterns = [
-        r'(is|are|was|were|do|does|did|have|has|had|can|could|should|would|will) ([\w\s]+)\?*$',
-        r'(is|are|was|were|do|does|did|have|has|had|can|could|should|would|will) (it|there|they|he|she|we|you|i) ([\w\s]+)\?*$',
-        r'(tell|show|explain|describe) (me|us) ([\w\s]+)\?*$',
-        r'(need|want) (to know|info|information|details) ([\w\s]+)\?*$'
-    ]
-
-    for pattern in inverted_patterns:
-        if re.match(pattern, text):
+    # Check for inverted question structure
+    for pattern in INVERTED_PATTERNS:
+        if pattern.match(text):
             logger.info(f"Detected inverted question pattern in: '{text}'")
             return True
 
-    # Check for additional question patterns/expressions - expanded list
-    question_expressions = [
-        "explain", "tell me about", "what about", "i want to know", "can you", "i need info", 
-        "information on", "details about", "describe", "elaborate on", "need help with",
-        "tell me", "show me", "how do i", "how to", "what is", "what are", "what does",
-        "help me", "question about", "looking for", "searching for", "trying to find",
-        "want to learn", "need to understand", "wondering about", "curious about"
-    ]
-
-    for expression in question_expressions:
-        if expression in text:
-            logger.info(f"Detected question expression '{expression}' in: '{text}'")
-            return True
-
-    # Topic-specific triggers that indicate questions about crypto topics
-    crypto_question_indicators = {
-        'filot': ["filot", "bot", "assistant"],
-        'la token': ["la", "la token", "token", "la!"],
-        'liquidity': ["pool", "liquidity", "lp", "yield farm"],
-        'wallet': ["wallet", "connect", "address", "balance"],
-        'investment': ["invest", "strategy", "return", "apr", "apy", "yield"],
-        'risk': ["risk", "impermanent loss", "il", "safe"]
-    }
+    # Check for additional question patterns/expressions
+    expression = _first_hit(hits, QUESTION_EXPRESSIONS)
+    if expression:
+        logger.info(f"Detected question expression '{expression}' in: '{text}'")
+        return True
 
-    for topic, indicators in crypto_question_indicators.items():
-        if any(indicator in text for indicator in indicators):
-            # For short texts or texts with these terms at the beginning, treat as questions
-            if len(text.split()) <= 3 or any(text.startswith(indicator) for indicator in indicators):
+    # Topic-specific triggers: for short texts or texts starting with a trigger, treat as questions
+    for topic, indicators in CRYPTO_QUESTION_INDICATORS.items():
+        if _first_hit(hits, indicators):
+            if len(words) <= 3 or _first_hit(hits, indicators, at_start=True):
                 logger.info(f"Detected crypto topic '{topic}' in potential question: '{text}'")
                 return True
 
@@ -765,12 +938,12 @@ def get_predefined_response(query: str) -> Optional[str]:
     # Clean the query
     query_lower = query.lower().strip("?!.,")
 
-    # Get responses and variations
-    responses = get_predefined_responses()
-    variations = get_variations()
+    # One pass over the query finds every variation, keyword and trigger it contains
+    hits = _AUTOMATON.search(query_lower)
+    responses = _RESPONSES
 
     # Check if it's likely a question
-    if not is_question(query) and not any(keyword in query_lower for keyword in ['hi', 'hello', 'hey', 'start']):
+    if not is_question(query) and not _first_hit(hits, GREETING_KEYWORDS):
         # If it doesn't seem like a question and doesn't contain greeting keywords, skip matching
         logger.debug(f"Message '{query_lower}' doesn't seem like a question, skipping predefined matching")
         return None
@@ -779,105 +952,48 @@ def get_predefined_response(query: str) -> Optional[str]:
     logger.info(f"Processing potential question: '{query_lower}'")
 
     # First, check for launch-related queries as a high priority match
-    if 'launch' in query_lower and ('la' in query_lower or 'token' in query_lower):
+    if 'launch' in hits and ('la' in hits or 'token' in hits):
         logger.info(f"Detected launch-related query: {query_lower}")
         return responses.get("tell me about la token's launch")
 
     # Check for when-related queries about LA token launch
-    if 'when' in query_lower and ('la' in query_lower or 'token' in query_lower):
+    if 'when' in hits and ('la' in hits or 'token' in hits):
         logger.info(f"Detected when-related LA token query: {query_lower}")
         return responses.get("tell me about la token's launch")
 
     # Check for single-word queries using key terms
-    key_terms = {
-        'la': 'what is la token',
-        'filot': 'what is filot',
-        'token': 'what is la token',
-        'roadmap': 'what is the roadmap',
-    }
-    if query_lower in key_terms:
-        logger.info(f"Matched key term: {query_lower} → {key_terms[query_lower]}")
-        return responses.get(key_terms[query_lower])
+    if query_lower in KEY_TERMS:
+        logger.info(f"Matched key term: {query_lower} → {KEY_TERMS[query_lower]}")
+        return responses.get(KEY_TERMS[query_lower])
 
     # Check for exact matches
     if query_lower in responses:
         logger.info(f"Matched exact query: {query_lower}")
         return responses[query_lower]
 
-    # Check in variations (exact match or substring match)
-    for canonical, variant_list in variations.items():
-        if query_lower in variant_list:
+    # Check in variations: the earliest canonical with any variation in the query wins
+    matched = [_VARIANT_CANONICAL[variant] for variant in hits if variant in _VARIANT_CANONICAL]
+    if matched:
+        canonical = _CANONICALS[min(matched)]
+        if query_lower in _VARIATIONS[canonical]:
             logger.info(f"Matched variation: {query_lower} → {canonical}")
-            return responses.get(canonical)
-
-        # Look for substring matches
-        for variant in variant_list:
-            if variant in query_lower:
-                logger.info(f"Matched substring: '{variant}' in '{query_lower}' → {canonical}")
-                return responses.get(canonical)
+        else:
+            variant = _first_hit(hits, _VARIATIONS[canonical])
+            logger.info(f"Matched substring: '{variant}' in '{query_lower}' → {canonical}")
+        return responses.get(canonical)
 
     # Check for keyword combinations
-    keyword_combinations = {
-        ('how', 'start'): 'how to use filot',
-        ('what', 'pool'): 'what is liquidity pool',
-        ('what', 'apr'): 'what is apr',
-        ('impermanent', 'loss'): 'impermanent loss',
-        ('who', 'you'): 'what is filot',
-        ('what', 'ask'): 'what can i ask',
-        ('apy', 'mean'): 'what is apy',
-        ('bank', 'interest'): 'compare bank interest',
-        ('difference', 'apr', 'apy'): 'what is apy',
-        ('how', 'filot', 'work'): 'how does filot work',
-        ('how', 'work'): 'how does filot work',
-        ('security', 'measures'): 'security measures',
-        ('how', 'secure'): 'security measures',
-        ('investment', 'strategy'): 'investment strategies',
-        ('defi', 'cefi'): 'difference between defi and cefi',
-        ('defi', 'vs'): 'difference between defi and cefi',
-        ('yield', 'farm'): 'yield farming',
-        ('when', 'invest'): 'best time to invest',
-        ('best', 'time'): 'best time to invest',
-        ('tax', 'crypto'): 'tax implications',
-        ('small', 'investment'): 'how to start with $100',
-        ('$100', 'invest'): 'how to start with $100'
-    }
-    for keywords, response_key in keyword_combinations.items():
-        if all(keyword in query_lower for keyword in keywords):
+    for keywords, response_key in KEYWORD_COMBINATIONS:
+        if all(keyword in hits for keyword in keywords):
             logger.info(f"Matched keyword combination: {keywords} → {response_key}")
             return responses.get(response_key)
 
-    # Semantic matching for more complex questions
-    # This section tries to match questions that might be phrased differently
-    # but are looking for the same information
-
-    # Topics and their related keywords
-    topics = {
-        "what is filot": ["platform", "service", "purpose", "about", "project", "tool", "app", "application"],
-        "what is la token": ["cryptocurrency", "coin", "utility", "token", "tokenomics"],
-        "what is the roadmap": ["plan", "timeline", "future", "development", "coming", "next"],
-        "how to use filot": ["instructions", "guide", "manual", "tutorial", "user", "help", "use"],
-        "what is liquidity pool": ["provide liquidity", "lp", "pooling", "amm", "pool"],
-        "impermanent loss": ["risk", "loss", "divergence", "price change"],
-        "what is apr": ["interest", "return", "yield", "earn", "profit", "reward"],
-        "compare bank interest": ["savings", "traditional", "bank", "investment", "return"],
-        "how does filot work": ["mechanism", "process", "operation", "function", "algorithm", "system"],
-        "security measures": ["safety", "protection", "secure", "safeguard", "encryption", "protection"],
-        "investment strategies": ["approach", "method", "technique", "tactic", "plan", "portfolio"],
-        "difference between defi and cefi": ["centralized", "decentralized", "comparison", "versus", "traditional"],
-        "yield farming": ["staking", "liquidity mining", "rewards", "incentives", "defi yields"],
-        "best time to invest": ["timing", "entry", "market timing", "when to buy", "opportunity"],
-        "tax implications": ["taxation", "reporting", "irs", "tax treatment", "capital gains"],
-        "how to start with $100": ["beginner", "small amount", "low budget", "minimal", "starting capital"]
-    }
-
-    for topic, keywords in topics.items():
-        if any(keyword in query_lower for keyword in keywords):
-            topic_words = set(topic.split())
-            query_words = set(query_lower.split())
-            # If query contains at least one topic word and one keyword
-            if topic_words.intersection(query_words) and any(keyword in query_lower for keyword in keywords):
-                logger.info(f"Matched semantic topic: {topic} with keywords {[k for k in keywords if k in query_lower]}")
-                return responses.get(topic)
+    # Semantic matching: a topic keyword plus at least one word of the topic itself
+    query_words = set(query_lower.split())
+    for topic, keywords, topic_words in _TOPIC_INDEX:
+        if topic_words & query_words and _first_hit(hits, keywords):
+            logger.info(f"Matched semantic topic: {topic} with keywords {[k for k in keywords if k in hits]}")
+            return responses.get(topic)
 
     # No match found
     logger.info(f"No predefined response match for: {query_lower}")
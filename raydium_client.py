@@ -57,14 +57,8 @@ class RaydiumClient:
         
         logger.info(f"Initialized Raydium client with API URL: {self.base_url}")
         
-        # Verify the configured connection is valid
-        try:
-            self.check_health()
-            logger.info("Raydium API connection successfully verified")
-        except Exception as e:
-            logger.warning(f"Raydium API initial connection could not be verified: {e}")
-            # We don't raise an error here to allow the application to start
-            # even if the API is temporarily unavailable
+        # The connection is not verified here: a health check would block start-up
+        # on a network round trip, and the first request reports problems anyway
 
         # Configure retry strategy
         retry_strategy = Retry(
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Render cache for FiLot Telegram bot
+Keeps message sections rendered from pool data for the current market
+snapshot version, so the shared parts of pool messages are built once per
+refresh instead of once per user; per-user fragments are filled in at send time
+"""
+
+import time
+import logging
+import threading
+from typing import Dict, Any, Callable, Hashable, List, Optional, Tuple, TypeVar
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Maximum number of rendered sections kept for one snapshot version
+MAX_RENDERED_SECTIONS = 500
+
+# Pool fields that identify what a rendered section shows; aliases as in utils.format_pool_info
+POOL_KEY_FIELDS = (
+    ("id",),
+    ("pairName", "token_a_symbol"),
+    ("token_b_symbol",),
+    ("apr", "apr_24h"),
+    ("aprWeekly", "apr_7d"),
+    ("aprMonthly", "apr_30d"),
+    ("liquidity", "tvl"),
+    ("tokenPrices",),
+)
+
+T = TypeVar("T")
+
+
+def pools_key(pools: Optional[List[Dict[str, Any]]], extra_fields: Tuple[str, ...] = ()) -> Optional[Tuple]:
+    """
+    Build a hashable key for a list of pools from the fields messages display.
+
+    Args:
+        pools: List of pool dictionaries, or None
+        extra_fields: Further fields the template displays besides POOL_KEY_FIELDS
+
+    Returns:
+        Tuple identifying the pools and their displayed values, or None
+    """
+    if pools is None:
+        return None
+    key = []
+    for pool in pools:
+        values = []
+        for aliases in POOL_KEY_FIELDS + tuple((field,) for field in extra_fields):
+            value = next((pool[alias] for alias in aliases if alias in pool), None)
+            if isinstance(value, dict):
+                value = tuple(sorted(value.items()))
+            values.append(value)
+        key.append(tuple(values))
+    return tuple(key)
+
+
+class RenderCache:
+    """
+    Rendered message sections for the current snapshot version.
+
+    All sections are dropped when the snapshot version changes. Each entry
+    remembers how long it took to render, so every hit adds the render time
+    it saved to the metrics. Before the first snapshot nothing is cached.
+    """
+
+    def __init__(self, max_entries: int = MAX_RENDERED_SECTIONS):
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_entries: Maximum number of sections kept per snapshot version
+        """
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        # (template, key) -> (value, render_ms)
+        self._entries: Dict[Tuple[str, Hashable], Tuple[Any, float]] = {}
+        self.metrics = {
+            "hits": 0,
+            "misses": 0,
+            "uncached": 0,
+            "render_ms_spent": 0.0,
+            "render_ms_saved": 0.0,
+        }
+
+    def get_or_render(self, template: str, key: Hashable, render: Callable[[], T]) -> T:
+        """
+        Get a rendered section, rendering it on the first request for this snapshot version.
+
+        Args:
+            template: Name of the section, e.g. "pool_info"
+            key: Hashable description of the inputs (see pools_key)
+            render: Function building the section
+
+        Returns:
+            The rendered section
+        """
+        # Import at function level to avoid circular imports
+        from market_snapshot import get_snapshot_version
+
+        version = get_snapshot_version()
+        cache_key = (template, key)
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            entry = self._entries.get(cache_key) if version else None
+            if entry is not None:
+                self.metrics["hits"] += 1
+                self.metrics["render_ms_saved"] += entry[1]
+                return entry[0]
+
+        started = time.perf_counter()
+        value = render()
+        render_ms = (time.perf_counter() - started) * 1000
+
+        with self._lock:
+            self.metrics["render_ms_spent"] += render_ms
+            if not version:
+                self.metrics["uncached"] += 1
+            else:
+                self.metrics["misses"] += 1
+                # Skip storing if the snapshot changed while rendering
+                if version == self._version and len(self._entries) < self.max_entries:
+                    self._entries[cache_key] = (value, render_ms)
+        return value
+
+    def clear(self) -> None:
+        """Drop all rendered sections."""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with hit and miss counts, the number of cached sections
+            and the render time saved in total and per request (ms)
+        """
+        with self._lock:
+            stats = dict(self.metrics)
+            stats["sections"] = len(self._entries)
+            stats["snapshot_version"] = self._version
+        requests = stats["hits"] + stats["misses"] + stats["uncached"]
+        stats["render_ms_saved_per_request"] = stats["render_ms_saved"] / requests if requests else 0.0
+        return stats
+
+
+# Singleton render cache
+_render_cache: Optional[RenderCache] = None
+
+
+def get_render_cache() -> RenderCache:
+    """Get the singleton RenderCache instance."""
+    global _render_cache
+    if _render_cache is None:
+        _render_cache = RenderCache()
+    return _render_cache
@@ -46,6 +46,10 @@ TVL_RANGES = {
     "default": (500_000, 1_500_000)
 }
 
+# Shared store key and lifetime (seconds) of pool data fetched by one sharded worker
+SHARED_POOL_DATA_KEY = "pool_data"
+SHARED_POOL_DATA_TTL = 60
+
 def get_pool_data():
     """
     Get pool data directly from the Raydium API with verification.
@@ -57,6 +61,18 @@ def get_pool_data():
         - 3 top stable pools (SOL/USDC, SOL/RAY, SOL/USDT)
     """
     try:
+        # Import at function level to avoid circular imports
+        from sharding import is_sharded
+        from shared_store import get_shared_store
+
+        # Sharded workers reuse pool data another worker fetched recently
+        if is_sharded():
+            shared_pools = get_shared_store().get(SHARED_POOL_DATA_KEY)
+            if shared_pools:
+                from market_snapshot import publish_snapshot
+                publish_snapshot(shared_pools)
+                return shared_pools
+
         # Import from raydium_client at function level to avoid circular imports
         from raydium_client import get_client
 
@@ -276,6 +292,19 @@ def get_pool_data():
                 }
                 
         logger.info(f"Final pool counts: {len(pools_data['bestPerformance'])} best performance, {len(pools_data['topStable'])} stable")
+
+        # Publish as the current market snapshot for local simulation and analytics
+        try:
+            from market_snapshot import publish_snapshot
+            publish_snapshot(pools_data)
+        except Exception as e:
+            logger.error(f"Error publishing market snapshot: {e}")
+
+        if is_sharded():
+            try:
+                get_shared_store().set(SHARED_POOL_DATA_KEY, pools_data, ttl=SHARED_POOL_DATA_TTL)
+            except Exception as e:
+                logger.error(f"Error sharing pool data: {e}")
             
         return pools_data
     except Exception as e:
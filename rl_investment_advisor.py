@@ -11,14 +11,17 @@ import time
 import random
 import json
 import os
-import math
+import importlib.util
 from typing import Dict, List, Any, Optional, Tuple
 import numpy as np
 
 # Import real data clients
-from solpool_api_client import get_pools, get_pool_detail
+from solpool_api_client import get_pools, get_pool_detail, get_predictions
 from filotsense_api_client import get_sentiment_simple, get_prices_latest
 import agentic_advisor
+from impermanent_loss import impermanent_loss_risk
+from market_snapshot import record_pools, get_snapshot_version
+from feature_store import FEATURE_NAMES, compute_features, get_feature_store
 
 # Configure logging
 logging.basicConfig(
@@ -35,7 +38,8 @@ RISK_PROFILE_WEIGHTS = {
         "volume": 0.15,        # Medium weight on volume
         "volatility": -0.20,   # High penalty for volatility
         "sentiment": 0.10,     # Low weight on sentiment
-        "prediction": 0.10     # Low weight on AI predictions
+        "prediction": 0.10,    # Low weight on AI predictions
+        "impermanent_loss": -0.20  # High penalty for impermanent loss risk
     },
     "moderate": {
         "apr": 0.25,           # Medium weight on APR
@@ -43,7 +47,8 @@ RISK_PROFILE_WEIGHTS = {
         "volume": 0.15,        # Medium weight on volume
         "volatility": -0.10,   # Medium penalty for volatility
         "sentiment": 0.15,     # Medium weight on sentiment
-        "prediction": 0.15     # Medium weight on AI predictions
+        "prediction": 0.15,    # Medium weight on AI predictions
+        "impermanent_loss": -0.10  # Medium penalty for impermanent loss risk
     },
     "aggressive": {
         "apr": 0.35,           # High weight on APR
@@ -51,7 +56,8 @@ RISK_PROFILE_WEIGHTS = {
         "volume": 0.15,        # Medium weight on volume
         "volatility": -0.05,   # Low penalty for volatility
         "sentiment": 0.15,     # Medium weight on sentiment
-        "prediction": 0.20     # High weight on AI predictions
+        "prediction": 0.20,    # High weight on AI predictions
+        "impermanent_loss": -0.05  # Low penalty for impermanent loss risk
     }
 }
 
@@ -66,19 +72,15 @@ DQN_CONFIG = {
     "batch_size": 32           # Batch size for training
 }
 
+# Expected 30-day impermanent loss that maps to the maximum risk score
+MAX_IMPERMANENT_LOSS_RISK = 0.05
+
 # File to store experience replay buffer
 EXPERIENCE_BUFFER_FILE = "rl_experience.json"
 
-# Check if PyTorch is available (for actual DQN implementation)
-try:
-    import torch
-    import torch.nn as nn
-    import torch.optim as optim
-    PYTORCH_AVAILABLE = True
-    logger.info("PyTorch is available, using DQN model")
-except ImportError:
-    PYTORCH_AVAILABLE = False
-    logger.warning("PyTorch not available, using simulated RL model")
+def pytorch_available() -> bool:
+    """Check if PyTorch is installed (for actual DQN implementation) without importing it."""
+    return importlib.util.find_spec("torch") is not None
 
 class SimpleReplayMemory:
     """Simple experience replay memory for RL agent"""
@@ -227,11 +229,13 @@ class RLInvestmentAdvisor:
         self.action_size = 10
         
         # Initialize DQN model
-        if PYTORCH_AVAILABLE:
+        if pytorch_available():
+            logger.info("PyTorch is available, using DQN model")
             # PyTorch DQN implementation would go here
             # For now, just use the simple DQN
             self.model = SimpleDQN(self.state_size, self.action_size)
         else:
+            logger.warning("PyTorch not available, using simulated RL model")
             self.model = SimpleDQN(self.state_size, self.action_size)
             
         # For tracking selected investments
@@ -249,83 +253,90 @@ class RLInvestmentAdvisor:
         Returns:
             Feature vector as numpy array
         """
-        # Extract and normalize required values with sensible defaults
-        apr = min(pool.get("apr", 0) / 100.0, 1.0)  # Normalize 0-100% to 0-1
+        return compute_features([pool], sentiments, prices)[0]
+    
+    def _get_features(self, pool: Dict[str, Any], sentiments: Dict[str, Any] = None, prices: Dict[str, Any] = None) -> np.ndarray:
+        """
+        Get a pool's feature vector from the feature store, computing it if stale
         
-        # Log scale TVL (liquidity) to deal with wide range
-        liquidity = pool.get("liquidity", 0) or 0
-        tvl = min(math.log10(liquidity + 1) / 8.0, 1.0)  # log10 scale, max ~$100M
+        Args:
+            pool: Pool data dictionary
+            sentiments: Optional pre-loaded sentiment data (fetched if needed)
+            prices: Optional pre-loaded price data (fetched if needed)
+            
+        Returns:
+            Feature vector as numpy array
+        """
+        feature_store = get_feature_store()
+        pool_id = pool.get("id")
         
-        # Log scale volume
-        volume_24h = pool.get("volume_24h", 0) or 0
-        volume = min(math.log10(volume_24h + 1) / 7.0, 1.0)  # log10 scale, max ~$10M
+        if pool_id and not feature_store.is_stale(pool_id):
+            return feature_store.get(pool_id)
         
-        # Volatility (normalized, higher is more volatile)
-        volatility = min(pool.get("volatility", 0) / 100.0, 1.0) if "volatility" in pool else 0.5
+        # Get sentiment and price data - non-async calls
+        if sentiments is None:
+            sentiments = get_sentiment_simple()
+        if prices is None:
+            prices = get_prices_latest()
         
-        # Get token symbols for sentiment and price data
-        token1_symbol = pool.get("token1_symbol", "") or ""
-        token2_symbol = pool.get("token2_symbol", "") or ""
+        if not pool_id:
+            return self._extract_features(pool, sentiments, prices)
         
-        # Default values if no data available
-        token1_sentiment = 0.5  # Default neutral
-        token2_sentiment = 0.5  # Default neutral
-        price_change_24h = 0.0  # Default no change
+        feature_store.update([pool], sentiments, prices)
+        return feature_store.get(pool_id)
+    
+    def _get_prediction_scores(self, limit: int) -> Dict[str, float]:
+        """
+        Get the prediction scores of up to limit pools in a single API request.
         
-        # Get sentiment data if available (already in 0-1 scale)
-        if sentiments and "sentiment" in sentiments:
-            sent_data = sentiments["sentiment"]
+        Args:
+            limit: Maximum number of predictions to request
             
-            if token1_symbol in sent_data:
-                score = sent_data[token1_symbol].get("score", 0)
-                # Convert from -1:1 to 0:1 scale
-                token1_sentiment = (score + 1) / 2
-                
-            if token2_symbol in sent_data:
-                score = sent_data[token2_symbol].get("score", 0)
-                # Convert from -1:1 to 0:1 scale
-                token2_sentiment = (score + 1) / 2
-        
-        # Average sentiment for the pool
-        sentiment = (token1_sentiment + token2_sentiment) / 2
-        
-        # Get price change data if available
-        if prices and "prices" in prices:
-            price_data = prices["prices"]
-            
-            if token1_symbol in price_data:
-                # Normalize price change to 0-1 scale (assume max ±50%)
-                percent_change = price_data[token1_symbol].get("percent_change_24h", 0) or 0
-                price_change_24h = (percent_change + 50) / 100 if -50 <= percent_change <= 50 else 0.5
-        
-        # Prediction score (already normalized to 0-1)
-        prediction_score = min(pool.get("prediction_score", 50) / 100.0, 1.0)
-        
-        # APR change (normalized to 0-1 scale, with 0.5 being no change)
-        apr_change_7d = pool.get("apr_change_7d", 0) or 0
-        # Convert to 0-1 scale with 0.5 as no change, 1.0 as +50% APR, 0.0 as -50% APR
-        apr_change_norm = (apr_change_7d + 50) / 100 if -50 <= apr_change_7d <= 50 else 0.5
-        
-        # Create feature vector
-        features = np.array([
-            apr,                # APR (0-1)
-            tvl,                # TVL (log scaled, 0-1)
-            volume,             # Volume (log scaled, 0-1)
-            volatility,         # Volatility (0-1)
-            sentiment,          # Sentiment (0-1)
-            prediction_score,   # Prediction score (0-1)
-            apr_change_norm,    # APR change (0-1)
-            price_change_24h    # Price change (0-1)
-        ])
-        
-        # Log sample feature values for debugging
-        if random.random() < 0.1:  # Only log ~10% of extractions to avoid spam
-            logger.debug(f"Pool features: {token1_symbol}/{token2_symbol} - APR: {apr:.2f}, TVL: {tvl:.2f}, " +
-                      f"Volume: {volume:.2f}, Volatility: {volatility:.2f}, Sentiment: {sentiment:.2f}, " +
-                      f"Prediction: {prediction_score:.2f}, APR Change: {apr_change_norm:.2f}, " +
-                      f"Price Change: {price_change_24h:.2f}")
-        
-        return features
+        Returns:
+            Dictionary mapping pool IDs to prediction scores (0-100)
+        """
+        scores = {}
+        try:
+            for prediction in get_predictions(min_score=0.0, limit=limit):
+                score = prediction.get("prediction_score", prediction.get("score"))
+                if prediction.get("pool_id") and score is not None:
+                    scores[str(prediction["pool_id"])] = float(score)
+        except Exception as e:
+            logger.error(f"Error getting pool predictions: {e}")
+        return scores
+    
+    def _fill_missing_inputs(self, pools: List[Dict[str, Any]], statistics: Dict[str, Dict[str, Any]],
+                             predictions: Dict[str, float], feature_store: Any) -> None:
+        """
+        Fill feature inputs the pool list omits without a pool detail request per pool.
+        
+        Volatility and 7-day APR change come from the snapshot statistics, and
+        the prediction score from the batched predictions, or else from the
+        pool's previous feature row; inputs still missing fall back to the
+        neutral defaults of compute_features.
+        
+        Args:
+            pools: Pool data dictionaries, updated in place
+            statistics: Snapshot statistics by pool ID
+            predictions: Prediction scores by pool ID
+            feature_store: Store holding the pools' previous feature rows
+        """
+        prediction = FEATURE_NAMES.index("prediction")
+        for pool in pools:
+            pool_stats = statistics.get(str(pool["id"]))
+            if pool_stats:
+                if pool.get("volatility") is None and pool_stats["volatility"] is not None:
+                    pool["volatility"] = pool_stats["volatility"]
+                if pool.get("apr_change_7d") is None and pool_stats["apr_change_7d"] is not None:
+                    pool["apr_change_7d"] = pool_stats["apr_change_7d"]
+            
+            if "prediction_score" not in pool:
+                if str(pool["id"]) in predictions:
+                    pool["prediction_score"] = predictions[str(pool["id"])]
+                else:
+                    previous = feature_store.get(pool["id"])
+                    if previous is not None:
+                        pool["prediction_score"] = float(previous[prediction]) * 100
     
     def _calculate_reward(self, 
                         pool_data: Dict[str, Any], 
@@ -350,12 +361,8 @@ class RLInvestmentAdvisor:
             
         weights = RISK_PROFILE_WEIGHTS[risk_profile]
         
-        # Get sentiment and price data
-        sentiments = get_sentiment_simple()
-        prices = get_prices_latest()
-        
-        # Extract features
-        features = self._extract_features(pool_data, sentiments, prices)
+        # Get features (reuses the stored vector for the current snapshot)
+        features = self._get_features(pool_data)
         
         # Calculate weighted feature score (only use the first 6 features that match original weights)
         feature_score = (
@@ -458,38 +465,52 @@ class RLInvestmentAdvisor:
             except Exception as e:
                 logger.error(f"Error processing sentiment data: {e}")
             
-            # Extract features for each pool
-            pool_features = []
+            # Record the pools and estimate volatility and APR trends locally for all of them,
+            # without publishing them as displayed market data
+            statistics = {}
+            version = get_snapshot_version()
+            try:
+                statistics = record_pools(pools)
+            except Exception as e:
+                logger.error(f"Error estimating local pool statistics: {e}")
+            
+            # Skip duplicates by ID
+            candidates = {}
             for pool in pools:
-                # Skip duplicates by ID
-                if any(p["pool_id"] == pool.get("id") for p in pool_features):
-                    continue
-                
-                # Get detailed pool data if needed - non-async call
-                if "volatility" not in pool or "prediction_score" not in pool:
-                    try:
-                        detailed_pool = get_pool_detail(pool["id"])
-                        if detailed_pool:
-                            # Merge detailed data with pool data
-                            pool.update(detailed_pool)
-                    except Exception as e:
-                        logger.error(f"Error getting pool detail: {e}")
-                
-                # Extract features using real data
-                features = self._extract_features(pool, sentiments, prices)
+                if pool.get("id") and pool["id"] not in candidates:
+                    candidates[pool["id"]] = pool
+            
+            # Only pools without fresh features for this snapshot need to be enriched and recomputed
+            feature_store = get_feature_store()
+            stale_pools = [candidates[pool_id] for pool_id in feature_store.stale_ids(list(candidates), version)]
+            predictions = {}
+            if any("prediction_score" not in pool for pool in stale_pools):
+                predictions = self._get_prediction_scores(len(candidates))
+            self._fill_missing_inputs(stale_pools, statistics, predictions, feature_store)
+            feature_store.update(stale_pools, sentiments, prices, version)
+            if stale_pools:
+                logger.info(f"Computed features for {len(stale_pools)} of {len(candidates)} pools")
+            
+            # Read each pool's feature vector from the store
+            pool_features = []
+            for pool_id, pool in candidates.items():
+                features = feature_store.get(pool_id)
                 
                 # Skip invalid pools
-                if np.isnan(features).any():
+                if features is None or np.isnan(features).any():
                     continue
                 
                 # Add to feature list
                 pool_features.append({
-                    "pool_id": pool.get("id", ""),
+                    "pool_id": pool_id,
                     "pair": f"{pool.get('token1_symbol', '')}/{pool.get('token2_symbol', '')}",
                     "features": features,
                     "raw_data": pool
                 })
             
+            # Expected impermanent loss for all candidate pools in one vectorized pass
+            il_risks = impermanent_loss_risk([pool["raw_data"] for pool in pool_features])
+            
             # Use RL model to rank pools
             ranked_pools = []
             
@@ -510,6 +531,11 @@ class RLInvestmentAdvisor:
                     state[5] * weights["prediction"]   # Prediction
                 )
                 
+                # Penalize expected impermanent loss (normalized to 0-1)
+                il_risk = il_risks.get(pool["pool_id"])
+                if il_risk is not None:
+                    score += min(il_risk / MAX_IMPERMANENT_LOSS_RISK, 1.0) * weights["impermanent_loss"]
+                
                 # Add token preference bonus
                 if token_preference:
                     token1 = pool["raw_data"].get("token1_symbol", "")
@@ -532,6 +558,9 @@ class RLInvestmentAdvisor:
                 if state[3] < 0.1:  # Low volatility
                     reasons.append(f"Low price volatility")
                     
+                if il_risk is not None and il_risk < 0.001:  # Expected IL under 0.1%
+                    reasons.append(f"Low impermanent loss risk")
+                    
                 if state[4] > 0.7:  # Positive sentiment
                     reasons.append(f"Positive market sentiment")
                     
@@ -551,6 +580,7 @@ class RLInvestmentAdvisor:
                     "tvl": pool["raw_data"].get("liquidity", 0),
                     "score": score,
                     "confidence": confidence,
+                    "impermanent_loss_risk": il_risk,
                     "reasons": reasons,
                     "raw_data": pool["raw_data"]
                 })
@@ -570,6 +600,7 @@ class RLInvestmentAdvisor:
                     "tvl": pool["tvl"],
                     "score": pool["score"],
                     "confidence": pool["confidence"],
+                    "impermanent_loss_risk": pool["impermanent_loss_risk"],
                     "reasons": pool["reasons"]
                 })
             
@@ -634,12 +665,9 @@ class RLInvestmentAdvisor:
                 logger.error(f"Could not get pool details for {pool_id}")
                 return
             
-            # Get sentiment and price data - non-async calls
-            sentiments = get_sentiment_simple()
-            prices = get_prices_latest()
-            
             # Record initial state
-            initial_state = self._extract_features(pool_details, sentiments, prices)
+            pool_details.setdefault("id", pool_id)
+            initial_state = self._get_features(pool_details)
             
             # Store investment record
             investment_id = f"{user_id}_{pool_id}_{int(time.time())}"
@@ -686,12 +714,9 @@ class RLInvestmentAdvisor:
                     # Calculate days held
                     days_held = (time.time() - investment["start_time"]) / (60 * 60 * 24)
                     
-                    # Get sentiment and price data - non-async calls
-                    sentiments = get_sentiment_simple()
-                    prices = get_prices_latest()
-                    
-                    # Extract features for current state
-                    current_state = self._extract_features(pool_details, sentiments, prices)
+                    # Get features for current state
+                    pool_details.setdefault("id", pool_id)
+                    current_state = self._get_features(pool_details)
                     
                     # Calculate reward
                     # If exit_amount provided, use actual return
@@ -738,8 +763,15 @@ class RLInvestmentAdvisor:
         except Exception as e:
             logger.error(f"Error processing investment feedback: {e}")
             
-# Create a singleton instance
-rl_advisor = RLInvestmentAdvisor()
+# Singleton instance, created on first use (it loads the replay memory from disk)
+rl_advisor: Optional[RLInvestmentAdvisor] = None
+
+def get_rl_advisor() -> RLInvestmentAdvisor:
+    """Get the singleton RLInvestmentAdvisor instance."""
+    global rl_advisor
+    if rl_advisor is None:
+        rl_advisor = RLInvestmentAdvisor()
+    return rl_advisor
 
 def get_rl_recommendations(
     investment_amount: float,
@@ -759,8 +791,7 @@ def get_rl_recommendations(
     Returns:
         Dictionary with recommendations, explanations, and data sources
     """
-    global rl_advisor
-    return rl_advisor.get_recommendations(
+    return get_rl_advisor().get_recommendations(
         investment_amount, risk_profile, token_preference, max_suggestions
     )
 
@@ -774,8 +805,7 @@ def record_smart_investment(user_id: int, pool_id: str, investment_amount: float
         investment_amount: Amount invested
         risk_profile: User's risk profile
     """
-    global rl_advisor
-    rl_advisor.record_investment(user_id, pool_id, investment_amount, risk_profile)
+    get_rl_advisor().record_investment(user_id, pool_id, investment_amount, risk_profile)
     
 def feedback_smart_investment(user_id: int, pool_id: str, rating: int, exit_amount: Optional[float] = None):
     """
@@ -787,8 +817,7 @@ def feedback_smart_investment(user_id: int, pool_id: str, rating: int, exit_amou
         rating: User rating (1-5) of how good the investment was
         exit_amount: Optional amount received upon exit
     """
-    global rl_advisor
-    rl_advisor.feedback_investment(user_id, pool_id, rating, exit_amount)
+    get_rl_advisor().feedback_investment(user_id, pool_id, rating, exit_amount)
 
 # Simple test function
 def test_rl_recommendations():
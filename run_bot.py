@@ -10,10 +10,12 @@ import os
 import sys
 import time
 import logging
-import requests
-import threading
 import traceback
-from bot import create_application
+from startup import phase
+
+with phase("import"):
+    from bot import create_application
+    from webhook_server import run_application, ALLOWED_UPDATES
 
 # Configure logging
 logging.basicConfig(
@@ -30,46 +32,6 @@ logger = logging.getLogger(__name__)
 if not os.path.exists('logs'):
     os.makedirs('logs')
 
-def check_and_clear_webhooks():
-    """Delete any existing webhooks and clear pending updates"""
-    try:
-        token = os.environ.get("TELEGRAM_BOT_TOKEN")
-        if not token:
-            token = os.environ.get("TELEGRAM_TOKEN")
-            
-        if not token:
-            logger.error("No Telegram token found in environment variables")
-            return False
-            
-        # Delete webhook
-        webhook_url = f"https://api.telegram.org/bot{token}/deleteWebhook?drop_pending_updates=true"
-        response = requests.get(webhook_url)
-        logger.info(f"Webhook deletion result: {response.json()}")
-        
-        # Clear updates
-        clear_url = f"https://api.telegram.org/bot{token}/getUpdates"
-        params = {"offset": -1, "timeout": 1}
-        response = requests.get(clear_url, params=params)
-        logger.info(f"Update clearing result: {response.json()}")
-        
-        return True
-    except Exception as e:
-        logger.error(f"Error clearing webhooks: {e}")
-        return False
-
-def keep_alive_thread():
-    """Thread to periodically ping database to prevent connection idle timeout"""
-    from db_utils import ping_database
-    
-    while True:
-        try:
-            success, result = ping_database()
-            logger.info(f"Keep-alive database ping: {success}, result={result}")
-        except Exception as e:
-            logger.error(f"Error in keep-alive ping: {e}")
-        
-        time.sleep(60)  # Ping every minute
-
 def run_bot_with_recovery():
     """Run the bot with automatic recovery from crashes"""
     max_retries = 5
@@ -77,20 +39,15 @@ def run_bot_with_recovery():
     
     while retry_count < max_retries:
         try:
-            # Clear webhooks before starting
-            if not check_and_clear_webhooks():
-                logger.error("Failed to clear webhooks, waiting before retry")
-                time.sleep(10)
-                retry_count += 1
-                continue
-                
             # Create and start the bot
             logger.info("Starting Telegram bot...")
-            bot_app = create_application()
+            with phase("create_application"):
+                bot_app = create_application()
             
-            # Run the bot
-            bot_app.run_polling(
-                allowed_updates=["message", "callback_query"],
+            # Run the bot by webhook or polling as configured; either replaces the other's setup
+            run_application(
+                bot_app,
+                allowed_updates=ALLOWED_UPDATES,
                 close_loop=False,
                 drop_pending_updates=True,
                 stop_signals=None  # Handle signals manually
@@ -120,12 +77,6 @@ def run_bot_with_recovery():
 def main():
     """Main entry point with proper error handling"""
     try:
-        # Start keep-alive thread
-        alive_thread = threading.Thread(target=keep_alive_thread)
-        alive_thread.daemon = True
-        alive_thread.start()
-        logger.info("Keep-alive thread started")
-        
         # Run the bot with recovery
         success = run_bot_with_recovery()
         if not success:
@@ -16,6 +16,8 @@ from functools import wraps
 from telegram import Update
 from telegram.ext import ContextTypes
 import db_utils
+from log_writer import get_log_writer, USER_SPAM_SCORES
+from user_state import UserStateStore
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -37,6 +39,9 @@ SPAM_TRIGGERS = [
     (r'\b(crypto|token|coin|ico|airdrop|free|money|profit|invest|earn|mining)\b', 0.5),  # Common crypto spam words
 ]
 
+# Seconds a locally stored verification code stays valid
+VERIFICATION_CODE_TTL = 3600  # 1 hour
+
 # URL blocklist patterns
 SUSPICIOUS_URL_PATTERNS = [
     r'bit\.ly',
@@ -51,11 +56,39 @@ SUSPICIOUS_URL_PATTERNS = [
 ]
 
 class RateLimiter:
-    """Rate limiter for messages and commands."""
+    """
+    Sliding-window rate limiter for messages and commands.
+    
+    Each user keeps only the counts of the current and previous fixed window;
+    the previous count is weighted by how much of it still overlaps the
+    sliding window. Memory per user is constant and each check is O(1).
+    """
     
     def __init__(self):
-        self.user_message_counts: Dict[int, List[float]] = {}  # user_id -> list of message timestamps
-        self.user_command_counts: Dict[int, List[float]] = {}  # user_id -> list of command timestamps
+        # user_id -> [window_start, count, previous_count]; counts older than
+        # the previous window no longer matter, so idle users are forgotten after two windows
+        self.user_message_counts = UserStateStore("rate_limit_messages", 2 * RATE_LIMIT_RESET_TIME)
+        self.user_command_counts = UserStateStore("rate_limit_commands", 2 * RATE_LIMIT_RESET_TIME)
+    
+    @staticmethod
+    def _allow(counts: UserStateStore, user_id: int, limit: int, current_time: float) -> bool:
+        """Count an event in the user's window if the sliding-window estimate is below the limit."""
+        window_start = current_time - current_time % RATE_LIMIT_RESET_TIME
+        window = counts.get(user_id)
+        
+        if window is None:
+            window = counts[user_id] = [window_start, 0, 0]
+        elif window[0] != window_start:
+            # Roll over: the old current window becomes the previous one if it is adjacent
+            previous = window[1] if window_start - window[0] == RATE_LIMIT_RESET_TIME else 0
+            window[0], window[1], window[2] = window_start, 0, previous
+        
+        overlap = 1 - (current_time - window_start) / RATE_LIMIT_RESET_TIME
+        if window[2] * overlap + window[1] >= limit:
+            return False
+        
+        window[1] += 1
+        return True
     
     def check_rate_limit(self, user_id: int, is_command: bool = False) -> bool:
         """
@@ -72,49 +105,82 @@ class RateLimiter:
         
         if is_command:
             # Handle command rate limiting
-            if user_id not in self.user_command_counts:
-                self.user_command_counts[user_id] = []
-            
-            # Remove timestamps older than the reset time
-            self.user_command_counts[user_id] = [
-                t for t in self.user_command_counts[user_id]
-                if current_time - t < RATE_LIMIT_RESET_TIME
-            ]
-            
-            # Check if command count exceeds limit
-            if len(self.user_command_counts[user_id]) >= MAX_COMMANDS_PER_MINUTE:
-                return False
-            
-            # Add current timestamp
-            self.user_command_counts[user_id].append(current_time)
-        else:
-            # Handle message rate limiting
-            if user_id not in self.user_message_counts:
-                self.user_message_counts[user_id] = []
-            
-            # Remove timestamps older than the reset time
-            self.user_message_counts[user_id] = [
-                t for t in self.user_message_counts[user_id]
-                if current_time - t < RATE_LIMIT_RESET_TIME
-            ]
-            
-            # Check if message count exceeds limit
-            if len(self.user_message_counts[user_id]) >= MAX_MESSAGES_PER_MINUTE:
-                return False
-            
-            # Add current timestamp
-            self.user_message_counts[user_id].append(current_time)
+            return self._allow(self.user_command_counts, user_id, MAX_COMMANDS_PER_MINUTE, current_time)
         
-        return True
+        # Handle message rate limiting
+        return self._allow(self.user_message_counts, user_id, MAX_MESSAGES_PER_MINUTE, current_time)
+
+
+def _combine_triggers(triggers: List[Tuple[str, float]]) -> "re.Pattern":
+    """
+    Combine the spam triggers into one pattern scanned in a single pass.
+    
+    Each trigger becomes a named lookahead group ``t<index>`` so that all
+    triggers are tried at every position and may overlap each other. The
+    final conditional only lets positions where some trigger matched through.
+    
+    Args:
+        triggers: (pattern, score) pairs
+        
+    Returns:
+        Compiled combined pattern
+    """
+    parts = []
+    offset = 0
+    for index, (pattern, _) in enumerate(triggers):
+        # Renumber backreferences past the groups of the earlier triggers
+        shifted = re.sub(r'\\(\d+)', lambda match: '\\%d' % (int(match.group(1)) + offset + 1), pattern)
+        parts.append(f'(?:(?=(?P<t{index}>{shifted}))|)')
+        offset += 1 + re.compile(pattern).groups
+    
+    any_matched = '(?!)'
+    for index in reversed(range(len(triggers))):
+        any_matched = f'(?(t{index})|{any_matched})'
+    
+    return re.compile(''.join(parts) + any_matched, re.IGNORECASE)
+
 
 class SpamDetector:
     """Detector for spam messages."""
     
     def __init__(self):
-        self.user_spam_scores: Dict[int, Dict[str, Any]] = {}  # user_id -> {score, last_reset}
+        # A score idle for a whole reset interval would be reset anyway
+        self.user_spam_scores = UserStateStore("spam_scores", SPAM_RESET_INTERVAL)  # user_id -> {score, last_reset}
         
-        # Compile regex patterns for performance
-        self.patterns = [(re.compile(pattern, re.IGNORECASE), score) for pattern, score in SPAM_TRIGGERS]
+        # Compile all triggers into one pattern for performance
+        self.pattern = _combine_triggers(SPAM_TRIGGERS)
+        self.scores = [score for _, score in SPAM_TRIGGERS]
+    
+    def score_message(self, message_text: str) -> float:
+        """
+        Score a single message against the spam triggers.
+        
+        Each trigger adds its score for every match, independently of the
+        other triggers, so e.g. a URL also counts its path as a command.
+        
+        Args:
+            message_text: Message text to score
+            
+        Returns:
+            Spam score of the message
+        """
+        message_score = 0.0
+        
+        # Count non-overlapping matches per trigger, like a findall per pattern
+        match_ends = [0] * len(self.scores)
+        for match in self.pattern.finditer(message_text):
+            start = match.start()
+            for index, score in enumerate(self.scores):
+                end = match.end(f't{index}')
+                if end >= 0 and start >= match_ends[index]:
+                    message_score += score
+                    match_ends[index] = end
+        
+        # Check message length
+        if len(message_text) > 500:
+            message_score += 2.0
+        
+        return message_score
     
     def check_message(self, user_id: int, message_text: str) -> Tuple[bool, float]:
         """
@@ -143,17 +209,7 @@ class SpamDetector:
             }
         
         # Calculate message spam score
-        message_score = 0.0
-        
-        # Check message against regex patterns
-        for pattern, score in self.patterns:
-            matches = pattern.findall(message_text)
-            if matches:
-                message_score += score * len(matches)
-        
-        # Check message length
-        if len(message_text) > 500:
-            message_score += 2.0
+        message_score = self.score_message(message_text)
         
         # Update user's spam score
         self.user_spam_scores[user_id]['score'] += message_score
@@ -161,13 +217,12 @@ class SpamDetector:
         # Check if user's spam score exceeds threshold
         is_spam = self.user_spam_scores[user_id]['score'] >= SPAM_SCORE_THRESHOLD
         
-        # Update user's spam score in the database
-        try:
-            user = db_utils.get_or_create_user(user_id)
-            user.spam_score = self.user_spam_scores[user_id]['score']
-            db_utils.db.session.commit()
-        except Exception as e:
-            logger.error(f"Error updating user spam score: {e}")
+        # Store the user's spam score in the background; only changes need writing
+        if message_score:
+            get_log_writer().enqueue(USER_SPAM_SCORES, {
+                "user_id": user_id,
+                "spam_score": self.user_spam_scores[user_id]['score']
+            })
         
         return is_spam, message_score
 
@@ -232,7 +287,7 @@ class UserVerification:
     """System for verifying users."""
     
     def __init__(self):
-        self.pending_verifications: Dict[int, Dict[str, Any]] = {}  # user_id -> {code, expiry}
+        self.pending_verifications = UserStateStore("pending_verifications", VERIFICATION_CODE_TTL)  # user_id -> {code, expiry}
     
     def generate_verification_code(self, user_id: int) -> str:
         """
@@ -248,7 +303,7 @@ class UserVerification:
         code = db_utils.generate_verification_code(user_id)
         
         # Also store locally with expiry
-        expiry = time.time() + 3600  # 1 hour expiry
+        expiry = time.time() + VERIFICATION_CODE_TTL
         self.pending_verifications[user_id] = {
             'code': code,
             'expiry': expiry
@@ -0,0 +1,308 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Sharded bot runner for FiLot Telegram bot
+Runs the bot as several worker processes behind one webhook ingress. The
+ingress hashes each update's user ID to a worker, so every worker owns the
+in-memory state of its users; state all workers need goes through the
+shared store (see shared_store.py)
+
+Usage:
+    WEBHOOK_URL=https://bot.example.com python sharding.py --workers 4
+"""
+
+import os
+import sys
+import hmac
+import secrets
+import asyncio
+import logging
+import argparse
+import subprocess
+from typing import Dict, Any, List, Optional
+
+from aiohttp import web, ClientSession, ClientTimeout
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Number of worker processes and the index of this one (set by the launcher)
+SHARD_COUNT = int(os.environ.get("SHARD_COUNT", "1"))
+SHARD_INDEX = int(os.environ.get("SHARD_INDEX", "0"))
+
+# Worker i listens on 127.0.0.1:SHARD_BASE_PORT + i
+SHARD_BASE_PORT = int(os.environ.get("SHARD_BASE_PORT", "9100"))
+
+# Secret the ingress sends to workers (generated by the launcher)
+SHARD_SECRET = os.environ.get("SHARD_SECRET", "")
+
+# Shared store used by workers when none is configured
+DEFAULT_SHARED_STORE_URL = "sqlite:////tmp/filot_shared_store.db"
+
+# Seconds the ingress waits for a worker to accept an update
+FORWARD_TIMEOUT = 10
+
+# Seconds between checks for exited workers
+WORKER_CHECK_INTERVAL = 5
+
+# Keys of the state stored on the ingress app
+WORKERS_KEY = web.AppKey("workers", List[str])
+SECRET_KEY = web.AppKey("secret", str)
+WORKER_SECRET_KEY = web.AppKey("worker_secret", str)
+METRICS_KEY = web.AppKey("metrics", Dict[str, Any])
+SESSION_KEY = web.AppKey("session", ClientSession)
+
+
+def jump_hash(key: int, buckets: int) -> int:
+    """
+    Jump consistent hash: map a key to one of buckets.
+
+    Changing the number of buckets from n to n + 1 moves only 1/(n + 1) of
+    the keys, so adding a worker keeps most users on their current worker.
+
+    Args:
+        key: Non-negative integer key
+        buckets: Number of buckets
+
+    Returns:
+        Bucket index in [0, buckets)
+    """
+    key &= 0xFFFFFFFFFFFFFFFF
+    bucket, candidate = -1, 0
+    while candidate < buckets:
+        bucket = candidate
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        candidate = int((bucket + 1) * (float(1 << 31) / float((key >> 33) + 1)))
+    return bucket
+
+
+def shard_for(user_id: int, shards: int = SHARD_COUNT) -> int:
+    """Get the worker index owning a user (or chat) ID."""
+    return jump_hash(abs(user_id), shards) if shards > 1 else 0
+
+
+def is_sharded() -> bool:
+    """Whether this process is one of several bot workers."""
+    return SHARD_COUNT > 1
+
+
+def owns_user(user_id: int) -> bool:
+    """
+    Check whether this process handles a user's updates and alerts.
+
+    Args:
+        user_id: Telegram user ID
+
+    Returns:
+        True unless the bot is sharded and the user belongs to another worker
+    """
+    return shard_for(user_id) == SHARD_INDEX
+
+
+def routing_key(update: Dict[str, Any]) -> Optional[int]:
+    """
+    Get the ID an update is routed by from its raw JSON.
+
+    Uses the sender's user ID (as the update scheduler orders by user), or
+    the chat ID for updates without a sender.
+
+    Args:
+        update: Update dictionary as posted by Telegram
+
+    Returns:
+        User or chat ID, or None if the update has neither
+    """
+    for field, value in update.items():
+        if field == "update_id" or not isinstance(value, dict):
+            continue
+        sender = value.get("from") or value.get("user")
+        if isinstance(sender, dict) and "id" in sender:
+            return sender["id"]
+        chat = value.get("chat") or (value.get("message") or {}).get("chat")
+        if isinstance(chat, dict) and "id" in chat:
+            return chat["id"]
+    return None
+
+
+async def handle_ingress(request: web.Request) -> web.Response:
+    """Verify a webhook POST from Telegram and forward it to the owning worker."""
+    # Import at function level to avoid circular imports
+    from webhook_server import SECRET_HEADER
+
+    app = request.app
+    metrics = app[METRICS_KEY]
+    if app[SECRET_KEY] and not hmac.compare_digest(request.headers.get(SECRET_HEADER, ""), app[SECRET_KEY]):
+        metrics["rejected"] += 1
+        return web.Response(status=403)
+
+    try:
+        update = await request.json()
+        key = routing_key(update)
+    except Exception as e:
+        metrics["invalid"] += 1
+        logger.error(f"Invalid webhook update: {e}")
+        return web.Response(status=400)
+
+    shard = shard_for(key, len(app[WORKERS_KEY])) if key is not None else 0
+    headers = {SECRET_HEADER: app[WORKER_SECRET_KEY]} if app[WORKER_SECRET_KEY] else {}
+    try:
+        async with app[SESSION_KEY].post(app[WORKERS_KEY][shard], json=update, headers=headers) as response:
+            status = response.status
+    except Exception as e:
+        status = None
+        logger.error(f"Error forwarding update to worker {shard}: {e}")
+
+    if status != 200:
+        # Telegram retries updates not answered with 200
+        metrics["failed"][shard] += 1
+        return web.Response(status=503)
+    metrics["forwarded"][shard] += 1
+    return web.Response()
+
+
+def create_ingress_app(workers: List[str], secret: str = "", worker_secret: str = "",
+                       path: str = "/telegram") -> web.Application:
+    """
+    Create the ingress web application.
+
+    Args:
+        workers: Webhook URL of each worker, by shard index
+        secret: Secret token expected from Telegram (checking is skipped if empty)
+        worker_secret: Secret token sent to the workers
+        path: Path the webhook is served on
+
+    Returns:
+        aiohttp Application serving POST <path>
+    """
+    app = web.Application()
+    app[WORKERS_KEY] = workers
+    app[SECRET_KEY] = secret
+    app[WORKER_SECRET_KEY] = worker_secret
+    app[METRICS_KEY] = {
+        "forwarded": [0] * len(workers),
+        "failed": [0] * len(workers),
+        "rejected": 0,
+        "invalid": 0,
+    }
+
+    async def open_session(app: web.Application) -> None:
+        app[SESSION_KEY] = ClientSession(timeout=ClientTimeout(total=FORWARD_TIMEOUT))
+
+    async def close_session(app: web.Application) -> None:
+        await app[SESSION_KEY].close()
+
+    app.on_startup.append(open_session)
+    app.on_cleanup.append(close_session)
+    app.router.add_post(path, handle_ingress)
+    return app
+
+
+def worker_url(index: int, path: str) -> str:
+    """Local webhook URL of a worker."""
+    return f"http://127.0.0.1:{SHARD_BASE_PORT + index}{path}"
+
+
+def run_worker() -> None:
+    """Run this process as worker SHARD_INDEX, receiving updates from the ingress."""
+    # Import at function level so the ingress does not load the bot
+    from bot import create_application
+    from webhook_server import serve_webhook
+
+    logger.info(f"Starting bot worker {SHARD_INDEX + 1}/{SHARD_COUNT}")
+    asyncio.run(serve_webhook(
+        create_application(),
+        url=None,
+        secret=SHARD_SECRET,
+        listen="127.0.0.1",
+        port=SHARD_BASE_PORT + SHARD_INDEX,
+    ))
+
+
+def start_worker(index: int, count: int, worker_secret: str) -> subprocess.Popen:
+    """Start worker process index of count."""
+    env = dict(os.environ)
+    env.update({
+        "SHARD_INDEX": str(index),
+        "SHARD_COUNT": str(count),
+        "SHARD_SECRET": worker_secret,
+        "SHARED_STORE_URL": os.environ.get("SHARED_STORE_URL", DEFAULT_SHARED_STORE_URL),
+        # Workers share AI answers through the database instead of each asking the AI again
+        "ANSWER_CACHE_PERSIST": os.environ.get("ANSWER_CACHE_PERSIST", "true"),
+    })
+    return subprocess.Popen([sys.executable, os.path.abspath(__file__), "--worker"], env=env)
+
+
+async def run_ingress(count: int) -> None:
+    """
+    Start count workers and the ingress, and restart workers that exit.
+
+    Args:
+        count: Number of worker processes
+    """
+    # Import at function level to avoid circular imports
+    from telegram import Bot
+    from webhook_server import (
+        WEBHOOK_URL, WEBHOOK_SECRET, WEBHOOK_PATH, WEBHOOK_LISTEN, WEBHOOK_PORT, ALLOWED_UPDATES
+    )
+
+    if not WEBHOOK_URL:
+        raise ValueError("WEBHOOK_URL must be set for the sharded bot")
+    token = os.environ.get("TELEGRAM_TOKEN") or os.environ.get("TELEGRAM_BOT_TOKEN")
+    if not token:
+        raise ValueError("Telegram bot token not found")
+
+    worker_secret = secrets.token_hex(16)
+    workers = [start_worker(i, count, worker_secret) for i in range(count)]
+    app = create_ingress_app([worker_url(i, WEBHOOK_PATH) for i in range(count)],
+                             WEBHOOK_SECRET, worker_secret, WEBHOOK_PATH)
+    runner = web.AppRunner(app)
+    try:
+        await runner.setup()
+        await web.TCPSite(runner, WEBHOOK_LISTEN, WEBHOOK_PORT).start()
+        async with Bot(token) as bot:
+            await bot.set_webhook(url=WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH,
+                                  secret_token=WEBHOOK_SECRET or None,
+                                  allowed_updates=ALLOWED_UPDATES)
+        logger.info(f"Ingress listening on {WEBHOOK_LISTEN}:{WEBHOOK_PORT}, routing to {count} workers")
+
+        while True:
+            await asyncio.sleep(WORKER_CHECK_INTERVAL)
+            for i, process in enumerate(workers):
+                if process.poll() is not None:
+                    logger.error(f"Worker {i} exited with code {process.returncode}, restarting")
+                    workers[i] = start_worker(i, count, worker_secret)
+            logger.debug(f"Ingress metrics: {app[METRICS_KEY]}")
+    finally:
+        await runner.cleanup()
+        for process in workers:
+            process.terminate()
+        for process in workers:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def main():
+    """Run the ingress with its workers, or a single worker when started by the ingress."""
+    logging.basicConfig(
+        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+        level=logging.INFO
+    )
+    parser = argparse.ArgumentParser(description="Run the bot as sharded worker processes")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of worker processes")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker()
+    else:
+        try:
+            asyncio.run(run_ingress(args.workers))
+        except KeyboardInterrupt:
+            logger.info("Sharded bot stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Shared key-value store for FiLot Telegram bot
+Holds state that every bot worker must see (e.g. recently fetched pool data)
+when the bot runs as several sharded processes; an in-process store is used
+when there is a single process, and an SQLite file stands in for a networked
+store on one machine
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Dict, Any, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Store location: "memory://" (single process) or "sqlite:////path/to/file.db"
+SHARED_STORE_URL = os.environ.get("SHARED_STORE_URL", "memory://")
+
+# Seconds an SQLite writer waits for another process's lock
+SQLITE_BUSY_TIMEOUT = 5.0
+
+
+class MemoryStore:
+    """Shared store for a single process: a dictionary with expiry times."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[Any, Optional[float]]] = {}
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Get a value.
+
+        Args:
+            key: Key
+
+        Returns:
+            The stored value, or None if missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store a value.
+
+        Args:
+            key: Key
+            value: JSON-serializable value
+            ttl: Seconds until the value expires (never if None)
+        """
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl if ttl else None)
+
+    def delete(self, key: str) -> None:
+        """Remove a value."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class SQLiteStore:
+    """
+    Shared store for several processes on one machine, kept in an SQLite file.
+
+    Values are stored as JSON. Each thread uses its own connection; WAL mode
+    lets readers proceed while another process writes.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the store, creating the file and table if needed.
+
+        Args:
+            path: Database file path
+        """
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS shared_store "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get this thread's connection."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=SQLITE_BUSY_TIMEOUT)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Get a value.
+
+        Args:
+            key: Key
+
+        Returns:
+            The stored value, or None if missing or expired
+        """
+        row = self._connection().execute(
+            "SELECT value FROM shared_store WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store a value.
+
+        Args:
+            key: Key
+            value: JSON-serializable value
+            ttl: Seconds until the value expires (never if None)
+        """
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO shared_store (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + ttl if ttl else None)
+            )
+
+    def delete(self, key: str) -> None:
+        """Remove a value."""
+        with self._connection() as connection:
+            connection.execute("DELETE FROM shared_store WHERE key = ?", (key,))
+
+
+def create_shared_store(url: str = SHARED_STORE_URL):
+    """
+    Create a store from a URL.
+
+    Args:
+        url: "memory://" or "sqlite:///<path>"
+
+    Returns:
+        MemoryStore or SQLiteStore
+    """
+    if url.startswith("sqlite:///"):
+        return SQLiteStore(url[len("sqlite:///"):])
+    if url not in ("", "memory://"):
+        logger.warning(f"Unsupported shared store URL {url}, using an in-process store")
+    return MemoryStore()
+
+
+# Singleton store
+_shared_store = None
+
+
+def get_shared_store():
+    """Get the singleton shared store configured by SHARED_STORE_URL."""
+    global _shared_store
+    if _shared_store is None:
+        _shared_store = create_shared_store()
+    return _shared_store
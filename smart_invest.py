@@ -16,7 +16,6 @@ from typing import Dict, List, Any, Optional, Union, Tuple
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler
 
-import rl_investment_advisor
 import db_utils
 from models import User, db
 from utils import format_number, escape_markdown
@@ -297,6 +296,9 @@ async def handle_token_preference(update: Update, context: ContextTypes.DEFAULT_
 
 async def handle_confirmation(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Process the confirmation and provide smart investment recommendations"""
+    # Import at function level so start-up does not load the advisors
+    import rl_investment_advisor
+    
     try:
         query = update.callback_query
         if not query:
@@ -442,6 +444,9 @@ async def handle_confirmation(update: Update, context: ContextTypes.DEFAULT_TYPE
 
 async def handle_feedback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle user feedback on the recommendations"""
+    # Import at function level so start-up does not load the advisors
+    import rl_investment_advisor
+    
     try:
         query = update.callback_query
         if not query:
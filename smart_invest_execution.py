@@ -17,12 +17,6 @@ from telegram.ext import (
     MessageHandler, filters, CallbackQueryHandler
 )
 
-from wallet_actions import (
-    get_wallet_status, connect_wallet, disconnect_wallet,
-    initiate_wallet_connection, check_connection_status,
-    execute_investment, check_transaction_status,
-    WalletConnectionStatus
-)
 from solpool_api_client import get_pool_detail, simulate_investment
 from models import User, db
 
@@ -47,6 +41,9 @@ async def start_investment(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     
     This is triggered by the "Invest Now" button on pool details
     """
+    # Import at function level so start-up does not load the wallet modules
+    from wallet_actions import get_wallet_status, WalletConnectionStatus
+    
     query = update.callback_query
     if not query:
         return ConversationHandler.END
@@ -192,6 +189,9 @@ async def handle_amount_input(update: Update, context: ContextTypes.DEFAULT_TYPE
     """
     Handle custom investment amount input from user
     """
+    # Import at function level so start-up does not load the wallet modules
+    from wallet_actions import get_wallet_status
+    
     user_id = update.effective_user.id if update.effective_user else 0
     
     # Get the amount from the message text
@@ -319,6 +319,9 @@ async def show_investment_confirmation(update: Update, context: ContextTypes.DEF
     """
     Show investment confirmation with simulated returns
     """
+    # Import at function level so start-up does not load the wallet modules
+    from wallet_actions import get_wallet_status
+    
     query = update.callback_query
     if not query:
         return ConversationHandler.END
@@ -394,6 +397,9 @@ async def handle_investment_confirmation(update: Update, context: ContextTypes.D
     """
     Process investment confirmation and execute the transaction
     """
+    # Import at function level so start-up does not load the wallet modules
+    from wallet_actions import get_wallet_status, WalletConnectionStatus
+    
     query = update.callback_query
     if not query:
         return ConversationHandler.END
@@ -494,6 +500,9 @@ async def handle_investment_confirmation(update: Update, context: ContextTypes.D
 
 async def handle_execute_investment(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle the final investment execution after user confirms the transaction details."""
+    # Import at function level so start-up does not load the wallet modules
+    from wallet_actions import get_wallet_status, execute_investment, WalletConnectionStatus
+    
     query = update.callback_query
     await query.answer()
     
@@ -660,6 +669,9 @@ async def handle_check_transaction(update: Update, context: ContextTypes.DEFAULT
     """
     Check the status of a transaction
     """
+    # Import at function level so start-up does not load the wallet modules
+    from wallet_actions import check_transaction_status
+    
     query = update.callback_query
     if not query:
         return ConversationHandler.END
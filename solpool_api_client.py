@@ -390,6 +390,9 @@ def simulate_investment(
     """
     Simulate investment in a specific pool
     
+    The simulation runs locally with investment_simulator, using the pool from
+    the current market snapshot or, if it is not there, the cached pool detail.
+    
     Args:
         pool_id: Pool ID to simulate investment in
         amount: Amount to invest (in USD)
@@ -399,82 +402,21 @@ def simulate_investment(
         Dictionary with simulation results
     """
     try:
-        # Generate cache key
-        sim_cache_key = f"simulation_{pool_id}_{amount}_{days}"
-        
-        if _is_cache_valid(sim_cache_key):
-            # Return cached data
-            return _cache[sim_cache_key]["data"]
+        # Import here to avoid loading NumPy for clients that never simulate
+        from investment_simulator import simulate_pool, simulate_snapshot_pool
         
-        if not _can_make_api_call("simulate"):
-            # Rate limited, return cached data if available
-            if sim_cache_key in _cache:
-                return _cache[sim_cache_key]["data"]
-            else:
-                # Return error indicating we're rate limited
-                logger.warning(f"Rate limited for simulation API: pool_id={pool_id}")
-                return {
-                    "success": False, 
-                    "error": "Rate limited", 
-                    "message": "Too many API calls, please try again later"
-                }
-        
-        # Make API call
-        url = f"{SOLPOOL_API_URL}/simulate"
-        params = {
-            "pool_id": pool_id,
-            "amount": amount,
-            "days": days
-        }
+        # Prefer the market snapshot, which needs no network call
+        simulation = simulate_snapshot_pool(pool_id, amount, days)
+        if simulation:
+            return simulation
         
-        # Use API key if available
-        headers = {}
-        if SOLPOOL_API_KEY:
-            headers["X-API-Key"] = SOLPOOL_API_KEY
-            
-        response = requests.get(url, params=params, headers=headers, timeout=10)
-        
-        # Update call timestamp
-        _update_api_call_timestamp("simulate")
-        
-        if response.status_code == 200:
-            result = response.json()
-            if result.get("status") == "success" and "data" in result:
-                simulation_data = result["data"]
-                _save_to_cache(sim_cache_key, simulation_data)
-                return simulation_data
-        
-        # Log error if API call was unsuccessful
-        if response.status_code != 200:
-            logger.error(f"API error in simulation: {response.status_code}, {response.text}")
-        else:
-            logger.error(f"Unexpected API response format for simulation: {response.text[:100]}...")
-        
-        # Try to get pool data to provide minimal info
+        # Fall back to the (cached) pool detail for pools outside the snapshot
         pool_data = get_pool_detail(pool_id)
         if pool_data:
-            # Return minimal simulation based on current pool APR
-            apr = pool_data.get("apr", 0) or 0
-            daily_rate = apr / 365 / 100
-            final_amount = amount * (1 + daily_rate) ** days
-            profit = final_amount - amount
-            
-            minimal_simulation = {
-                "success": True,
-                "initial_amount": amount,
-                "final_amount": final_amount,
-                "profit": profit,
-                "roi_percent": (profit / amount) * 100 if amount > 0 else 0,
-                "apr_used": apr,
-                "days": days,
-                "pool_id": pool_id,
-                "note": "Limited simulation based on current APR"
-            }
-            
-            _save_to_cache(sim_cache_key, minimal_simulation)
-            return minimal_simulation
+            pool_data.setdefault("id", pool_id)
+            return simulate_pool(pool_data, amount, days)
         
-        # Return error indication
+        logger.warning(f"No pool data available to simulate pool_id={pool_id}")
         return {
             "success": False,
             "error": "Simulation failed",
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Startup instrumentation for FiLot Telegram bot
+Times the phases of starting the bot, runs one-time initialization on first
+use instead of at import, and records the time to the first handled update
+
+Usage:
+    python startup.py                 # import time report for the bot (python -X importtime)
+    python startup.py --module main --top 20
+"""
+
+import os
+import re
+import sys
+import time
+import logging
+import argparse
+import threading
+import functools
+import subprocess
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple, TypeVar
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Fallback process start time when psutil is not available
+_MODULE_LOADED_AT = time.time()
+
+# Line format of python -X importtime: "import time: self | cumulative | module"
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+T = TypeVar("T")
+
+# Startup phase durations in milliseconds, in the order they finished
+_phases: Dict[str, float] = {}
+_first_update_after: Optional[float] = None
+
+
+def process_started_at() -> float:
+    """Unix time this process started."""
+    try:
+        import psutil
+        return psutil.Process(os.getpid()).create_time()
+    except Exception:
+        return _MODULE_LOADED_AT
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """
+    Time a startup phase.
+
+    Args:
+        name: Phase name reported in the metrics
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        _phases[name] = _phases.get(name, 0.0) + elapsed_ms
+        logger.info(f"Startup phase {name}: {elapsed_ms:.0f} ms")
+
+
+def once(func: Callable[[], T]) -> Callable[[], T]:
+    """
+    Make an initialization function run once, on its first call, timed as a startup phase.
+
+    Later calls return the first call's result. If the first call raises,
+    the next call tries again.
+
+    Args:
+        func: Function without arguments
+
+    Returns:
+        Wrapped function
+    """
+    lock = threading.Lock()
+    state: Dict[str, Any] = {}
+
+    @functools.wraps(func)
+    def wrapper() -> T:
+        if "result" not in state:
+            with lock:
+                if "result" not in state:
+                    with phase(func.__name__):
+                        state["result"] = func()
+        return state["result"]
+
+    wrapper.has_run = lambda: "result" in state
+    return wrapper
+
+
+def mark_first_update() -> None:
+    """Record the time from process start to the first handled update (only the first call counts)."""
+    global _first_update_after
+    if _first_update_after is None:
+        _first_update_after = time.time() - process_started_at()
+        logger.info(f"First update handled {_first_update_after:.2f}s after process start")
+
+
+def get_startup_metrics() -> Dict[str, Any]:
+    """
+    Get startup metrics.
+
+    Returns:
+        Dictionary with phase durations (ms) and seconds to the first handled update
+    """
+    return {
+        "phases_ms": {name: round(ms, 1) for name, ms in _phases.items()},
+        "first_update_after_s": round(_first_update_after, 3) if _first_update_after is not None else None,
+    }
+
+
+def importtime_report(module: str = "bot") -> Tuple[float, List[Tuple[str, float, float]]]:
+    """
+    Import a module in a fresh interpreter with -X importtime.
+
+    Args:
+        module: Module to import
+
+    Returns:
+        Tuple of (total import time in ms, list of (module, self ms, cumulative ms)
+        for this project's top-level modules)
+    """
+    project_dir = os.path.dirname(os.path.abspath(__file__))
+    project_modules = {name[:-3] for name in os.listdir(project_dir) if name.endswith(".py")}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=project_dir, capture_output=True, text=True
+    )
+
+    total_ms = 0.0
+    modules = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        if name == module and len(indent) == 1:
+            total_ms = int(cumulative_us) / 1000
+        if name in project_modules:
+            modules.append((name, int(self_us) / 1000, int(cumulative_us) / 1000))
+    if result.returncode != 0:
+        logger.error(f"Importing {module} failed: {result.stderr.strip().splitlines()[-1:]}")
+    return total_ms, modules
+
+
+def main():
+    """Print the import time report for a module."""
+    logging.basicConfig(
+        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+        level=logging.WARNING
+    )
+    parser = argparse.ArgumentParser(description="Report import time of the bot's modules")
+    parser.add_argument("--module", default="bot", help="module to import (default: bot)")
+    parser.add_argument("--top", type=int, default=15, help="number of modules to list")
+    args = parser.parse_args()
+
+    total_ms, modules = importtime_report(args.module)
+    print(f"import {args.module}: {total_ms:.0f} ms")
+    print(f"{'module':<32}{'self ms':>10}{'cumulative ms':>16}")
+    for name, self_ms, cumulative_ms in sorted(modules, key=lambda m: m[1], reverse=True)[:args.top]:
+        print(f"{name:<32}{self_ms:>10.1f}{cumulative_ms:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
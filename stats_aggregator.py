@@ -0,0 +1,294 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Incremental bot statistics for FiLot Telegram bot
+Counts queries, errors and response times in memory as they happen and
+periodically adds them to BotStatistics, so logging a message costs the
+same no matter how many queries have been logged before
+"""
+
+import math
+import time
+import atexit
+import logging
+import datetime
+import threading
+from typing import Dict, Any, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Seconds between flushes to BotStatistics
+STATS_FLUSH_INTERVAL = 60
+
+# Relative accuracy of response-time quantiles (each bucket is 5% wider than the last)
+SKETCH_RELATIVE_ACCURACY = 0.05
+
+# Response times below this (ms) share the lowest bucket
+SKETCH_MIN_VALUE = 0.1
+
+
+class QuantileSketch:
+    """
+    Streaming quantile estimate over logarithmic buckets.
+
+    Recording a value is O(1) and memory grows with the range of values
+    rather than their number; any quantile is within SKETCH_RELATIVE_ACCURACY
+    of the true value.
+    """
+
+    def __init__(self, relative_accuracy: float = SKETCH_RELATIVE_ACCURACY):
+        """
+        Initialize an empty sketch.
+
+        Args:
+            relative_accuracy: Maximum relative error of reported quantiles
+        """
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._buckets: Dict[int, int] = {}
+        self.count = 0
+
+    def add(self, value: float) -> None:
+        """Record a value."""
+        index = math.ceil(math.log(max(value, SKETCH_MIN_VALUE)) / self._log_gamma)
+        self._buckets[index] = self._buckets.get(index, 0) + 1
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile.
+
+        Args:
+            q: Quantile between 0 and 1, e.g. 0.95
+
+        Returns:
+            Estimated value, or 0.0 if nothing was recorded
+        """
+        if not self.count:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            if seen > rank:
+                break
+        # Midpoint of the bucket (gamma^(i-1), gamma^i] in relative terms
+        return 2 * self._gamma ** index / (self._gamma + 1)
+
+
+class StatsAggregator:
+    """
+    In-memory bot statistics, flushed to the database periodically.
+
+    Each flush adds what this process recorded since the last successful
+    flush to the shared BotStatistics row in SQL, so several workers can
+    flush without overwriting each other's counts. The stored mean response
+    time is weighted by the number of queries with a processing time
+    (response_count), which not every query has. The row is created once
+    from aggregate queries over the logged queries.
+    """
+
+    def __init__(self, flush_interval: float = STATS_FLUSH_INTERVAL):
+        """
+        Initialize the aggregator.
+
+        Args:
+            flush_interval: Seconds between background flushes
+        """
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flush_thread: Optional[threading.Thread] = None
+
+        # Totals of the database row as of the last flush (all workers), plus
+        # what this process recorded and has not flushed yet
+        self.base_queries = 0
+        self.base_responses = 0
+        self.base_average = 0.0
+        self.queries = 0
+        self.errors = 0
+        self.response_count = 0
+        self.response_total = 0.0
+        self.response_times = QuantileSketch()
+        self.last_flush: Optional[float] = None
+
+    def record_query(self) -> None:
+        """Count a logged user query."""
+        with self._lock:
+            self.queries += 1
+        self._ensure_flushing()
+
+    def record_response_time(self, processing_time: Optional[float]) -> None:
+        """
+        Count a query's processing time.
+
+        Args:
+            processing_time: Time taken to respond in ms
+        """
+        if processing_time is None:
+            return
+        with self._lock:
+            self.response_count += 1
+            self.response_total += processing_time
+            self.response_times.add(processing_time)
+
+    def record_error(self) -> None:
+        """Count a logged error."""
+        with self._lock:
+            self.errors += 1
+
+    def command_count(self) -> int:
+        """Total number of queries ever logged."""
+        return self.base_queries + self.queries
+
+    def average_response_time(self) -> float:
+        """Mean processing time in ms, including the times not flushed yet."""
+        count = self.base_responses + self.response_count
+        return (self.base_average * self.base_responses + self.response_total) / count if count else 0.0
+
+    def get_summary(self) -> Dict[str, Any]:
+        """
+        Get the current statistics without touching the database.
+
+        Returns:
+            Dictionary with counts, the all-time mean response time and
+            response-time quantiles since startup (ms)
+        """
+        with self._lock:
+            return {
+                "command_count": self.command_count(),
+                "pending_errors": self.errors,
+                "average_response_time": self.average_response_time(),
+                "response_time_p50": self.response_times.quantile(0.50),
+                "response_time_p95": self.response_times.quantile(0.95),
+                "response_time_p99": self.response_times.quantile(0.99),
+                "last_flush": self.last_flush,
+            }
+
+    def _create_row(self):
+        """Create the BotStatistics row from the logged queries. Needs an app context."""
+        # Import at function level to avoid circular imports
+        from sqlalchemy import func
+        from models import db, UserQuery, BotStatistics
+
+        query_count, response_count, response_total = db.session.query(
+            func.count(UserQuery.id), func.count(UserQuery.processing_time), func.sum(UserQuery.processing_time)
+        ).one()
+        with self._lock:
+            # Queries recorded here are mostly written already and are added by the flush
+            command_count = max(query_count - self.queries, 0)
+            response_total = float(response_total or 0.0) - self.response_total
+            response_count = response_count - self.response_count
+        if response_count <= 0:
+            response_count, response_total = 0, 0.0
+        stats = BotStatistics(start_time=datetime.datetime.utcnow(), command_count=command_count,
+                              response_count=response_count, error_count=0,
+                              average_response_time=max(response_total, 0.0) / response_count if response_count else 0.0)
+        db.session.add(stats)
+        db.session.flush()
+        return stats
+
+    def flush(self):
+        """
+        Add the statistics recorded since the last flush to the latest BotStatistics row.
+
+        Counts are incremented in SQL and the local counts are only reduced
+        once the update is committed, so a failed flush loses nothing. User
+        counts are cheap indexed counts and are refreshed here rather than on
+        every message. Needs an app context.
+
+        Returns:
+            The updated BotStatistics object, or None on error
+        """
+        # Import at function level to avoid circular imports
+        from sqlalchemy import func, update
+        from models import db, User, BotStatistics
+
+        try:
+            stats = BotStatistics.query.order_by(BotStatistics.id.desc()).first()
+            if not stats:
+                stats = self._create_row()
+
+            with self._lock:
+                queries, errors = self.queries, self.errors
+                response_count, response_total = self.response_count, self.response_total
+
+            table = BotStatistics.__table__
+            command_count = func.coalesce(table.c.command_count, 0)
+            values = {
+                "command_count": command_count + queries,
+                "error_count": func.coalesce(table.c.error_count, 0) + errors,
+                "active_user_count": User.query.filter(
+                    User.last_active > (datetime.datetime.utcnow() - datetime.timedelta(days=1)),
+                    User.is_blocked == False
+                ).count(),
+                "subscribed_user_count": User.query.filter_by(is_subscribed=True).count(),
+                "blocked_user_count": User.query.filter_by(is_blocked=True).count(),
+            }
+            if response_count:
+                responses = func.coalesce(table.c.response_count, 0)
+                values["response_count"] = responses + response_count
+                values["average_response_time"] = (
+                    func.coalesce(table.c.average_response_time, 0.0) * responses + response_total
+                ) / (responses + response_count)
+            db.session.execute(update(table).where(table.c.id == stats.id).values(**values))
+            db.session.commit()
+
+            with self._lock:
+                # Keep whatever was recorded while the flush ran
+                self.queries -= queries
+                self.errors -= errors
+                self.response_count -= response_count
+                self.response_total -= response_total
+
+            db.session.refresh(stats)
+            with self._lock:
+                self.base_queries = stats.command_count or 0
+                self.base_responses = stats.response_count or 0
+                self.base_average = stats.average_response_time or 0.0
+            self.last_flush = time.time()
+            return stats
+        except Exception as e:
+            logger.error(f"Error flushing bot statistics: {e}")
+            db.session.rollback()
+            return None
+
+    def _ensure_flushing(self) -> None:
+        """Start the background flush thread on first use."""
+        if self._flush_thread is not None:
+            return
+        with self._lock:
+            if self._flush_thread is not None:
+                return
+            self._flush_thread = threading.Thread(target=self._flush_loop, name="stats-flush", daemon=True)
+            self._flush_thread.start()
+        atexit.register(self._flush_in_app_context)
+
+    def _flush_loop(self) -> None:
+        """Flush the statistics every flush_interval seconds."""
+        while True:
+            time.sleep(self.flush_interval)
+            self._flush_in_app_context()
+
+    def _flush_in_app_context(self) -> None:
+        """Flush inside a Flask app context."""
+        try:
+            # Import at function level to avoid circular imports
+            from app import app
+            with app.app_context():
+                self.flush()
+        except Exception as e:
+            logger.error(f"Error in statistics flush: {e}")
+
+
+# Singleton aggregator
+_stats_aggregator: Optional[StatsAggregator] = None
+
+
+def get_stats_aggregator() -> StatsAggregator:
+    """Get the singleton StatsAggregator instance."""
+    global _stats_aggregator
+    if _stats_aggregator is None:
+        _stats_aggregator = StatsAggregator()
+    return _stats_aggregator
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Streaming replies for FiLot Telegram bot
+Posts a placeholder message and progressively edits it while an AI answer
+is generated, with edits throttled to stay within Telegram's rate limits
+"""
+
+import time
+import asyncio
+import logging
+from typing import List, Optional
+
+from telegram import Message
+from telegram.constants import ParseMode, MessageLimit
+from telegram.error import BadRequest, RetryAfter, TelegramError
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Minimum seconds between edits of the same message (Telegram allows about one per second per chat)
+STREAM_EDIT_INTERVAL = 1.2
+
+# Minimum number of new characters before an edit is worth sending
+STREAM_MIN_NEW_CHARS = 40
+
+# Placeholder shown until the first chunk arrives
+STREAM_PLACEHOLDER = "🤔 Thinking..."
+
+# Appended to partial answers to show more text is coming
+STREAM_CURSOR = " ▌"
+
+# Longest text a single message can hold
+MAX_MESSAGE_LENGTH = MessageLimit.MAX_TEXT_LENGTH
+
+
+def split_message(text: str, limit: int = MAX_MESSAGE_LENGTH) -> List[str]:
+    """
+    Split text into message-sized parts, preferring paragraph and line breaks.
+
+    Args:
+        text: Text to split
+        limit: Maximum length of each part
+
+    Returns:
+        List of parts, each at most limit characters
+    """
+    parts = []
+    while len(text) > limit:
+        cut = text.rfind("\n\n", 0, limit)
+        if cut <= 0:
+            cut = text.rfind("\n", 0, limit)
+        if cut <= 0:
+            cut = text.rfind(" ", 0, limit)
+        if cut <= 0:
+            cut = limit
+        parts.append(text[:cut].rstrip())
+        text = text[cut:].lstrip()
+    parts.append(text)
+    return parts
+
+
+class StreamingReply:
+    """
+    A reply message that is edited as an AI answer streams in.
+
+    Partial text is shown without formatting, since half-written Markdown
+    usually does not parse; finish() renders the complete answer as Markdown
+    and falls back to plain text if Telegram rejects it.
+    """
+
+    def __init__(self, message: Message, edit_interval: float = STREAM_EDIT_INTERVAL):
+        """
+        Initialize a streaming reply.
+
+        Args:
+            message: The user's message to reply to
+            edit_interval: Minimum seconds between edits
+        """
+        self.message = message
+        self.edit_interval = edit_interval
+        self.reply: Optional[Message] = None
+        self._shown = ""
+        self._next_edit_at = 0.0
+
+    async def start(self) -> None:
+        """Post the placeholder message."""
+        if self.reply is None:
+            self.reply = await self.message.reply_text(STREAM_PLACEHOLDER)
+            self._next_edit_at = time.monotonic() + self.edit_interval
+
+    async def update(self, text: str) -> None:
+        """
+        Show the text generated so far, unless an edit was sent too recently.
+
+        Args:
+            text: Answer text generated so far
+        """
+        if self.reply is None:
+            await self.start()
+            return
+        if time.monotonic() < self._next_edit_at or len(text) - len(self._shown) < STREAM_MIN_NEW_CHARS:
+            return
+
+        # Only the first message is edited while streaming; finish() sends any overflow
+        preview = text[:MAX_MESSAGE_LENGTH - len(STREAM_CURSOR)] + STREAM_CURSOR
+        await self._edit(preview, parse_mode=None)
+        self._shown = text
+
+    async def finish(self, text: str) -> None:
+        """
+        Show the complete answer, rendered as Markdown where possible.
+
+        Args:
+            text: Complete answer text
+        """
+        parts = split_message(text)
+        if self.reply is None:
+            self.reply = await self._send(parts[0])
+        else:
+            await self._edit(parts[0], parse_mode=ParseMode.MARKDOWN, final=True)
+        for part in parts[1:]:
+            await self._send(part)
+
+    async def _send(self, text: str) -> Message:
+        """Send a new reply as Markdown, falling back to plain text."""
+        try:
+            return await self.message.reply_text(text, parse_mode=ParseMode.MARKDOWN)
+        except BadRequest:
+            return await self.message.reply_text(text)
+
+    async def _edit(self, text: str, parse_mode: Optional[str], final: bool = False) -> None:
+        """
+        Edit the reply, respecting Telegram's flood control.
+
+        Intermediate edits are skipped when rate limited; the final edit waits
+        and falls back to plain text if the Markdown does not parse.
+        """
+        try:
+            await self.reply.edit_text(text, parse_mode=parse_mode)
+        except RetryAfter as e:
+            retry_after = float(e.retry_after)
+            logger.warning(f"Streaming edit rate limited for {retry_after:.1f}s")
+            self._next_edit_at = time.monotonic() + retry_after
+            if final:
+                await asyncio.sleep(retry_after)
+                await self._edit(text, parse_mode, final)
+            return
+        except BadRequest as e:
+            if "not modified" in str(e).lower():
+                pass
+            elif parse_mode is not None:
+                # Unbalanced Markdown in the answer, show it as plain text instead
+                await self._edit(text, None, final)
+                return
+            else:
+                logger.error(f"Error editing streaming reply: {e}")
+        except TelegramError as e:
+            logger.error(f"Error editing streaming reply: {e}")
+        self._next_edit_at = time.monotonic() + self.edit_interval
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Test script for the AI answer cache
+"""
+
+import time
+import asyncio
+import logging
+
+from answer_cache import AnswerCache, normalize_question
+
+# Configure logging
+logging.basicConfig(
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+
+def test_normalize_question():
+    """Punctuation, case and filler words do not change the cache key."""
+    assert normalize_question("Hey, what is Impermanent Loss??") == "what is impermanent loss"
+    assert normalize_question("what is impermanent loss") == "what is impermanent loss"
+    assert normalize_question("Is SOL/USDC safe?") == "is sol/usdc safe"
+    assert normalize_question("What's the APR on $1,000.50?") == "whats apr on $1,000.50"
+    assert normalize_question("?!") == ""
+
+
+def test_lru_ttl_and_context():
+    """Answers are separated by profile, evicted by LRU and expire after the TTL."""
+    cache = AnswerCache(max_entries=2, ttl=60, persist=False)
+    key = cache.make_key("What is IL?", "moderate", "medium")
+    assert cache.get(key) is None
+
+    cache.put(key, "answer")
+    assert cache.get(cache.make_key("what is il", "moderate", "medium")) == "answer"
+    assert cache.get(cache.make_key("what is il", "high-risk", "medium")) is None
+
+    # Profile is ignored for answers that do not depend on pool data
+    shared = cache.make_key("what is il", "moderate", "medium", market_dependent=False)
+    cache.put(shared, "explanation")
+    assert cache.get(cache.make_key("what is il", "conservative", "long", market_dependent=False)) == "explanation"
+
+    cache.put(cache.make_key("another question", "moderate", "medium"), "other")
+    assert cache.get(key) is None
+    assert cache.get_stats()["evictions"] == 1
+
+    expired = AnswerCache(ttl=-1, persist=False)
+    expired.put(key, "answer")
+    assert expired.get(key) is None
+    assert expired.get_stats()["expirations"] == 1
+
+    stats = cache.get_stats()
+    assert stats["hits"] == 2 and stats["misses"] == 3
+    assert abs(stats["hit_ratio"] - 0.4) < 1e-9
+
+
+def test_lookup_with_fallback_key():
+    """Trying the market and concept keys of one question counts one lookup."""
+    cache = AnswerCache(persist=False)
+    market_key = cache.make_key("what is il", "moderate", "medium")
+    concept_key = cache.make_key("what is il", market_dependent=False)
+    assert cache.get(market_key, concept_key) is None
+    assert cache.get_stats()["misses"] == 1
+
+    cache.put(concept_key, "explanation")
+    assert cache.get(market_key, concept_key) == "explanation"
+    stats = cache.get_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+
+def test_persisted_async():
+    """Async lookups and stores reach the database through async_db."""
+    # Import at function level to avoid circular imports
+    from app import app
+    from models import db
+    from async_db import get_async_db
+
+    with app.app_context():
+        db.create_all()
+
+    async def run():
+        writer = AnswerCache(persist=True)
+        key = writer.make_key(f"what is a liquidity pool {time.time()}", "moderate", "medium")
+        calls = get_async_db().metrics["calls"]
+        await writer.put_async(key, "A pool of two tokens traders swap against.")
+
+        # A fresh cache (e.g. after a restart) finds the answer in the database
+        reader = AnswerCache(persist=True)
+        answer = await reader.get_async(key)
+        assert get_async_db().metrics["calls"] == calls + 2
+
+        # Both keys of a question are looked up in one database call
+        concept_key = writer.make_key(f"what is slippage {time.time()}", market_dependent=False)
+        await writer.put_async(concept_key, "The difference between expected and executed price.")
+        market_key = writer.make_key(concept_key.question, "moderate", "medium")
+        calls = get_async_db().metrics["calls"]
+        assert await reader.get_async(market_key, concept_key) == "The difference between expected and executed price."
+        assert get_async_db().metrics["calls"] == calls + 1
+        return answer, reader.get_stats()
+
+    answer, stats = asyncio.run(run())
+    assert answer == "A pool of two tokens traders swap against."
+    assert stats["persisted_hits"] == 2 and stats["misses"] == 0 and stats["entries"] == 2
+
+
+def main():
+    """Run all tests"""
+    for test in (
+        test_normalize_question,
+        test_lru_ttl_and_context,
+        test_lookup_with_fallback_key,
+        test_persisted_async,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
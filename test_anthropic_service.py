@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Test script for the async Anthropic service (concurrency, deadlines, cancellation)
+"""
+
+import time
+import asyncio
+import logging
+from types import SimpleNamespace
+
+from anthropic_service import AnthropicAI
+
+# Configure logging
+logging.basicConfig(
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+
+class FakeMessages:
+    """Messages API answering every request after a delay."""
+
+    def __init__(self, delay=0.1, text="Pools with stable pairs carry less impermanent loss."):
+        self.delay = delay
+        self.text = text
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def create(self, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        return SimpleNamespace(content=[SimpleNamespace(text=self.text)])
+
+
+def make_service(messages, max_concurrency=2):
+    """Build a service whose SDK client is replaced by the fake messages API."""
+    service = AnthropicAI(api_key="test-key", max_concurrency=max_concurrency)
+    service._client = SimpleNamespace(messages=messages)
+    return service
+
+
+def test_concurrency_limit():
+    """Calls beyond max_concurrency wait for a slot; the others run at the same time."""
+    messages = FakeMessages(delay=0.1)
+    service = make_service(messages, max_concurrency=2)
+
+    async def run():
+        started = time.perf_counter()
+        answers = await asyncio.gather(*[
+            service.get_financial_advice(f"Question {i}") for i in range(6)
+        ])
+        return answers, time.perf_counter() - started
+
+    answers, elapsed = asyncio.run(run())
+    assert answers == [messages.text] * 6
+    assert messages.max_in_flight == 2
+    assert 0.3 <= elapsed < 0.5, elapsed
+
+    metrics = service.get_metrics()
+    assert metrics["completed"] == 6 and metrics["in_flight"] == 0 and metrics["waiting"] == 0
+    assert metrics["queue_time_max"] >= 0.15
+
+
+def test_deadline_and_cancellation():
+    """Timed-out and cancelled calls free their slot for the next request."""
+    messages = FakeMessages(delay=0.3)
+    service = make_service(messages, max_concurrency=1)
+
+    async def run():
+        try:
+            await service._create_message(deadline=0.05, messages=[])
+            raise AssertionError("deadline not enforced")
+        except TimeoutError:
+            pass
+
+        task = asyncio.create_task(service._create_message(messages=[]))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+        messages.delay = 0.0
+        return await service._create_message(deadline=0.1, messages=[])
+
+    response = asyncio.run(run())
+    assert response.content[0].text == messages.text
+    metrics = service.get_metrics()
+    assert metrics["timeouts"] == 1 and metrics["cancelled"] == 1 and metrics["completed"] == 1
+    assert metrics["in_flight"] == 0 and messages.in_flight == 0
+
+
+def main():
+    """Run all tests"""
+    for test in (
+        test_concurrency_limit,
+        test_deadline_and_cancellation,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
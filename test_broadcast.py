@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Test script for the broadcast engine
+"""
+
+import time
+import asyncio
+import logging
+
+import broadcast as broadcast_module
+from broadcast import Broadcast, SendRateLimiter, _Page
+
+# Configure logging
+logging.basicConfig(
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+
+def test_rate_limiter():
+    """After the burst, tokens are handed out at the configured rate and pauses delay them."""
+    async def run():
+        limiter = SendRateLimiter(rate=100, burst=5)
+        started = time.monotonic()
+        for _ in range(25):
+            await limiter.acquire()
+        elapsed = time.monotonic() - started
+        assert 0.15 <= elapsed < 0.5, elapsed
+
+        limiter.pause(0.2)
+        started = time.monotonic()
+        await limiter.acquire()
+        assert time.monotonic() - started >= 0.2
+
+    asyncio.run(run())
+
+
+def test_watermark_advances_over_finished_pages():
+    """The checkpoint only moves past pages whose deliveries have all finished."""
+    broadcast = Broadcast(bot=None, key="test", text="hello")
+    first, second = _Page(last_id=10, remaining=2), _Page(last_id=20, remaining=1)
+    broadcast._pages.extend([first, second])
+
+    broadcast._complete(second)
+    assert broadcast._watermark == 0
+    broadcast._complete(first)
+    assert broadcast._watermark == 0
+    broadcast._complete(first)
+    assert broadcast._watermark == 20 and not broadcast._pages
+
+
+class FakeBot:
+    """Bot recording the chats it sent to and when."""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, parse_mode=None, api_kwargs=None):
+        self.sent.append((time.monotonic(), chat_id))
+
+
+def _create_tables():
+    """Create the checkpoint table."""
+    # Import at function level to avoid circular imports
+    from app import app
+    from models import db
+
+    with app.app_context():
+        db.create_all()
+
+
+def test_broadcasts_share_rate_limit():
+    """Broadcasts running at the same time draw from one process-wide rate limit."""
+    _create_tables()
+    bot = FakeBot()
+    suffix = time.time()
+    original_rate = broadcast_module.BROADCAST_RATE
+    broadcast_module.BROADCAST_RATE = 50
+
+    async def run():
+        return await asyncio.gather(
+            Broadcast(bot, f"shared-a:{suffix}", "first", recipients=range(1, 31)).run(),
+            Broadcast(bot, f"shared-b:{suffix}", "second", recipients=range(101, 131)).run(),
+        )
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        broadcast_module.BROADCAST_RATE = original_rate
+    assert [result["sent"] for result in results] == [30, 30]
+    # 60 sends with a burst of 10 take at least 50 / 50 seconds at 50 messages per second
+    elapsed = bot.sent[-1][0] - bot.sent[0][0]
+    assert elapsed >= 0.9, elapsed
+
+
+class InterruptedBot(FakeBot):
+    """Bot that stops answering after a number of sends, like a process that was killed."""
+
+    def __init__(self, limit):
+        super().__init__()
+        self.limit = limit
+
+    async def send_message(self, chat_id, text, parse_mode=None, api_kwargs=None):
+        if len(self.sent) >= self.limit:
+            await asyncio.Event().wait()
+        await super().send_message(chat_id, text, parse_mode, api_kwargs)
+
+
+def test_interrupted_broadcast_resumes():
+    """An interrupted run keeps its checkpoint and the next run only sends from there."""
+    _create_tables()
+    key = f"resume:{time.time()}"
+    recipients = range(1, 51)
+
+    async def interrupt():
+        bot = InterruptedBot(limit=15)
+        task = asyncio.create_task(
+            Broadcast(bot, key, "hello", workers=2, rate=1000, page_size=10, recipients=recipients).run()
+        )
+        while len(bot.sent) < 15:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        return bot
+
+    first = asyncio.run(interrupt())
+    assert [chat_id for _, chat_id in first.sent] == list(range(1, 16))
+
+    # Only the first page was fully delivered, so the run resumes after it
+    second = FakeBot()
+    metrics = asyncio.run(
+        Broadcast(second, key, "hello", workers=2, rate=1000, page_size=10, recipients=recipients).run()
+    )
+    assert metrics["resumed_from"] == 10 and metrics["completed"]
+    assert sorted(chat_id for _, chat_id in second.sent) == list(range(11, 51))
+    assert metrics["sent"] == 55
+
+    # A completed broadcast is not sent again
+    third = FakeBot()
+    assert asyncio.run(Broadcast(third, key, "hello", recipients=recipients).run())["completed"]
+    assert not third.sent
+
+
+def test_unreadable_checkpoint_fails_run():
+    """A broadcast whose checkpoint cannot be read fails instead of starting over."""
+    # Import at function level to avoid circular imports
+    from models import db
+
+    def broken_get(model, key):
+        raise RuntimeError("database unavailable")
+
+    _create_tables()
+    bot = FakeBot()
+    attempts = broadcast_module.CHECKPOINT_LOAD_ATTEMPTS
+    broadcast_module.CHECKPOINT_LOAD_ATTEMPTS = 2
+    db.session.get = broken_get
+    try:
+        asyncio.run(Broadcast(bot, f"broken:{time.time()}", "hello", rate=1000, recipients=range(1, 11)).run())
+        assert False, "the broadcast should fail"
+    except RuntimeError:
+        pass
+    finally:
+        del db.session.get
+        broadcast_module.CHECKPOINT_LOAD_ATTEMPTS = attempts
+    assert not bot.sent
+
+
+def main():
+    """Run all tests"""
+    for test in (
+        test_rate_limiter,
+        test_watermark_advances_over_finished_pages,
+        test_broadcasts_share_rate_limit,
+        test_interrupted_broadcast_resumes,
+        test_unreadable_checkpoint_fails_run,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Test script for the callback query router
+"""
+
+import asyncio
+import logging
+from types import SimpleNamespace
+
+from callback_router import CallbackRouter, PrefixTrie, FALLBACK_ROUTE
+
+# Configure logging
+logging.basicConfig(
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+
+def test_prefix_trie():
+    """The longest registered prefix wins and the first value for a prefix is kept."""
+    trie = PrefixTrie()
+    assert trie.insert("pool:", "pool")
+    assert trie.insert("pool:detail:", "detail")
+    assert not trie.insert("pool:", "other")
+    assert trie.longest_prefix("pool:detail:42") == ("pool:detail:", "detail")
+    assert trie.longest_prefix("pool:42") == ("pool:", "pool")
+    assert trie.longest_prefix("pools") is None
+
+
+def test_resolve_and_dispatch():
+    """Exact routes beat prefixes, unknown data goes to the fallback and latency is counted."""
+    calls = []
+
+    def make_handler(name):
+        async def handler(update, context):
+            calls.append(name)
+        return handler
+
+    router = CallbackRouter()
+    router.add_route("stable_pools", make_handler("stable"))
+    router.add_prefix_route("stable_pools:", make_handler("stable_page"))
+    router.add_prefix_route("pool:", make_handler("pool"))
+
+    assert router.resolve("stable_pools")[0] == "stable_pools"
+    assert router.resolve("stable_pools:2")[0] == "stable_pools:*"
+    assert router.resolve("unknown") == (None, None)
+
+    router.set_fallback(make_handler("fallback"))
+    assert router.resolve("unknown")[0] == FALLBACK_ROUTE
+
+    async def press(data):
+        await router.dispatch(SimpleNamespace(callback_query=SimpleNamespace(data=data)), None)
+
+    for data in ("stable_pools", "pool:abc", "pool:def", "unknown"):
+        asyncio.run(press(data))
+    assert calls == ["stable", "pool", "pool", "fallback"]
+
+    routes = router.get_metrics()["routes"]
+    assert routes["pool:*"]["calls"] == 2
+    assert routes[FALLBACK_ROUTE]["calls"] == 1
+
+
+def main():
+    """Run all tests"""
+    for test in (
+        test_prefix_trie,
+        test_resolve_and_dispatch,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Test script for the shared database connection pool
+"""
+
+import gc
+import asyncio
+import logging
+import threading
+
+import db_pool
+from db_pool import ConnectionPool, PoolTimeout
+
+# Configure logging
+logging.basicConfig(
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+
+class FakeCursor:
+    """Cursor of FakeConnection."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, query, params=None):
+        if self.connection.broken:
+            raise RuntimeError("server closed the connection unexpectedly")
+        self.connection.statements.append(query)
+
+    def fetchone(self):
+        return (1,)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """Stand-in for a psycopg2 connection recording commits and rollbacks."""
+
+    def __init__(self, dsn):
+        self.dsn = dsn
+        self.closed = 0
+        self.autocommit = False
+        self.broken = False
+        self.statements = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        if self.broken:
+            raise RuntimeError("server closed the connection unexpectedly")
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+
+def test_reuse_and_context_manager():
+    """Closed connections go back to the pool and are reused; the block commits or rolls back."""
+    pool = ConnectionPool("postgresql://test", min_size=1, max_size=2, connect=FakeConnection)
+    assert pool.get_metrics()["open"] == 1
+
+    conn = pool.getconn()
+    raw = conn._connection
+    conn.cursor().execute("SELECT 1")
+    conn.close()
+    conn.close()
+    assert raw.rollbacks == 1
+
+    with pool.connection() as conn:
+        assert conn._connection is raw
+        conn.cursor().execute("INSERT 1")
+    assert raw.commits == 1
+
+    try:
+        with pool.connection():
+            raise ValueError("handler failed")
+    except ValueError:
+        pass
+    assert raw.rollbacks >= 3
+
+    with pool.connection(autocommit=True) as conn:
+        assert conn.autocommit
+    assert raw.autocommit is False
+
+    metrics = pool.get_metrics()
+    assert metrics["opened"] == 1 and metrics["checkouts"] == 4 and metrics["in_use"] == 0
+
+
+def test_wait_and_timeout():
+    """Callers wait for a free connection, and time out when none is returned."""
+    pool = ConnectionPool("postgresql://test", min_size=0, max_size=1, timeout=0.05, connect=FakeConnection)
+    conn = pool.getconn()
+    try:
+        pool.getconn()
+        assert False, "second checkout should time out"
+    except PoolTimeout:
+        pass
+
+    threading.Timer(0.02, conn.close).start()
+    second = pool.getconn(timeout=1)
+    second.close()
+    metrics = pool.get_metrics()
+    assert metrics["waits"] == 2 and metrics["timeouts"] == 1 and metrics["wait_ms_max"] > 0
+    assert metrics["opened"] == 1
+
+
+def test_health_check():
+    """Broken idle connections are replaced before they are handed out."""
+    pool = ConnectionPool("postgresql://test", min_size=1, max_size=2, connect=FakeConnection)
+    first = pool.getconn()
+    raw = first._connection
+    first.close()
+
+    raw.broken = True
+    original_idle = db_pool.HEALTH_CHECK_IDLE
+    db_pool.HEALTH_CHECK_IDLE = 0
+    try:
+        conn = pool.getconn()
+    finally:
+        db_pool.HEALTH_CHECK_IDLE = original_idle
+    assert conn._connection is not raw and raw.closed
+    conn.close()
+
+    # A connection broken while in use is discarded when returned
+    conn = pool.getconn()
+    conn._connection.broken = True
+    conn.close()
+    metrics = pool.get_metrics()
+    assert metrics["health_check_failures"] == 1 and metrics["closed"] == 2 and metrics["open"] == 0
+
+
+def test_async_checkout():
+    """Transactions wait for a pooled connection on the database threads, not the event loop."""
+    # Import at function level to avoid circular imports
+    import transactions
+
+    pool = ConnectionPool("postgresql://test", min_size=0, max_size=1, timeout=1.0, connect=FakeConnection)
+    held = pool.getconn()
+    threads = []
+
+    def checkout(autocommit=False):
+        threads.append(threading.get_ident())
+        return pool.getconn()
+
+    async def run():
+        loop_thread = threading.get_ident()
+        waiting = asyncio.ensure_future(transactions._get_connection())
+        # The loop keeps running while the checkout waits for the held connection
+        await asyncio.sleep(0.1)
+        assert not waiting.done()
+        held.close()
+        conn = await waiting
+        conn.close()
+        return loop_thread
+
+    original, original_ready = transactions.get_pooled_connection, transactions._tables_ready
+    transactions.get_pooled_connection, transactions._tables_ready = checkout, True
+    try:
+        loop_thread = asyncio.run(run())
+    finally:
+        transactions.get_pooled_connection, transactions._tables_ready = original, original_ready
+    assert threads and threads[0] != loop_thread
+    assert pool.get_metrics()["waits"] == 1
+
+
+def test_walletconnect_async_checkout():
+    """WalletConnect session handlers wait for a pooled connection on the database threads."""
+    # Import at function level to avoid circular imports
+    import walletconnect_utils
+
+    pool = ConnectionPool("postgresql://test", min_size=0, max_size=1, timeout=1.0, connect=FakeConnection)
+    held = pool.getconn()
+    threads = []
+
+    def checkout():
+        threads.append(threading.get_ident())
+        return pool.getconn(autocommit=True)
+
+    async def run():
+        loop_thread = threading.get_ident()
+        waiting = asyncio.ensure_future(walletconnect_utils.kill_walletconnect_session("session-1"))
+        # The loop keeps running while the checkout waits for the held connection
+        await asyncio.sleep(0.1)
+        assert not waiting.done()
+        held.close()
+        return loop_thread, await waiting
+
+    saved = {name: getattr(walletconnect_utils, name)
+             for name in ("get_db_connection", "SOLANA_SERVICE_AVAILABLE", "PSYCOPG2_AVAILABLE", "DATABASE_URL")}
+    walletconnect_utils.get_db_connection = checkout
+    walletconnect_utils.SOLANA_SERVICE_AVAILABLE = False
+    walletconnect_utils.PSYCOPG2_AVAILABLE = True
+    walletconnect_utils.DATABASE_URL = "postgresql://test"
+    try:
+        loop_thread, result = asyncio.run(run())
+    finally:
+        for name, value in saved.items():
+            setattr(walletconnect_utils, name, value)
+    assert result == {"success": True, "message": "Session terminated successfully"}
+    assert threads and threads[0] != loop_thread
+    metrics = pool.get_metrics()
+    assert metrics["waits"] == 1 and metrics["in_use"] == 0
+
+
+def test_leaked_connection():
+    """A connection dropped without close() goes back to the pool."""
+    pool = ConnectionPool("postgresql://test", min_size=0, max_size=1, timeout=1.0, connect=FakeConnection)
+    conn = pool.getconn()
+    del conn
+    gc.collect()
+    second = pool.getconn()
+    second.close()
+    metrics = pool.get_metrics()
+    assert metrics["leaked"] == 1 and metrics["opened"] == 1 and metrics["in_use"] == 0
+
+
+def test_failed_operations_return_connections():
+    """Transactions give their connection back when a statement fails."""
+    # Import at function level to avoid circular imports
+    import transactions
+
+    pool = ConnectionPool("postgresql://test", min_size=0, max_size=2, timeout=0.2, connect=FakeConnection)
+
+    def checkout(autocommit=False):
+        conn = pool.getconn(autocommit)
+        conn._connection.broken = True
+        return conn
+
+    original, original_ready = transactions.get_pooled_connection, transactions._tables_ready
+    transactions.get_pooled_connection, transactions._tables_ready = checkout, True
+    try:
+        for _ in range(3):
+            result = asyncio.run(transactions.get_transaction_status("tx-1"))
+            assert not result["success"]
+    finally:
+        transactions.get_pooled_connection, transactions._tables_ready = original, original_ready
+
+    # Broken connections are discarded, and their slots are free again
+    pool.getconn(timeout=0.2).close()
+    metrics = pool.get_metrics()
+    assert metrics["timeouts"] == 0 and metrics["in_use"] == 0 and metrics["leaked"] == 0
+
+
+def main():
+    """Run all tests"""
+    for test in (
+        test_reuse_and_context_manager,
+        test_wait_and_timeout,
+        test_health_check,
+        test_async_checkout,
+        test_walletconnect_async_checkout,
+        test_leaked_connection,
+        test_failed_operations_return_connections,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Test script for the RL pool feature store and its snapshot-driven inputs
+"""
+
+import os
+import time
+import logging
+import tempfile
+
+import numpy as np
+
+import market_snapshot
+import rl_investment_advisor
+from market_snapshot import MarketSnapshot, PoolHistoryStore, normalize_pool, publish_snapshot, record_pools
+from feature_store import FEATURE_NAMES, PoolFeatureStore
+from rl_investment_advisor import RLInvestmentAdvisor
+
+# Configure logging
+logging.basicConfig(
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+# Pool in the SolPool API format, without volatility, APR change or prediction score
+POOL = {
+    "id": "pool-sol-usdc",
+    "token1_symbol": "SOL",
+    "token2_symbol": "USDC",
+    "token1_price": 150.0,
+    "token2_price": 1.0,
+    "apr": 30.0,
+    "liquidity": 5_000_000,
+    "volume_24h": 2_000_000,
+}
+
+
+def _record_history():
+    """Store 8 days of hourly samples: APR rising from 20% to 30%, price moving 1% an hour."""
+    path = os.path.join(tempfile.mkdtemp(), "pool_history.npz")
+    history = market_snapshot._history = PoolHistoryStore(path=path)
+    market_snapshot._snapshot = None
+    rng = np.random.default_rng(11)
+    now = time.time()
+    price = 150.0
+    hours = 8 * 24
+    for i in range(hours):
+        price *= float(np.exp(rng.normal(0, 0.01)))
+        history.record(
+            [{"id": POOL["id"], "apr": 20.0 + 10.0 * i / hours, "tvl": 5e6, "volume": 2e6,
+              "price_a": price, "price_b": 1.0}],
+            timestamp=now - (hours - i) * 3600,
+            force=True
+        )
+
+
+def test_snapshot_features():
+    """Volatility and 7-day APR change features come from the snapshot statistics."""
+    _record_history()
+    snapshot = publish_snapshot({"solpool": [dict(POOL)]})
+    pool_stats = snapshot.statistics[POOL["id"]]
+    assert pool_stats["volatility"] is not None and pool_stats["apr_change_7d"] > 0
+
+    store = PoolFeatureStore()
+    pool = dict(POOL)
+    RLInvestmentAdvisor()._fill_missing_inputs([pool], snapshot.statistics, {}, store)
+    store.update([pool], version=snapshot.version)
+
+    features = store.get(POOL["id"])
+    volatility = features[FEATURE_NAMES.index("volatility")]
+    apr_change = features[FEATURE_NAMES.index("apr_change")]
+    assert abs(volatility - min(pool_stats["volatility"] / 100, 1.0)) < 1e-6
+    assert abs(apr_change - (pool_stats["apr_change_7d"] + 50) / 100) < 1e-6
+    # A rising APR is above the neutral 0.5 a missing APR change would give
+    assert apr_change > 0.5
+    assert not store.is_stale(POOL["id"], snapshot.version)
+
+
+def test_advisor_pools_not_published():
+    """Pools recorded for the advisor get statistics without changing the displayed snapshot."""
+    _record_history()
+    displayed = normalize_pool(dict(POOL, id="pool-displayed", apr=12.0))
+    snapshot = market_snapshot._snapshot = MarketSnapshot(
+        3, {"topAPR": [displayed]}, {displayed["id"]: displayed}, time.time(), {}, "fp3"
+    )
+
+    statistics = record_pools([dict(POOL)])
+    assert statistics[POOL["id"]]["apr_change_7d"] > 0
+    assert market_snapshot.get_current_snapshot() is snapshot and snapshot.version == 3
+    assert POOL["id"] not in snapshot.records
+    # The displayed pools are part of the same history sample
+    history = market_snapshot.get_history_store()
+    assert history.series("apr", [POOL["id"], displayed["id"]], points=1)[:, 0].tolist() == [30.0, 12.0]
+
+
+def test_prediction_from_previous_features():
+    """A pool without a prediction score keeps the one of its previous feature row."""
+    store = PoolFeatureStore()
+    store.update([dict(POOL, prediction_score=80)], version=1)
+
+    pool = dict(POOL)
+    RLInvestmentAdvisor()._fill_missing_inputs([pool], {}, {}, store)
+    assert abs(pool["prediction_score"] - 80) < 1e-4
+    assert "volatility" not in pool
+
+    # Unknown pools keep the neutral default
+    unknown = dict(POOL, id="pool-unknown")
+    RLInvestmentAdvisor()._fill_missing_inputs([unknown], {}, {}, store)
+    store.update([unknown], version=2)
+    assert abs(store.get("pool-unknown")[FEATURE_NAMES.index("prediction")] - 0.5) < 1e-6
+
+
+def test_batched_predictions():
+    """Prediction scores of all pools come from one predictions request."""
+    requests = []
+
+    def get_predictions(min_score=50.0, limit=5):
+        requests.append((min_score, limit))
+        return [{"pool_id": POOL["id"], "prediction_score": 72.0},
+                {"pool_id": "pool-other", "score": 35.0}]
+
+    original = rl_investment_advisor.get_predictions
+    rl_investment_advisor.get_predictions = get_predictions
+    try:
+        advisor = RLInvestmentAdvisor()
+        predictions = advisor._get_prediction_scores(3)
+    finally:
+        rl_investment_advisor.get_predictions = original
+    assert requests == [(0.0, 3)]
+    assert predictions == {POOL["id"]: 72.0, "pool-other": 35.0}
+
+    # The batched score wins over the previous feature row
+    store = PoolFeatureStore()
+    store.update([dict(POOL, prediction_score=20)], version=1)
+    pool = dict(POOL)
+    advisor._fill_missing_inputs([pool], {}, predictions, store)
+    store.update([pool], version=2)
+    assert abs(store.get(POOL["id"])[FEATURE_NAMES.index("prediction")] - 0.72) < 1e-6
+
+
+def main():
+    """Run all tests"""
+    for test in (
+        test_snapshot_features,
+        test_advisor_pools_not_published,
+        test_prediction_from_previous_features,
+        test_batched_predictions,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Test script for the process heartbeat and uptime computation
+"""
+
+import logging
+import datetime
+
+from heartbeat import Heartbeat, covered_seconds
+
+# Configure logging
+logging.basicConfig(
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+
+def test_covered_seconds():
+    """Overlapping intervals count once and are clipped to the window."""
+    assert covered_seconds([], 0, 100) == 0
+    assert covered_seconds([(10, 20), (15, 30), (50, 60)], 0, 100) == 30
+    assert covered_seconds([(-50, 10), (90, 150)], 0, 100) == 20
+    assert covered_seconds([(200, 300)], 0, 100) == 0
+
+
+def test_beat_and_uptime():
+    """Beats upsert one row per process; uptime counts gaps between processes as down."""
+    # Import at function level to avoid circular imports
+    from app import app
+    from models import db, ServiceHeartbeat, ErrorLog
+
+    with app.app_context():
+        db.create_all()
+        db.session.execute(db.delete(ServiceHeartbeat).where(ServiceHeartbeat.service == "test"))
+        db.session.add(ServiceHeartbeat(id="stale:1", service="test",
+                                        started_at=datetime.datetime(2020, 1, 1),
+                                        last_seen=datetime.datetime(2020, 1, 2), beats=1))
+        db.session.add(ErrorLog(error_type="keep_alive", error_message="Anti-idle activity", module="app.py"))
+        db.session.commit()
+
+    heartbeat = Heartbeat(service="test", interval=60)
+    assert heartbeat.beat() and heartbeat.beat()
+    with app.app_context():
+        row = db.session.get(ServiceHeartbeat, heartbeat.instance_id)
+        assert row.beats == 2 and row.service == "test"
+
+    # A previous process that ran for the first hour of the last four
+    now = datetime.datetime.utcnow()
+    heartbeat.started_at = now - datetime.timedelta(hours=2)
+    with app.app_context():
+        row = db.session.get(ServiceHeartbeat, heartbeat.instance_id)
+        row.started_at = heartbeat.started_at
+        db.session.add(ServiceHeartbeat(id="other:1", service="test",
+                                        started_at=now - datetime.timedelta(hours=4),
+                                        last_seen=now - datetime.timedelta(hours=3), beats=60))
+        db.session.commit()
+    uptime = heartbeat.compute_uptime()
+    assert 74 < uptime < 76, uptime
+
+    # Pruning removes only stale heartbeat rows, never error log rows
+    heartbeat.prune()
+    with app.app_context():
+        services = db.session.execute(
+            db.select(ServiceHeartbeat.id).where(ServiceHeartbeat.service == "test")
+        ).scalars().all()
+        assert sorted(services) == sorted([heartbeat.instance_id, "other:1"])
+        assert db.session.execute(
+            db.select(ErrorLog).where(ErrorLog.error_type == "keep_alive")
+        ).first() is not None
+
+    status = heartbeat.get_status()
+    assert status["beats"] == 2 and status["failures"] == 0 and status["last_beat_age"] is not None
+
+
+def test_restart_gets_new_row():
+    """A restarted process with the same host and PID does not inherit the old start time."""
+    # Import at function level to avoid circular imports
+    from app import app
+    from models import db, ServiceHeartbeat
+
+    first = Heartbeat(service="test-restart", interval=60)
+    first.started_at = datetime.datetime.utcnow() - datetime.timedelta(hours=5)
+    assert first.beat()
+
+    restarted = Heartbeat(service="test-restart", interval=60)
+    assert restarted.instance_id != first.instance_id
+    assert restarted.beat()
+    with app.app_context():
+        row = db.session.get(ServiceHeartbeat, restarted.instance_id)
+        assert row.started_at == restarted.started_at and row.beats == 1
+
+
+def main():
+    """Run all tests"""
+    for test in (
+        test_covered_seconds,
+        test_beat_and_uptime,
+        test_restart_gets_new_row,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Test script for the local financial question classifier
+"""
+
+import time
+import logging
+
+from intent_classifier import IntentClassifier, CATEGORIES, SEED_EXAMPLES
+
+# Configure logging
+logging.basicConfig(
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+
+def test_seed_classification():
+    """Typical questions are classified confidently; unknown text defers to the LLM."""
+    classifier = IntentClassifier()
+    assert set(SEED_EXAMPLES) == set(CATEGORIES)
+
+    assert classifier.classify("What is impermanent loss?") == "defi_explanation"
+    assert classifier.classify("Which pool gives the best APR for SOL?") == "pool_advice"
+    assert classifier.classify("Will SOL price go up next month?") == "market_prediction"
+    assert classifier.classify("How are my LP rewards taxed?") == "tax_question"
+    assert classifier.classify("How should I split $2000 between pools?") == "strategy_help"
+
+    assert classifier.predict("zxqv blorp") == ("general", 0.0)
+    assert classifier.classify("zxqv blorp") is None
+
+
+def test_training_from_logged_labels():
+    """Logged LLM labels teach the classifier new vocabulary."""
+    classifier = IntentClassifier()
+    question = "is kamino lending integrated"
+    assert classifier.classify(question) is None
+
+    used = classifier.train([
+        ("is kamino integrated with filot", "platform_question"),
+        ("can i use kamino lending", "platform_question"),
+        ("kamino lending support", "platform_question"),
+        ("some question", "not_a_category"),
+    ])
+    assert used == 3
+    assert classifier.training_size == 3
+    assert classifier.classify(question) == "platform_question"
+
+
+def main():
+    """Run all tests"""
+    for test in (
+        test_seed_classification,
+        test_training_from_logged_labels,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
+
+    classifier = IntentClassifier()
+    start = time.perf_counter()
+    for _ in range(10_000):
+        classifier.predict("Which pool gives the best APR for SOL right now?")
+    print(f"Classified a question in {(time.perf_counter() - start) * 100:.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Test script for the local investment simulator and market snapshot history
+"""
+
+import os
+import time
+import logging
+import tempfile
+
+import numpy as np
+
+import market_snapshot
+from market_snapshot import (
+    PoolHistoryStore, normalize_pool, publish_snapshot, get_current_snapshot, HISTORY_SAMPLE_INTERVAL
+)
+from pool_statistics import estimate_statistics
+from investment_simulator import simulate_returns, simulate_pool
+from impermanent_loss import (
+    impermanent_loss, scenario_grid, expected_impermanent_loss,
+    simulate_price_paths, path_impermanent_loss
+)
+
+# Configure logging
+logging.basicConfig(
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+# Pools in the response_data format used by /info and /simulate
+SAMPLE_POOLS = {
+    "bestPerformance": [
+        {
+            "id": "pool-sol-usdc",
+            "pairName": "SOL/USDC",
+            "apr": 36.5,
+            "aprWeekly": 30.0,
+            "aprMonthly": 28.0,
+            "liquidity": 5_000_000,
+            "volume24h": 2_000_000,
+            "fee": 0.0025,
+            "tokenPrices": {"SOL": 150.0, "USDC": 1.0}
+        },
+        {
+            "id": "pool-usdc-usdt",
+            "pairName": "USDC/USDT",
+            "apr": 7.3,
+            "liquidity": 12_000_000,
+            "tokenPrices": {"USDC": 1.0, "USDT": 1.0}
+        }
+    ]
+}
+
+
+def _use_temporary_history():
+    """Point the market snapshot module at an empty history file."""
+    path = os.path.join(tempfile.mkdtemp(), "pool_history.npz")
+    market_snapshot._history = PoolHistoryStore(path=path, max_points=48)
+    return market_snapshot._history
+
+
+def test_impermanent_loss():
+    """IL is zero without a price move and matches the textbook 2x value"""
+    assert abs(float(impermanent_loss(1.0))) < 1e-12
+    # A 2x price move costs about 5.72% versus holding
+    assert abs(float(impermanent_loss(2.0)) + 0.0572) < 1e-3
+    # IL is symmetric in the log price ratio
+    assert abs(float(impermanent_loss(4.0)) - float(impermanent_loss(0.25))) < 1e-12
+
+
+def test_impermanent_loss_engine():
+    """Grid, breakeven, path and expected IL agree with each other"""
+    result = scenario_grid([0.0, 0.05])
+    assert result["lp_value"].shape == (2, len(result["price_ratio"]))
+
+    # Without fees the LP never beats holding; at the breakeven ratios fees exactly offset IL
+    assert np.all(result["net_vs_hold"][0] <= 1e-12)
+    lower, upper = result["breakeven"][1]
+    for ratio in (lower, upper):
+        assert abs((1 + float(impermanent_loss(ratio))) * 1.05 - 1) < 1e-9
+    assert abs(lower * upper - 1) < 1e-9
+
+    # Monte Carlo paths converge on the quadrature expectation
+    volatility = np.array([0.002, 0.05])
+    expected = expected_impermanent_loss(volatility, [30])[:, 0]
+    paths = simulate_price_paths(volatility, 30, paths=4000)
+    simulated = path_impermanent_loss(paths)["mean"][:, -1]
+    assert expected[1] < expected[0] <= 0
+    assert abs(simulated[1] - expected[1]) < 0.002
+
+
+def test_simulate_returns_shapes_and_compounding():
+    """Results broadcast over pools, amounts, horizons and scenarios"""
+    _use_temporary_history()
+    result = simulate_returns(SAMPLE_POOLS["bestPerformance"], [100.0, 1000.0, 5000.0], [1, 30, 365])
+
+    assert result["final_value"].shape == (2, 3, 3, 3)
+    assert result["il_bands"].shape == (2, 3, 2)
+    assert result["net_value"].shape == (2, 3, 3, 3, 2)
+
+    # Steady scenario is daily compounding of the APR
+    expected = 1000.0 * (1 + 0.365 / 365) ** 365
+    assert abs(result["final_value"][0, 1, 2, 0] - expected) < 1e-6
+
+    # Decaying APR never beats a steady APR
+    assert np.all(result["final_value"][..., 1] <= result["final_value"][..., 0] + 1e-9)
+    assert np.all(result["final_value"][..., 2] <= result["final_value"][..., 1] + 1e-9)
+
+    # Stable pairs carry far less impermanent loss than volatile ones
+    assert result["il_bands"][1, -1, 0] > result["il_bands"][0, -1, 0]
+
+    # Fee income comes from volume * fee / TVL and never exceeds earnings
+    assert np.all(result["fee_income"] <= result["earnings"] + 1e-9)
+
+
+def test_volatility_from_history():
+    """Stored price history drives the impermanent loss band"""
+    history = _use_temporary_history()
+    start = time.time() - 48 * 3600
+    rng = np.random.default_rng(7)
+    price = 150.0
+    for i in range(48):
+        price *= float(np.exp(rng.normal(0, 0.01)))
+        history.record(
+            [{"id": "pool-sol-usdc", "apr": 36.5, "tvl": 5e6, "volume": 2e6, "price_a": price, "price_b": 1.0}],
+            timestamp=start + i * 3600,
+            force=True
+        )
+
+    result = simulate_returns(SAMPLE_POOLS["bestPerformance"][:1], [1000.0], [30])
+    # Hourly 1% moves are about 4.9% per day, close to the default but estimated from data
+    assert 0.03 < result["daily_volatility"][0] < 0.07
+
+
+def test_pool_statistics():
+    """APR changes and trends are estimated from stored history"""
+    store = PoolHistoryStore(path=os.path.join(tempfile.mkdtemp(), "pool_history.npz"), max_points=24 * 35)
+    now = time.time()
+    # APR rises from 10% to 40% over 31 days, sampled every 6 hours
+    for i in range(31 * 4 + 1):
+        store.record(
+            [{"id": "pool-sol-usdc", "apr": 10 + 30 * i / (31 * 4), "price_a": 150.0, "price_b": 1.0}],
+            timestamp=now - 31 * 86400 + i * 6 * 3600,
+            force=True
+        )
+
+    records = [normalize_pool(pool) for pool in SAMPLE_POOLS["bestPerformance"]]
+    records[0]["apr"] = 40.0
+    stats = estimate_statistics(records, store=store, now=now)
+
+    # 7 days ago the APR was about 33.2%, 30 days ago about 11%
+    assert abs(stats["apr_change_7d"][0] - (40 / (10 + 30 * 24 / 31) - 1) * 100) < 1.0
+    assert 250 < stats["apr_change_30d"][0] < 270
+    assert stats["apr_trend"][0] > 0
+    # A flat price gives zero volatility; the unknown pool falls back to API averages
+    assert stats["daily_volatility"][0] == 0
+    assert np.isnan(stats["apr_change_7d"][1])
+
+
+def test_snapshot_and_single_simulation():
+    """Publishing pool data makes local single-pool simulation available"""
+    _use_temporary_history()
+    snapshot = publish_snapshot(SAMPLE_POOLS)
+    assert get_current_snapshot() is snapshot
+    assert snapshot.get_pool("pool-sol-usdc")["pair"] == "SOL/USDC"
+
+    # Unchanged data keeps the same version
+    assert publish_snapshot(SAMPLE_POOLS).version == snapshot.version
+
+    simulation = simulate_pool(snapshot.get_pool("pool-sol-usdc"), 1000.0, days=30)
+    assert simulation["success"]
+    assert simulation["profit"] > 0
+    assert abs(simulation["token_a_amount"] - 500.0 / 150.0) < 1e-9
+    assert simulation["impermanent_loss_1sigma"] < 0
+
+    # Statistics are published alongside the snapshot
+    assert snapshot.get_statistics("pool-sol-usdc")["apr_change_7d"] > 0
+
+
+def test_invalid_duration_and_history_file():
+    """Zero days is rejected, and saving the history leaves no temporary files behind"""
+    history = _use_temporary_history()
+    assert simulate_pool(SAMPLE_POOLS["bestPerformance"][0], 1000.0, days=0)["success"] is False
+    try:
+        simulate_returns(SAMPLE_POOLS["bestPerformance"], [1000.0], [30, 0])
+        assert False, "a zero horizon should be rejected"
+    except ValueError:
+        pass
+
+    # Recording only updates memory; the history is written by flush()
+    history.record([normalize_pool(SAMPLE_POOLS["bestPerformance"][0])], force=True)
+    directory = os.path.dirname(history.path)
+    assert os.listdir(directory) == []
+    assert history.flush()
+    assert os.listdir(directory) == ["pool_history.npz"]
+    assert PoolHistoryStore(path=history.path, max_points=48).series("apr", ["pool-sol-usdc"])[0, -1] == 36.5
+
+
+def test_history_saved_in_background():
+    """Publishing never writes the history file; the background writer saves new observations"""
+    history = _use_temporary_history()
+    original_interval = market_snapshot.HISTORY_SAVE_INTERVAL
+    market_snapshot.HISTORY_SAVE_INTERVAL = 0.05
+    try:
+        publish_snapshot(SAMPLE_POOLS)
+        deadline = time.time() + 5
+        while not os.path.exists(history.path) and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        market_snapshot.HISTORY_SAVE_INTERVAL = original_interval
+    assert os.path.exists(history.path)
+    assert PoolHistoryStore(path=history.path, max_points=48).series("apr", ["pool-sol-usdc"])[0, -1] == 36.5
+
+
+def test_history_of_alternating_categories():
+    """Publishing one category records a sample for the pools of the other categories too"""
+    history = _use_temporary_history()
+    market_snapshot._snapshot = None
+    best, stable = SAMPLE_POOLS["bestPerformance"]
+    for pool_data in ({"bestPerformance": [best]}, {"topStable": [stable]}, {"bestPerformance": [best]}):
+        publish_snapshot(pool_data)
+        # Age the stored samples so the next publish passes the sample interval
+        history._timestamps -= HISTORY_SAMPLE_INTERVAL
+
+    apr = history.series("apr", ["pool-sol-usdc", "pool-usdc-usdt"], points=3)
+    assert np.allclose(apr[0], 36.5)
+    assert np.isnan(apr[1, 0]) and np.allclose(apr[1, 1:], 7.3)
+
+
+def main():
+    """Run all tests"""
+    for test in (
+        test_impermanent_loss,
+        test_impermanent_loss_engine,
+        test_simulate_returns_shapes_and_compounding,
+        test_volatility_from_history,
+        test_pool_statistics,
+        test_snapshot_and_single_simulation,
+        test_invalid_duration_and_history_file,
+        test_history_saved_in_background,
+        test_history_of_alternating_categories,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
+
+    # Benchmark: 100 pools x 20 amounts x 4 horizons x 3 scenarios in one call
+    _use_temporary_history()
+    pools = [dict(SAMPLE_POOLS["bestPerformance"][0], id=f"pool-{i}", apr=5 + i) for i in range(100)]
+    start = time.perf_counter()
+    simulate_returns(pools, np.linspace(100, 10_000, 20), [1, 7, 30, 365])
+    print(f"Simulated 24,000 combinations in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Test script for the write-behind log writer
+"""
+
+import time
+import asyncio
+import logging
+import datetime
+import threading
+
+from log_writer import LogWriter, USER_QUERIES, USER_ACTIVITY_LOGS, USER_SPAM_SCORES, ERROR_LOGS
+
+# Configure logging
+logging.basicConfig(
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+# Telegram user ID used by the tests
+USER_ID = 7070
+
+
+def _reset_user():
+    """Create the test user without logs, messages or spam score."""
+    # Import at function level to avoid circular imports
+    from app import app
+    from models import db, User, UserQuery, UserActivityLog
+
+    with app.app_context():
+        db.create_all()
+        db.session.execute(db.delete(UserQuery).where(UserQuery.user_id == USER_ID))
+        db.session.execute(db.delete(UserActivityLog).where(UserActivityLog.user_id == USER_ID))
+        db.session.execute(db.delete(User).where(User.id == USER_ID))
+        db.session.add(User(id=USER_ID, username="log_tester", message_count=2, spam_score=0))
+        db.session.commit()
+
+
+def _read_user():
+    """Get the test user's (message_count, spam_score, activity count)."""
+    # Import at function level to avoid circular imports
+    from app import app
+    from models import db, User, UserActivityLog
+
+    with app.app_context():
+        user = db.session.get(User, USER_ID)
+        activities = UserActivityLog.query.filter_by(user_id=USER_ID).count()
+        return user.message_count, user.spam_score, activities
+
+
+def _activity(i):
+    return {"user_id": USER_ID, "activity_type": "test", "details": str(i),
+            "timestamp": datetime.datetime.utcnow()}
+
+
+def test_batching():
+    """Full batches are written at once; the rest waits for the interval or a flush."""
+    _reset_user()
+    writer = LogWriter(batch_size=3, flush_interval=5.0)
+    for i in range(7):
+        assert writer.enqueue(USER_ACTIVITY_LOGS, _activity(i))
+    assert writer.flush()
+    assert writer.metrics["batches"] == 3 and writer.metrics["written"] == 7
+    assert _read_user()[2] == 7
+    writer.close()
+
+
+def test_queue_full_drops_without_blocking():
+    """Records beyond the queue size are dropped and counted immediately."""
+    release = threading.Event()
+    writer = LogWriter(max_queue=2, batch_size=1)
+    writer._write = lambda batch: release.wait(5)
+
+    writer.enqueue(USER_ACTIVITY_LOGS, _activity(0))
+    # Let the writer take the first record and block on it
+    time.sleep(0.1)
+    assert writer.enqueue(USER_ACTIVITY_LOGS, _activity(1))
+    assert writer.enqueue(USER_ACTIVITY_LOGS, _activity(2))
+    started = time.perf_counter()
+    assert not writer.enqueue(USER_ACTIVITY_LOGS, _activity(3))
+    assert time.perf_counter() - started < 0.01
+    assert writer.get_metrics()["dropped"] == 1 and writer.get_metrics()["queued"] == 2
+
+    release.set()
+    assert writer.flush()
+    writer.close()
+
+
+def _blocked_writer(max_queue, **kwargs):
+    """Writer whose batches of one record wait for release; returns (writer, release, written)."""
+    release = threading.Event()
+    written = []
+    writer = LogWriter(max_queue=max_queue, batch_size=1, **kwargs)
+
+    def write(batch):
+        release.wait(5)
+        written.extend(batch)
+
+    writer._write = write
+    writer.enqueue(USER_ACTIVITY_LOGS, _activity(0))
+    # Let the writer take the first record and block on it
+    time.sleep(0.1)
+    return writer, release, written
+
+
+def test_error_logs_never_dropped():
+    """Error logs finding the queue full are kept and written."""
+    writer, release, written = _blocked_writer(max_queue=1)
+    assert writer.enqueue(USER_ACTIVITY_LOGS, _activity(1))
+    assert not writer.enqueue(USER_ACTIVITY_LOGS, _activity(2))
+    error = {"error_type": "test", "error_message": "queue full"}
+    assert writer.enqueue(ERROR_LOGS, error)
+    metrics = writer.get_metrics()
+    assert metrics["dropped"] == 1 and metrics["overflowed"] == 1 and metrics["queued"] == 2
+
+    release.set()
+    assert writer.flush()
+    assert (ERROR_LOGS, error) in written and len(written) == 3
+    writer.close()
+
+
+def test_error_log_overflow_is_bounded():
+    """Error logs beyond the overflow size evict the oldest one, which is counted as dropped."""
+    writer, release, written = _blocked_writer(max_queue=1, max_overflow=2)
+    assert writer.enqueue(USER_ACTIVITY_LOGS, _activity(1))
+    errors = [{"error_type": "test", "error_message": f"error {i}"} for i in range(3)]
+    for error in errors:
+        assert writer.enqueue(ERROR_LOGS, error)
+    metrics = writer.get_metrics()
+    assert metrics["dropped"] == 1 and metrics["overflowed"] == 3 and metrics["queued"] == 3
+
+    release.set()
+    assert writer.flush()
+    assert (ERROR_LOGS, errors[0]) not in written
+    assert [(ERROR_LOGS, error) in written for error in errors[1:]] == [True, True]
+    writer.close()
+
+
+def test_async_enqueue_waits_for_room():
+    """enqueue_async waits for room in a full queue without blocking the event loop."""
+    writer, release, written = _blocked_writer(max_queue=1)
+    assert writer.enqueue(USER_ACTIVITY_LOGS, _activity(1))
+
+    async def run():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.create_task(tick())
+        timed_out = await writer.enqueue_async(USER_ACTIVITY_LOGS, _activity(2), timeout=0.05)
+        threading.Timer(0.1, release.set).start()
+        queued = await writer.enqueue_async(USER_ACTIVITY_LOGS, _activity(3), timeout=2.0)
+        ticker.cancel()
+        return timed_out, queued, ticks
+
+    timed_out, queued, ticks = asyncio.run(run())
+    assert not timed_out and queued
+    # The loop kept running while the records waited
+    assert ticks >= 5, ticks
+    assert writer.flush()
+    assert writer.metrics["dropped"] == 1 and len(written) == 3
+    writer.close()
+
+
+def test_user_counters():
+    """Logged queries add to message_count; the latest spam score of a batch wins."""
+    _reset_user()
+    writer = LogWriter(batch_size=100, flush_interval=5.0)
+    now = datetime.datetime.utcnow()
+    for i in range(3):
+        writer.enqueue(USER_QUERIES, {"user_id": USER_ID, "command": "message", "query_text": f"q{i}",
+                                      "response_text": None, "processing_time": 1.0, "timestamp": now})
+    writer.enqueue(USER_SPAM_SCORES, {"user_id": USER_ID, "spam_score": 2})
+    writer.enqueue(USER_SPAM_SCORES, {"user_id": USER_ID, "spam_score": 5})
+    assert writer.flush()
+    assert writer.metrics["batches"] == 1 and writer.metrics["failed_batches"] == 0
+    assert _read_user()[:2] == (5, 5)
+    writer.close()
+
+
+def test_unknown_user_created():
+    """A spam score for a user not in the database yet creates the user."""
+    # Import at function level to avoid circular imports
+    from app import app
+    from models import db, User
+
+    with app.app_context():
+        db.create_all()
+        db.session.execute(db.delete(User).where(User.id == USER_ID + 1))
+        db.session.commit()
+
+    writer = LogWriter(batch_size=100, flush_interval=5.0)
+    writer.enqueue(USER_SPAM_SCORES, {"user_id": USER_ID + 1, "spam_score": 3})
+    assert writer.flush()
+    assert writer.metrics["failed_batches"] == 0
+    with app.app_context():
+        user = db.session.get(User, USER_ID + 1)
+        assert user is not None and user.spam_score == 3 and user.message_count == 0
+    writer.close()
+
+
+def test_flush_and_close():
+    """flush() leaves the writer running; close() stops it until the next record."""
+    _reset_user()
+    writer = LogWriter(batch_size=100, flush_interval=5.0)
+    writer.enqueue(USER_ACTIVITY_LOGS, _activity(0))
+    assert writer.flush()
+    thread = writer._thread
+    assert thread.is_alive()
+
+    writer.enqueue(USER_ACTIVITY_LOGS, _activity(1))
+    writer.close()
+    assert not thread.is_alive() and _read_user()[2] == 2
+
+    writer.enqueue(USER_ACTIVITY_LOGS, _activity(2))
+    assert writer._thread.is_alive() and writer.flush()
+    assert _read_user()[2] == 3
+    writer.close()
+
+
+def main():
+    """Run all tests"""
+    for test in (
+        test_batching,
+        test_queue_full_drops_without_blocking,
+        test_error_logs_never_dropped,
+        test_error_log_overflow_is_bounded,
+        test_async_enqueue_waits_for_room,
+        test_user_counters,
+        test_unknown_user_created,
+        test_flush_and_close,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
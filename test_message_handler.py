@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Test script for the free-text message handler
+"""
+
+import asyncio
+import logging
+import threading
+from types import SimpleNamespace
+
+import bot
+import db_utils
+import async_db
+from menus import MenuType
+
+# Configure logging
+logging.basicConfig(
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+# A question without a predefined answer, answered by the AI advisor
+QUESTION = "Could you advise me on my portfolio allocation?"
+
+
+class FakeMessage:
+    """Telegram message recording replies and edits."""
+
+    def __init__(self, text="", chat=None):
+        self.text = text
+        self.chat = chat if chat is not None else []
+        self.edits = []
+
+    async def reply_text(self, text, **kwargs):
+        reply = FakeMessage(text, self.chat)
+        self.chat.append(reply)
+        return reply
+
+    async def reply_markdown(self, text, **kwargs):
+        return await self.reply_text(text)
+
+    async def edit_text(self, text, **kwargs):
+        self.edits.append(text)
+        self.text = text
+
+
+class FakeAdvisor:
+    """AI advisor answering general questions with a fixed, streamed answer."""
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.calls = []
+
+    async def classify_financial_question(self, question):
+        self.calls.append("classify")
+        return "general"
+
+    async def get_financial_advice(self, question, pool_data=None, risk_profile=None,
+                                   investment_horizon=None, on_text=None):
+        self.calls.append("advice")
+        if on_text:
+            await on_text(self.answer[:10])
+        return self.answer
+
+
+class Patched:
+    """Replace module attributes for the duration of a block."""
+
+    def __init__(self, *replacements):
+        self.replacements = replacements
+        self.originals = []
+
+    def __enter__(self):
+        for module, name, value in self.replacements:
+            self.originals.append((module, name, getattr(module, name)))
+            setattr(module, name, value)
+        return self
+
+    def __exit__(self, *exc):
+        for module, name, value in reversed(self.originals):
+            setattr(module, name, value)
+
+
+def _make_update(text, user_id=5151):
+    message = FakeMessage(text)
+    update = SimpleNamespace(
+        effective_user=SimpleNamespace(id=user_id, username="tester", first_name="Test", last_name=None),
+        effective_chat=SimpleNamespace(id=user_id),
+        message=message,
+        callback_query=None,
+    )
+    context = SimpleNamespace(bot=SimpleNamespace(send_chat_action=_no_op))
+    return update, context
+
+
+async def _no_op(*args, **kwargs):
+    return None
+
+
+def _recorder(records, pick=lambda args, kwargs: (args, kwargs)):
+    """Async logging function appending what pick extracts from its arguments to records."""
+    async def record(*args, **kwargs):
+        records.append(pick(args, kwargs))
+    return record
+
+
+async def _no_pools():
+    return []
+
+
+async def _current_menu(user_id):
+    return MenuType.MAIN
+
+
+async def _profile(user_id, **fields):
+    return SimpleNamespace(id=user_id, risk_profile="moderate", investment_horizon="medium")
+
+
+def test_general_question():
+    """A general question is answered by the advisor, and the query and activity are logged."""
+    answer = "Diversify across stable pools first and size positions to your risk profile."
+    advisor = FakeAdvisor(answer)
+    logged_queries, logged_activities = [], []
+    classifier = SimpleNamespace(classify=lambda text: None)
+    bot.get_answer_cache().clear()
+
+    with Patched(
+        (bot, "ai_advisor", advisor),
+        (bot, "get_classifier", lambda: classifier),
+        (bot, "get_pool_data", _no_pools),
+        (bot, "get_current_menu", _current_menu),
+        (async_db, "get_or_create_user", _profile),
+        (db_utils, "log_user_query_async", _recorder(logged_queries, lambda args, kwargs: kwargs)),
+        (db_utils, "log_user_activity_async", _recorder(logged_activities)),
+    ):
+        update, context = _make_update(QUESTION)
+        asyncio.run(bot.handle_message(update, context))
+
+    chat = update.message.chat
+    assert advisor.calls == ["classify", "advice"], advisor.calls
+    assert len(chat) == 1 and chat[0].text == answer, [m.text for m in chat]
+    assert logged_queries and logged_queries[0]["response_text"] == answer
+    assert logged_activities and logged_activities[0][0][1] == "ai_response"
+
+
+def test_cached_answer():
+    """A repeated question is answered from the cache without classifying it or loading pools."""
+    answer = "Keep most of it in stable pairs while you learn how the pools behave."
+    advisor = FakeAdvisor(answer)
+    logged_activities = []
+    classifier = SimpleNamespace(classify=lambda text: None)
+    bot.get_answer_cache().clear()
+
+    async def _pools_not_expected():
+        raise AssertionError("pool data loaded for a cached answer")
+
+    replacements = [
+        (bot, "ai_advisor", advisor),
+        (bot, "get_classifier", lambda: classifier),
+        (bot, "get_current_menu", _current_menu),
+        (async_db, "get_or_create_user", _profile),
+        (db_utils, "log_user_query_async", _no_op),
+        (db_utils, "log_user_activity_async", _recorder(logged_activities, lambda args, kwargs: kwargs["details"])),
+    ]
+    with Patched(*replacements, (bot, "get_pool_data", _no_pools)):
+        asyncio.run(bot.handle_message(*_make_update(QUESTION)))
+    with Patched(*replacements, (bot, "get_pool_data", _pools_not_expected)):
+        update, context = _make_update("could you advise me on my PORTFOLIO allocation")
+        asyncio.run(bot.handle_message(update, context))
+
+    assert advisor.calls == ["classify", "advice"], advisor.calls
+    assert [m.text for m in update.message.chat] == [answer]
+    assert logged_activities == ["Classification: general (llm)", "Classification: unclassified (cache)"]
+
+
+def test_fallback_not_cached():
+    """Canned replies, e.g. for an empty model response, are not served from the cache."""
+    advisor = FakeAdvisor("I couldn't generate financial advice at this time.")
+    classifier = SimpleNamespace(classify=lambda text: None)
+    bot.get_answer_cache().clear()
+
+    with Patched(
+        (bot, "ai_advisor", advisor),
+        (bot, "get_classifier", lambda: classifier),
+        (bot, "get_pool_data", _no_pools),
+        (bot, "get_current_menu", _current_menu),
+        (async_db, "get_or_create_user", _profile),
+        (db_utils, "log_user_query_async", _no_op),
+        (db_utils, "log_user_activity_async", _no_op),
+    ):
+        for _ in range(2):
+            asyncio.run(bot.handle_message(*_make_update(QUESTION)))
+
+    assert advisor.calls == ["classify", "advice", "classify", "advice"], advisor.calls
+
+
+def test_commands_off_event_loop():
+    """Command handlers run their database work on the database threads."""
+    threads, logged_activities = [], []
+
+    def subscribe_user(user_id):
+        threads.append(threading.get_ident())
+        return True
+
+    async def run():
+        update, context = _make_update("/subscribe")
+        await bot.subscribe_command(update, context)
+        return threading.get_ident(), update.message.chat
+
+    with Patched(
+        (db_utils, "subscribe_user", subscribe_user),
+        (db_utils, "log_user_activity_async", _recorder(logged_activities, lambda args, kwargs: args[1])),
+    ):
+        loop_thread, chat = asyncio.run(run())
+
+    assert threads and threads[0] != loop_thread
+    assert logged_activities == ["subscribe"]
+    assert "successfully subscribed" in chat[0].text
+
+
+def main():
+    """Run all tests"""
+    for test in (
+        test_general_question,
+        test_cached_answer,
+        test_fallback_not_cached,
+        test_commands_off_event_loop,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
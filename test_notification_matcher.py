@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Test script for the market snapshot notification matcher
+"""
+
+import time
+import asyncio
+import logging
+import threading
+
+import sharding
+from market_snapshot import MarketSnapshot
+from notification_matcher import (
+    ALERT_COOLDOWN, INDEX_REFRESH_INTERVAL, NotificationIndex, NotificationMatcher, diff_snapshots, parse_watch_targets
+)
+
+# Configure logging
+logging.basicConfig(
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+
+def make_snapshot(version, apr=10.0, price=100.0, tvl=1_000_000.0, trend=0.0):
+    """Build a snapshot with one SOL/USDC and one BONK/USDC pool."""
+    records = {
+        "p1": {"id": "p1", "pair": "SOL/USDC", "token_a": "SOL", "token_b": "USDC",
+               "apr": apr, "tvl": tvl, "price_a": price, "price_b": 1.0},
+        "p2": {"id": "p2", "pair": "BONK/USDC", "token_a": "BONK", "token_b": "USDC",
+               "apr": 30.0, "tvl": 500_000.0, "price_a": 0.00002, "price_b": 1.0},
+    }
+    statistics = {"p1": {"apr_trend": trend}, "p2": {"apr_trend": 0.0}}
+    return MarketSnapshot(version, {}, records, time.time(), statistics, f"fp{version}")
+
+
+def test_diff_snapshots():
+    """Only changes past their thresholds become events."""
+    base = make_snapshot(1)
+    assert diff_snapshots(base, make_snapshot(2, apr=11.0, price=102.0)) == []
+
+    events = diff_snapshots(base, make_snapshot(2, apr=15.0, price=110.0, tvl=2_000_000.0, trend=8.0))
+    kinds = sorted((event.kind, event.key) for event in events)
+    assert kinds == [("apr", "p1"), ("market", "tvl"), ("prediction", "p1"), ("price", "SOL")]
+
+
+def test_market_alert_ignores_new_pools():
+    """Pools appearing or disappearing between snapshots do not change the total liquidity."""
+    base = make_snapshot(1)
+    grown = make_snapshot(2)
+    grown.records["p3"] = {"id": "p3", "pair": "JTO/USDC", "token_a": "JTO", "token_b": "USDC",
+                           "apr": 20.0, "tvl": 5_000_000.0, "price_a": 3.0, "price_b": 1.0}
+    assert diff_snapshots(base, grown) == []
+    assert diff_snapshots(grown, base) == []
+
+
+def test_index_matching():
+    """Users match events of their types, filtered by watched pools and tokens."""
+    index = NotificationIndex()
+    index.update(1, ["apr"])
+    index.update(2, ["apr"], parse_watch_targets(["bonk"]))
+    index.update(3, ["apr", "price"], parse_watch_targets(["sol/usdc"]))
+    index.update(4, ["price"])
+
+    events = {event.kind: event for event in diff_snapshots(make_snapshot(1), make_snapshot(2, apr=15.0, price=110.0))}
+    assert index.match(events["apr"]) == {1, 3}
+    assert index.match(events["price"]) == {3, 4}
+
+    index.update(1, [])
+    index.remove(4)
+    assert index.match(events["apr"]) == {3}
+    assert index.match(events["price"]) == {3}
+    assert len(index) == 2
+
+
+class RecordingMatcher(NotificationMatcher):
+    """Matcher recording the alerts it would broadcast."""
+
+    def __init__(self):
+        super().__init__()
+        self.dispatched = []
+
+    def _dispatch(self, snapshot, text, user_ids):
+        self.dispatched.append((text, sorted(user_ids)))
+        return True
+
+
+def test_market_alerts_reach_watchers():
+    """Users watching pools or tokens still get market alerts, which have no targets."""
+    index = NotificationIndex()
+    index.update(1, ["market", "apr"], parse_watch_targets(["SOL"]))
+    index.update(2, ["market"])
+    events = diff_snapshots(make_snapshot(1), make_snapshot(2, apr=15.0, tvl=2_000_000.0))
+    events = {event.kind: event for event in events}
+    assert index.match(events["market"]) == {1, 2}
+    assert index.match(events["apr"]) == {1}
+
+    index.remove(1)
+    assert index.match(events["market"]) == {2}
+
+
+def test_on_snapshot():
+    """Alerts are combined per user, grouped by text and not repeated within the cooldown."""
+    matcher = RecordingMatcher()
+    matcher._loaded_at = time.time()
+    matcher.index.update(1, ["apr", "price"])
+    matcher.index.update(2, ["price"])
+
+    assert matcher.on_snapshot(None, make_snapshot(1)) == {}
+    alerts = matcher.on_snapshot(make_snapshot(1), make_snapshot(2, apr=15.0, price=110.0))
+    assert sorted(sorted(users) for users in alerts.values()) == [[1], [2]]
+    assert len(matcher.dispatched) == 2
+
+    assert matcher.on_snapshot(make_snapshot(2), make_snapshot(3, apr=25.0, price=130.0)) == {}
+    assert matcher.metrics["suppressed"] == 2
+
+    # Cooldowns end and are evicted
+    matcher._last_fired = {key: fired - ALERT_COOLDOWN for key, fired in matcher._last_fired.items()}
+    assert matcher.on_snapshot(make_snapshot(3), make_snapshot(4, apr=40.0, price=150.0))
+    assert len(matcher._last_fired) == 2
+
+
+def test_stale_index_reloads_in_background():
+    """A stale index is matched against while a reload runs, and replaced once it finishes."""
+    release = threading.Event()
+
+    class SlowLoadMatcher(RecordingMatcher):
+        def load_index(self):
+            release.wait(5)
+            index = NotificationIndex()
+            index.update(2, ["apr"])
+            self.index, self._loaded_at = index, time.time()
+
+    matcher = SlowLoadMatcher()
+    matcher._loaded_at = time.time() - INDEX_REFRESH_INTERVAL - 1
+    matcher.index.update(1, ["apr"])
+
+    started = time.monotonic()
+    alerts = matcher.on_snapshot(make_snapshot(1), make_snapshot(2, apr=15.0))
+    assert time.monotonic() - started < 1
+    assert list(alerts.values()) == [[1]]
+
+    release.set()
+    deadline = time.monotonic() + 5
+    while matcher._reloading and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not matcher._reloading
+    matcher._last_fired.clear()
+    alerts = matcher.on_snapshot(make_snapshot(2), make_snapshot(3, apr=25.0))
+    assert list(alerts.values()) == [[2]]
+
+
+def test_dropped_alerts_keep_no_cooldown():
+    """Alerts dropped for lack of a bot, or matching no user, can fire on the next change."""
+    matcher = NotificationMatcher()
+    matcher._loaded_at = time.time()
+    matcher.index.update(1, ["apr"])
+
+    alerts = matcher.on_snapshot(make_snapshot(1), make_snapshot(2, apr=15.0, price=110.0))
+    assert list(alerts.values()) == [[1]]
+    assert matcher.metrics["dropped"] == 1
+    assert not matcher._last_fired
+
+    alerts = matcher.on_snapshot(make_snapshot(2), make_snapshot(3, apr=25.0, price=130.0))
+    assert list(alerts.values()) == [[1]]
+    assert matcher.metrics["suppressed"] == 0
+
+
+class FakeBot:
+    """Bot recording the chats it sent to."""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, parse_mode=None, api_kwargs=None):
+        self.sent.append(chat_id)
+
+
+async def _wait_for(condition, timeout=5.0):
+    """Wait until condition() is true or the timeout passes."""
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    return condition()
+
+
+def test_shards_share_snapshot():
+    """Workers alerting their own users about the same snapshot do not share a broadcast checkpoint."""
+    # Import at function level to avoid circular imports
+    from app import app
+    from models import db
+
+    with app.app_context():
+        db.create_all()
+
+    version = int(time.time() * 1000)
+    previous, current = make_snapshot(version), make_snapshot(version + 1, apr=15.0)
+    bot = FakeBot()
+    original_index = sharding.SHARD_INDEX
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        for shard, user_id in enumerate((1, 2)):
+            matcher = NotificationMatcher()
+            matcher._loaded_at = time.time()
+            matcher.index.update(user_id, ["apr"])
+            matcher.attach(loop, bot)
+            sharding.SHARD_INDEX = shard
+            assert matcher.on_snapshot(previous, current)
+            assert await _wait_for(lambda: user_id in bot.sent), bot.sent
+
+    try:
+        asyncio.run(run())
+    finally:
+        sharding.SHARD_INDEX = original_index
+    assert sorted(bot.sent) == [1, 2]
+
+
+def main():
+    """Run all tests"""
+    for test in (
+        test_diff_snapshots,
+        test_market_alert_ignores_new_pools,
+        test_index_matching,
+        test_market_alerts_reach_watchers,
+        test_on_snapshot,
+        test_stale_index_reloads_in_background,
+        test_dropped_alerts_keep_no_cooldown,
+        test_shards_share_snapshot,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
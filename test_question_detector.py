@@ -0,0 +1,372 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Test script for the compiled question matcher
+Checks that is_question and get_predefined_response give the same answers as the
+original linear-scan implementation, and benchmarks per-message matching cost
+"""
+
+import re
+import time
+import random
+import logging
+from typing import Optional
+
+from question_detector import (
+    get_predefined_responses, get_variations, is_question, get_predefined_response,
+    KEYWORD_COMBINATIONS, TOPIC_KEYWORDS, PatternAutomaton
+)
+
+# Keep the benchmark output readable
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+# Messages in the style users actually send
+SAMPLE_MESSAGES = [
+    "What is FiLot?",
+    "Tell me about LA!",
+    "How do I start investing?",
+    "Explain impermanent loss",
+    "What's the difference between APR and APY?",
+    "How much can I earn compared to a bank?",
+    "Is LA token on Solana?",
+    "What's the contract address for LA?",
+    "When does the project launch?",
+    "Help me understand liquidity pools",
+    "Who created FiLot?",
+    "I want to know more about LA token",
+    "Hi there",
+    "This is not a question just a statement",
+    "Just random words without any meaning",
+    "gm",
+    "thanks!",
+    "wallet",
+    "is my wallet safe",
+    "the sol pool looks great today",
+    "defi vs cefi which one is better",
+    "any tips for a beginner with a small amount",
+    "how are taxes on capital gains handled",
+    "lp",
+    "I lost money on a pool yesterday, price change was brutal",
+]
+
+
+# Original implementation, kept as the reference for parity and as the benchmark baseline
+
+def legacy_is_question(text: str) -> bool:
+    """
+    Determine if text is likely a question based on various patterns.
+
+    Args:
+        text: The message text to analyze
+
+    Returns:
+        True if the text is likely a question, False otherwise
+    """
+    # Clean the text
+    text = text.strip().lower()
+
+    # Empty text is not a question
+    if not text:
+        return False
+
+    # Single word inputs are often questions about specific topics in a chat context
+    if len(text.split()) == 1 or len(text.split()) == 2:
+        # Check against common crypto and bot-related terms
+        crypto_terms = [
+            'filot', 'la', 'token', 'pool', 'apr', 'yield', 'liquidity', 'impermanent', 
+            'risk', 'wallet', 'roadmap', 'security', 'defi', 'governance', 'investment'
+        ]
+        for term in crypto_terms:
+            if term in text:
+                logger.info(f"Treating single/short term '{text}' as question about '{term}'")
+                return True
+
+    # Check if ends with a question mark
+    if text.endswith('?'):
+        logger.info(f"Detected question mark in: '{text}'")
+        return True
+
+    # Check for question words at the beginning - expanded list
+    question_starters = [
+        'what', 'how', 'why', 'when', 'where', 'which', 'who', 'is', 'are', 'can', 
+        'could', 'will', 'would', 'should', 'do', 'does', 'did', 'tell me about',
+        'explain', 'describe', 'show me', 'give me', 'i need', 'i want', 'help me with'
+    ]
+
+    for starter in question_starters:
+        if text.startswith(starter):  # Removed ' ' requirement to match more flexible starts
+            logger.info(f"Detected question starter '{starter}' in: '{text}'")
+            return True
+
+    # Check for question words anywhere in the text - for short messages
+    if len(text.split()) <= 5:  # Only for short messages to avoid false positives
+        anywhere_question_words = [
+            'what', 'how', 'why', 'when', 'where', 'which', 'who'
+        ]
+        for word in anywhere_question_words:
+            if word in text.split():
+                logger.info(f"Detected question word '{word}' in short text: '{text}'")
+                return True
+
+    # Check for inverted question structure - expanded patterns
+    inverted_patterns = [
+        r'(is|are|was|were|do|does|did|have|has|had|can|could|should|would|will) ([\w\s]+)\?*$',
+        r'(is|are|was|were|do|does|did|have|has|had|can|could|should|would|will) (it|there|they|he|she|we|you|i) ([\w\s]+)\?*$',
+        r'(tell|show|explain|describe) (me|us) ([\w\s]+)\?*$',
+        r'(need|want) (to know|info|information|details) ([\w\s]+)\?*$'
+    ]
+
+    for pattern in inverted_patterns:
+        if re.match(pattern, text):
+            logger.info(f"Detected inverted question pattern in: '{text}'")
+            return True
+
+    # Check for additional question patterns/expressions - expanded list
+    question_expressions = [
+        "explain", "tell me about", "what about", "i want to know", "can you", "i need info", 
+        "information on", "details about", "describe", "elaborate on", "need help with",
+        "tell me", "show me", "how do i", "how to", "what is", "what are", "what does",
+        "help me", "question about", "looking for", "searching for", "trying to find",
+        "want to learn", "need to understand", "wondering about", "curious about"
+    ]
+
+    for expression in question_expressions:
+        if expression in text:
+            logger.info(f"Detected question expression '{expression}' in: '{text}'")
+            return True
+
+    # Topic-specific triggers that indicate questions about crypto topics
+    crypto_question_indicators = {
+        'filot': ["filot", "bot", "assistant"],
+        'la token': ["la", "la token", "token", "la!"],
+        'liquidity': ["pool", "liquidity", "lp", "yield farm"],
+        'wallet': ["wallet", "connect", "address", "balance"],
+        'investment': ["invest", "strategy", "return", "apr", "apy", "yield"],
+        'risk': ["risk", "impermanent loss", "il", "safe"]
+    }
+
+    for topic, indicators in crypto_question_indicators.items():
+        if any(indicator in text for indicator in indicators):
+            # For short texts or texts with these terms at the beginning, treat as questions
+            if len(text.split()) <= 3 or any(text.startswith(indicator) for indicator in indicators):
+                logger.info(f"Detected crypto topic '{topic}' in potential question: '{text}'")
+                return True
+
+    # Log if we determined this isn't a question
+    logger.info(f"Text not detected as question: '{text}'")
+    return False
+
+
+def legacy_get_predefined_response(query: str) -> Optional[str]:
+    """
+    Retrieve a predefined response based on the user's query using enhanced matching.
+    The matching logic checks for direct keys, variations, and keyword combinations.
+
+    Args:
+        query: User's message text
+
+    Returns:
+        Predefined response or None if no match is found
+    """
+    if not query:
+        return None
+
+    # Clean the query
+    query_lower = query.lower().strip("?!.,")
+
+    # Get responses and variations
+    responses = get_predefined_responses()
+    variations = get_variations()
+
+    # Check if it's likely a question
+    if not legacy_is_question(query) and not any(keyword in query_lower for keyword in ['hi', 'hello', 'hey', 'start']):
+        # If it doesn't seem like a question and doesn't contain greeting keywords, skip matching
+        logger.debug(f"Message '{query_lower}' doesn't seem like a question, skipping predefined matching")
+        return None
+
+    # Log that we're processing a potential question
+    logger.info(f"Processing potential question: '{query_lower}'")
+
+    # First, check for launch-related queries as a high priority match
+    if 'launch' in query_lower and ('la' in query_lower or 'token' in query_lower):
+        logger.info(f"Detected launch-related query: {query_lower}")
+        return responses.get("tell me about la token's launch")
+
+    # Check for when-related queries about LA token launch
+    if 'when' in query_lower and ('la' in query_lower or 'token' in query_lower):
+        logger.info(f"Detected when-related LA token query: {query_lower}")
+        return responses.get("tell me about la token's launch")
+
+    # Check for single-word queries using key terms
+    key_terms = {
+        'la': 'what is la token',
+        'filot': 'what is filot',
+        'token': 'what is la token',
+        'roadmap': 'what is the roadmap',
+    }
+    if query_lower in key_terms:
+        logger.info(f"Matched key term: {query_lower} → {key_terms[query_lower]}")
+        return responses.get(key_terms[query_lower])
+
+    # Check for exact matches
+    if query_lower in responses:
+        logger.info(f"Matched exact query: {query_lower}")
+        return responses[query_lower]
+
+    # Check in variations (exact match or substring match)
+    for canonical, variant_list in variations.items():
+        if query_lower in variant_list:
+            logger.info(f"Matched variation: {query_lower} → {canonical}")
+            return responses.get(canonical)
+
+        # Look for substring matches
+        for variant in variant_list:
+            if variant in query_lower:
+                logger.info(f"Matched substring: '{variant}' in '{query_lower}' → {canonical}")
+                return responses.get(canonical)
+
+    # Check for keyword combinations
+    keyword_combinations = {
+        ('how', 'start'): 'how to use filot',
+        ('what', 'pool'): 'what is liquidity pool',
+        ('what', 'apr'): 'what is apr',
+        ('impermanent', 'loss'): 'impermanent loss',
+        ('who', 'you'): 'what is filot',
+        ('what', 'ask'): 'what can i ask',
+        ('apy', 'mean'): 'what is apy',
+        ('bank', 'interest'): 'compare bank interest',
+        ('difference', 'apr', 'apy'): 'what is apy',
+        ('how', 'filot', 'work'): 'how does filot work',
+        ('how', 'work'): 'how does filot work',
+        ('security', 'measures'): 'security measures',
+        ('how', 'secure'): 'security measures',
+        ('investment', 'strategy'): 'investment strategies',
+        ('defi', 'cefi'): 'difference between defi and cefi',
+        ('defi', 'vs'): 'difference between defi and cefi',
+        ('yield', 'farm'): 'yield farming',
+        ('when', 'invest'): 'best time to invest',
+        ('best', 'time'): 'best time to invest',
+        ('tax', 'crypto'): 'tax implications',
+        ('small', 'investment'): 'how to start with $100',
+        ('$100', 'invest'): 'how to start with $100'
+    }
+    for keywords, response_key in keyword_combinations.items():
+        if all(keyword in query_lower for keyword in keywords):
+            logger.info(f"Matched keyword combination: {keywords} → {response_key}")
+            return responses.get(response_key)
+
+    # Semantic matching for more complex questions
+    # This section tries to match questions that might be phrased differently
+    # but are looking for the same information
+
+    # Topics and their related keywords
+    topics = {
+        "what is filot": ["platform", "service", "purpose", "about", "project", "tool", "app", "application"],
+        "what is la token": ["cryptocurrency", "coin", "utility", "token", "tokenomics"],
+        "what is the roadmap": ["plan", "timeline", "future", "development", "coming", "next"],
+        "how to use filot": ["instructions", "guide", "manual", "tutorial", "user", "help", "use"],
+        "what is liquidity pool": ["provide liquidity", "lp", "pooling", "amm", "pool"],
+        "impermanent loss": ["risk", "loss", "divergence", "price change"],
+        "what is apr": ["interest", "return", "yield", "earn", "profit", "reward"],
+        "compare bank interest": ["savings", "traditional", "bank", "investment", "return"],
+        "how does filot work": ["mechanism", "process", "operation", "function", "algorithm", "system"],
+        "security measures": ["safety", "protection", "secure", "safeguard", "encryption", "protection"],
+        "investment strategies": ["approach", "method", "technique", "tactic", "plan", "portfolio"],
+        "difference between defi and cefi": ["centralized", "decentralized", "comparison", "versus", "traditional"],
+        "yield farming": ["staking", "liquidity mining", "rewards", "incentives", "defi yields"],
+        "best time to invest": ["timing", "entry", "market timing", "when to buy", "opportunity"],
+        "tax implications": ["taxation", "reporting", "irs", "tax treatment", "capital gains"],
+        "how to start with $100": ["beginner", "small amount", "low budget", "minimal", "starting capital"]
+    }
+
+    for topic, keywords in topics.items():
+        if any(keyword in query_lower for keyword in keywords):
+            topic_words = set(topic.split())
+            query_words = set(query_lower.split())
+            # If query contains at least one topic word and one keyword
+            if topic_words.intersection(query_words) and any(keyword in query_lower for keyword in keywords):
+                logger.info(f"Matched semantic topic: {topic} with keywords {[k for k in keywords if k in query_lower]}")
+                return responses.get(topic)
+
+    # No match found
+    logger.info(f"No predefined response match for: {query_lower}")
+    return None
+
+
+def _corpus():
+    """Sample messages plus every variation, key and keyword in a few phrasings."""
+    rng = random.Random(42)
+    phrases = list(get_predefined_responses()) + [v for vs in get_variations().values() for v in vs]
+    keywords = [k for ks, _ in KEYWORD_COMBINATIONS for k in ks]
+    keywords += [k for ks in TOPIC_KEYWORDS.values() for k in ks]
+
+    corpus = list(SAMPLE_MESSAGES)
+    for phrase in phrases:
+        corpus += [phrase, phrase.upper() + "?", f"so {phrase} please", f"hmm {phrase}."]
+    for _ in range(500):
+        corpus.append(" ".join(rng.sample(keywords + ["the", "my", "a", "sol", "today"], rng.randint(1, 6))))
+    return corpus
+
+
+def test_automaton_finds_all_occurrences():
+    """Overlapping patterns and patterns ending inside other patterns are all found"""
+    automaton = PatternAutomaton(["he", "she", "his", "hers", "la", "la token"])
+    hits = automaton.search("ushers like la token")
+    assert hits == {"she": 1, "he": 2, "hers": 2, "la": 12, "la token": 12}
+
+
+def test_automaton_cache_ignores_foreign_characters():
+    """Characters outside every pattern reset the match without growing the transition cache."""
+    automaton = PatternAutomaton(["he", "she", "his", "hers"])
+    cached = sum(len(transitions) for transitions in automaton._delta)
+    assert automaton.search("sh🚀e 你好 ushers") == {"she": 9, "he": 10, "hers": 10}
+    text = "".join(chr(code) for code in range(0x4E00, 0x5E00))
+    automaton.search(text)
+    grown = sum(len(transitions) for transitions in automaton._delta) - cached
+    assert grown <= len(automaton._alphabet) * len(automaton._delta)
+    assert not any(char in transitions for transitions in automaton._delta for char in "🚀你好")
+
+
+def test_matches_original_implementation():
+    """Compiled matching returns exactly what the linear scans returned"""
+    for message in _corpus():
+        assert is_question(message) == legacy_is_question(message), message
+        assert get_predefined_response(message) == legacy_get_predefined_response(message), message
+
+
+def _time_per_message(function, messages, rounds=5):
+    """Best-of-rounds average time per message in microseconds."""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for message in messages:
+            function(message)
+        best = min(best, time.perf_counter() - start)
+    return best / len(messages) * 1e6
+
+
+def main():
+    """Run parity tests and the matching benchmark"""
+    test_automaton_finds_all_occurrences()
+    test_automaton_cache_ignores_foreign_characters()
+    test_matches_original_implementation()
+    print("✅ Compiled matcher matches the original implementation")
+
+    # Silence per-message INFO logging so only matching cost is measured
+    logging.getLogger("question_detector").setLevel(logging.WARNING)
+    logger.setLevel(logging.WARNING)
+
+    messages = _corpus()
+    before = _time_per_message(legacy_get_predefined_response, messages)
+    after = _time_per_message(get_predefined_response, messages)
+    print(f"get_predefined_response: {before:.1f} µs -> {after:.1f} µs per message ({before / after:.1f}x)")
+
+    before = _time_per_message(legacy_is_question, messages)
+    after = _time_per_message(is_question, messages)
+    print(f"is_question:             {before:.1f} µs -> {after:.1f} µs per message ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
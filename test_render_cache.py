@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Test script for the snapshot-versioned render cache
+"""
+
+import logging
+
+import market_snapshot
+from render_cache import RenderCache, pools_key
+
+# Configure logging
+logging.basicConfig(
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+
+class FakeSnapshot:
+    """Stand-in for the current market snapshot."""
+
+    def __init__(self, version):
+        self.version = version
+
+
+def test_pools_key():
+    """Keys change with displayed values and ignore other fields."""
+    pool = {"id": "p1", "pairName": "SOL/USDC", "apr": 10.0, "liquidity": 1000.0}
+    assert pools_key([pool]) == pools_key([dict(pool, volume=5)])
+    assert pools_key([pool]) != pools_key([dict(pool, apr=11.0)])
+    assert pools_key(None) is None
+
+    # Templates showing further fields add them to the key
+    assert pools_key([pool]) == pools_key([dict(pool, apr_volatility=5.0)])
+    assert pools_key([pool], extra_fields=("apr_volatility",)) != pools_key(
+        [dict(pool, apr_volatility=5.0)], extra_fields=("apr_volatility",)
+    )
+
+
+def test_versioned_rendering():
+    """Sections are rendered once per snapshot version and not cached before the first snapshot."""
+    renders = []
+
+    def render():
+        renders.append(1)
+        return "text"
+
+    cache = RenderCache()
+    original = market_snapshot._snapshot
+    try:
+        market_snapshot._snapshot = None
+        cache.get_or_render("pool_info", "key", render)
+        cache.get_or_render("pool_info", "key", render)
+        assert len(renders) == 2
+
+        market_snapshot._snapshot = FakeSnapshot(1)
+        for _ in range(3):
+            assert cache.get_or_render("pool_info", "key", render) == "text"
+        assert len(renders) == 3
+
+        market_snapshot._snapshot = FakeSnapshot(2)
+        cache.get_or_render("pool_info", "key", render)
+        assert len(renders) == 4
+    finally:
+        market_snapshot._snapshot = original
+
+    stats = cache.get_stats()
+    assert stats["hits"] == 2 and stats["misses"] == 2 and stats["uncached"] == 2
+    assert stats["render_ms_saved"] >= 0 and stats["sections"] == 1
+
+
+def main():
+    """Run all tests"""
+    for test in (
+        test_pools_key,
+        test_versioned_rendering,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Test script for the rate limiter and spam detector
+"""
+
+import logging
+
+import safeguards
+from safeguards import RateLimiter, SpamDetector, SPAM_SCORE_THRESHOLD
+
+# Configure logging
+logging.basicConfig(
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+
+class RecordingLogWriter:
+    """Log writer keeping queued records in a list."""
+
+    def __init__(self):
+        self.records = []
+
+    def enqueue(self, table, row):
+        self.records.append((table, row))
+        return True
+
+
+def _allowed(counts, limit, current_time, attempts=20):
+    """Number of events allowed out of attempts made at the same moment."""
+    return sum(RateLimiter._allow(counts, 1, limit, current_time) for _ in range(attempts))
+
+
+def test_sliding_window_estimate():
+    """The previous window counts in proportion to its overlap with the sliding window."""
+    counts = {}
+    # Window [120, 180): the limit applies to a fresh window
+    assert _allowed(counts, 10, 120.0) == 10
+    # A quarter into [180, 240): 10 * 0.75 = 7.5 carried over, so 3 more fit
+    assert _allowed(counts, 10, 195.0) == 3
+    # Halfway into [240, 300): 3 * 0.5 = 1.5 carried over, so 9 more fit
+    assert _allowed(counts, 10, 270.0) == 9
+    # After an idle window nothing is carried over
+    assert _allowed(counts, 10, 400.0) == 10
+    assert counts[1] == [360.0, 10, 0]
+
+
+def test_spam_score_per_trigger():
+    """Each trigger adds its score for every match, independently of the others."""
+    detector = SpamDetector()
+    cases = [
+        ("hello there", 0.0),
+        ("hello @alice and @bob", 2.0),  # Mentions
+        ("/start", 0.5),  # Command
+        ("HELLOWORLDX", 3.0),  # ALL CAPS; the triggers ignore case, so any 10+ letter run counts
+        ("understanding", 3.0),
+        ("nooooooo", 2.0),  # Repeated characters
+        ("free crypto money", 1.5),  # Spam words
+        # The URL also counts its path segments as commands
+        ("https://spam.example/path", 2.0 + 2 * 0.5),
+        ("ab " * 167, 2.0),  # Longer than 500 characters
+    ]
+    for text, expected in cases:
+        assert detector.score_message(text) == expected, (text, detector.score_message(text))
+
+
+def test_spam_score_accumulates():
+    """A user's score adds up to the threshold; changed scores are queued for writing."""
+    writer = RecordingLogWriter()
+    original = safeguards.get_log_writer
+    safeguards.get_log_writer = lambda: writer
+    try:
+        detector = SpamDetector()
+        assert detector.check_message(42, "hello") == (False, 0.0)
+        for _ in range(3):
+            is_spam, score = detector.check_message(42, "AIRDROPTOKENS @bob @eve")
+        assert is_spam and score == 3.0 + 2 * 1.0
+    finally:
+        safeguards.get_log_writer = original
+
+    assert detector.user_spam_scores[42]["score"] == 15.0 >= SPAM_SCORE_THRESHOLD
+    assert [row["spam_score"] for _, row in writer.records] == [5.0, 10.0, 15.0]
+
+
+def main():
+    """Run all tests"""
+    for test in (
+        test_sliding_window_estimate,
+        test_spam_score_per_trigger,
+        test_spam_score_accumulates,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
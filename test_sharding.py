@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Test script for sharded bot routing and the shared store
+"""
+
+import os
+import time
+import asyncio
+import logging
+import tempfile
+from collections import Counter
+
+from aiohttp import web
+
+import sharding
+from sharding import create_ingress_app, jump_hash, routing_key, shard_for, start_worker
+from shared_store import SQLiteStore, create_shared_store
+from webhook_server import SECRET_HEADER, post_synthetic_update, synthetic_update
+
+# Configure logging
+logging.basicConfig(
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+# Local ports for the test ingress and workers
+TEST_INGRESS_PORT = 18500
+TEST_WORKER_PORT = 18510
+
+
+def test_jump_hash():
+    """Users spread evenly over workers and few move when a worker is added."""
+    users = range(100_000, 120_000)
+    counts = Counter(jump_hash(user, 4) for user in users)
+    assert sorted(counts) == [0, 1, 2, 3]
+    assert min(counts.values()) > 0.9 * len(users) / 4
+
+    moved = sum(jump_hash(user, 4) != jump_hash(user, 5) for user in users)
+    assert moved < 0.25 * len(users)
+    assert shard_for(12345, 1) == 0
+
+
+def test_routing_key():
+    """Updates route by sender, or by chat without a sender."""
+    assert routing_key(synthetic_update(1, user_id=42, text="hi")) == 42
+    assert routing_key(synthetic_update(2, user_id=43, callback_data="explore_pools")) == 43
+    assert routing_key({"update_id": 3, "channel_post": {"chat": {"id": -100}}}) == -100
+    assert routing_key({"update_id": 4}) is None
+
+
+def test_shared_store():
+    """Values written through one SQLite connection are seen by another and expire."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "shared.db")
+        writer, reader = SQLiteStore(path), create_shared_store(f"sqlite:///{path}")
+        writer.set("pool_data", {"topStable": [{"id": "p1"}]})
+        writer.set("short", 1, ttl=0.05)
+        assert reader.get("pool_data") == {"topStable": [{"id": "p1"}]}
+        time.sleep(0.1)
+        assert reader.get("short") is None
+        writer.delete("pool_data")
+        assert reader.get("pool_data") is None
+
+
+async def _route_updates(users):
+    """Run an ingress in front of two recording workers and post one update per user."""
+    received = {0: [], 1: []}
+
+    def make_worker(index):
+        async def handle(request):
+            assert request.headers.get(SECRET_HEADER) == "internal"
+            received[index].append(routing_key(await request.json()))
+            return web.Response()
+        app = web.Application()
+        app.router.add_post("/telegram", handle)
+        return app
+
+    runners = [web.AppRunner(make_worker(i)) for i in range(2)]
+    runners.append(web.AppRunner(create_ingress_app(
+        [f"http://127.0.0.1:{TEST_WORKER_PORT + i}/telegram" for i in range(2)],
+        secret="s3cret", worker_secret="internal"
+    )))
+    ports = [TEST_WORKER_PORT, TEST_WORKER_PORT + 1, TEST_INGRESS_PORT]
+    for runner, port in zip(runners, ports):
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+    try:
+        url = f"http://127.0.0.1:{TEST_INGRESS_PORT}/telegram"
+        statuses = [await post_synthetic_update(synthetic_update(i, user_id=user, text="hi"), url, "s3cret")
+                    for i, user in enumerate(users)]
+        statuses.append(await post_synthetic_update(synthetic_update(99, text="hi"), url, "wrong"))
+    finally:
+        for runner in runners:
+            await runner.cleanup()
+    return statuses, received
+
+
+def test_ingress_routing():
+    """The ingress forwards each update to the worker owning its user."""
+    users = list(range(1000, 1020))
+    statuses, received = asyncio.run(_route_updates(users))
+    assert statuses == [200] * len(users) + [403]
+    for index, routed in received.items():
+        assert routed and all(shard_for(user, 2) == index for user in routed)
+    assert sorted(received[0] + received[1]) == users
+
+
+def test_worker_environment():
+    """Workers are started with their shard and a persisted answer cache."""
+    started = []
+    popen = sharding.subprocess.Popen
+    sharding.subprocess.Popen = lambda args, env: started.append(env)
+    persist = os.environ.pop("ANSWER_CACHE_PERSIST", None)
+    try:
+        start_worker(1, 4, "secret")
+    finally:
+        sharding.subprocess.Popen = popen
+        if persist is not None:
+            os.environ["ANSWER_CACHE_PERSIST"] = persist
+    env = started[0]
+    assert env["SHARD_INDEX"] == "1" and env["SHARD_COUNT"] == "4" and env["SHARD_SECRET"] == "secret"
+    assert env["ANSWER_CACHE_PERSIST"] == "true"
+
+
+def main():
+    """Run all tests"""
+    for test in (
+        test_jump_hash,
+        test_routing_key,
+        test_shared_store,
+        test_ingress_routing,
+        test_worker_environment,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
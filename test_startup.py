@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Test script for start-up instrumentation and lazy initialization
+"""
+
+import logging
+
+import startup
+from startup import get_startup_metrics, importtime_report, once, phase
+
+# Configure logging
+logging.basicConfig(
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+
+def test_once():
+    """Initialization runs on the first call only and is retried after a failure."""
+    calls = []
+
+    @once
+    def init_something():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("not ready")
+        return "ready"
+
+    try:
+        init_something()
+        assert False, "first call should raise"
+    except RuntimeError:
+        pass
+    assert not init_something.has_run()
+    assert init_something() == "ready" and init_something() == "ready"
+    assert len(calls) == 2 and init_something.has_run()
+    assert "init_something" in get_startup_metrics()["phases_ms"]
+
+
+def test_phase_and_first_update():
+    """Phases are timed and only the first handled update is recorded."""
+    with phase("test_phase"):
+        pass
+    assert get_startup_metrics()["phases_ms"]["test_phase"] >= 0
+
+    startup._first_update_after = None
+    startup.mark_first_update()
+    first = get_startup_metrics()["first_update_after_s"]
+    startup.mark_first_update()
+    assert first is not None and get_startup_metrics()["first_update_after_s"] == first
+
+
+def test_importtime_report():
+    """Import times of project modules are read from python -X importtime."""
+    total_ms, modules = importtime_report("market_snapshot")
+    assert total_ms > 0
+    assert "market_snapshot" in [name for name, _, _ in modules]
+
+
+def main():
+    """Run all tests"""
+    for test in (
+        test_once,
+        test_phase_and_first_update,
+        test_importtime_report,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Test script for the incremental bot statistics aggregator
+"""
+
+import random
+import logging
+
+import numpy as np
+
+from stats_aggregator import QuantileSketch, StatsAggregator, SKETCH_RELATIVE_ACCURACY
+
+# Configure logging
+logging.basicConfig(
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+
+def test_quantile_sketch_accuracy():
+    """Sketch quantiles stay within the configured relative accuracy."""
+    rng = random.Random(7)
+    values = [rng.lognormvariate(6, 1.2) for _ in range(20000)]
+    sketch = QuantileSketch()
+    for value in values:
+        sketch.add(value)
+
+    assert sketch.count == len(values)
+    for q in (0.5, 0.9, 0.95, 0.99):
+        exact = float(np.quantile(values, q, method="lower"))
+        assert abs(sketch.quantile(q) - exact) <= SKETCH_RELATIVE_ACCURACY * exact * 1.01, q
+
+    assert QuantileSketch().quantile(0.5) == 0.0
+
+
+def test_incremental_totals():
+    """Totals combine the seeded history with what was recorded since."""
+    stats = StatsAggregator()
+    # Pretend the totals were already read from the database
+    stats.base_queries = 1000
+    stats.base_responses = 1000
+    stats.base_average = 200.0
+    stats._flush_thread = object()
+
+    for _ in range(5):
+        stats.record_query()
+    stats.record_response_time(800.0)
+    stats.record_response_time(None)
+    stats.record_error()
+
+    summary = stats.get_summary()
+    assert summary["command_count"] == 1005
+    assert summary["pending_errors"] == 1
+    assert abs(summary["average_response_time"] - (200000 + 800) / 1001) < 1e-9
+    assert abs(summary["response_time_p50"] - 800.0) <= 800.0 * SKETCH_RELATIVE_ACCURACY
+
+
+def test_flush_from_workers():
+    """Flushes add each worker's counts to the shared row and keep them if the commit fails."""
+    # Import at function level to avoid circular imports
+    from app import app
+    from models import db, BotStatistics
+
+    with app.app_context():
+        db.create_all()
+        db.session.add(BotStatistics(command_count=100, response_count=100, average_response_time=50.0,
+                                     error_count=1))
+        db.session.commit()
+
+        workers = [StatsAggregator(), StatsAggregator()]
+        for stats, queries in zip(workers, (3, 7)):
+            stats._flush_thread = object()
+            for _ in range(queries):
+                stats.record_query()
+                stats.record_response_time(150.0)
+            stats.record_error()
+
+        # A failed commit keeps the counts for the next flush
+        commit = db.session.commit
+        db.session.commit = lambda: (_ for _ in ()).throw(RuntimeError("database unavailable"))
+        try:
+            assert workers[0].flush() is None
+        finally:
+            db.session.commit = commit
+        assert workers[0].queries == 3 and workers[0].errors == 1
+
+        for stats in workers:
+            assert stats.flush() is not None
+            assert stats.queries == 0 and stats.errors == 0 and stats.response_count == 0
+
+        row = BotStatistics.query.order_by(BotStatistics.id.desc()).first()
+        assert row.command_count == 110 and row.error_count == 3
+        assert abs(row.average_response_time - (100 * 50 + 10 * 150) / 110) < 1e-6
+        assert workers[1].get_summary()["command_count"] == 110
+
+
+def test_mean_weighted_by_responses():
+    """The stored mean counts only queries with a processing time."""
+    # Import at function level to avoid circular imports
+    from app import app
+    from models import db, BotStatistics
+
+    with app.app_context():
+        db.create_all()
+        db.session.add(BotStatistics(command_count=0, response_count=0, average_response_time=0.0, error_count=0))
+        db.session.commit()
+
+        stats = StatsAggregator()
+        stats._flush_thread = object()
+        for processing_time in (1000.0, 3000.0):
+            # 100 queries, 10 of them timed
+            for i in range(100):
+                stats.record_query()
+                stats.record_response_time(processing_time if i < 10 else None)
+            assert stats.flush() is not None
+            assert abs(stats.get_summary()["average_response_time"] - stats.base_average) < 1e-6
+
+        row = BotStatistics.query.order_by(BotStatistics.id.desc()).first()
+        assert row.command_count == 200 and row.response_count == 20
+        assert abs(row.average_response_time - 2000.0) < 1e-6
+
+
+def main():
+    """Run all tests"""
+    for test in (
+        test_quantile_sketch_accuracy,
+        test_incremental_totals,
+        test_flush_from_workers,
+        test_mean_weighted_by_responses,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
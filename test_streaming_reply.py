@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Test script for streaming AI answers into a Telegram reply
+"""
+
+import time
+import asyncio
+import logging
+from types import SimpleNamespace
+
+from telegram.constants import ParseMode
+from telegram.error import BadRequest, RetryAfter
+
+from anthropic_service import AnthropicAI
+from streaming_reply import StreamingReply, STREAM_CURSOR, MAX_MESSAGE_LENGTH
+
+# Configure logging
+logging.basicConfig(
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+
+class FakeMessage:
+    """Telegram message recording replies and edits, optionally failing some edits."""
+
+    def __init__(self, text="", sent=None, failures=None):
+        self.text = text
+        self.sent = sent if sent is not None else []
+        self.failures = failures if failures is not None else []
+        self.edits = []
+
+    async def reply_text(self, text, parse_mode=None):
+        reply = FakeMessage(text, self.sent, self.failures)
+        self.sent.append(reply)
+        return reply
+
+    async def edit_text(self, text, parse_mode=None):
+        if self.failures:
+            raise self.failures.pop(0)
+        self.edits.append((time.monotonic(), text, parse_mode))
+        self.text = text
+
+
+class FakeStream:
+    """Messages API stream yielding text chunks at a fixed pace."""
+
+    def __init__(self, chunks, delay):
+        self.chunks = chunks
+        self.delay = delay
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @property
+    async def text_stream(self):
+        for chunk in self.chunks:
+            await asyncio.sleep(self.delay)
+            yield chunk
+
+
+def test_streamed_advice():
+    """Edits of a streamed answer are throttled and the final edit renders the full Markdown text."""
+    chunks = [f"*Point {i}:* diversify across stable pools. " for i in range(25)]
+    service = AnthropicAI(api_key="test-key")
+    service._client = SimpleNamespace(messages=SimpleNamespace(stream=lambda **kwargs: FakeStream(chunks, 0.02)))
+    message = FakeMessage("How should I invest?")
+    reply = StreamingReply(message, edit_interval=0.1)
+
+    async def run():
+        await reply.start()
+        answer = await service.get_financial_advice("How should I invest?", on_text=reply.update)
+        await reply.finish(answer)
+        return answer
+
+    answer = asyncio.run(run())
+    assert answer == "".join(chunks)
+    assert [m.text for m in message.sent] == [answer]
+
+    edits = reply.reply.edits
+    partial, final = edits[:-1], edits[-1]
+    # About 0.5s of streaming at one edit per 0.1s at most
+    assert 2 <= len(partial) <= 5, len(partial)
+    assert all(text.endswith(STREAM_CURSOR) and parse_mode is None for _, text, parse_mode in partial)
+    assert all(later[0] - earlier[0] >= 0.1 for earlier, later in zip(partial, partial[1:]))
+    assert final[1:] == (answer, ParseMode.MARKDOWN)
+    assert service.get_metrics()["streamed"] == 1
+
+
+def test_final_edit_fallbacks():
+    """The final edit waits out flood control, falls back to plain text and sends any overflow."""
+    message = FakeMessage("question", failures=[
+        RetryAfter(0.05),
+        BadRequest("Can't parse entities: can't find end of the entity"),
+    ])
+    reply = StreamingReply(message, edit_interval=0.1)
+    long_answer = "*unbalanced " + "word " * (MAX_MESSAGE_LENGTH // 4)
+
+    async def run():
+        await reply.start()
+        await reply.finish(long_answer)
+
+    asyncio.run(run())
+    assert message.sent[0] is reply.reply
+    assert len(reply.reply.edits) == 1
+    _, text, parse_mode = reply.reply.edits[0]
+    assert parse_mode is None and len(text) <= MAX_MESSAGE_LENGTH
+    assert len(message.sent) == 2 and (text + " " + message.sent[1].text).strip() == long_answer.strip()
+
+
+def main():
+    """Run all tests"""
+    for test in (
+        test_streamed_advice,
+        test_final_edit_fallbacks,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Test script for the per-user ordered update scheduler
+"""
+
+import json
+import time
+import asyncio
+import logging
+
+from telegram import Update
+from telegram.ext import Application, MessageHandler, filters
+from telegram.request import BaseRequest
+
+from update_scheduler import OrderedUpdateProcessor
+from webhook_server import synthetic_update
+
+# Configure logging
+logging.basicConfig(
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+
+async def _process(processor, updates):
+    """Process (update, delay) pairs the way the Application does and record completion order."""
+    finished = []
+
+    async def handle(update, delay):
+        await asyncio.sleep(delay)
+        finished.append(update.update_id)
+
+    await processor.initialize()
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        asyncio.create_task(processor.process_update(update, handle(update, delay)))
+        for update, delay in updates
+    ])
+    return finished, time.perf_counter() - started
+
+
+class OfflineRequest(BaseRequest):
+    """Request backend answering getMe locally, so an Application initializes without the Bot API."""
+
+    @property
+    def read_timeout(self):
+        return None
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, *args, **kwargs):
+        if not url.endswith("/getMe"):
+            raise AssertionError(f"Unexpected Bot API request: {url}")
+        bot_user = {"id": 123, "is_bot": True, "first_name": "FiLot", "username": "filot_test_bot"}
+        return 200, json.dumps({"ok": True, "result": bot_user}).encode("utf-8")
+
+
+def make_update(update_id, user_id, text="hi"):
+    """Build a message update from a user."""
+    return Update.de_json(synthetic_update(update_id, user_id, text=text), None)
+
+
+async def _dispatch(block, updates):
+    """Feed (update_id, user_id, delay) messages through an Application with a text handler."""
+    processor = OrderedUpdateProcessor(max_running=8)
+    application = (
+        Application.builder()
+        .token("123:abc")
+        .request(OfflineRequest())
+        .get_updates_request(OfflineRequest())
+        .concurrent_updates(processor)
+        .build()
+    )
+    finished = []
+
+    async def handle(update, context):
+        await asyncio.sleep(float(update.message.text))
+        finished.append(update.update_id)
+
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle, block=block))
+    await application.initialize()
+    await processor.initialize()
+
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        processor.process_update(update, application.process_update(update))
+        for update in [make_update(update_id, user_id, str(delay)) for update_id, user_id, delay in updates]
+    ])
+    dispatched = list(finished)
+    while len(finished) < len(updates):
+        await asyncio.sleep(0.01)
+    return dispatched, finished, time.perf_counter() - started
+
+
+def test_ordering_per_user():
+    """A user's updates finish in arrival order even when later ones are faster."""
+    processor = OrderedUpdateProcessor(max_running=8)
+    updates = [(make_update(1, 1), 0.2), (make_update(2, 1), 0.0), (make_update(3, 1), 0.05)]
+    finished, _ = asyncio.run(_process(processor, updates))
+    assert finished == [1, 2, 3]
+    assert processor.metrics["blocked"] == 2
+    assert processor.get_metrics()["queued_updates"] == 0
+
+
+def test_concurrency_across_users():
+    """A slow user does not delay other users, and the global limit is respected."""
+    processor = OrderedUpdateProcessor(max_running=8)
+    updates = [(make_update(1, 1), 0.3)] + [(make_update(i, i), 0.0) for i in range(2, 6)]
+    finished, elapsed = asyncio.run(_process(processor, updates))
+    assert finished[-1] == 1 and elapsed < 0.5
+
+    processor = OrderedUpdateProcessor(max_running=2)
+    updates = [(make_update(i, i), 0.1) for i in range(1, 5)]
+    _, elapsed = asyncio.run(_process(processor, updates))
+    assert elapsed >= 0.2
+    assert processor.metrics["slot_wait_ms_max"] > 0
+
+
+def test_application_handlers():
+    """Ordering holds for blocking handlers; block=False handlers escape the scheduler."""
+    updates = [(1, 1, 0.2), (2, 1, 0.0), (3, 2, 0.0)]
+    dispatched, finished, elapsed = asyncio.run(_dispatch(True, updates))
+    assert finished == [3, 1, 2] and dispatched == finished and elapsed < 0.35
+
+    dispatched, finished, _ = asyncio.run(_dispatch(False, updates))
+    assert 1 not in dispatched and finished.index(2) < finished.index(1)
+
+
+def main():
+    """Run all tests"""
+    for test in (
+        test_ordering_per_user,
+        test_concurrency_across_users,
+        test_application_handlers,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
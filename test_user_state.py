@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Test script for TTL-bounded user state stores
+"""
+
+import time
+import asyncio
+import logging
+
+import user_state
+from user_state import UserStateStore, sweep_all, get_state_metrics
+
+# Configure logging
+logging.basicConfig(
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+
+def test_ttl_and_lru():
+    """Idle entries expire, reads keep entries alive and the per-store cap evicts the oldest."""
+    store = UserStateStore("test_ttl", ttl=60, max_entries=2)
+    store[1] = "a"
+    store[2] = "b"
+    assert store[1] == "a"
+    store[3] = "c"
+    assert 2 not in store and 1 in store and 3 in store
+    assert store.evictions == 1
+
+    # Age user 1 past the TTL
+    value, _ = store._entries[1]
+    store._entries[1] = (value, time.monotonic() - 120)
+    assert 1 not in store
+    assert store.get(1) is None
+    assert store.expirations == 1
+
+    store[4] = "d"
+    store._entries[3] = ("c", time.monotonic() - 120)
+    store._entries.move_to_end(3, last=False)
+    assert store.sweep() == 1
+    assert list(store) == [4]
+
+
+def test_global_cap():
+    """The global cap evicts the least recently used entries across stores."""
+    user_state._stores.clear()
+    first = UserStateStore("test_cap_first", ttl=60)
+    second = UserStateStore("test_cap_second", ttl=60)
+    first[1] = "old"
+    second[1] = "newer"
+    first[2] = "newest"
+
+    sweep_all(max_entries=1)
+    assert 1 not in first and 1 not in second and 2 in first
+    assert get_state_metrics()["test_cap_first"]["evictions"] == 1
+
+
+def test_sweeper_starts_on_event_loop():
+    """Writing from a coroutine starts the background sweeper."""
+    async def write():
+        UserStateStore("test_sweeper", ttl=60)[1] = "a"
+        assert user_state._sweeper_task is not None and not user_state._sweeper_task.done()
+        user_state._sweeper_task.cancel()
+
+    asyncio.run(write())
+
+
+def main():
+    """Run all tests"""
+    for test in (
+        test_ttl_and_lru,
+        test_global_cap,
+        test_sweeper_starts_on_event_loop,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Test script for the webhook server using synthetic updates
+"""
+
+import asyncio
+import logging
+
+from aiohttp import web
+from telegram.ext import Application
+
+from webhook_server import create_webhook_app, post_synthetic_update, synthetic_update
+
+# Configure logging
+logging.basicConfig(
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+# Local port for the test server
+TEST_PORT = 18443
+
+
+async def _post_updates():
+    """Start a webhook server for an unstarted application and POST updates to it."""
+    application = Application.builder().token("123456:TEST").updater(None).build()
+    runner = web.AppRunner(create_webhook_app(application, secret="s3cret", path="/telegram"))
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", TEST_PORT).start()
+    url = f"http://127.0.0.1:{TEST_PORT}/telegram"
+    try:
+        statuses = [
+            await post_synthetic_update(synthetic_update(1, text="hello"), url, "s3cret"),
+            await post_synthetic_update(synthetic_update(2, callback_data="explore_pools"), url, "s3cret"),
+            await post_synthetic_update(synthetic_update(3, text="forged"), url, "wrong"),
+            await post_synthetic_update(synthetic_update(4, text="unsigned"), url, ""),
+        ]
+    finally:
+        await runner.cleanup()
+
+    queued = []
+    while not application.update_queue.empty():
+        queued.append(application.update_queue.get_nowait())
+    return statuses, queued
+
+
+def test_webhook_updates():
+    """Updates with the secret token are enqueued, others are rejected."""
+    statuses, queued = asyncio.run(_post_updates())
+    assert statuses == [200, 200, 403, 403]
+    assert [update.update_id for update in queued] == [1, 2]
+    assert queued[0].message.text == "hello"
+    assert queued[1].callback_query.data == "explore_pools"
+
+
+def main():
+    """Run all tests"""
+    for test in (
+        test_webhook_updates,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -20,6 +20,7 @@ from datetime import datetime, timedelta
 from solana_wallet_service import get_wallet_service
 from raydium_client import get_client, calculate_optimal_swap_amount
 from db_utils import get_db_connection
+from db_pool import get_pooled_connection
 
 # Configure logging
 logging.basicConfig(
@@ -45,6 +46,7 @@ TRANSACTION_STATUS_EXPIRED = "expired"
 
 def init_transaction_tables():
     """Initialize database tables for transaction tracking."""
+    conn = None
     try:
         # Get database connection
         conn, cursor = get_db_connection()
@@ -82,6 +84,11 @@ def init_transaction_tables():
         )
         """)
         
+        # Index for the per-user history queries
+        from migrate_indexes import RAW_TABLE_INDEXES
+        for statement in RAW_TABLE_INDEXES["transactions"]:
+            cursor.execute(statement)
+        
         conn.commit()
         cursor.close()
         conn.close()
@@ -90,9 +97,35 @@ def init_transaction_tables():
     except Exception as e:
         logger.error(f"Error initializing transaction tables: {e}")
         return False
+    finally:
+        if conn is not None:
+            conn.close()
+
+_tables_ready = False
 
-# Initialize tables when module is imported
-init_transaction_tables()
+def _connect():
+    """
+    Borrow a pooled database connection, creating the transaction tables on first use.
+    
+    Tables are created here rather than at import, so importing this module
+    does not touch the database. Closing the connection returns it to the pool.
+    """
+    global _tables_ready
+    if not _tables_ready:
+        _tables_ready = init_transaction_tables()
+    return get_pooled_connection()
+
+async def _get_connection():
+    """
+    Borrow a pooled database connection without blocking the event loop.
+    
+    Waiting for a free connection (up to DB_POOL_TIMEOUT) and creating the
+    tables run on the database threads of async_db. The statements executed
+    on the connection are short indexed lookups and still run in the caller.
+    """
+    # Import at function level to avoid circular imports
+    from async_db import get_async_db
+    return await get_async_db().run_blocking(_connect)
 
 async def prepare_swap_transaction(
     user_id: int,
@@ -114,6 +147,7 @@ async def prepare_swap_transaction(
     Returns:
         Dict with transaction details
     """
+    conn = None
     try:
         # Generate a unique transaction ID
         transaction_id = str(uuid.uuid4())
@@ -153,7 +187,7 @@ async def prepare_swap_transaction(
         }
         
         # Store transaction in database
-        conn = get_db_connection()
+        conn = await _get_connection()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -205,6 +239,9 @@ async def prepare_swap_transaction(
             "success": False,
             "error": f"Error preparing transaction: {str(e)}"
         }
+    finally:
+        if conn is not None:
+            conn.close()
 
 async def prepare_add_liquidity_transaction(
     user_id: int,
@@ -228,6 +265,7 @@ async def prepare_add_liquidity_transaction(
     Returns:
         Dict with transaction details
     """
+    conn = None
     try:
         # Generate a unique transaction ID
         transaction_id = str(uuid.uuid4())
@@ -271,7 +309,7 @@ async def prepare_add_liquidity_transaction(
         }
         
         # Store transaction in database
-        conn = get_db_connection()
+        conn = await _get_connection()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -324,6 +362,9 @@ async def prepare_add_liquidity_transaction(
             "success": False,
             "error": f"Error preparing transaction: {str(e)}"
         }
+    finally:
+        if conn is not None:
+            conn.close()
 
 async def prepare_remove_liquidity_transaction(
     user_id: int,
@@ -343,6 +384,7 @@ async def prepare_remove_liquidity_transaction(
     Returns:
         Dict with transaction details
     """
+    conn = None
     try:
         # Generate a unique transaction ID
         transaction_id = str(uuid.uuid4())
@@ -391,7 +433,7 @@ async def prepare_remove_liquidity_transaction(
         }
         
         # Store transaction in database
-        conn = get_db_connection()
+        conn = await _get_connection()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -444,6 +486,9 @@ async def prepare_remove_liquidity_transaction(
             "success": False,
             "error": f"Error preparing transaction: {str(e)}"
         }
+    finally:
+        if conn is not None:
+            conn.close()
 
 async def simulate_transaction(transaction_id: str) -> Dict[str, Any]:
     """
@@ -455,9 +500,10 @@ async def simulate_transaction(transaction_id: str) -> Dict[str, Any]:
     Returns:
         Dict with simulation results
     """
+    conn = None
     try:
         # Get transaction data from database
-        conn = get_db_connection()
+        conn = await _get_connection()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -574,6 +620,9 @@ async def simulate_transaction(transaction_id: str) -> Dict[str, Any]:
             "success": False,
             "error": f"Error simulating transaction: {str(e)}"
         }
+    finally:
+        if conn is not None:
+            conn.close()
 
 async def approve_transaction(transaction_id: str, user_id: int) -> Dict[str, Any]:
     """
@@ -586,9 +635,10 @@ async def approve_transaction(transaction_id: str, user_id: int) -> Dict[str, An
     Returns:
         Dict with approval result
     """
+    conn = None
     try:
         # Get transaction data from database
-        conn = get_db_connection()
+        conn = await _get_connection()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -665,6 +715,9 @@ async def approve_transaction(transaction_id: str, user_id: int) -> Dict[str, An
             "success": False,
             "error": f"Error approving transaction: {str(e)}"
         }
+    finally:
+        if conn is not None:
+            conn.close()
 
 async def reject_transaction(transaction_id: str, user_id: int, reason: Optional[str] = None) -> Dict[str, Any]:
     """
@@ -678,9 +731,10 @@ async def reject_transaction(transaction_id: str, user_id: int, reason: Optional
     Returns:
         Dict with rejection result
     """
+    conn = None
     try:
         # Get transaction data from database
-        conn = get_db_connection()
+        conn = await _get_connection()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -761,6 +815,9 @@ async def reject_transaction(transaction_id: str, user_id: int, reason: Optional
             "success": False,
             "error": f"Error rejecting transaction: {str(e)}"
         }
+    finally:
+        if conn is not None:
+            conn.close()
 
 async def execute_transaction(transaction_id: str) -> Dict[str, Any]:
     """
@@ -772,9 +829,10 @@ async def execute_transaction(transaction_id: str) -> Dict[str, Any]:
     Returns:
         Dict with execution result
     """
+    conn = None
     try:
         # Get transaction data from database
-        conn = get_db_connection()
+        conn = await _get_connection()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -931,6 +989,9 @@ async def execute_transaction(transaction_id: str) -> Dict[str, Any]:
             "success": False,
             "error": f"Error executing transaction: {str(e)}"
         }
+    finally:
+        if conn is not None:
+            conn.close()
 
 async def get_transaction_status(transaction_id: str) -> Dict[str, Any]:
     """
@@ -942,9 +1003,10 @@ async def get_transaction_status(transaction_id: str) -> Dict[str, Any]:
     Returns:
         Dict with transaction status and details
     """
+    conn = None
     try:
         # Get transaction data from database
-        conn = get_db_connection()
+        conn = await _get_connection()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -1025,6 +1087,9 @@ async def get_transaction_status(transaction_id: str) -> Dict[str, Any]:
             "success": False,
             "error": f"Error getting transaction status: {str(e)}"
         }
+    finally:
+        if conn is not None:
+            conn.close()
 
 async def get_user_transactions(user_id: int, limit: int = 10, status: Optional[str] = None) -> Dict[str, Any]:
     """
@@ -1038,9 +1103,10 @@ async def get_user_transactions(user_id: int, limit: int = 10, status: Optional[
     Returns:
         Dict with list of transactions
     """
+    conn = None
     try:
         # Get transaction data from database
-        conn = get_db_connection()
+        conn = await _get_connection()
         cursor = conn.cursor()
         
         # Build query based on parameters
@@ -1094,6 +1160,9 @@ async def get_user_transactions(user_id: int, limit: int = 10, status: Optional[
             "success": False,
             "error": f"Error getting user transactions: {str(e)}"
         }
+    finally:
+        if conn is not None:
+            conn.close()
 
 async def update_transaction_status(transaction_id: str, status: str, log_data: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -1107,9 +1176,10 @@ async def update_transaction_status(transaction_id: str, status: str, log_data:
     Returns:
         Dict with update result
     """
+    conn = None
     try:
         # Update transaction in database
-        conn = get_db_connection()
+        conn = await _get_connection()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -1160,6 +1230,6 @@ async def update_transaction_status(transaction_id: str, status: str, log_data:
             "success": False,
             "error": f"Error updating transaction status: {str(e)}"
         }
-
-# Initialize transaction tables when module is imported
-init_transaction_tables()
\ No newline at end of file
+    finally:
+        if conn is not None:
+            conn.close()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Update scheduler for FiLot Telegram bot
+Processes updates from different users concurrently while keeping each
+user's updates in arrival order, so one slow handler no longer delays
+everyone else and conversation flows still see their steps in sequence
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, Any, Awaitable, Hashable, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from startup import mark_first_update
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Maximum number of updates whose handlers run at the same time
+UPDATE_CONCURRENCY = int(os.environ.get("UPDATE_CONCURRENCY", "32"))
+
+# Maximum number of updates accepted from the queue but not finished (running or waiting)
+MAX_PENDING_UPDATES = 4096
+
+# Number of users with the deepest queues reported in the metrics
+REPORTED_QUEUES = 5
+
+
+def ordering_key(update: object) -> Optional[Hashable]:
+    """
+    Get the key whose updates must be processed in order.
+
+    Args:
+        update: Update taken from the application's queue
+
+    Returns:
+        The user ID, the chat ID if there is no user, or None for unordered updates
+    """
+    if not isinstance(update, Update):
+        return None
+    if update.effective_user:
+        return update.effective_user.id
+    if update.effective_chat:
+        return update.effective_chat.id
+    return None
+
+
+class OrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Update processor with strict per-user ordering and cross-user concurrency.
+
+    Each update waits for the previous update with the same ordering key to
+    finish (head-of-line blocking, measured per update) and then for one of
+    the global handler slots. Only updates at the head of their user's queue
+    take a slot, so a user with many queued updates cannot starve others.
+
+    Ordering covers the handlers awaited by the update's coroutine: handlers
+    registered with block=False run as separate tasks once the update is
+    dispatched, so they are neither ordered nor limited by the slots.
+    """
+
+    def __init__(self, max_running: int = UPDATE_CONCURRENCY, max_pending: int = MAX_PENDING_UPDATES):
+        """
+        Initialize the processor.
+
+        Args:
+            max_running: Maximum number of updates processed concurrently
+            max_pending: Maximum number of updates accepted but not finished
+        """
+        # The base class semaphore bounds accepted updates; handler slots are limited separately
+        super().__init__(max_concurrent_updates=max(max_pending, max_running))
+        self.max_running = max_running
+        self._slots = asyncio.Semaphore(max_running)
+        # key -> future completed when the last accepted update of that key finishes
+        self._tails: Dict[Hashable, asyncio.Future] = {}
+        self._depth: Dict[Hashable, int] = defaultdict(int)
+        self._running = 0
+        self.metrics = {
+            "processed": 0,
+            "failed": 0,
+            "blocked": 0,
+            "blocked_ms_total": 0.0,
+            "blocked_ms_max": 0.0,
+            "slot_wait_ms_total": 0.0,
+            "slot_wait_ms_max": 0.0,
+        }
+
+    async def initialize(self) -> None:
+        """Reset the handler slots for the running event loop."""
+        self._slots = asyncio.Semaphore(self.max_running)
+        self._tails.clear()
+        self._depth.clear()
+
+    async def shutdown(self) -> None:
+        """Nothing to release; pending updates finish with the application."""
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        """
+        Run an update's handlers after the previous update of the same user.
+
+        Args:
+            update: The update to process
+            coroutine: Coroutine processing the update
+        """
+        key = ordering_key(update)
+        previous = done = None
+        if key is not None:
+            # Take a place in the user's queue before the first await, in arrival order
+            previous = self._tails.get(key)
+            done = asyncio.get_running_loop().create_future()
+            self._tails[key] = done
+            self._depth[key] += 1
+
+        try:
+            if previous is not None and not previous.done():
+                started = time.perf_counter()
+                await asyncio.shield(previous)
+                self._count("blocked", (time.perf_counter() - started) * 1000)
+
+            started = time.perf_counter()
+            async with self._slots:
+                self._count("slot_wait", (time.perf_counter() - started) * 1000)
+                self._running += 1
+                try:
+                    await coroutine
+                    self.metrics["processed"] += 1
+                    mark_first_update()
+                except Exception as e:
+                    self.metrics["failed"] += 1
+                    logger.error(f"Error processing update for {key}: {e}")
+                finally:
+                    self._running -= 1
+        finally:
+            if done is not None:
+                done.set_result(None)
+                if self._tails.get(key) is done:
+                    del self._tails[key]
+                self._depth[key] -= 1
+                if not self._depth[key]:
+                    del self._depth[key]
+
+    def _count(self, name: str, elapsed_ms: float) -> None:
+        """Add one measured wait to the metrics."""
+        if name == "blocked":
+            self.metrics["blocked"] += 1
+            self.metrics["blocked_ms_total"] += elapsed_ms
+            self.metrics["blocked_ms_max"] = max(self.metrics["blocked_ms_max"], elapsed_ms)
+        else:
+            self.metrics["slot_wait_ms_total"] += elapsed_ms
+            self.metrics["slot_wait_ms_max"] = max(self.metrics["slot_wait_ms_max"], elapsed_ms)
+
+    def queue_depth(self, key: Hashable) -> int:
+        """Number of a user's updates running or waiting."""
+        return self._depth.get(key, 0)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get scheduler metrics.
+
+        Returns:
+            Dictionary with running and queued counts, the deepest per-user
+            queues and head-of-line blocking and slot wait times (ms)
+        """
+        metrics = dict(self.metrics)
+        deepest = sorted(self._depth.items(), key=lambda item: item[1], reverse=True)[:REPORTED_QUEUES]
+        processed = metrics["processed"] + metrics["failed"]
+        metrics.update({
+            "max_running": self.max_running,
+            "running": self._running,
+            "queued_users": len(self._depth),
+            "queued_updates": sum(self._depth.values()),
+            "deepest_queues": {str(key): depth for key, depth in deepest},
+            "blocked_ms_avg": metrics["blocked_ms_total"] / metrics["blocked"] if metrics["blocked"] else 0.0,
+            "slot_wait_ms_avg": metrics["slot_wait_ms_total"] / processed if processed else 0.0,
+        })
+        return metrics
+
+
+# Processor of the most recently built application
+_update_scheduler: Optional[OrderedUpdateProcessor] = None
+
+
+def create_update_scheduler(max_running: int = UPDATE_CONCURRENCY) -> OrderedUpdateProcessor:
+    """
+    Create the update processor for a new Application.
+
+    Args:
+        max_running: Maximum number of updates processed concurrently
+
+    Returns:
+        OrderedUpdateProcessor to pass to ApplicationBuilder.concurrent_updates
+    """
+    global _update_scheduler
+    _update_scheduler = OrderedUpdateProcessor(max_running)
+    return _update_scheduler
+
+
+def get_scheduler_metrics() -> Dict[str, Any]:
+    """Get metrics of the current update processor, empty before the bot is built."""
+    return _update_scheduler.get_metrics() if _update_scheduler else {}
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+TTL-bounded per-user state for FiLot Telegram bot
+Dictionary-like stores for in-memory user state that forget idle users,
+share a global size cap and are swept by a background task on the event loop
+"""
+
+import os
+import time
+import heapq
+import asyncio
+import logging
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Maximum number of entries across all stores; the least recently used are evicted first
+GLOBAL_MAX_ENTRIES = int(os.environ.get("USER_STATE_MAX_ENTRIES", "100000"))
+
+# Seconds between background sweeps
+SWEEP_INTERVAL = 30.0
+
+# Registered stores by name
+_stores: Dict[str, "UserStateStore"] = {}
+
+# Background sweeper task on the bot's event loop
+_sweeper_task: Optional[asyncio.Task] = None
+
+
+class UserStateStore(MutableMapping):
+    """
+    Per-user state that expires after a period of inactivity.
+
+    Behaves like a dict keyed by user ID. Reading or writing an entry marks
+    it as recently used; entries idle for longer than the TTL are removed by
+    the sweeper, and the oldest entries are evicted when the store or the
+    global cap is full. Entries are kept in least-recently-used order, so
+    expiry and eviction only ever look at the front of the store.
+    """
+
+    def __init__(self, name: str, ttl: float, max_entries: Optional[int] = None):
+        """
+        Create and register a store.
+
+        Args:
+            name: Name used in size gauges
+            ttl: Seconds an idle entry is kept
+            max_entries: Optional cap for this store alone
+        """
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.evictions = 0
+        self.expirations = 0
+        # user_id -> (value, last_used)
+        self._entries: "OrderedDict[Any, Tuple[Any, float]]" = OrderedDict()
+        _stores[name] = self
+
+    def __getitem__(self, user_id: Any) -> Any:
+        value, last_used = self._entries[user_id]
+        now = time.monotonic()
+        if now - last_used > self.ttl:
+            del self._entries[user_id]
+            self.expirations += 1
+            raise KeyError(user_id)
+        self._entries[user_id] = (value, now)
+        self._entries.move_to_end(user_id)
+        return value
+
+    def __setitem__(self, user_id: Any, value: Any) -> None:
+        self._entries[user_id] = (value, time.monotonic())
+        self._entries.move_to_end(user_id)
+        if self.max_entries is not None and len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        _ensure_sweeper()
+
+    def __delitem__(self, user_id: Any) -> None:
+        del self._entries[user_id]
+
+    def __contains__(self, user_id: Any) -> bool:
+        entry = self._entries.get(user_id)
+        return entry is not None and time.monotonic() - entry[1] <= self.ttl
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(list(self._entries))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """
+        Remove expired entries.
+
+        Args:
+            now: Current monotonic time (defaults to now)
+
+        Returns:
+            Number of entries removed
+        """
+        cutoff = (time.monotonic() if now is None else now) - self.ttl
+        removed = 0
+        while self._entries:
+            user_id, (_, last_used) = next(iter(self._entries.items()))
+            if last_used >= cutoff:
+                break
+            del self._entries[user_id]
+            removed += 1
+        self.expirations += removed
+        return removed
+
+    def oldest(self) -> Optional[float]:
+        """Last-used time of the least recently used entry, if any."""
+        if not self._entries:
+            return None
+        return next(iter(self._entries.values()))[1]
+
+    def evict_oldest(self) -> None:
+        """Evict the least recently used entry."""
+        self._entries.popitem(last=False)
+        self.evictions += 1
+
+
+def sweep_all(max_entries: int = GLOBAL_MAX_ENTRIES) -> int:
+    """
+    Expire idle entries in every store, then enforce the global cap.
+
+    Args:
+        max_entries: Maximum number of entries across all stores
+
+    Returns:
+        Number of entries removed
+    """
+    now = time.monotonic()
+    removed = sum(store.sweep(now) for store in _stores.values())
+
+    # Evict the globally least recently used entries until under the cap
+    excess = sum(len(store) for store in _stores.values()) - max_entries
+    if excess > 0:
+        heap: List[Tuple[float, str]] = [
+            (store.oldest(), name) for name, store in _stores.items() if len(store)
+        ]
+        heapq.heapify(heap)
+        for _ in range(excess):
+            _, name = heapq.heappop(heap)
+            store = _stores[name]
+            store.evict_oldest()
+            if len(store):
+                heapq.heappush(heap, (store.oldest(), name))
+        removed += excess
+        logger.warning(f"User state over its cap of {max_entries} entries, evicted {excess}")
+
+    return removed
+
+
+async def _sweep_loop() -> None:
+    """Sweep all stores every SWEEP_INTERVAL seconds."""
+    while True:
+        await asyncio.sleep(SWEEP_INTERVAL)
+        try:
+            removed = sweep_all()
+            if removed:
+                logger.debug(f"Swept {removed} user state entries")
+        except Exception as e:
+            logger.error(f"Error sweeping user state: {e}")
+
+
+def _ensure_sweeper() -> None:
+    """Start the sweeper on the running event loop, if there is one and it is not running yet."""
+    global _sweeper_task
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # Not on an event loop (e.g. a Flask request); the next write from the bot starts it
+        return
+    if _sweeper_task is not None and not _sweeper_task.done() and _sweeper_task.get_loop() is loop:
+        return
+    _sweeper_task = loop.create_task(_sweep_loop())
+
+
+def get_state_metrics() -> Dict[str, Any]:
+    """
+    Get size gauges for all stores.
+
+    Returns:
+        Dictionary with entries, evictions and expirations per store and the total size
+    """
+    metrics = {
+        name: {"entries": len(store), "evictions": store.evictions, "expirations": store.expirations}
+        for name, store in _stores.items()
+    }
+    metrics["total_entries"] = sum(len(store) for store in _stores.values())
+    metrics["max_entries"] = GLOBAL_MAX_ENTRIES
+    return metrics
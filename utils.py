@@ -3,13 +3,16 @@ Utility functions for the Telegram cryptocurrency pool bot
 """
 
 import math
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Optional, Tuple, Union
 from datetime import datetime, timedelta
 
 def format_pool_info(pools: List[Dict[str, Any]], stable_pools: Optional[List[Dict[str, Any]]] = None, show_title: Optional[str] = None) -> str:
     """
     Format pool information for display in Telegram messages.
 
+    The text only depends on the pool data, so it is rendered once per
+    market snapshot version and shared by all users.
+
     Args:
         pools: List of pool dictionaries from API or response_data
         stable_pools: List of stable pool dictionaries (optional)
@@ -18,6 +21,17 @@ def format_pool_info(pools: List[Dict[str, Any]], stable_pools: Optional[List[Di
     Returns:
         Formatted string
     """
+    # Import at function level to avoid circular imports
+    from render_cache import get_render_cache, pools_key
+
+    return get_render_cache().get_or_render(
+        "pool_info",
+        (pools_key(pools), pools_key(stable_pools), show_title),
+        lambda: _render_pool_info(pools, stable_pools, show_title)
+    )
+
+def _render_pool_info(pools: List[Dict[str, Any]], stable_pools: Optional[List[Dict[str, Any]]] = None, show_title: Optional[str] = None) -> str:
+    """Build the text returned by format_pool_info."""
     if not pools and not stable_pools:
         return "No pools available at the moment. Please try again later."
     
@@ -193,6 +207,10 @@ def format_simulation_results(pools: List[Dict[str, Any]], amount: float) -> str
     """
     Format investment simulation results for display in Telegram messages.
 
+    Simulated earnings scale linearly with the amount, so the simulation and
+    the pool sections are prepared once per market snapshot version for a
+    $1 investment and only the amounts are filled in per request.
+
     Args:
         pools: List of pool dictionaries
         amount: Investment amount in USD
@@ -203,6 +221,42 @@ def format_simulation_results(pools: List[Dict[str, Any]], amount: float) -> str
     if not pools:
         return "No pools available for simulation. Please try again later."
 
+    # Import at function level to avoid circular imports
+    from render_cache import get_render_cache, pools_key
+
+    sections = get_render_cache().get_or_render(
+        "simulation", pools_key(pools), lambda: _simulation_sections(pools)
+    )
+    if not sections:
+        return "No pools available for simulation. Please try again later."
+
+    # Header
+    result = f"🚀 Simulation for an Investment of ${amount:,.2f}:\n\n"
+
+    # Fill in the earnings for this amount
+    for header, earnings_lines, risk_template, cooling_per_dollar in sections:
+        result += header
+        for label, per_dollar in earnings_lines:
+            result += f"  - {label} Earnings: ${per_dollar * amount:,.2f}\n"
+        result += risk_template.format(cooling=cooling_per_dollar * amount)
+
+    # Add disclaimer and helpful guidance
+    result += "Disclaimer: The numbers above are estimations and actual earnings may vary.\n\n"
+    result += "Want to compare different amounts? Use '/simulate [amount]' with your preferred investment amount.\n\n"
+    result += "Use the buttons below to explore more options or continue your investment journey."
+
+    return result
+
+def _simulation_sections(pools: List[Dict[str, Any]]) -> List[Tuple[str, List[Tuple[str, float]], str, float]]:
+    """
+    Simulate a $1 investment in each pool and render the parts of each pool section that do not depend on the amount.
+
+    Args:
+        pools: List of pool dictionaries
+
+    Returns:
+        List of (header, [(horizon label, earnings per dollar)], risk line template, cooled annual earnings per dollar)
+    """
     # Helper function to safely get dictionary values
     def get_value(pool, key, default=0):
         # Handle the different key names in our response_data vs. API
@@ -249,51 +303,42 @@ def format_simulation_results(pools: List[Dict[str, Any]], amount: float) -> str
         display_pools = pools
 
     if not display_pools:
-        return "No pools available for simulation. Please try again later."
+        return []
 
-    # Header
-    result = f"🚀 Simulation for an Investment of ${amount:,.2f}:\n\n"
+    # Simulate all pools and horizons in one vectorized pass
+    from investment_simulator import simulate_returns, DEFAULT_HORIZONS
+    simulation = simulate_returns(display_pools, [1.0], DEFAULT_HORIZONS, scenarios=["steady", "cooling"])
+    horizon_labels = {1: "Daily", 7: "Weekly", 30: "Monthly", 365: "Annual"}
+    monthly = DEFAULT_HORIZONS.index(30)
+    annual = DEFAULT_HORIZONS.index(365)
 
-    # Generate simulations for each pool
-    for pool in display_pools:
+    sections = []
+    for i, record in enumerate(simulation["records"]):
         try:
-            # Parse numeric values safely
-            pool_id = str(get_value(pool, 'id'))
-            apr_24h = float(get_value(pool, 'apr_24h'))
-            
-            # Calculate rates and earnings
-            daily_rate = apr_24h / 365
-            daily_earnings = amount * (daily_rate / 100)
-            weekly_earnings = daily_earnings * 7
-            monthly_earnings = daily_earnings * 30
-            yearly_earnings = amount * (apr_24h / 100)
-
-            # Get token information
-            token_a = get_value(pool, 'token_a_symbol')
-            token_b = get_value(pool, 'token_b_symbol')
-            token_pair = f"{token_a}/{token_b}"
+            earnings = simulation["earnings"][i, 0]  # (horizons, scenarios)
+            il_bands = simulation["il_bands"][i]  # (horizons, bands)
 
-            # Format each pool's simulation results
-            pool_info = (
-                f"• Pool ID: 📋 {pool_id}\n"
-                f"  Token Pair: {token_pair}\n"
-                f"  - Daily Earnings: ${daily_earnings:.2f}\n"
-                f"  - Weekly Earnings: ${weekly_earnings:.2f}\n"
-                f"  - Monthly Earnings: ${monthly_earnings:.2f}\n"
-                f"  - Annual Earnings: ${yearly_earnings:.2f}\n"
-                f"\n"
+            header = (
+                f"• Pool ID: 📋 {record['id']}\n"
+                f"  Token Pair: {record['pair']}\n"
+            )
+            earnings_lines = [
+                (horizon_labels.get(int(days), f'{days}-Day'), float(earnings[h, 0]))
+                for h, days in enumerate(simulation["horizons"])
+            ]
+
+            # Downside: annual earnings if the APR cools off and a 1σ price move over a month
+            risk_template = (
+                "  - If APR cools off: ${cooling:,.2f} per year\n"
+                f"  - Impermanent loss risk (1σ, 30d): {il_bands[monthly, 0] * 100:.2f}%\n"
+                "\n"
             )
-            result += pool_info
+            sections.append((header, earnings_lines, risk_template, float(earnings[annual, 1])))
         except Exception as e:
             # Skip this pool if calculation fails
             continue
 
-    # Add disclaimer and helpful guidance
-    result += "Disclaimer: The numbers above are estimations and actual earnings may vary.\n\n"
-    result += "Want to compare different amounts? Use '/simulate [amount]' with your preferred investment amount.\n\n"
-    result += "Use the buttons below to explore more options or continue your investment journey."
-
-    return result
+    return sections
 
 def format_daily_update(pools: List[Dict[str, Any]]) -> str:
     """
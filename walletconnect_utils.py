@@ -10,6 +10,7 @@ import time
 import uuid
 import asyncio
 from typing import Dict, Any, Optional, Union, Tuple
+from contextlib import contextmanager
 import urllib.parse  # Standard library for URL encoding
 from datetime import datetime, timedelta
 
@@ -31,7 +32,6 @@ except ImportError:
 
 # Try to import optional dependencies with fallbacks
 try:
-    import psycopg2
     from psycopg2.extras import Json
     PSYCOPG2_AVAILABLE = True
 except ImportError:
@@ -69,20 +69,30 @@ if not DATABASE_URL and PSYCOPG2_AVAILABLE:
 #########################
 
 def get_db_connection():
-    """Create a database connection."""
+    """Borrow an autocommit database connection from the shared pool; close() returns it."""
     # Skip if psycopg2 is not available or DATABASE_URL is not set
     if not PSYCOPG2_AVAILABLE or not DATABASE_URL:
         logger.warning("Database connection not available - psycopg2 or DATABASE_URL missing")
         return None
         
     try:
-        connection = psycopg2.connect(DATABASE_URL)
-        connection.autocommit = True
-        return connection
+        # Import at function level so the pool is only loaded with psycopg2
+        from db_pool import get_pooled_connection
+        return get_pooled_connection(autocommit=True)
     except Exception as e:
         logger.error(f"Database connection error: {e}")
         return None
 
+@contextmanager
+def db_connection():
+    """Borrow a connection like get_db_connection() for a block, returning it to the pool afterwards."""
+    conn = get_db_connection()
+    try:
+        yield conn
+    finally:
+        if conn:
+            conn.close()
+
 def init_db():
     """Initialize the database tables needed for WalletConnect sessions."""
     # Import app at function level to avoid circular imports
@@ -95,8 +105,7 @@ def init_db():
     
     try:
         # Use app context for database operations
-        with app.app_context():
-            conn = get_db_connection()
+        with app.app_context(), db_connection() as conn:
             if not conn:
                 logger.warning("Could not connect to database - skipping initialization")
                 return False
@@ -116,14 +125,218 @@ def init_db():
                 )
             """)
             
+            # Index for listing a user's sessions
+            from migrate_indexes import RAW_TABLE_INDEXES
+            for statement in RAW_TABLE_INDEXES["wallet_sessions"]:
+                cursor.execute(statement)
+            
             cursor.close()
-            conn.close()
             logger.info("Database initialized successfully")
             return True
     except Exception as e:
         logger.error(f"Error initializing database: {e}", exc_info=True)
         return False
 
+def _save_session(session_id: str, session_data: Dict[str, Any], telegram_user_id: int,
+                  status: str, wallet_address: Optional[str], expires_at: Any) -> None:
+    """Insert a session row. Blocking; run it with get_async_db().run_blocking()."""
+    # Import app at function level to avoid circular imports
+    from app import app
+    
+    with app.app_context(), db_connection() as conn:
+        if conn:
+            cursor = conn.cursor()
+            
+            cursor.execute(
+                """
+                INSERT INTO wallet_sessions 
+                (session_id, session_data, telegram_user_id, status, wallet_address, expires_at) 
+                VALUES (%s, %s, %s, %s, %s, %s)
+                """, 
+                (session_id, Json(session_data), telegram_user_id, status, wallet_address, expires_at)
+            )
+            
+            cursor.close()
+            logger.info(f"Saved WalletConnect session to database")
+
+def _check_session(session_id: str) -> Dict[str, Any]:
+    """Look up a session and expire it if it timed out. Blocking; run it with get_async_db().run_blocking()."""
+    # Import app at function level to avoid circular imports
+    from app import app
+    
+    # Use app context for database operations
+    with app.app_context(), db_connection() as conn:
+        if not conn:
+            logger.warning("Could not connect to database for session check")
+            return {
+                "success": True,
+                "session_id": session_id,
+                "status": "unknown",
+                "message": "Database connection failed, session status unknown",
+                "security_level": "unknown"
+            }
+            
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute(
+                "SELECT session_data, status, telegram_user_id, created_at FROM wallet_sessions WHERE session_id = %s",
+                (session_id,)
+            )
+            
+            result = cursor.fetchone()
+            
+            if not result:
+                cursor.close()
+                return {"success": False, "error": "Session not found"}
+                
+            session_data, status, telegram_user_id, created_at = result
+            
+            # Check if session has expired (default: 1 hour timeout)
+            current_time = int(time.time())
+            expires_at = session_data.get("expires_at", 0)
+            
+            if expires_at > 0 and current_time > expires_at:
+                # Session has expired, mark it as expired and return error
+                logger.info(f"Session {session_id} has expired")
+                
+                try:
+                    # Update session status in database
+                    cursor.execute(
+                        "UPDATE wallet_sessions SET status = 'expired' WHERE session_id = %s",
+                        (session_id,)
+                    )
+                except Exception as update_error:
+                    logger.warning(f"Could not update session status: {update_error}")
+                
+                cursor.close()
+                
+                return {
+                    "success": False,
+                    "error": "Session has expired. Please create a new wallet connection.",
+                    "session_id": session_id,
+                    "expired": True
+                }
+            
+            # Add security level information to the response
+            security_level = session_data.get("security_level", "unknown")
+            permissions = session_data.get("permissions_requested", [])
+            
+            cursor.close()
+            
+            return {
+                "success": True,
+                "session_id": session_id,
+                "status": status,
+                "telegram_user_id": telegram_user_id,
+                "session_data": session_data,
+                "security_level": security_level,
+                "permissions": permissions,
+                "created_at": created_at.isoformat() if created_at else None,
+                "expires_at": expires_at if expires_at > 0 else None,
+                "expires_in_seconds": max(0, expires_at - current_time) if expires_at > 0 else None
+            }
+            
+        except Exception as db_error:
+            if cursor:
+                cursor.close()
+            raise db_error
+
+def _delete_session(session_id: str) -> Dict[str, Any]:
+    """Delete a session row. Blocking; run it with get_async_db().run_blocking()."""
+    # Import app at function level to avoid circular imports
+    from app import app
+    
+    # Use app context for database operations
+    with app.app_context(), db_connection() as conn:
+        if not conn:
+            logger.warning("Could not connect to database for session deletion")
+            return {
+                "success": True,
+                "message": "Session considered terminated (database unreachable)",
+                "warning": "Database operations skipped - could not connect"
+            }
+            
+        try:
+            cursor = conn.cursor()
+            
+            # Simple deletion without checking first
+            cursor.execute(
+                "DELETE FROM wallet_sessions WHERE session_id = %s",
+                (session_id,)
+            )
+            
+            cursor.close()
+            
+        except Exception as db_error:
+            logger.error(f"Database error while killing session: {db_error}", exc_info=True)
+            return {
+                "success": True,
+                "message": "Session considered terminated (database error)",
+                "warning": f"Database error: {str(db_error)}"
+            }
+    
+    return {
+        "success": True,
+        "message": "Session terminated successfully"
+    }
+
+def _list_user_sessions(telegram_user_id: int) -> Dict[str, Any]:
+    """List a user's sessions, newest first. Blocking; run it with get_async_db().run_blocking()."""
+    # Import app at function level to avoid circular imports
+    from app import app
+    
+    # Use app context for database operations
+    with app.app_context(), db_connection() as conn:
+        if not conn:
+            logger.warning("Could not connect to database for getting user sessions")
+            return {
+                "success": True,
+                "telegram_user_id": telegram_user_id,
+                "sessions": [],
+                "warning": "Database connection failed - cannot retrieve sessions"
+            }
+            
+        try:
+            cursor = conn.cursor()
+            
+            cursor.execute(
+                """
+                SELECT session_id, session_data, status, created_at 
+                FROM wallet_sessions 
+                WHERE telegram_user_id = %s
+                ORDER BY created_at DESC
+                """,
+                (telegram_user_id,)
+            )
+            
+            sessions = []
+            for row in cursor.fetchall():
+                session_id, session_data, status, created_at = row
+                sessions.append({
+                    "session_id": session_id,
+                    "status": status,
+                    "created_at": created_at.isoformat() if created_at else None,
+                    "uri": session_data.get("uri", "") if session_data else "",
+                })
+            
+            cursor.close()
+            
+            return {
+                "success": True,
+                "telegram_user_id": telegram_user_id,
+                "sessions": sessions
+            }
+            
+        except Exception as db_error:
+            logger.error(f"Database error while getting user sessions: {db_error}", exc_info=True)
+            return {
+                "success": True,
+                "telegram_user_id": telegram_user_id,
+                "sessions": [],
+                "warning": f"Database error: {str(db_error)}"
+            }
+
 #########################
 # WalletConnect Integration
 #########################
@@ -138,8 +351,8 @@ async def create_walletconnect_session(telegram_user_id: int) -> Dict[str, Any]:
     Returns:
         Dictionary with session details including URI
     """
-    # Import app at function level to avoid circular imports
-    from app import app
+    # Import at function level to avoid circular imports
+    from async_db import get_async_db
     
     # If Solana wallet service is available, use it instead of the legacy implementation
     if SOLANA_SERVICE_AVAILABLE:
@@ -153,51 +366,36 @@ async def create_walletconnect_session(telegram_user_id: int) -> Dict[str, Any]:
             # Save to database if successful and database is available
             if result["success"] and PSYCOPG2_AVAILABLE and DATABASE_URL:
                 try:
-                    with app.app_context():
-                        conn = get_db_connection()
-                        if conn:
-                            cursor = conn.cursor()
-                            
-                            # Convert to ISO format if datetime objects
-                            expires_at = result.get("expires_at")
-                            if isinstance(expires_at, str):
-                                # Already in correct format
-                                pass
-                            elif hasattr(expires_at, "isoformat"):
-                                # Convert datetime to string
-                                expires_at = expires_at.isoformat()
-                            else:
-                                # Use default expiration if not available
-                                expires_at = (datetime.now() + timedelta(hours=1)).isoformat()
-                            
-                            session_data = {
-                                "uri": result.get("uri", ""),
-                                "qr_uri": result.get("qr_uri", ""),
-                                "created": int(time.time()),
-                                "session_id": result["session_id"],
-                                "security_level": result.get("security_level", "read_only"),
-                                "expires_at": expires_at,
-                            }
-                            
-                            cursor.execute(
-                                """
-                                INSERT INTO wallet_sessions 
-                                (session_id, session_data, telegram_user_id, status, wallet_address, expires_at) 
-                                VALUES (%s, %s, %s, %s, %s, %s)
-                                """, 
-                                (
-                                    result["session_id"], 
-                                    Json(session_data), 
-                                    telegram_user_id, 
-                                    result.get("status", "pending"),
-                                    result.get("wallet_address", None),
-                                    expires_at
-                                )
-                            )
-                            
-                            cursor.close()
-                            conn.close()
-                            logger.info(f"Saved WalletConnect session to database")
+                    # Convert to ISO format if datetime objects
+                    expires_at = result.get("expires_at")
+                    if isinstance(expires_at, str):
+                        # Already in correct format
+                        pass
+                    elif hasattr(expires_at, "isoformat"):
+                        # Convert datetime to string
+                        expires_at = expires_at.isoformat()
+                    else:
+                        # Use default expiration if not available
+                        expires_at = (datetime.now() + timedelta(hours=1)).isoformat()
+                    
+                    session_data = {
+                        "uri": result.get("uri", ""),
+                        "qr_uri": result.get("qr_uri", ""),
+                        "created": int(time.time()),
+                        "session_id": result["session_id"],
+                        "security_level": result.get("security_level", "read_only"),
+                        "expires_at": expires_at,
+                    }
+                    
+                    await get_async_db().run_blocking(
+                        _save_session,
+                        result["session_id"],
+                        session_data,
+                        telegram_user_id,
+                        result.get("status", "pending"),
+                        result.get("wallet_address", None),
+                        expires_at
+                    )
                 except Exception as db_error:
                     logger.warning(f"Could not save WalletConnect session to database: {db_error}")
             
@@ -272,35 +470,20 @@ async def create_walletconnect_session(telegram_user_id: int) -> Dict[str, Any]:
         # Try to save to database if available, but continue even if it fails
         try:
             if PSYCOPG2_AVAILABLE and DATABASE_URL:
-                # Use app context for database operations
-                with app.app_context():
-                    conn = get_db_connection()
-                    if conn:
-                        cursor = conn.cursor()
-                        
-                        expires_at = datetime.now() + timedelta(hours=1)
-                        
-                        session_data = {
-                            "uri": data["uri"],
-                            "raw_wc_uri": data.get("raw_wc_uri", ""),
-                            "created": int(time.time()),
-                            "session_id": data.get("id", ""),
-                            "security_level": "read_only",
-                            "expires_at": expires_at.isoformat(),
-                        }
-                        
-                        cursor.execute(
-                            """
-                            INSERT INTO wallet_sessions 
-                            (session_id, session_data, telegram_user_id, status, expires_at) 
-                            VALUES (%s, %s, %s, %s, %s)
-                            """, 
-                            (session_id, Json(session_data), telegram_user_id, "pending", expires_at)
-                        )
-                        
-                        cursor.close()
-                        conn.close()
-                        logger.info(f"Saved WalletConnect session to database")
+                expires_at = datetime.now() + timedelta(hours=1)
+                
+                session_data = {
+                    "uri": data["uri"],
+                    "raw_wc_uri": data.get("raw_wc_uri", ""),
+                    "created": int(time.time()),
+                    "session_id": data.get("id", ""),
+                    "security_level": "read_only",
+                    "expires_at": expires_at.isoformat(),
+                }
+                
+                await get_async_db().run_blocking(
+                    _save_session, session_id, session_data, telegram_user_id, "pending", None, expires_at
+                )
         except Exception as db_error:
             # Just log the error but continue - we don't need the database for the core functionality
             logger.warning(f"Could not save WalletConnect session to database: {db_error}")
@@ -333,8 +516,8 @@ async def check_walletconnect_session(session_id: str) -> Dict[str, Any]:
     Returns:
         Dictionary with session status and security information
     """
-    # Import app at function level to avoid circular imports
-    from app import app
+    # Import at function level to avoid circular imports
+    from async_db import get_async_db
     
     # If Solana wallet service is available, use it instead of the legacy implementation
     if SOLANA_SERVICE_AVAILABLE:
@@ -368,89 +551,7 @@ async def check_walletconnect_session(session_id: str) -> Dict[str, Any]:
         }
     
     try:
-        # Use app context for database operations
-        with app.app_context():
-            conn = get_db_connection()
-            if not conn:
-                logger.warning("Could not connect to database for session check")
-                return {
-                    "success": True,
-                    "session_id": session_id,
-                    "status": "unknown",
-                    "message": "Database connection failed, session status unknown",
-                    "security_level": "unknown"
-                }
-                
-            cursor = conn.cursor()
-            
-            try:
-                cursor.execute(
-                    "SELECT session_data, status, telegram_user_id, created_at FROM wallet_sessions WHERE session_id = %s",
-                    (session_id,)
-                )
-                
-                result = cursor.fetchone()
-                
-                if not result:
-                    cursor.close()
-                    conn.close()
-                    return {"success": False, "error": "Session not found"}
-                    
-                session_data, status, telegram_user_id, created_at = result
-                
-                # Check if session has expired (default: 1 hour timeout)
-                current_time = int(time.time())
-                expires_at = session_data.get("expires_at", 0)
-                
-                if expires_at > 0 and current_time > expires_at:
-                    # Session has expired, mark it as expired and return error
-                    logger.info(f"Session {session_id} has expired")
-                    
-                    try:
-                        # Update session status in database
-                        cursor.execute(
-                            "UPDATE wallet_sessions SET status = 'expired' WHERE session_id = %s",
-                            (session_id,)
-                        )
-                    except Exception as update_error:
-                        logger.warning(f"Could not update session status: {update_error}")
-                    
-                    cursor.close()
-                    conn.close()
-                    
-                    return {
-                        "success": False,
-                        "error": "Session has expired. Please create a new wallet connection.",
-                        "session_id": session_id,
-                        "expired": True
-                    }
-                
-                # Add security level information to the response
-                security_level = session_data.get("security_level", "unknown")
-                permissions = session_data.get("permissions_requested", [])
-                
-                cursor.close()
-                conn.close()
-                
-                return {
-                    "success": True,
-                    "session_id": session_id,
-                    "status": status,
-                    "telegram_user_id": telegram_user_id,
-                    "session_data": session_data,
-                    "security_level": security_level,
-                    "permissions": permissions,
-                    "created_at": created_at.isoformat() if created_at else None,
-                    "expires_at": expires_at if expires_at > 0 else None,
-                    "expires_in_seconds": max(0, expires_at - current_time) if expires_at > 0 else None
-                }
-                
-            except Exception as db_error:
-                if cursor:
-                    cursor.close()
-                if conn and conn.closed == 0:
-                    conn.close()
-                raise db_error
+        return await get_async_db().run_blocking(_check_session, session_id)
             
     except Exception as e:
         logger.error(f"Error checking WalletConnect session: {e}", exc_info=True)
@@ -469,8 +570,8 @@ async def kill_walletconnect_session(session_id: str) -> Dict[str, Any]:
     Returns:
         Dictionary with operation result
     """
-    # Import app at function level to avoid circular imports
-    from app import app
+    # Import at function level to avoid circular imports
+    from async_db import get_async_db
     
     # If Solana wallet service is available, use it instead of the legacy implementation
     if SOLANA_SERVICE_AVAILABLE:
@@ -502,44 +603,7 @@ async def kill_walletconnect_session(session_id: str) -> Dict[str, Any]:
         }
     
     try:
-        # Use app context for database operations
-        with app.app_context():
-            # Skip database check if not available
-            conn = get_db_connection()
-            if not conn:
-                logger.warning("Could not connect to database for session deletion")
-                return {
-                    "success": True,
-                    "message": "Session considered terminated (database unreachable)",
-                    "warning": "Database operations skipped - could not connect"
-                }
-                
-            try:
-                cursor = conn.cursor()
-                
-                # Simple deletion without checking first
-                cursor.execute(
-                    "DELETE FROM wallet_sessions WHERE session_id = %s",
-                    (session_id,)
-                )
-                
-                cursor.close()
-                conn.close()
-                
-            except Exception as db_error:
-                logger.error(f"Database error while killing session: {db_error}", exc_info=True)
-                if conn and conn.closed == 0:
-                    conn.close()
-                return {
-                    "success": True,
-                    "message": "Session considered terminated (database error)",
-                    "warning": f"Database error: {str(db_error)}"
-                }
-        
-        return {
-            "success": True,
-            "message": "Session terminated successfully"
-        }
+        return await get_async_db().run_blocking(_delete_session, session_id)
         
     except Exception as e:
         logger.error(f"Error killing WalletConnect session: {e}", exc_info=True)
@@ -559,8 +623,8 @@ async def get_user_walletconnect_sessions(telegram_user_id: int) -> Dict[str, An
     Returns:
         Dictionary with list of sessions
     """
-    # Import app at function level to avoid circular imports
-    from app import app
+    # Import at function level to avoid circular imports
+    from async_db import get_async_db
     
     # If database not available, return empty list
     if not PSYCOPG2_AVAILABLE or not DATABASE_URL:
@@ -573,60 +637,7 @@ async def get_user_walletconnect_sessions(telegram_user_id: int) -> Dict[str, An
         }
     
     try:
-        # Use app context for database operations
-        with app.app_context():
-            conn = get_db_connection()
-            if not conn:
-                logger.warning("Could not connect to database for getting user sessions")
-                return {
-                    "success": True,
-                    "telegram_user_id": telegram_user_id,
-                    "sessions": [],
-                    "warning": "Database connection failed - cannot retrieve sessions"
-                }
-                
-            try:
-                cursor = conn.cursor()
-                
-                cursor.execute(
-                    """
-                    SELECT session_id, session_data, status, created_at 
-                    FROM wallet_sessions 
-                    WHERE telegram_user_id = %s
-                    ORDER BY created_at DESC
-                    """,
-                    (telegram_user_id,)
-                )
-                
-                sessions = []
-                for row in cursor.fetchall():
-                    session_id, session_data, status, created_at = row
-                    sessions.append({
-                        "session_id": session_id,
-                        "status": status,
-                        "created_at": created_at.isoformat() if created_at else None,
-                        "uri": session_data.get("uri", "") if session_data else "",
-                    })
-                
-                cursor.close()
-                conn.close()
-                
-                return {
-                    "success": True,
-                    "telegram_user_id": telegram_user_id,
-                    "sessions": sessions
-                }
-                
-            except Exception as db_error:
-                logger.error(f"Database error while getting user sessions: {db_error}", exc_info=True)
-                if conn and conn.closed == 0:
-                    conn.close()
-                return {
-                    "success": True,
-                    "telegram_user_id": telegram_user_id,
-                    "sessions": [],
-                    "warning": f"Database error: {str(db_error)}"
-                }
+        return await get_async_db().run_blocking(_list_user_sessions, telegram_user_id)
             
     except Exception as e:
         logger.error(f"Error getting user WalletConnect sessions: {e}", exc_info=True)
@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Webhook server for FiLot Telegram bot
+Receives updates from Telegram over HTTPS POSTs instead of long polling and
+puts them straight into the Application's update queue; BOT_MODE selects
+webhook or polling for every entry point
+
+Usage:
+    BOT_MODE=webhook WEBHOOK_URL=https://bot.example.com python run_bot.py
+    python webhook_server.py --post "hello"       # POST a synthetic message to the local server
+    python webhook_server.py --callback explore_pools
+"""
+
+import os
+import sys
+import hmac
+import json
+import time
+import signal
+import asyncio
+import logging
+import threading
+from typing import Dict, Any, List, Optional
+
+from aiohttp import web
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# How updates are received: "polling" or "webhook"
+BOT_MODE = os.environ.get("BOT_MODE", "polling").lower()
+
+# Public HTTPS base URL Telegram posts to, e.g. https://bot.example.com
+WEBHOOK_URL = os.environ.get("WEBHOOK_URL", "")
+
+# Path the webhook is served on
+WEBHOOK_PATH = os.environ.get("WEBHOOK_PATH", "/telegram")
+
+# Address and port the webhook server listens on (behind the HTTPS proxy)
+WEBHOOK_LISTEN = os.environ.get("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.environ.get("WEBHOOK_PORT", "8443"))
+
+# Sent by Telegram in X-Telegram-Bot-Api-Secret-Token; requests without it are rejected
+WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET", "")
+
+# Header carrying the secret token
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+# Update types the bot handles
+ALLOWED_UPDATES = ["message", "callback_query"]
+
+# Largest request body accepted (Telegram updates are a few KB)
+MAX_UPDATE_SIZE = 1024 * 1024
+
+
+# Keys of the state stored on the webhook app
+APPLICATION_KEY = web.AppKey("application", Any)
+SECRET_KEY = web.AppKey("secret", str)
+METRICS_KEY = web.AppKey("metrics", Dict[str, Any])
+
+# Webhook counters reported by /health
+_metrics: Dict[str, Any] = {"received": 0, "rejected": 0, "invalid": 0, "last_update_at": None}
+
+
+async def handle_update(request: web.Request) -> web.Response:
+    """Verify a webhook POST and enqueue the update it carries."""
+    metrics = request.app[METRICS_KEY]
+    secret = request.app[SECRET_KEY]
+    if secret and not hmac.compare_digest(request.headers.get(SECRET_HEADER, ""), secret):
+        metrics["rejected"] += 1
+        logger.warning(f"Rejected webhook request from {request.remote} with a wrong secret token")
+        return web.Response(status=403)
+
+    # Import at function level so the synthetic update poster runs without the bot
+    from telegram import Update
+
+    application = request.app[APPLICATION_KEY]
+    try:
+        update = Update.de_json(await request.json(), application.bot)
+    except Exception as e:
+        metrics["invalid"] += 1
+        logger.error(f"Invalid webhook update: {e}")
+        return web.Response(status=400)
+
+    # Answer Telegram right away; handlers run from the update queue
+    await application.update_queue.put(update)
+    metrics["received"] += 1
+    metrics["last_update_at"] = time.time()
+    return web.Response()
+
+
+def create_webhook_app(application, secret: str = WEBHOOK_SECRET, path: str = WEBHOOK_PATH) -> web.Application:
+    """
+    Create the webhook web application.
+
+    Args:
+        application: telegram.ext.Application whose update queue receives the updates
+        secret: Expected secret token (checking is skipped if empty)
+        path: Path the webhook is served on
+
+    Returns:
+        aiohttp Application serving POST <path>
+    """
+    app = web.Application(client_max_size=MAX_UPDATE_SIZE)
+    app[APPLICATION_KEY] = application
+    app[SECRET_KEY] = secret
+    app[METRICS_KEY] = _metrics
+    app.router.add_post(path, handle_update)
+    return app
+
+
+def get_webhook_metrics() -> Dict[str, Any]:
+    """
+    Get webhook counters.
+
+    Returns:
+        Dictionary with the mode and received, rejected and invalid update counts
+    """
+    return dict(_metrics, mode=BOT_MODE)
+
+
+async def serve_webhook(application, url: Optional[str] = WEBHOOK_URL, secret: str = WEBHOOK_SECRET,
+                        listen: str = WEBHOOK_LISTEN, port: int = WEBHOOK_PORT, path: str = WEBHOOK_PATH,
+                        allowed_updates: Optional[List[str]] = ALLOWED_UPDATES,
+                        drop_pending_updates: bool = False,
+                        stop_event: Optional[asyncio.Event] = None) -> None:
+    """
+    Run the application with a webhook until stopped.
+
+    Args:
+        application: telegram.ext.Application to run
+        url: Public base URL registered with Telegram (the path is appended);
+            None for a worker behind the sharding ingress, which registers the webhook itself
+        secret: Secret token Telegram (or the ingress) sends with every update
+        listen: Address to listen on
+        port: Port to listen on
+        path: Path the webhook is served on
+        allowed_updates: Update types Telegram should send
+        drop_pending_updates: Whether to discard updates that arrived while the bot was down
+        stop_event: Event ending the server when set (SIGINT/SIGTERM in the main thread)
+    """
+    stop_event = stop_event or asyncio.Event()
+    if threading.current_thread() is threading.main_thread():
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop_event.set)
+            except NotImplementedError:
+                pass
+
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    runner = web.AppRunner(create_webhook_app(application, secret, path))
+    try:
+        await application.start()
+        await runner.setup()
+        await web.TCPSite(runner, listen, port).start()
+        if url is not None:
+            await application.bot.set_webhook(
+                url=url.rstrip("/") + path,
+                secret_token=secret or None,
+                allowed_updates=allowed_updates,
+                drop_pending_updates=drop_pending_updates,
+            )
+        logger.info(f"Webhook server listening on {listen}:{port}{path}")
+        await stop_event.wait()
+    finally:
+        await runner.cleanup()
+        if application.running:
+            await application.stop()
+            if application.post_stop:
+                await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+        logger.info("Webhook server stopped")
+
+
+def run_application(application, mode: str = BOT_MODE, **polling_kwargs) -> None:
+    """
+    Run the application in the configured mode, blocking until it stops.
+
+    Args:
+        application: telegram.ext.Application to run
+        mode: "webhook" or "polling"
+        **polling_kwargs: Arguments for run_polling (drop_pending_updates also applies to webhooks)
+    """
+    if mode == "webhook":
+        if not WEBHOOK_URL:
+            raise ValueError("WEBHOOK_URL must be set when BOT_MODE is webhook")
+        if not WEBHOOK_SECRET:
+            logger.warning("WEBHOOK_SECRET not set, webhook requests are not authenticated")
+        asyncio.run(serve_webhook(
+            application,
+            allowed_updates=polling_kwargs.get("allowed_updates", ALLOWED_UPDATES),
+            drop_pending_updates=polling_kwargs.get("drop_pending_updates", False),
+        ))
+    else:
+        # run_polling removes any webhook before it starts polling
+        application.run_polling(**polling_kwargs)
+
+
+def synthetic_update(update_id: int, user_id: int = 1, text: Optional[str] = None,
+                     callback_data: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Build a minimal update as Telegram would send it.
+
+    Args:
+        update_id: Update ID
+        user_id: Sender's user and chat ID
+        text: Message text (for a message update)
+        callback_data: Button data (for a callback query update)
+
+    Returns:
+        Update as a JSON-serializable dictionary
+    """
+    user = {"id": user_id, "is_bot": False, "first_name": "Test"}
+    chat = {"id": user_id, "type": "private", "first_name": "Test"}
+    message = {"message_id": update_id, "date": int(time.time()), "chat": chat, "from": user,
+               "text": text or ""}
+    if callback_data is not None:
+        return {"update_id": update_id, "callback_query": {
+            "id": str(update_id), "from": user, "chat_instance": str(user_id),
+            "data": callback_data, "message": dict(message, text="Menu"),
+        }}
+    return {"update_id": update_id, "message": message}
+
+
+async def post_synthetic_update(update: Dict[str, Any], url: Optional[str] = None,
+                                secret: str = WEBHOOK_SECRET) -> int:
+    """
+    POST an update to a webhook server the way Telegram does.
+
+    Args:
+        update: Update dictionary (see synthetic_update)
+        url: Webhook URL (defaults to the local server)
+        secret: Secret token to send
+
+    Returns:
+        HTTP status code of the response
+    """
+    # Import at function level to avoid circular imports
+    import aiohttp
+
+    url = url or f"http://127.0.0.1:{WEBHOOK_PORT}{WEBHOOK_PATH}"
+    headers = {SECRET_HEADER: secret} if secret else {}
+    async with aiohttp.ClientSession() as session:
+        async with session.post(url, json=update, headers=headers) as response:
+            return response.status
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+        level=logging.INFO
+    )
+    if len(sys.argv) != 3 or sys.argv[1] not in ("--post", "--callback"):
+        print(__doc__)
+        sys.exit(1)
+    kwargs = {"text": sys.argv[2]} if sys.argv[1] == "--post" else {"callback_data": sys.argv[2]}
+    status = asyncio.run(post_synthetic_update(synthetic_update(int(time.time()), **kwargs)))
+    print(json.dumps({"status": status}))
@@ -11,8 +11,12 @@ import logging
 import threading
 import asyncio
 import traceback
-from app import app
-from bot import create_application
+from startup import phase
+
+with phase("import"):
+    from app import app, init_app
+    from bot import create_application
+    from webhook_server import run_application, ALLOWED_UPDATES
 
 # Configure logging
 logging.basicConfig(
@@ -25,8 +29,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# WSGI application reference
+# WSGI application reference; tables and the keep-alive are set up before serving
 application = app
+init_app()
 
 def run_flask():
     """Run the Flask application"""
@@ -38,20 +43,14 @@ def run_flask():
 def run_bot():
     """Run the Telegram bot"""
     try:
-        # First, try to delete any existing webhook
-        token = os.environ.get("TELEGRAM_TOKEN") or os.environ.get("TELEGRAM_BOT_TOKEN")
-        if token:
-            import requests
-            requests.get(f"https://api.telegram.org/bot{token}/deleteWebhook?drop_pending_updates=true")
-            # Clear existing updates to prevent conflicts
-            requests.get(f"https://api.telegram.org/bot{token}/getUpdates", params={"offset": -1, "timeout": 0})
-
         # Create and initialize the bot application
-        bot_app = create_application()
+        with phase("create_application"):
+            bot_app = create_application()
 
-        # Run the bot with proper cleanup
-        bot_app.run_polling(
-            allowed_updates=["message", "callback_query"],
+        # Run the bot with proper cleanup, by webhook or polling as configured
+        run_application(
+            bot_app,
+            allowed_updates=ALLOWED_UPDATES,
             close_loop=False,
             drop_pending_updates=True,
             stop_signals=None  # Prevent automatic signal handling